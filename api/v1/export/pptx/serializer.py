@@ -0,0 +1,21 @@
+from django.urls import reverse
+from rest_framework.fields import SerializerMethodField
+from rest_framework.serializers import ModelSerializer
+from plan_visual_django.models import VisualExportJob
+
+
+class ExportJobSerialiser(ModelSerializer):
+    """
+    Status of a PowerPoint export.  Once complete the file can be downloaded from download_url.
+    """
+    download_url = SerializerMethodField()
+
+    class Meta:
+        model = VisualExportJob
+        fields = ["id", "visual", "render_revision", "status", "error_message", "created", "updated", "download_url"]
+
+    @staticmethod
+    def get_download_url(job):
+        if job.status != VisualExportJob.Status.COMPLETE:
+            return None
+        return reverse("download-visual-pptx", args=[job.visual_id])
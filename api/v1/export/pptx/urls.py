@@ -0,0 +1,7 @@
+from django.urls import path
+from api.v1.export.pptx.views import ExportPptxVisualAPI, ExportPptxJobAPI
+
+urlpatterns = [
+    path('visuals/<int:visual_id>/', ExportPptxVisualAPI.as_view()),
+    path('jobs/<int:job_id>/', ExportPptxJobAPI.as_view()),
+]
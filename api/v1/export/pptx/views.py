@@ -0,0 +1,52 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from api.v1.export.pptx.serializer import ExportJobSerialiser
+from plan_visual_django.models import PlanVisual, VisualExportJob
+from plan_visual_django.services.auth.user_services import CurrentUser
+from plan_visual_django.services.visual.export.pptx_export import request_visual_export, get_job_status
+
+
+def _get_object_for_user(request, model, object_id):
+    """
+    Returns the visual or export job if it exists and belongs to the current user or session, otherwise None.
+    """
+    try:
+        obj = model.objects.get(id=object_id)
+    except model.DoesNotExist:
+        return None
+
+    if not CurrentUser(request).has_access_to_object(obj):
+        return None
+    return obj
+
+
+def _job_response(job):
+    response_status = status.HTTP_200_OK if job.is_finished else status.HTTP_202_ACCEPTED
+    return Response(ExportJobSerialiser(job).data, status=response_status)
+
+
+class ExportPptxVisualAPI(APIView):
+    """
+    Starts a PowerPoint export of the visual at its current revision (or returns the existing export if there is one).
+
+    Returns 200 if the export has finished (including when the file is already in the export cache), otherwise 202,
+    in which case the job url can be polled until it has finished.
+    """
+    @staticmethod
+    def post(request, visual_id):
+        visual = _get_object_for_user(request, PlanVisual, visual_id)
+        if visual is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return _job_response(request_visual_export(visual))
+
+
+class ExportPptxJobAPI(APIView):
+    @staticmethod
+    def get(request, job_id):
+        job = _get_object_for_user(request, VisualExportJob, job_id)
+        if job is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return _job_response(get_job_status(job))
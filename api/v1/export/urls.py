@@ -0,0 +1,5 @@
+from django.urls import path, include
+
+urlpatterns = [
+    path('pptx/', include('api.v1.export.pptx.urls')),
+]
@@ -1,8 +1,9 @@
 from django.urls import path, include
-from api.v1.model.plan.views import ModelPlanListAPI, ModelPlanAPI
+from api.v1.model.plan.views import ModelPlanListAPI, ModelPlanAPI, PlanTreeCacheStatsAPI
 
 urlpatterns = [
     path('activities/', include('api.v1.model.plan.activity.urls')),
+    path('tree-cache-stats/', PlanTreeCacheStatsAPI.as_view()),
     path('', ModelPlanListAPI.as_view()),
     path('<int:id>/', ModelPlanAPI.as_view()),
 ]
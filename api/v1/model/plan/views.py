@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from api.v1.model.plan.serializer import ModelPlanSerialiser, ModelPlanListSerialiser
 from plan_visual_django.models import Plan, PlanVisual
+from plan_visual_django.services.plan_file_utilities.plan_tree_cache import get_plan_tree_cache_stats
 
 
 class ModelPlanListAPI(APIView):
@@ -27,4 +28,10 @@ class ModelPlanAPI(APIView):
         return Response(response)
 
 
-
+class PlanTreeCacheStatsAPI(APIView):
+    """
+    Returns hit and miss counts for the cache of plan trees in this process.
+    """
+    @staticmethod
+    def get(request):
+        return Response(get_plan_tree_cache_stats())
@@ -0,0 +1,32 @@
+from rest_framework.fields import SerializerMethodField
+from rest_framework.serializers import ModelSerializer
+from plan_visual_django.models import PlanImportJob
+
+
+class PlanImportJobSerialiser(ModelSerializer):
+    """
+    Status and progress of a plan import, with the descriptions of the status and stage for display.
+    """
+    status_description = SerializerMethodField()
+    stage_description = SerializerMethodField()
+    is_finished = SerializerMethodField()
+
+    class Meta:
+        model = PlanImportJob
+        fields = [
+            "id", "plan", "plan_name", "update_flag", "status", "status_description", "stage", "stage_description",
+            "rows_read", "activities_added", "activities_updated", "activities_deleted", "skipped_unchanged",
+            "cancel_requested", "error_message", "is_finished", "created", "updated"
+        ]
+
+    @staticmethod
+    def get_status_description(job):
+        return job.get_status_display()
+
+    @staticmethod
+    def get_stage_description(job):
+        return job.get_stage_display()
+
+    @staticmethod
+    def get_is_finished(job):
+        return job.is_finished
@@ -0,0 +1,8 @@
+from django.urls import path
+from api.v1.plan_import.views import PlanImportJobListAPI, PlanImportJobAPI, PlanImportJobCancelAPI
+
+urlpatterns = [
+    path('jobs/', PlanImportJobListAPI.as_view()),
+    path('jobs/<int:job_id>/', PlanImportJobAPI.as_view()),
+    path('jobs/<int:job_id>/cancel/', PlanImportJobCancelAPI.as_view()),
+]
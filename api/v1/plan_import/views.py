@@ -0,0 +1,69 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from api.v1.plan_import.serializer import PlanImportJobSerialiser
+from plan_visual_django.models import PlanImportJob
+from plan_visual_django.services.auth.user_services import CurrentUser
+from plan_visual_django.services.plan_file_utilities.plan_import import get_job_status, cancel_import_job, \
+    get_user_import_jobs
+
+MAX_JOBS_LISTED = 20
+
+
+def _get_job_for_user(request, job_id):
+    """
+    Returns the job if it exists and belongs to the current user or session, otherwise None.
+    """
+    try:
+        job = PlanImportJob.objects.get(id=job_id)
+    except PlanImportJob.DoesNotExist:
+        return None
+
+    if not CurrentUser(request).has_access_to_object(job):
+        return None
+    return job
+
+
+def _job_response(job):
+    response_status = status.HTTP_200_OK if job.is_finished else status.HTTP_202_ACCEPTED
+    return Response(PlanImportJobSerialiser(job).data, status=response_status)
+
+
+class PlanImportJobListAPI(APIView):
+    """
+    Most recent plan imports for the current user or session.
+    """
+    @staticmethod
+    def get(request):
+        jobs = [get_job_status(job) for job in get_user_import_jobs(CurrentUser(request))[:MAX_JOBS_LISTED]]
+        return Response(PlanImportJobSerialiser(jobs, many=True).data)
+
+
+class PlanImportJobAPI(APIView):
+    """
+    Status and progress of a plan import.  Returns 200 once the import has finished, otherwise 202, so it can be polled
+    until it has finished.
+    """
+    @staticmethod
+    def get(request, job_id):
+        job = _get_job_for_user(request, job_id)
+        if job is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return _job_response(get_job_status(job))
+
+
+class PlanImportJobCancelAPI(APIView):
+    """
+    Cancels a plan import.  An import which has already started saving activities will still complete, so the returned
+    job may not be cancelled.
+    """
+    @staticmethod
+    def post(request, job_id):
+        job = _get_job_for_user(request, job_id)
+        if job is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        if not job.is_finished:
+            job = cancel_import_job(job)
+        return _job_response(job)
@@ -0,0 +1,31 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from plan_visual_django.services.visual.rendering.render_binary import encode_canvas_binary, CANVAS_BINARY_MEDIA_TYPE
+
+
+class CanvasBinaryRenderer(BaseRenderer):
+    """
+    Renders output from CanvasRenderer in the compact binary format (see render_binary.py).  Used when the client
+    asks for it in the Accept header.
+    """
+    media_type = CANVAS_BINARY_MEDIA_TYPE
+    format = "canvas-binary"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        if not (isinstance(data, dict) and all(isinstance(layer, list) for layer in data.values())):
+            # Not rendered canvas output (e.g. an error message) so return it as JSON.
+            response = (renderer_context or {}).get("response")
+            if response is not None:
+                response["Content-Type"] = "application/json"
+            return JSONRenderer().render(data, renderer_context=renderer_context)
+
+        return encode_canvas_binary(data)
+
+
+# JSON remains the default - binary is only used if the client asks for it.
+CANVAS_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, CanvasBinaryRenderer]
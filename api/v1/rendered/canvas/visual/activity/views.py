@@ -1,8 +1,11 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from api.v1.rendered.canvas.renderers import CANVAS_RENDERER_CLASSES
 from plan_visual_django.models import PlanVisual
 from plan_visual_django.services.visual.rendering.renderers import CanvasRenderer
+from plan_visual_django.services.visual.rendering.render_cache import get_or_render, render_cache_headers
+from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
 
 
 class RenderedCanvasVisualActivityListAPI(APIView):
@@ -10,6 +13,8 @@ class RenderedCanvasVisualActivityListAPI(APIView):
     This API is used to render the visual activities for display as part of the visual
     in the browser.
     """
+    renderer_classes = CANVAS_RENDERER_CLASSES
+
     @staticmethod
     def get(request, visual_id):
         """
@@ -23,10 +28,14 @@ class RenderedCanvasVisualActivityListAPI(APIView):
         if visual.activity_count() == 0:
             return Response(status=status.HTTP_204_NO_CONTENT, data=None)
         else:
-            visual_activity_plotables = {"activities": visual.get_visual_activity_plotables()}
-            renderer = CanvasRenderer()
-            rendered_plotables = renderer.render_from_iterable(visual_activity_plotables)
-            return Response(rendered_plotables)
+            rendered_plotables, cache_hit = get_or_render(
+                visual,
+                "activities",
+                lambda: CanvasRenderer().render_from_iterable(
+                    {"activities": VisualRenderSnapshot(visual).get_visual_activity_plotables()}
+                )
+            )
+            return Response(rendered_plotables, headers=render_cache_headers(visual, cache_hit))
 
 
 class RenderedCanvasVisualActivityAPI(APIView):
@@ -34,6 +43,8 @@ class RenderedCanvasVisualActivityAPI(APIView):
     This API is used to render a specific visual activity for display as part of the visual
     in the browser.
     """
+    renderer_classes = CANVAS_RENDERER_CLASSES
+
     @staticmethod
     def get(request, visual_id, unique_id):
         """
@@ -47,9 +58,13 @@ class RenderedCanvasVisualActivityAPI(APIView):
         if visual.activity_count() == 0:
             return Response(status=status.HTTP_204_NO_CONTENT, data=None)
         else:
-            activity = visual.visualactivity_set.get(unique_id_from_plan=unique_id)
-            activity_plotable = activity.get_plotable()
-            visual_activity_plotables = {"activities": [activity_plotable]}
-            renderer = CanvasRenderer()
-            rendered_plotables = renderer.render_from_iterable(visual_activity_plotables)
-            return Response(rendered_plotables)
\ No newline at end of file
+            def render_activity():
+                activity_plotable = VisualRenderSnapshot(visual).get_visual_activity_plotable(unique_id)
+                if activity_plotable is None:
+                    return None
+                return CanvasRenderer().render_from_iterable({"activities": [activity_plotable]})
+
+            rendered_plotables, cache_hit = get_or_render(visual, f"activity:{unique_id}", render_activity)
+            if rendered_plotables is None:
+                return Response(status=status.HTTP_404_NOT_FOUND, data=None)
+            return Response(rendered_plotables, headers=render_cache_headers(visual, cache_hit))
\ No newline at end of file
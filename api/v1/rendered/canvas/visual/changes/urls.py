@@ -0,0 +1,7 @@
+from django.urls import path
+
+from api.v1.rendered.canvas.visual.changes.views import RenderedCanvasVisualChangesAPI
+
+urlpatterns = [
+    path('<int:visual_id>/', RenderedCanvasVisualChangesAPI.as_view()),
+]
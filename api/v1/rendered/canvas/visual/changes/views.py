@@ -0,0 +1,43 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from plan_visual_django.models import PlanVisual
+from plan_visual_django.services.visual.rendering.render_cache import get_or_render, render_cache_headers
+from plan_visual_django.services.visual.rendering.render_changelog import get_rendered_changes
+from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
+from plan_visual_django.services.visual.rendering.renderers import CanvasRenderer
+
+
+class RenderedCanvasVisualChangesAPI(APIView):
+    """
+    This API is used to update the visual in the browser after an edit, by returning just the rendered objects which
+    have changed since the revision of the visual the browser already has.
+    """
+    @staticmethod
+    def get(request, visual_id):
+        """
+        Returns changes to the rendered visual since the revision supplied in the "since" query parameter.  If the
+        parameter is missing, or the revision is no longer held on the server, then the full visual is returned.
+
+        :param request:
+        :param visual_id:
+        :return:
+        """
+        visual = PlanVisual.objects.get(id=visual_id)
+
+        try:
+            since_revision = int(request.query_params["since"])
+        except (KeyError, ValueError):
+            since_revision = None
+
+        if visual.activity_count() == 0:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        rendered_plotables, cache_hit = get_or_render(
+            visual,
+            "visual",
+            lambda: CanvasRenderer().render_from_iterable(VisualRenderSnapshot(visual).get_plotables())
+        )
+        changes = get_rendered_changes(visual, since_revision, rendered_plotables)
+
+        return Response(changes, headers=render_cache_headers(visual, cache_hit))
@@ -1,14 +1,19 @@
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from api.v1.rendered.canvas.renderers import CANVAS_RENDERER_CLASSES
 from plan_visual_django.models import PlanVisual
 from plan_visual_django.services.visual.rendering.renderers import CanvasRenderer
+from plan_visual_django.services.visual.rendering.render_cache import get_or_render, render_cache_headers
+from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
 
 
 class RenderedCanvasVisualTimelineListAPI(ListAPIView):
     """
     This API is used to generate data to render all the timelines for the given visual on html canvas.
     """
+    renderer_classes = CANVAS_RENDERER_CLASSES
+
     def get(self, request, visual_id=None, **kwargs):
         """
         This method returns a JSON object containing all plotables for the specified visual.
@@ -17,14 +22,15 @@ class RenderedCanvasVisualTimelineListAPI(ListAPIView):
         :return:
         """
         visual = PlanVisual.objects.get(id=visual_id)
-        timeline_plotables = {
-            'timelines': visual.get_timeline_plotables()
-        }
-
-        renderer = CanvasRenderer()
-        rendered_plotables = renderer.render_from_iterable(timeline_plotables)
+        rendered_plotables, cache_hit = get_or_render(
+            visual,
+            "timelines",
+            lambda: CanvasRenderer().render_from_iterable({
+                'timelines': VisualRenderSnapshot(visual).get_timeline_plotables()
+            })
+        )
 
-        return Response(data=rendered_plotables)
+        return Response(data=rendered_plotables, headers=render_cache_headers(visual, cache_hit))
 
 
 
@@ -32,6 +38,8 @@ class RenderedCanvasVisualTimelineAPI(APIView):
     """
     This API is used to generate data to render all the timelines for the given visual on html canvas.
     """
+    renderer_classes = CANVAS_RENDERER_CLASSES
+
     @staticmethod
     def get(request, visual_id, sequence_num, **kwargs):
         """
@@ -41,11 +49,12 @@ class RenderedCanvasVisualTimelineAPI(APIView):
         :return:
         """
         visual = PlanVisual.objects.get(id=visual_id)
-        timeline_plotables = {
-            'timelines': [visual.get_timeline_plotables(sequence_number=sequence_num)]
-        }
-
-        renderer = CanvasRenderer()
-        rendered_plotables = renderer.render_from_iterable(timeline_plotables)
-
-        return Response(data=rendered_plotables)
\ No newline at end of file
+        rendered_plotables, cache_hit = get_or_render(
+            visual,
+            f"timelines:{sequence_num}",
+            lambda: CanvasRenderer().render_from_iterable({
+                'timelines': [VisualRenderSnapshot(visual).get_timeline_plotables(sequence_number=sequence_num)]
+            })
+        )
+
+        return Response(data=rendered_plotables, headers=render_cache_headers(visual, cache_hit))
\ No newline at end of file
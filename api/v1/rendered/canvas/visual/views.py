@@ -1,18 +1,34 @@
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from api.v1.rendered.canvas.renderers import CANVAS_RENDERER_CLASSES, CanvasBinaryRenderer
 from plan_visual_django.models import PlanVisual
+from plan_visual_django.services.visual.rendering.render_cache import get_or_render, render_cache_headers, \
+    get_render_cache_stats, get_cached_render
+from plan_visual_django.services.visual.rendering.render_changelog import record_rendered_revision
+from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
+from plan_visual_django.services.visual.rendering.render_streaming import stream_json_layers
 from plan_visual_django.services.visual.rendering.renderers import CanvasRenderer
 
+STREAM_QUERY_PARAM = "stream"
+
 
 class RenderCanvasVisualAPI(APIView):
     """
     This API is used to render the visual for display in the browser.
     """
+    renderer_classes = CANVAS_RENDERER_CLASSES
+
     @staticmethod
     def get(request, visual_id):
         """
-        This method returns a JSON object containing all plotables for the specified visual.
+        This method returns a JSON object containing all plotables for the specified visual.  The rendered output
+        is cached against the revision of the visual so is only re-calculated when the visual has changed.
+
+        If the query parameter stream=true is included, the JSON is streamed to the browser as it is rendered (see
+        render_streaming.py), which is better for very large visuals.  The binary format (see render_binary.py) is
+        returned instead of JSON if the client asks for it in the Accept header, and isn't streamed.
         :param request:
         :param visual_id:
         :return:
@@ -21,8 +37,46 @@ class RenderCanvasVisualAPI(APIView):
 
         if visual.activity_count() == 0:
             return Response(status=status.HTTP_204_NO_CONTENT)
+        elif request.query_params.get(STREAM_QUERY_PARAM, "").lower() in ("1", "true", "yes") and \
+                not isinstance(request.accepted_renderer, CanvasBinaryRenderer):
+            return RenderCanvasVisualAPI.stream(visual)
         else:
-            visual_plotables = visual.get_plotables()
-            renderer = CanvasRenderer()
-            rendered_plotables = renderer.render_from_iterable(visual_plotables)
-            return Response(rendered_plotables)
+            rendered_plotables, cache_hit = get_or_render(
+                visual,
+                "visual",
+                lambda: CanvasRenderer().render_from_iterable(VisualRenderSnapshot(visual).get_plotables())
+            )
+            # Record what has been sent so that the browser can ask for just the changes after the next edit.
+            record_rendered_revision(visual, rendered_plotables)
+            return Response(rendered_plotables, headers=render_cache_headers(visual, cache_hit))
+
+    @staticmethod
+    def stream(visual):
+        """
+        Streams the rendered visual.  If it's already in the cache then the cached output is streamed, otherwise the
+        plotables are rendered lazily as the response is sent.  Output rendered while streaming isn't cached or
+        recorded in the changelog, as that would mean holding the whole rendered visual in memory, which is what
+        streaming is there to avoid.
+
+        :param visual:
+        :return:
+        """
+        rendered_plotables = get_cached_render(visual, "visual")
+        cache_hit = rendered_plotables is not None
+        if not cache_hit:
+            # Load everything from the database now, so that only rendering happens while the response is streamed.
+            rendered_plotables = CanvasRenderer().iter_render(VisualRenderSnapshot(visual).get_plotables())
+
+        response = StreamingHttpResponse(stream_json_layers(rendered_plotables), content_type="application/json")
+        for header, value in render_cache_headers(visual, cache_hit).items():
+            response[header] = value
+        return response
+
+
+class RenderCacheStatsAPI(APIView):
+    """
+    Returns hit and miss counts for the cache of rendered visuals.
+    """
+    @staticmethod
+    def get(request):
+        return Response(get_render_cache_stats())
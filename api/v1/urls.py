@@ -3,4 +3,6 @@ from django.urls import path, include
 urlpatterns = [
     path('model/', include('api.v1.model.urls')),
     path('rendered/', include('api.v1.rendered.urls')),
+    path('export/', include('api.v1.export.urls')),
+    path('plan-import/', include('api.v1.plan_import.urls')),
 ]
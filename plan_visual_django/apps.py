@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PlanVisualDjangoConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "plan_visual_django"
+
+    def ready(self):
+        # Connect signal handlers
+        from plan_visual_django import signals  # noqa: F401
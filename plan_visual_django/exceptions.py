@@ -26,4 +26,12 @@ class AddPlanError(Exception):
 
 
 class MissingPlotableIdError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class PlanImportCancelled(Exception):
+    pass
+
+
+class PlanImportLimitReached(Exception):
+    pass
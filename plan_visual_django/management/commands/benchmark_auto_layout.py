@@ -0,0 +1,109 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from plan_visual_django.management.commands.benchmark_plan_tree import Command as PlanTreeBenchmark
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree
+from plan_visual_django.services.visual.model.auto_layout_pool import _initialise_worker
+from plan_visual_django.services.visual.model.full_autolayout_algorithm import LayoutOptions, Plannable, \
+    build_initial_layout, cluster_interval, count_overlapping_pairs, count_overlapping_pairs_pairwise, \
+    measure_tracks_needed, pack_with_affinity
+
+
+class Command(BaseCommand):
+    help = ("Times the full auto-layout (coarsening each lane until it fits and packing it into tracks) for large "
+            "synthetic plans, for a range of maximum tracks per lane.  Use --children-per-parent for wide plans, "
+            "where scoring the overlap of siblings dominates")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 50_000],
+                            help="Numbers of activities in the generated plans")
+        parser.add_argument("--max-tracks", type=int, nargs="+", default=[2, 12, 40],
+                            help="Maximum tracks per lane to lay out with")
+        parser.add_argument("--max-depth", type=int, default=6, help="Deepest level of the plan hierarchy")
+        parser.add_argument("--children-per-parent", type=int, default=None,
+                            help="Give every summary activity this many children, rather than a random hierarchy")
+        parser.add_argument("--workers", type=int, default=0,
+                            help="Also time laying out the lanes in parallel with this many worker processes")
+
+    @staticmethod
+    def time_overlap_scoring(plan_tree, count_overlaps):
+        """
+        Time to count the overlapping children of every summary activity, as done when scoring sibling clusters.
+        """
+        families = [
+            [cluster_interval(child) for child in node.children]
+            for node in plan_tree.get_node_list() if node.children
+        ]
+        start = time.perf_counter()
+        for intervals in families:
+            count_overlaps(intervals)
+        return (time.perf_counter() - start) * 1000
+
+    def handle(self, *args, **options):
+        executor = None
+        if options["workers"] > 0:
+            executor = ProcessPoolExecutor(
+                max_workers=options["workers"], mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialise_worker,
+            )
+            # Start the workers up front so that isn't included in the timings.
+            list(executor.map(time.sleep, [0] * options["workers"]))
+
+        try:
+            results = self.run(options, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(format_banner("Auto-layout", 40, "*"))
+        self.stdout.write(format_dict_list(results))
+
+    def run(self, options, executor):
+        results = []
+        for size in options["sizes"]:
+            activities = PlanTreeBenchmark.create_activities(size, options["max_depth"], options["children_per_parent"])
+            plan_tree = PlanTree.from_activities(activities)
+            plan_tree.get_root()  # Build the node view up front so it isn't included in the timings
+
+            # Packing every bar in the plan on its own, without coarsening.
+            plannables = [Plannable(node) for node in plan_tree.get_node_list() if not node.activity.milestone_flag]
+            start = time.perf_counter()
+            tracks_needed = measure_tracks_needed(plannables)
+            measure_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            pack_with_affinity(plannables, None)
+            pack_ms = (time.perf_counter() - start) * 1000
+
+            sweep_ms = self.time_overlap_scoring(plan_tree, count_overlapping_pairs)
+            pairwise_ms = self.time_overlap_scoring(plan_tree, count_overlapping_pairs_pairwise)
+
+            for max_tracks in options["max_tracks"]:
+                start = time.perf_counter()
+                layout = build_initial_layout(plan_tree, LayoutOptions(max_tracks_per_lane=max_tracks))
+                layout_ms = (time.perf_counter() - start) * 1000
+
+                parallel_timing = {}
+                if executor is not None:
+                    start = time.perf_counter()
+                    build_initial_layout(plan_tree, LayoutOptions(max_tracks_per_lane=max_tracks), executor=executor)
+                    parallel_timing = {
+                        f"layout, {options['workers']} workers (ms)": f"{(time.perf_counter() - start) * 1000:,.0f}"
+                    }
+
+                results.append({
+                    "activities": size,
+                    "max tracks": max_tracks,
+                    "layout (ms)": f"{layout_ms:,.0f}",
+                    **parallel_timing,
+                    "coarsen steps": len(layout["notes"]["coarsened"]),
+                    "tracks used": sum(lane["tracks_used"] for lane in layout["lanes"]),
+                    "all bars: tracks": tracks_needed,
+                    "all bars: measure (ms)": f"{measure_ms:,.1f}",
+                    "all bars: pack (ms)": f"{pack_ms:,.1f}",
+                    "overlaps: sweep (ms)": f"{sweep_ms:,.1f}",
+                    "overlaps: pairwise (ms)": f"{pairwise_ms:,.1f}",
+                })
+        return results
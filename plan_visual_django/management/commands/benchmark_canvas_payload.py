@@ -0,0 +1,91 @@
+import gzip
+import json
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from plan_visual_django.models import Color, Font, PlotableStyle, VisualActivity
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.visual.model.plotable_shapes import PlotableShapeName
+from plan_visual_django.services.visual.rendering.plotable_store import PlotableStore
+from plan_visual_django.services.visual.rendering.render_binary import encode_canvas_binary, decode_canvas_binary
+from plan_visual_django.services.visual.rendering.renderers import CanvasRenderer
+
+
+class Command(BaseCommand):
+    help = "Compares payload size and decode time of the JSON and binary formats for rendered canvas output"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1_000, 10_000, 50_000],
+            help="Numbers of activities to benchmark"
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Number of runs for each size (best is reported)")
+
+    @staticmethod
+    def create_rendered_visual(num_activities):
+        """
+        Renders a synthetic visual with the given number of activities, using a handful of styles, without needing
+        anything in the database.
+        """
+        font = Font(font_name="Arial")
+        styles = [
+            PlotableStyle(
+                fill_color=Color(red=red, green=128, blue=255 - red),
+                line_color=Color(red=0, green=0, blue=0),
+                font_color=Color(red=255, green=255, blue=255),
+                font=font,
+                line_thickness=1,
+                font_size=10,
+            )
+            for red in range(0, 250, 50)
+        ]
+        shapes = [PlotableShapeName.RECTANGLE, PlotableShapeName.ROUNDED_RECTANGLE, PlotableShapeName.DIAMOND]
+
+        store = PlotableStore()
+        for index in range(num_activities):
+            store.append(
+                f"activity-ID-{index:06}",
+                shapes[index % len(shapes)],
+                top=40 + (index % 200) * 13.0,
+                left=(index * 37 % 1000) * 1.17,
+                width=(index % 60 + 1) * 3.3,
+                height=10.0,
+                format=styles[index % len(styles)],
+                text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE,
+                text_flow=VisualActivity.TextFlow.FLOW_TO_RIGHT,
+                text=f"Activity {index}",
+                external_text_flag=False
+            )
+        return CanvasRenderer().render_from_iterable({"visual_activities": store})
+
+    def handle(self, *args, **options):
+        results = []
+        for size in options["sizes"]:
+            rendered = self.create_rendered_visual(size)
+
+            json_payload = JSONRenderer().render(rendered)
+            binary_payload = encode_canvas_binary(rendered)
+
+            json_decode_time = min(timeit.repeat(lambda: json.loads(json_payload), number=1, repeat=options["repeat"]))
+            binary_decode_time = min(
+                timeit.repeat(lambda: decode_canvas_binary(binary_payload), number=1, repeat=options["repeat"])
+            )
+
+            results.append({
+                "activities": size,
+                "json (KB)": f"{len(json_payload) / 1024:,.0f}",
+                "binary (KB)": f"{len(binary_payload) / 1024:,.0f}",
+                "json gzip (KB)": f"{len(gzip.compress(json_payload)) / 1024:,.0f}",
+                "binary gzip (KB)": f"{len(gzip.compress(binary_payload)) / 1024:,.0f}",
+                "json decode (ms)": f"{json_decode_time * 1000:.1f}",
+                "binary decode (ms)": f"{binary_decode_time * 1000:.1f}",
+            })
+
+        self.stdout.write(format_banner("Canvas payload JSON v binary", 40, "*"))
+        self.stdout.write(format_dict_list(results))
+        self.stdout.write("Decode times are for the Python decoders.  The browser decoder builds the same objects from "
+                          "typed array views, so relative times in the browser will differ.")
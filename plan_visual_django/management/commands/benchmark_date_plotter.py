@@ -0,0 +1,68 @@
+import random
+import timeit
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from plan_visual_django.services.general.date_utilities import DatePlotter
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+
+
+class Command(BaseCommand):
+    help = "Compares throughput of scalar and batch x coordinate calculation in DatePlotter"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1_000, 10_000, 100_000],
+            help="Numbers of activities to benchmark"
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Number of runs for each size (best is reported)")
+
+    def handle(self, *args, **options):
+        earliest_date = date(2023, 1, 1)
+        latest_date = date(2027, 12, 31)
+        date_plotter = DatePlotter(earliest_date, latest_date, 0, 1200)
+        num_days = (latest_date - earliest_date).days
+
+        results = []
+        randomiser = random.Random(0)
+        for size in options["sizes"]:
+            start_dates = [earliest_date + timedelta(days=randomiser.randint(0, num_days)) for _ in range(size)]
+            end_dates = [
+                start_date + timedelta(days=randomiser.randint(0, (latest_date - start_date).days))
+                for start_date in start_dates
+            ]
+
+            def scalar():
+                return [
+                    (
+                        date_plotter.left(start_date),
+                        date_plotter.width(start_date, end_date),
+                        date_plotter.midpoint(start_date)
+                    )
+                    for start_date, end_date in zip(start_dates, end_dates)
+                ]
+
+            def batch():
+                # Includes conversion to ordinals as callers will need to do that.
+                return date_plotter.batch_coordinates(
+                    [start_date.toordinal() for start_date in start_dates],
+                    [end_date.toordinal() for end_date in end_dates],
+                )
+
+            scalar_time = min(timeit.repeat(scalar, number=1, repeat=options["repeat"]))
+            batch_time = min(timeit.repeat(batch, number=1, repeat=options["repeat"]))
+
+            results.append({
+                "activities": size,
+                "scalar (ms)": f"{scalar_time * 1000:.2f}",
+                "batch (ms)": f"{batch_time * 1000:.2f}",
+                "scalar (activities/s)": f"{size / scalar_time:,.0f}",
+                "batch (activities/s)": f"{size / batch_time:,.0f}",
+                "speed up": f"{scalar_time / batch_time:.1f}x",
+            })
+
+        self.stdout.write(format_banner("DatePlotter scalar v batch", 40, "*"))
+        self.stdout.write(format_dict_list(results))
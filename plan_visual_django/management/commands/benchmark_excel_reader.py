@@ -0,0 +1,173 @@
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+import openpyxl
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from openpyxl.styles import Alignment
+from plan_visual_django.models import Plan
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.plan_file_utilities.plan_field import PlanInputField, FileTypes
+from plan_visual_django.services.plan_file_utilities.plan_reader import ExcelXLSFileReader
+
+
+class CellByCellExcelReader(ExcelXLSFileReader):
+    """
+    The reader as it was before streaming was introduced, kept here for comparison.  Loads the whole workbook, reads
+    every cell individually until 100 blank rows have been seen, builds a table by column and then turns it back into
+    rows.
+    """
+    def iter_rows(self, plan):
+        records, headings = self.read(plan)
+        return iter(records), headings
+
+    def read(self, plan):
+        wb_obj = openpyxl.load_workbook(plan.file.file, data_only=True)
+        sheet = wb_obj[self.get_sheet_name(wb_obj.sheetnames, Path(plan.file_name).stem, plan.file_type_name)]
+
+        headings = []
+        column = 1
+        while sheet.cell(1, column).value is not None:
+            headings.append(sheet.cell(1, column).value)
+            column += 1
+
+        table = {heading: [] for heading in headings}
+        num_blank_rows = 0
+        read_row_num = 1
+        while num_blank_rows <= 100:
+            maybe_row = {}
+            row_confirmed = False
+            for col, heading in enumerate(headings):
+                cell = sheet.cell(read_row_num + 1, col + 1)
+                maybe_row[heading] = PlanInputField(value=cell.value, indent=cell.alignment.indent)
+                if cell.value is not None:
+                    row_confirmed = True
+            if row_confirmed:
+                for heading in headings:
+                    table[heading].append(maybe_row[heading])
+            else:
+                num_blank_rows += 1
+            read_row_num += 1
+
+        num_rows = len(next(iter(table.values())))
+        return [{heading: table[heading][row] for heading in table} for row in range(num_rows)], headings
+
+
+class Command(BaseCommand):
+    help = "Compares time and peak memory of the streaming and cell by cell Excel readers on synthetic plan exports"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[2_000, 20_000],
+            help="Numbers of activities in the generated files"
+        )
+
+    @staticmethod
+    def create_msp_export(num_activities: int) -> bytes:
+        """
+        File laid out like an MS Project export (excel-01-msp-export-default-01), with plan data on the Task_Data
+        sheet.
+        """
+        workbook = openpyxl.Workbook()
+        workbook.active.title = "Summary"
+        sheet = workbook.create_sheet("Task_Data")
+        sheet.append(["Outline_Level", "Outline_Number", "Name", "Duration", "Start_Date", "Finish_Date", "ID",
+                      "Milestone"])
+        start = datetime(2024, 1, 1, 8)
+        for index in range(num_activities):
+            start_date = start + timedelta(days=index % 500)
+            duration = index % 20
+            sheet.append([
+                index % 4 + 1, f"1.{index + 1}", f"Activity {index + 1}", f"{duration} days",
+                start_date.strftime("%d %B %Y %H:%M"),
+                (start_date + timedelta(days=duration)).strftime("%d %B %Y %H:%M"),
+                str(index + 1), "Yes" if duration == 0 else "No"
+            ])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def create_smartsheet_export(num_activities: int) -> bytes:
+        """
+        File laid out like a Smartsheet export (excel-02-smartsheet-export-01), where the level of each activity is
+        held as the indent of the task name.
+        """
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = "Plan"
+        sheet.append(["Id", "Level #", "Task Name", "Duration", "Start", "Finish", "Predecessors", "Assigned To"])
+        alignments = [Alignment(indent=level) for level in range(4)]
+        start = datetime(2024, 1, 1)
+        for index in range(num_activities):
+            level = index % 4
+            start_date = start + timedelta(days=index % 500)
+            sheet.append([
+                float(index + 1), level, f"Activity {index + 1}", f"{index % 20}d",
+                start_date, start_date + timedelta(days=index % 20), None, None
+            ])
+            sheet.cell(index + 2, 3).alignment = alignments[level]
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def read_and_parse(reader, file_path, file_name, file_type_name):
+        plan = mock.Mock(spec=Plan)
+        plan.file_type_name = file_type_name
+        plan.file_name = file_name
+        _, plan_field_mapping = FileTypes.get_file_type_by_name(file_type_name)
+        with open(file_path, "rb") as file:
+            plan.file = File(file)
+            rows, headings = reader.iter_rows(plan)
+            return reader.parse(rows, headings, plan_field_mapping=plan_field_mapping)
+
+    def measure(self, reader, file_path, file_name, file_type_name):
+        start = time.perf_counter()
+        parsed = self.read_and_parse(reader, file_path, file_name, file_type_name)
+        elapsed = time.perf_counter() - start
+
+        # Memory measured in a separate run as tracing slows everything down.
+        tracemalloc.start()
+        self.read_and_parse(reader, file_path, file_name, file_type_name)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return len(parsed), elapsed, peak
+
+    def handle(self, *args, **options):
+        file_formats = [
+            ("MS Project", "excel-01-msp-export-default-01", self.create_msp_export),
+            ("Smartsheet", "excel-02-smartsheet-export-01", self.create_smartsheet_export),
+        ]
+
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            for size in options["sizes"]:
+                for format_name, file_type_name, create_file in file_formats:
+                    file_name = f"plan-{size}.xlsx"
+                    file_path = os.path.join(directory, file_name)
+                    Path(file_path).write_bytes(create_file(size))
+
+                    result = {"format": format_name, "activities": size}
+                    timings = {}
+                    for reader_name, reader in (("old", CellByCellExcelReader()), ("streaming", ExcelXLSFileReader())):
+                        num_parsed, elapsed, peak = self.measure(reader, file_path, file_name, file_type_name)
+                        timings[reader_name] = elapsed
+                        result[f"{reader_name} parsed"] = num_parsed
+                        result[f"{reader_name} (ms)"] = f"{elapsed * 1000:,.0f}"
+                        result[f"{reader_name} peak (MB)"] = f"{peak / 1024 / 1024:,.1f}"
+                    result["speedup"] = f"{timings['old'] / timings['streaming']:.1f}x"
+                    results.append(result)
+
+        self.stdout.write(format_banner("Excel reader: cell by cell v streaming", 40, "*"))
+        self.stdout.write(format_dict_list(results))
@@ -0,0 +1,57 @@
+import os
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from plan_visual_django.management.commands.benchmark_excel_reader import Command as ExcelReaderBenchmark
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.plan_file_utilities.plan_field import FileType
+from plan_visual_django.services.plan_file_utilities.plan_reader import get_file_reader
+from plan_visual_django.services.plan_file_utilities.synthetic_plan import generate_synthetic_plan, \
+    write_synthetic_plan
+
+
+class Command(BaseCommand):
+    help = "Compares time and peak memory to read and parse the same synthetic plan as Excel, CSV and MS Project XML"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[2_000, 20_000],
+            help="Numbers of activities in the generated files"
+        )
+
+    def handle(self, *args, **options):
+        file_formats = [
+            ("Excel (MSP export)", FileType.EXCEL_MSP_EXPORT_DEFAULT),
+            ("CSV", FileType.CSV_PLAN_01),
+            ("MS Project XML", FileType.MSP_XML_01),
+        ]
+
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            for size in options["sizes"]:
+                activities = generate_synthetic_plan(size)
+                for format_name, file_type in file_formats:
+                    file_data, extension = write_synthetic_plan(activities, file_type)
+                    file_name = f"plan-{size}.{extension}"
+                    file_path = os.path.join(directory, file_name)
+                    Path(file_path).write_bytes(file_data)
+
+                    num_parsed, elapsed, peak = ExcelReaderBenchmark().measure(
+                        get_file_reader(file_type), file_path, file_name, file_type.file_type_name
+                    )
+                    results.append({
+                        "format": format_name,
+                        "activities": size,
+                        "file size (KB)": f"{os.path.getsize(file_path) / 1024:,.0f}",
+                        "parsed": num_parsed,
+                        "read and parse (ms)": f"{elapsed * 1000:,.0f}",
+                        "rows/s": f"{num_parsed / elapsed:,.0f}",
+                        "peak (MB)": f"{peak / 1024 / 1024:,.1f}",
+                    })
+
+        self.stdout.write(format_banner("Plan import by file format", 40, "*"))
+        self.stdout.write(format_dict_list(results))
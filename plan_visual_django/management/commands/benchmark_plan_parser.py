@@ -0,0 +1,100 @@
+import io
+import time
+from unittest import mock
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from plan_visual_django.management.commands.benchmark_excel_reader import Command as ExcelReaderBenchmark
+from plan_visual_django.models import Plan
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.plan_file_utilities.plan_field import FileType, FileTypes
+from plan_visual_django.services.plan_file_utilities.plan_reader import ExcelXLSFileReader, PlanParser, \
+    convert_dispatch
+
+
+class RowByRowPlanParser(PlanParser):
+    """
+    The parser as it was before field mappings were compiled, kept here for comparison.  Looks up the converter for
+    every field of every row.
+    """
+    def parse(self, data, headings):
+        supplied_field_mapping = self.validate_input_fields(headings)
+
+        parsed_data = []
+        for plan_record in data:
+            parsed_data_record = {}
+            ignore_record = False
+            for plan_field, input_field in supplied_field_mapping:
+                if input_field.input_field_name not in headings:
+                    parsed_data_record[plan_field.value.field_name] = "(n/a)"
+                elif not ignore_record:
+                    raw_value = plan_record[input_field.input_field_name].get_input_data(input_field.input_field_source)
+                    try:
+                        parsed_value = convert_dispatch(
+                            input_field.input_field_type.code, plan_field.value.field_type.value, raw_value
+                        )
+                    except (ValueError, TypeError):
+                        ignore_record = True
+                    else:
+                        parsed_data_record[plan_field.value.field_name.value] = parsed_value
+            if not ignore_record:
+                parsed_data.append(parsed_data_record)
+
+        return parsed_data
+
+
+class Command(BaseCommand):
+    help = "Measures parsing throughput (rows per second) for each supported plan file type"
+
+    # Generates a synthetic file laid out like each file type.
+    file_generators = {
+        FileType.EXCEL_MSP_EXPORT_DEFAULT: ExcelReaderBenchmark.create_msp_export,
+        FileType.SMARTSHEET_EXPORT_01: ExcelReaderBenchmark.create_smartsheet_export,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument("--activities", type=int, default=20_000, help="Number of activities in each plan")
+        parser.add_argument("--repeat", type=int, default=3, help="Number of runs for each (best is reported)")
+
+    @staticmethod
+    def read_rows(file_type: FileType, file_data: bytes):
+        """
+        Reads the rows in before timing, so that only parsing is measured.
+        """
+        plan = mock.Mock(spec=Plan)
+        plan.file_type_name = file_type.file_type_name
+        plan.file_name = "benchmark.xlsx"
+        plan.file = File(io.BytesIO(file_data))
+        return ExcelXLSFileReader().read(plan)
+
+    @staticmethod
+    def time_parse(parser_class, plan_field_mapping, rows, headings, repeat):
+        timings = []
+        for _ in range(repeat):
+            parser = parser_class(plan_field_mapping=plan_field_mapping)
+            start = time.perf_counter()
+            parsed = parser.parse(iter(rows), headings)
+            timings.append(time.perf_counter() - start)
+        return len(parsed), min(timings)
+
+    def handle(self, *args, **options):
+        results = []
+        for file_type, plan_field_mapping in FileTypes.file_type_data.items():
+            if file_type not in self.file_generators:
+                self.stdout.write(f"No synthetic file for {file_type.title}, skipped")
+                continue
+
+            rows, headings = self.read_rows(file_type, self.file_generators[file_type](options["activities"]))
+
+            result = {"file type": file_type.title, "rows": len(rows)}
+            timings = {}
+            for parser_name, parser_class in (("row by row", RowByRowPlanParser), ("compiled", PlanParser)):
+                num_parsed, elapsed = self.time_parse(parser_class, plan_field_mapping, rows, headings, options["repeat"])
+                timings[parser_name] = elapsed
+                result[f"{parser_name} parsed"] = num_parsed
+                result[f"{parser_name} (rows/s)"] = f"{len(rows) / elapsed:,.0f}"
+            result["speedup"] = f"{timings['row by row'] / timings['compiled']:.1f}x"
+            results.append(result)
+
+        self.stdout.write(format_banner("Plan parser throughput", 40, "*"))
+        self.stdout.write(format_dict_list(results))
@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from plan_visual_django.models import Plan
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.visual.export.pptx_deck_export import render_plan_deck_bytes, get_visuals_for_deck
+from plan_visual_django.services.visual.export.pptx_export import _initialise_worker
+
+
+class Command(BaseCommand):
+    help = "Times export of all visuals of a plan as one PowerPoint deck with different numbers of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("plan_id", type=int, help="Plan to export (needs to be in the database)")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            nargs="+",
+            default=[0, 1, 2, os.cpu_count()],
+            help="Numbers of worker processes to try (0 calculates plotables in this process)"
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Number of runs for each (best is reported)")
+
+    @staticmethod
+    def time_export(plan, executor, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render_plan_deck_bytes(plan, executor=executor)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def handle(self, *args, **options):
+        try:
+            plan = Plan.objects.get(id=options["plan_id"])
+        except Plan.DoesNotExist:
+            raise CommandError(f"Plan {options['plan_id']} does not exist")
+
+        num_visuals = get_visuals_for_deck(plan).count()
+
+        results = []
+        for num_workers in sorted(set(options["workers"])):
+            if num_workers == 0:
+                elapsed = self.time_export(plan, None, options["repeat"])
+            else:
+                with ProcessPoolExecutor(
+                        max_workers=num_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_initialise_worker
+                ) as executor:
+                    # Start the workers before timing, as in the server the pool is already running.
+                    list(executor.map(abs, range(num_workers)))
+                    elapsed = self.time_export(plan, executor, options["repeat"])
+
+            results.append({
+                "workers": num_workers,
+                "visuals": num_visuals,
+                "total (ms)": f"{elapsed * 1000:,.0f}",
+                "per visual (ms)": f"{elapsed * 1000 / max(num_visuals, 1):,.1f}",
+            })
+
+        self.stdout.write(format_banner(f"Plan deck export: {plan.plan_name}", 40, "*"))
+        self.stdout.write(format_dict_list(results))
+        self.stdout.write(f"{os.cpu_count()} CPUs available.  Slides are assembled in this process after the plotables "
+                          f"have been calculated, so that part doesn't change with the number of workers.")
@@ -0,0 +1,129 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from plan_visual_django.models import Plan, PlanActivity
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.plan_file_utilities.plan_parsing import read_and_parse_plan, analyse_plan_changes, \
+    create_plan_activity
+
+
+class ParsedDataReader:
+    """
+    Returns activities as if they had already been read and parsed from a plan file, so that only the database
+    updates are timed.
+    """
+    def __init__(self, activities):
+        self.activities = activities
+
+    def iter_rows(self, plan):
+        return iter([]), []
+
+    def parse(self, raw_data, headers, plan_field_mapping):
+        return [dict(activity) for activity in self.activities]
+
+
+def row_by_row_reimport(plan, activities):
+    """
+    Re-import as it was before bulk updates were introduced, kept here for comparison.  Every activity still in the
+    plan is saved whether it has changed or not, and deleted activities are removed one at a time.
+    """
+    from plan_visual_django.models import VisualActivity
+
+    activities = [dict(activity, sequence_number=index) for index, activity in enumerate(activities, start=1)]
+    new_activities, updated_activities, deleted_ids = analyse_plan_changes(activities, plan)
+    for activity in new_activities:
+        create_plan_activity(plan, activity).save()
+    for activity in updated_activities:
+        record = PlanActivity.objects.get(plan=plan, unique_sticky_activity_id=activity['unique_sticky_activity_id'])
+        record.activity_name = activity['activity_name']
+        record.start_date = activity['start_date']
+        record.end_date = activity['end_date']
+        record.level = activity['level']
+        record.sequence_number = activity['sequence_number']
+        record.save()
+    for sticky_id in deleted_ids:
+        PlanActivity.objects.get(plan=plan, unique_sticky_activity_id=sticky_id).delete()
+        for visual in plan.planvisual_set.all():
+            VisualActivity.objects.filter(visual=visual, unique_id_from_plan=sticky_id).delete()
+
+
+class Command(BaseCommand):
+    help = "Times re-upload of a large plan where a small proportion of activities have changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--activities", type=int, default=10_000, help="Number of activities in the plan")
+        parser.add_argument("--change-percent", type=float, default=1.0, help="Percentage of activities changed")
+        parser.add_argument("--skip-old", action="store_true", help="Don't time the row by row re-import")
+
+    @staticmethod
+    def create_activities(num_activities):
+        start = date(2024, 1, 1)
+        return [
+            {
+                'unique_sticky_activity_id': f"BM-{index:06}",
+                'activity_name': f"Activity {index}",
+                'duration': index % 20,
+                'start_date': start + timedelta(days=index % 500),
+                'end_date': start + timedelta(days=index % 500 + index % 20),
+                'level': index % 4 + 1,
+            }
+            for index in range(num_activities)
+        ]
+
+    @staticmethod
+    def change_activities(activities, change_percent):
+        """
+        Changes a spread of activities, with a third renamed, a third moved and a third replaced by new activities.
+        """
+        num_changes = max(int(len(activities) * change_percent / 100), 1)
+        step = max(len(activities) // num_changes, 1)
+        changed = [dict(activity) for activity in activities]
+        for change_number, index in enumerate(range(0, len(changed), step)[:num_changes]):
+            if change_number % 3 == 0:
+                changed[index]['activity_name'] += " (renamed)"
+            elif change_number % 3 == 1:
+                changed[index]['end_date'] += timedelta(days=7)
+            else:
+                changed[index]['unique_sticky_activity_id'] += "-NEW"
+        return changed, num_changes
+
+    def time_reimport(self, reimport, activities, changed_activities):
+        """
+        Imports the base plan, then times re-upload of the changed plan.  Everything is rolled back afterwards.
+        """
+        with transaction.atomic():
+            plan = Plan.objects.create(plan_name="Re-import benchmark", file_name="benchmark.xlsx",
+                                       file_type_name="excel-02-smartsheet-export-01")
+            read_and_parse_plan(plan, None, ParsedDataReader(activities))
+
+            start = time.perf_counter()
+            reimport(plan, changed_activities)
+            elapsed = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+        return elapsed
+
+    def handle(self, *args, **options):
+        activities = self.create_activities(options["activities"])
+        changed_activities, num_changes = self.change_activities(activities, options["change_percent"])
+
+        implementations = [
+            ("bulk", lambda plan, data: read_and_parse_plan(plan, None, ParsedDataReader(data), update_flag=True)),
+        ]
+        if not options["skip_old"]:
+            implementations.insert(0, ("row by row", row_by_row_reimport))
+
+        results = []
+        for name, reimport in implementations:
+            elapsed = self.time_reimport(reimport, activities, changed_activities)
+            results.append({
+                "implementation": name,
+                "activities": len(activities),
+                "changed": num_changes,
+                "re-import (ms)": f"{elapsed * 1000:,.0f}",
+            })
+
+        self.stdout.write(format_banner("Plan re-import", 40, "*"))
+        self.stdout.write(format_dict_list(results))
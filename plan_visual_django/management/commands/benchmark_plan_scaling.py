@@ -0,0 +1,246 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from plan_visual_django.models import Plan, PlanActivity, PlanVisual, TimelineForVisual, VisualActivity
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.plan_file_utilities.plan_field import FileType, FileTypes
+from plan_visual_django.services.plan_file_utilities.plan_parsing import read_and_parse_plan
+from plan_visual_django.services.plan_file_utilities.plan_reader import get_file_reader
+from plan_visual_django.services.plan_file_utilities.synthetic_plan import generate_synthetic_plan, \
+    write_synthetic_plan
+from plan_visual_django.services.visual.export.pptx_export import render_pptx_bytes
+from plan_visual_django.services.visual.model.auto_layout import VisualLayoutManager
+from plan_visual_django.services.visual.model.full_autolayout_algorithm import build_initial_layout
+from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
+from plan_visual_django.services.visual.rendering.renderers import CanvasRenderer
+
+# Stages timed for each plan size, in the order they are run.
+STAGES = [
+    "import",
+    "tree build",
+    "auto-layout",
+    "create visual",
+    "canvas render",
+    "pptx render",
+    "canvas render (all activities)",
+    "pptx render (all activities)",
+]
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Times each stage from importing a plan file to rendering it (import, plan tree, auto-layout, canvas and "
+            "PowerPoint rendering) on synthetic plans of increasing size, and saves the results as JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[100, 1_000, 10_000, 50_000],
+            help="Numbers of activities in the generated plans"
+        )
+        parser.add_argument(
+            "--file-type",
+            choices=[file_type.file_type_name for file_type in FileType],
+            default=FileType.CSV_PLAN_01.file_type_name,
+            help="File type the synthetic plan is imported from"
+        )
+        parser.add_argument("--max-depth", type=int, default=4, help="Deepest level of the plan hierarchy")
+        parser.add_argument("--milestone-ratio", type=float, default=0.1,
+                            help="Proportion of leaf activities which are milestones")
+        parser.add_argument("--date-spread", type=int, default=730,
+                            help="Number of days within which all activities fall")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic plans")
+        parser.add_argument("--repeat", type=int, default=1,
+                            help="Number of runs of each stage after import (best is reported)")
+        parser.add_argument("--skip-pptx", action="store_true", help="Don't time PowerPoint rendering")
+        parser.add_argument(
+            "--pptx-limit",
+            type=int,
+            default=5_000,
+            help="Don't time PowerPoint rendering of visuals with more activities than this, as it can take many minutes"
+        )
+        parser.add_argument("--output", type=Path, default=Path("plan_scaling_benchmark.json"),
+                            help="File to write the results to")
+        parser.add_argument("--compare", type=Path, help="Results file from an earlier run to compare against")
+
+    @staticmethod
+    def timed(function, repeat=1):
+        """
+        :return: Result of the last call, and the best time in milliseconds.
+        """
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - start)
+        return result, round(min(timings) * 1000, 1)
+
+    @staticmethod
+    def create_visual_with_all_activities(plan: Plan) -> PlanVisual:
+        """
+        Visual with every activity in the plan, one per track in a single swimlane, so that rendering is measured at
+        the full size of the plan (the auto-layout only picks a selection of activities).
+        """
+        visual = PlanVisual.objects.create_with_defaults(plan=plan)
+        TimelineForVisual.create_default_timeline(visual, TimelineForVisual.TimelineLabelType.MONTHS, enabled=True)
+        swimlane = visual.add_swimlanes_to_visual(visual.default_swimlane_plotable_style, "All activities")[0]
+        VisualActivity.objects.bulk_create([
+            VisualActivity(
+                visual=visual,
+                unique_id_from_plan=sticky_id,
+                enabled=True,
+                swimlane=swimlane,
+                plotable_shape=visual.default_milestone_shape if milestone_flag else visual.default_activity_shape,
+                vertical_positioning_value=track_number,
+                height_in_tracks=1,
+                text_horizontal_alignment=VisualActivity.HorizontalAlignment.CENTER,
+                text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE,
+                text_flow=VisualActivity.TextFlow.FLOW_TO_RIGHT,
+                plotable_style=visual.default_activity_plotable_style,
+            )
+            for track_number, (sticky_id, milestone_flag) in enumerate(
+                PlanActivity.objects.filter(plan=plan).values_list('unique_sticky_activity_id', 'milestone_flag'),
+                start=1
+            )
+        ], batch_size=1000)
+        return visual
+
+    def run_stages(self, size, file_type: FileType, options):
+        """
+        Runs every stage for a plan of the given size.  Everything written to the database is rolled back afterwards.
+
+        :return: Time in milliseconds for each stage, and counts of what was processed.
+        """
+        activities = generate_synthetic_plan(
+            size,
+            max_depth=options["max_depth"],
+            milestone_ratio=options["milestone_ratio"],
+            date_spread_days=options["date_spread"],
+            seed=options["seed"],
+        )
+        file_data, extension = write_synthetic_plan(activities, file_type)
+        _, plan_field_mapping = FileTypes.get_file_type_by_name(file_type.file_type_name)
+        repeat = options["repeat"]
+
+        timings = {}
+        counts = {"file size (bytes)": len(file_data)}
+        with transaction.atomic():
+            plan = Plan.objects.create(
+                user=get_user_model().objects.order_by('id').first(),
+                plan_name=f"Scaling benchmark {size}",
+                file_name=f"synthetic-{size}.{extension}",
+                file_type_name=file_type.file_type_name,
+                file=ContentFile(file_data, name=f"synthetic-{size}.{extension}"),
+            )
+
+            (added, _, _), timings["import"] = self.timed(
+                lambda: read_and_parse_plan(plan, plan_field_mapping, get_file_reader(file_type))
+            )
+            counts["activities imported"] = added
+
+            plan_tree, timings["tree build"] = self.timed(plan.get_plan_tree, repeat)
+            _, timings["auto-layout"] = self.timed(
+                lambda: build_initial_layout(plan_tree, VisualLayoutManager.full_visual_layout_options()), repeat
+            )
+
+            visual, timings["create visual"] = self.timed(lambda: VisualLayoutManager.create_full_visual(plan))
+            TimelineForVisual.create_default_timeline(visual, TimelineForVisual.TimelineLabelType.MONTHS, enabled=True)
+            all_activities_visual = self.create_visual_with_all_activities(plan)
+
+            for suffix, render_visual in (("", visual), (" (all activities)", all_activities_visual)):
+                counts[f"visual activities{suffix}"] = VisualActivity.objects.filter(visual=render_visual).count()
+                _, timings[f"canvas render{suffix}"] = self.timed(
+                    lambda: CanvasRenderer().render_from_iterable(VisualRenderSnapshot(render_visual.id).get_plotables()),
+                    repeat
+                )
+                if not options["skip_pptx"] and counts[f"visual activities{suffix}"] <= options["pptx_limit"]:
+                    pptx_bytes, timings[f"pptx render{suffix}"] = self.timed(
+                        lambda: render_pptx_bytes(VisualRenderSnapshot(render_visual.id).get_plotables()), repeat
+                    )
+                    counts[f"pptx size (bytes){suffix}"] = len(pptx_bytes)
+
+            plan.file.delete(save=False)
+            transaction.set_rollback(True)
+
+        return timings, counts
+
+    @staticmethod
+    def load_baseline(path: Path):
+        try:
+            baseline = json.loads(path.read_text())
+        except (OSError, ValueError) as exception:
+            raise CommandError(f"Can't read results to compare against from {path}: {exception}")
+        return {result["activities"]: result["timings_ms"] for result in baseline["results"]}, baseline.get("commit")
+
+    def handle(self, *args, **options):
+        file_type = FileType.from_name(options["file_type"])
+        baseline, baseline_commit = self.load_baseline(options["compare"]) if options["compare"] else ({}, None)
+
+        results = []
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            for size in options["sizes"]:
+                self.stdout.write(f"Plan with {size:,} activities...")
+                timings, counts = self.run_stages(size, file_type, options)
+                results.append({"activities": size, "timings_ms": timings, "counts": counts})
+
+        commit = get_git_commit()
+        output = {
+            "benchmark": "plan_scaling",
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "cpu_count": os.cpu_count(),
+            "options": {
+                "file_type": file_type.file_type_name,
+                "max_depth": options["max_depth"],
+                "milestone_ratio": options["milestone_ratio"],
+                "date_spread": options["date_spread"],
+                "seed": options["seed"],
+                "repeat": options["repeat"],
+                "pptx_limit": None if options["skip_pptx"] else options["pptx_limit"],
+            },
+            "results": results,
+        }
+        options["output"].write_text(json.dumps(output, indent=2))
+
+        # One row per plan size and stage, so every row has the same columns.
+        rows = []
+        for result in results:
+            for stage in STAGES:
+                if stage not in result["timings_ms"]:
+                    continue
+                row = {"activities": result["activities"], "stage": stage, "time (ms)": f"{result['timings_ms'][stage]:,.1f}"}
+                if options["compare"]:
+                    baseline_ms = baseline.get(result["activities"], {}).get(stage)
+                    row["baseline (ms)"] = f"{baseline_ms:,.1f}" if baseline_ms is not None else "-"
+                    row["change"] = f"{(result['timings_ms'][stage] / baseline_ms - 1) * 100:+.0f}%" if baseline_ms else "-"
+                rows.append(row)
+
+        self.stdout.write(format_banner(f"Plan scaling ({file_type.title})", 40, "*"))
+        self.stdout.write(format_dict_list(rows))
+        if options["compare"]:
+            self.stdout.write(f"Compared with {options['compare']} (commit {baseline_commit})")
+        self.stdout.write(f"Results written to {options['output']}")
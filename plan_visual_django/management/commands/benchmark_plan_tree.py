@@ -0,0 +1,85 @@
+import time
+
+from anytree import findall
+from django.core.management.base import BaseCommand
+from plan_visual_django.models import PlanActivity
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree
+from plan_visual_django.services.plan_file_utilities.synthetic_plan import generate_synthetic_plan
+
+
+class Command(BaseCommand):
+    help = ("Times building a PlanTree and querying it (id lookup, children, descendants) for large synthetic plans, "
+            "compared with searching the anytree nodes for each id")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000],
+                            help="Numbers of activities in the generated plans")
+        parser.add_argument("--max-depth", type=int, default=6, help="Deepest level of the plan hierarchy")
+        parser.add_argument("--findall-sample", type=int, default=20,
+                            help="Number of ids looked up by searching the anytree nodes (it's slow on big plans)")
+
+    @staticmethod
+    def create_activities(size, max_depth, children_per_parent=None):
+        """
+        Unsaved PlanActivity records for a synthetic plan, so the tree can be built without using the database.
+        """
+        return [
+            PlanActivity(
+                unique_sticky_activity_id=activity.sticky_id,
+                activity_name=activity.name,
+                level=activity.level,
+                milestone_flag=activity.milestone_flag,
+                start_date=activity.start_date,
+                end_date=activity.end_date,
+                sequence_number=sequence_number,
+            )
+            for sequence_number, activity in enumerate(
+                generate_synthetic_plan(size, max_depth=max_depth, children_per_parent=children_per_parent), start=1
+            )
+        ]
+
+    @staticmethod
+    def per_call_us(function, ids):
+        start = time.perf_counter()
+        for unique_id in ids:
+            function(unique_id)
+        return (time.perf_counter() - start) / len(ids) * 1_000_000
+
+    def handle(self, *args, **options):
+        results = []
+        for size in options["sizes"]:
+            activities = self.create_activities(size, options["max_depth"])
+            ids = [activity.unique_sticky_activity_id for activity in activities]
+
+            start = time.perf_counter()
+            plan_tree = PlanTree.from_activities(activities)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            root = plan_tree.get_root()
+            node_view_ms = (time.perf_counter() - start) * 1000
+
+            sample = ids[::max(len(ids) // options["findall_sample"], 1)][:options["findall_sample"]]
+            timings = {
+                "id lookup": self.per_call_us(plan_tree.get_plan_tree_activity_by_unique_id, ids),
+                "children": self.per_call_us(plan_tree.get_plan_tree_child_activities_by_unique_id, ids),
+                "descendants": self.per_call_us(plan_tree.get_plan_tree_descendant_activities_by_unique_id, ids),
+                "findall lookup": self.per_call_us(
+                    lambda unique_id: findall(root, filter_=lambda node: node.id == unique_id), sample
+                ),
+            }
+
+            results.append({
+                "activities": size,
+                "build (ms)": f"{build_ms:,.1f}",
+                "node view (ms)": f"{node_view_ms:,.1f}",
+                "id lookup (us)": f"{timings['id lookup']:,.2f}",
+                "children (us)": f"{timings['children']:,.2f}",
+                "descendants (us)": f"{timings['descendants']:,.2f}",
+                "findall lookup (us)": f"{timings['findall lookup']:,.0f}",
+                "lookup speed up": f"{timings['findall lookup'] / timings['id lookup']:,.0f}x",
+            })
+
+        self.stdout.write(format_banner("Plan tree", 40, "*"))
+        self.stdout.write(format_dict_list(results))
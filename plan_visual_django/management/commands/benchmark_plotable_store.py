@@ -0,0 +1,67 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from plan_visual_django.models import PlotableStyle, VisualActivity
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.visual.model.plotable_shapes import PlotableShapeName
+from plan_visual_django.services.visual.rendering.plotable_store import PlotableStore
+from plan_visual_django.services.visual.rendering.plotables import get_plotable
+from plan_visual_django.services.visual.rendering.renderers import VisualRenderer
+
+
+class Command(BaseCommand):
+    help = "Compares memory use and bounds calculation time for individual plotables and a PlotableStore"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=50_000, help="Number of plotables")
+
+    def handle(self, *args, **options):
+        size = options["size"]
+        style = PlotableStyle()  # Not saved - just needs to be shared by all the plotables
+
+        def plotable_fields():
+            for index in range(size):
+                yield dict(
+                    plotable_id=f"activity-ID-{index:06}",
+                    plotable_shape_name=PlotableShapeName.RECTANGLE,
+                    top=(index % 700) * 1.5,
+                    left=(index * 3 % 1000) * 1.5,
+                    width=(index % 50 + 1) * 1.5,
+                    height=20.0,
+                    format=style,
+                    text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE,
+                    text_flow=VisualActivity.TextFlow.FLOW_TO_RIGHT,
+                    text=f"Activity {index}",
+                    external_text_flag=False
+                )
+
+        def build_plotables():
+            return [get_plotable(**fields) for fields in plotable_fields()]
+
+        def build_store():
+            store = PlotableStore()
+            for fields in plotable_fields():
+                store.append(**fields)
+            return store
+
+        results = []
+        for name, build in (("Plotable objects", build_plotables), ("PlotableStore", build_store)):
+            tracemalloc.start()
+            plotables = build()
+            memory_used, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            VisualRenderer()._calculate_visual_bounds({"activities": plotables})
+            bounds_time = time.perf_counter() - start
+
+            results.append({
+                "storage": name,
+                "plotables": size,
+                "bytes per plotable": f"{memory_used / size:.0f}",
+                "bounds (ms)": f"{bounds_time * 1000:.2f}",
+            })
+
+        self.stdout.write(format_banner("Plotable storage", 40, "*"))
+        self.stdout.write(format_dict_list(results))
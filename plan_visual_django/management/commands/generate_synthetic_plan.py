@@ -0,0 +1,64 @@
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from plan_visual_django.services.general.text_formatting import format_banner, format_dict_list
+from plan_visual_django.services.plan_file_utilities.plan_field import FileType
+from plan_visual_django.services.plan_file_utilities.synthetic_plan import generate_synthetic_plan, \
+    write_synthetic_plan
+
+
+class Command(BaseCommand):
+    help = "Generates a synthetic hierarchical plan and writes it as a file of each supported file type"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--activities", type=int, default=1_000, help="Number of activities in the plan")
+        parser.add_argument("--max-depth", type=int, default=4, help="Deepest level of the hierarchy")
+        parser.add_argument("--milestone-ratio", type=float, default=0.1,
+                            help="Proportion of leaf activities which are milestones")
+        parser.add_argument("--date-spread", type=int, default=730,
+                            help="Number of days from the start of the plan within which all activities fall")
+        parser.add_argument("--start-date", type=date.fromisoformat, default=date(2024, 1, 1),
+                            help="Start of the plan (YYYY-MM-DD)")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, the same seed gives the same plan")
+        parser.add_argument(
+            "--file-types",
+            nargs="+",
+            choices=[file_type.file_type_name for file_type in FileType],
+            default=[file_type.file_type_name for file_type in FileType],
+            help="File types to write (default all)"
+        )
+        parser.add_argument("--output-dir", type=Path, default=Path("."), help="Folder to write the files to")
+
+    def handle(self, *args, **options):
+        if options["activities"] < 1 or options["max_depth"] < 1:
+            raise CommandError("Number of activities and maximum depth must be at least 1")
+        if not 0 <= options["milestone_ratio"] <= 1:
+            raise CommandError("Milestone ratio must be between 0 and 1")
+
+        activities = generate_synthetic_plan(
+            options["activities"],
+            max_depth=options["max_depth"],
+            milestone_ratio=options["milestone_ratio"],
+            date_spread_days=options["date_spread"],
+            start_date=options["start_date"],
+            seed=options["seed"],
+        )
+
+        output_dir: Path = options["output_dir"]
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        results = []
+        for file_type_name in options["file_types"]:
+            file_type = FileType.from_name(file_type_name)
+            file_data, extension = write_synthetic_plan(activities, file_type)
+            file_path = output_dir / f"synthetic-{options['activities']}-{file_type_name}.{extension}"
+            file_path.write_bytes(file_data)
+            results.append({
+                "file type": file_type.title,
+                "file": str(file_path),
+                "size (KB)": f"{len(file_data) / 1024:,.0f}",
+            })
+
+        self.stdout.write(format_banner(f"Synthetic plan: {len(activities)} activities", 40, "*"))
+        self.stdout.write(format_dict_list(results))
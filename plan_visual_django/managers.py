@@ -49,3 +49,47 @@ class PlanVisualManager(models.Manager):
             plan.visual_count += 1
             plan.save()
             return self.create(plan=plan, **kwargs)
+
+
+class PlanActivityManager(models.Manager):
+    """
+    Queries on the plan hierarchy, using the hierarchy columns stored on each activity when the plan is imported.  Each
+    one is a single indexed query.  For activities imported before the hierarchy was stored, the hierarchy is worked
+    out from the levels of the whole plan instead.
+    """
+    def children_of(self, activity):
+        """
+        :param activity: PlanActivity
+        :return: Queryset of the activities directly below the given one, in sequence order.
+        """
+        if activity.depth is None:
+            return self._from_plan_tree(activity, activity.plan.get_plan_tree().get_plan_tree_child_activities_by_unique_id)
+        return self.filter(plan_id=activity.plan_id, parent_unique_id=activity.unique_sticky_activity_id)
+
+    def descendants_of(self, activity):
+        """
+        :param activity: PlanActivity
+        :return: Queryset of all the activities below the given one, in sequence order.
+        """
+        if activity.subtree_end_sequence is None:
+            return self._from_plan_tree(
+                activity, activity.plan.get_plan_tree().get_plan_tree_descendant_activities_by_unique_id
+            )
+        return self.filter(
+            plan_id=activity.plan_id,
+            sequence_number__gt=activity.sequence_number,
+            sequence_number__lt=activity.subtree_end_sequence,
+        )
+
+    def rollup_dates(self, activity):
+        """
+        :param activity: PlanActivity
+        :return: Earliest start and latest end date across the activity and everything below it.
+        """
+        subtree = self.descendants_of(activity) | self.filter(pk=activity.pk)
+        dates = subtree.order_by().aggregate(start_date=models.Min('start_date'), end_date=models.Max('end_date'))
+        return dates['start_date'], dates['end_date']
+
+    def _from_plan_tree(self, activity, tree_query):
+        ids = [plan_activity.pk for plan_activity in tree_query(activity.unique_sticky_activity_id)]
+        return self.filter(pk__in=ids)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_visual_django', '0017_anonymoususerproxy_alter_staticcontent_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planvisual',
+            name='render_revision',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
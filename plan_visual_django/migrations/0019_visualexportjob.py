@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_visual_django', '0018_planvisual_render_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisualExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('render_revision', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('QUEUED', 'Waiting for a worker'), ('RUNNING', 'Being exported'), ('COMPLETE', 'Export complete'), ('FAILED', 'Export failed')], default='QUEUED', max_length=10)),
+                ('error_message', models.TextField(blank=True, default='')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('visual', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='plan_visual_django.planvisual')),
+            ],
+            options={
+                'ordering': ['-created'],
+                'indexes': [models.Index(fields=['visual', 'render_revision'], name='plan_visual_visual__0a44b1_idx')],
+            },
+        ),
+    ]
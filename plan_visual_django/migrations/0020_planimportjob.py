@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_visual_django', '0019_visualexportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plan_name', models.CharField(max_length=100)),
+                ('session_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('update_flag', models.BooleanField(default=False)),
+                ('file', models.FileField(blank=True, null=True, upload_to='plan_files')),
+                ('file_name', models.CharField(blank=True, default='', max_length=100)),
+                ('status', models.CharField(choices=[('QUEUED', 'Waiting for a worker'), ('RUNNING', 'Being imported'), ('COMPLETE', 'Import complete'), ('FAILED', 'Import failed'), ('CANCELLED', 'Import cancelled')], default='QUEUED', max_length=10)),
+                ('stage', models.CharField(choices=[('QUEUED', 'Waiting to start'), ('READ', 'Reading plan file'), ('PARSE', 'Parsing activities'), ('DIFF', 'Comparing with current plan'), ('WRITE', 'Saving activities'), ('DONE', 'Finished')], default='QUEUED', max_length=10)),
+                ('rows_read', models.PositiveIntegerField(default=0)),
+                ('activities_added', models.PositiveIntegerField(default=0)),
+                ('activities_updated', models.PositiveIntegerField(default=0)),
+                ('activities_deleted', models.PositiveIntegerField(default=0)),
+                ('cancel_requested', models.BooleanField(default=False)),
+                ('error_message', models.TextField(blank=True, default='')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('plan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='plan_visual_django.plan')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created'],
+                'indexes': [models.Index(fields=['user', 'status'], name='plan_visual_user_id_3d24c0_idx'), models.Index(fields=['session_id', 'status'], name='plan_visual_session_d737a8_idx')],
+            },
+        ),
+    ]
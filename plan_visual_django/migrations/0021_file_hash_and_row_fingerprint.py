@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:28
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_row_fingerprints(apps, schema_editor):
+    """
+    Calculates the fingerprint for activities already in the database, so the first re-upload of an existing plan
+    doesn't have to rewrite every activity.
+    """
+    from plan_visual_django.services.plan_file_utilities.plan_parsing import calculate_activity_fingerprint
+
+    PlanActivity = apps.get_model('plan_visual_django', 'PlanActivity')
+    batch = []
+    for activity in PlanActivity.objects.order_by().only(
+            'activity_name', 'start_date', 'end_date', 'level', 'sequence_number').iterator(chunk_size=BATCH_SIZE):
+        activity.row_fingerprint = calculate_activity_fingerprint(
+            activity.activity_name, activity.start_date, activity.end_date, activity.level, activity.sequence_number
+        )
+        batch.append(activity)
+        if len(batch) >= BATCH_SIZE:
+            PlanActivity.objects.bulk_update(batch, ['row_fingerprint'])
+            batch = []
+    PlanActivity.objects.bulk_update(batch, ['row_fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_visual_django', '0020_planimportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='file_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='planactivity',
+            name='row_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='planimportjob',
+            name='file_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='planimportjob',
+            name='skipped_unchanged',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(fill_row_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_visual_django', '0021_file_hash_and_row_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plan',
+            name='file_type_name',
+            field=models.CharField(choices=[('excel-01-msp-export-default-01', 'Excel - Default MSP Export'), ('excel-02-smartsheet-export-01', 'Excel - Default Smartsheet Export (with Id)'), ('csv-01-plan-01', 'CSV - Plan Visualiser CSV'), ('msp-xml-01', 'MS Project XML')], max_length=50),
+        ),
+    ]
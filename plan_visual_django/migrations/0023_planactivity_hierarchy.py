@@ -0,0 +1,72 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_hierarchy(apps, schema_editor):
+    """
+    Works out the hierarchy of the activities of plans already in the database, and updates their fingerprints to
+    include it.  Plans whose levels don't make a valid hierarchy are left without it.
+    """
+    from plan_visual_django.services.plan_file_utilities.plan_parsing import calculate_activity_fingerprint
+    from plan_visual_django.services.plan_file_utilities.plan_tree import calculate_hierarchy, InvalidPlanHierarchy
+
+    Plan = apps.get_model('plan_visual_django', 'Plan')
+    PlanActivity = apps.get_model('plan_visual_django', 'PlanActivity')
+    for plan_id in Plan.objects.order_by().values_list('id', flat=True):
+        activities = list(PlanActivity.objects.filter(plan_id=plan_id).order_by('sequence_number'))
+        try:
+            parents, depths, subtree_ends = calculate_hierarchy([activity.level for activity in activities])
+        except InvalidPlanHierarchy:
+            continue
+
+        for activity, parent, depth, subtree_end in zip(activities, parents, depths, subtree_ends):
+            activity.parent_unique_id = activities[parent].unique_sticky_activity_id if parent >= 0 else ""
+            activity.depth = depth
+            activity.subtree_end_sequence = (
+                activities[subtree_end].sequence_number if subtree_end < len(activities)
+                else activities[-1].sequence_number + 1
+            )
+            activity.row_fingerprint = calculate_activity_fingerprint(
+                activity.activity_name, activity.start_date, activity.end_date, activity.level,
+                activity.sequence_number, activity.parent_unique_id, activity.depth, activity.subtree_end_sequence
+            )
+        PlanActivity.objects.bulk_update(
+            activities, ['parent_unique_id', 'depth', 'subtree_end_sequence', 'row_fingerprint'], batch_size=BATCH_SIZE
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_visual_django', '0022_plan_file_types_csv_and_msp_xml'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planactivity',
+            name='depth',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='planactivity',
+            name='parent_unique_id',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='planactivity',
+            name='subtree_end_sequence',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='planactivity',
+            index=models.Index(fields=['plan', 'parent_unique_id'], name='plan_visual_plan_id_f39374_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='planactivity',
+            index=models.Index(fields=['plan', 'sequence_number'], name='plan_visual_plan_id_edb841_idx'),
+        ),
+        migrations.RunPython(fill_hierarchy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_visual_django', '0023_planactivity_hierarchy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='revision',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -4,7 +4,7 @@ import markdown
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
 from django.db.models import UniqueConstraint, Max, Min, Sum
-from plan_visual_django.managers import PlotableStyleManager, PlanVisualManager
+from plan_visual_django.managers import PlotableStyleManager, PlanVisualManager, PlanActivityManager
 from plan_visual_django.services.general.date_utilities import DatePlotter, format_date_for_visual_activity
 from plan_visual_django.services.plan_file_utilities.plan_field import FileType
 from plan_visual_django.services.plan_file_utilities.plan_parsing import extract_summary_plan_info
@@ -51,6 +51,8 @@ class Plan(models.Model):
     file_type_name = models.CharField(max_length=50, choices=FileType.as_choices())
     visual_count = models.IntegerField(default=0)  # Used to generate unique default visual names
     session_id = models.CharField(max_length=50, null=True, blank=True)  # Stores anonymous user session ID
+    file_hash = models.CharField(max_length=64, blank=True, default="")  # SHA-256 of the file last imported for the plan
+    revision = models.IntegerField(default=0)  # Incremented each time the plan's activities are imported (see plan_tree_cache.py)
 
     class Meta:
         constraints: list[UniqueConstraint] = \
@@ -71,8 +73,11 @@ class Plan(models.Model):
         return summary
 
     def get_plan_tree(self):
-        from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree
-        plan_tree = PlanTree(self)
+        """
+        Tree of the plan's activities at the current revision, shared with other requests so must not be modified.
+        """
+        from plan_visual_django.services.plan_file_utilities.plan_tree_cache import get_plan_tree
+        plan_tree = get_plan_tree(self)
 
         return plan_tree
 
@@ -103,14 +108,44 @@ class PlanActivity(models.Model):
     end_date = models.DateField()
     level = models.IntegerField(default=1)
 
+    # Position of the activity in the plan hierarchy, worked out from the levels when the plan is imported so that
+    # the hierarchy can be queried without replaying the levels of the whole plan (see calculate_hierarchy).  The
+    # subtree of an activity is the activity itself and those with a sequence number from its own up to (but not
+    # including) subtree_end_sequence.  Null where the hierarchy hasn't been worked out.
+    parent_unique_id = models.CharField(max_length=50, blank=True, default="")  # Blank for a top level activity
+    depth = models.IntegerField(null=True, blank=True)  # 1 for a top level activity
+    subtree_end_sequence = models.IntegerField(null=True, blank=True)
+
+    # Hash of the fields which can change when the plan is re-uploaded, so changed activities can be found without
+    # comparing every field (see calculate_activity_fingerprint).  Kept up to date when the activity is saved.
+    row_fingerprint = models.CharField(max_length=32, blank=True, default="")
+
+    objects = PlanActivityManager()
+
     class Meta:
         # Order by sequence number is critical to ensure plan structure is well defined.
         ordering = ["plan", "sequence_number"]
         verbose_name_plural = " Plan activities"
         unique_together = (('plan', 'unique_sticky_activity_id'),)
+        indexes = [
+            models.Index(fields=['plan', 'parent_unique_id']),
+            models.Index(fields=['plan', 'sequence_number']),
+        ]
 
     def __str__(self):
         return f'{self.activity_name:.20}'
+
+    def save(self, *args, **kwargs):
+        from plan_visual_django.services.plan_file_utilities.plan_parsing import calculate_activity_fingerprint
+
+        self.row_fingerprint = calculate_activity_fingerprint(
+            self.activity_name, self.start_date, self.end_date, self.level, self.sequence_number,
+            self.parent_unique_id, self.depth, self.subtree_end_sequence
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'row_fingerprint' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['row_fingerprint']
+        super().save(*args, **kwargs)
     
     @property
     def duration(self):
@@ -249,6 +284,10 @@ class PlanVisual(models.Model):
     default_timeline_plotable_style_odd = models.ForeignKey(PlotableStyle, on_delete=models.CASCADE, related_name="default_timeline_plotable_style_odd")
     default_timeline_plotable_style_even = models.ForeignKey(PlotableStyle, on_delete=models.CASCADE, related_name="default_timeline_plotable_style_even", null=True)
 
+    # Incremented (by signal handlers) whenever anything which affects how the visual is rendered changes.  Used to
+    # key cached rendered output for the visual.
+    render_revision = models.PositiveIntegerField(default=0, editable=False)
+
     objects = PlanVisualManager()
 
     class Meta:
@@ -466,7 +505,7 @@ class PlanVisual(models.Model):
         :param sequence_number:
         :return:
         """
-        swimlanes = self.get_swimlanes(visible_only_flag=True, sequence_number=sequence_number)
+        swimlanes = self.get_swimlane_geometry().get_visible_swimlanes(sequence_number=sequence_number)
 
         swimlane_plotables = [swimlane.get_plotable() for swimlane in swimlanes]
         return swimlane_plotables
@@ -552,16 +591,26 @@ class PlanVisual(models.Model):
         :param height:
         :return:
         """
-        # First get height of timelines as the swimlanes sit below them.
-        height_of_timelines = self.get_timelines_height()
+        top, left, height_of_swimlane_area = self.get_swimlane_geometry().get_swimlane_area_dimensions(sequence_number)
+
+        return top, left, self.width, height_of_swimlane_area
+
+    def get_swimlane_geometry(self):
+        """
+        Returns the tops and heights of all the swimlanes in the visual.  The geometry is calculated once and held on
+        this instance until a swimlane, activity, timeline or the visual itself is changed, so that plotting each
+        swimlane and activity doesn't involve working out the position of every swimlane above it again.
 
-        swimlanes = self.get_swimlanes(sequence_number=sequence_number)
-        num_swimlanes = len(swimlanes)
-        total_gap = max(0, num_swimlanes-1) * self.swimlane_gap
-        total_height_of_swimlanes = sum(swimlane.get_height() for swimlane in swimlanes)
-        height_of_swimlane_area = total_height_of_swimlanes + total_gap
+        :return:
+        """
+        from plan_visual_django.services.visual.model.swimlane_geometry import SwimlaneGeometry, \
+            get_swimlane_geometry_generation
 
-        return height_of_timelines + self.timeline_to_swimlane_gap, 0, self.width, height_of_swimlane_area
+        geometry = getattr(self, '_swimlane_geometry', None)
+        if geometry is None or geometry.generation != get_swimlane_geometry_generation(self.id):
+            geometry = SwimlaneGeometry.for_visual(self)
+            self._swimlane_geometry = geometry
+        return geometry
 
     def get_plotables(self):
         """
@@ -572,14 +621,15 @@ class PlanVisual(models.Model):
         - swimlanes
         - visual activities
 
+        The plotables are calculated from a VisualRenderSnapshot, which loads all the data for the visual in a fixed
+        number of queries, rather than by calling get_timeline_plotables() etc. which query the database for every
+        swimlane and activity.
+
         :return:
         """
-        plotables = {
-            "timelines": self.get_timeline_plotables(),
-            "swimlanes": self.get_swimlane_plotables(),
-            "visual_activities": self.get_visual_activity_plotables()
-        }
-        return plotables
+        from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
+
+        return VisualRenderSnapshot(self).get_plotables()
 
     def _get_dimensions_recursive(self, plotable_iterable: Plotable | Dict[str, Plotable | Dict[str, Plotable]], lowest_top=-1, highest_bottom=-1, highest_right=-1, lowest_left=-1):
         """
@@ -596,15 +646,29 @@ class PlanVisual(models.Model):
         :param lowest_left:
         :return:
         """
+        from plan_visual_django.services.visual.rendering.plotable_store import PlotableStore
+
         if isinstance(plotable_iterable, Plotable):
-            if lowest_top == -1 or plotable_iterable.get_top() < lowest_top:
-                lowest_top = plotable_iterable.get_top()
-            if highest_bottom == -1 or plotable_iterable.get_bottom() > highest_bottom:
-                highest_bottom = plotable_iterable.get_bottom()
-            if highest_right == -1 or plotable_iterable.get_right() > highest_right:
-                highest_right = plotable_iterable.get_right()
-            if lowest_left == -1 or plotable_iterable.get_left() < lowest_left:
-                lowest_left = plotable_iterable.get_left()
+            top, bottom, right, left = \
+                plotable_iterable.get_top(), plotable_iterable.get_bottom(), \
+                plotable_iterable.get_right(), plotable_iterable.get_left()
+        elif isinstance(plotable_iterable, PlotableStore):
+            # A store calculates the bounds of all its plotables in one go, so treat it as if it were a single plotable
+            # covering all of them.
+            store_bounds = plotable_iterable.get_bounds()
+            if store_bounds is None:
+                return lowest_top, highest_bottom, highest_right, lowest_left
+            left, top, right, bottom = store_bounds
+
+        if isinstance(plotable_iterable, (Plotable, PlotableStore)):
+            if lowest_top == -1 or top < lowest_top:
+                lowest_top = top
+            if highest_bottom == -1 or bottom > highest_bottom:
+                highest_bottom = bottom
+            if highest_right == -1 or right > highest_right:
+                highest_right = right
+            if lowest_left == -1 or left < lowest_left:
+                lowest_left = left
             return lowest_top, highest_bottom, highest_right, lowest_left
         elif isinstance(plotable_iterable, Iterable):
             # Need to distinguish between Dict and other types of iterable
@@ -815,14 +879,7 @@ class SwimlaneForVisual(models.Model):
         :return:
         """
 
-        top_of_swimlane, _, _, _, _, _ = self.get_plotable().get_dimensions()
-
-        # If this isn't the top track then add a gap after the previous one otherwise don't.
-        additional_gap = 0 if track_number == 1 else self.plan_visual.track_gap
-
-        top_of_track = top_of_swimlane + self.get_height_of_tracks(track_number-1) + additional_gap
-
-        return top_of_track
+        return self.plan_visual.get_swimlane_geometry().get_top_of_track(self.id, track_number)
 
     def get_height(self):
         """
@@ -840,22 +897,17 @@ class SwimlaneForVisual(models.Model):
         return height
 
     def get_plotable(self):
-        dims_of_previous_swimlanes = self.plan_visual.get_swimlanesforvisual_dimensions(self.sequence_number)
-        previous_s_lane_top, previous_s_lane_left, previous_s_lane_width, previous_s_lane_height = dims_of_previous_swimlanes
-
-        # If height of all previous swimlanes is zero then this is the first visible swimlane so don't add a gap.
-        gap = 0 if previous_s_lane_height == 0 else self.plan_visual.swimlane_gap
-
-        # Top of this swimlane is top of previous + height of previous + swimlane gap.
-        this_top = previous_s_lane_top + previous_s_lane_height + gap
+        # Top of this swimlane is top of previous + height of previous + swimlane gap, which the swimlane geometry
+        # for the visual has already worked out for every swimlane.
+        geometry = self.plan_visual.get_swimlane_geometry()
 
         swimlane_plotable = get_plotable(
             f"swimlane-{self.id}",
             PlotableShapeName.RECTANGLE,  # Note for now swimlanes will always be rectangles so hard-code
-            top=this_top,
+            top=geometry.get_swimlane_top(self.id),
             left=0,  # Hard-coding for now as nothing will appear to the left of the swimlane
             width=self.plan_visual.width,
-            height=self.get_height(),
+            height=geometry.get_swimlane_height(self.id),
             format=self.plotable_style,
             text_vertical_alignment=VisualActivity.VerticalAlignment.TOP,
             text_flow=VisualActivity.TextFlow.FLOW_TO_RIGHT,
@@ -967,8 +1019,9 @@ class   VisualActivity(models.Model):
             return None
 
         # Get swimlane this activity is in then work out its top.
-        activity_top = self.swimlane.get_top_of_track(self.vertical_positioning_value)
-        activity_height = self.swimlane.get_height_of_tracks(self.height_in_tracks)
+        geometry = self.visual.get_swimlane_geometry()
+        activity_top = geometry.get_top_of_track(self.swimlane_id, self.vertical_positioning_value)
+        activity_height = geometry.get_height_of_tracks(self.height_in_tracks)
 
         earliest_visual_date, latest_visual_date = self.visual.get_visual_earliest_latest_date()
 
@@ -1138,3 +1191,100 @@ class PhysicalPlanFile(models.Model):
 
     def __str__(self):
         return self.physical_file_name if self.physical_file_name else f"Plan {self.plan_id}"
+
+
+class VisualExportJob(models.Model):
+    """
+    Request to export a visual as a PowerPoint file.  Exports are carried out by a pool of worker processes (see
+    plan_visual_django/services/visual/export/pptx_export.py) so that building the presentation doesn't tie up the
+    process handling the request, and the job records the progress of the export.
+
+    The export is for the visual as it was at a given render revision.  The generated file is held in the export cache
+    against the visual and revision, so the file for a job may have been evicted after the job has completed.
+    """
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Waiting for a worker"
+        RUNNING = "RUNNING", "Being exported"
+        COMPLETE = "COMPLETE", "Export complete"
+        FAILED = "FAILED", "Export failed"
+
+    visual = models.ForeignKey(PlanVisual, on_delete=models.CASCADE)
+    render_revision = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    error_message = models.TextField(blank=True, default="")
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['visual', 'render_revision']),
+        ]
+
+    def __str__(self):
+        return f"Export of {self.visual} (revision {self.render_revision}): {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.COMPLETE, self.Status.FAILED)
+
+
+class PlanImportJob(models.Model):
+    """
+    Request to import a new plan file, or a new version of an existing plan.  Imports are carried out by a pool of
+    worker threads (see plan_visual_django/services/plan_file_utilities/plan_import.py) so that reading a big plan
+    doesn't hold up the request, and the job records how far the import has got so that it can be shown to the user.
+
+    For a re-upload the new file is held on the job, and only replaces the plan's file once the import has succeeded.
+
+    The owner (user or session) is held on the job as well as the plan, as a new plan which fails to import is removed
+    but the job is kept so that the user can see what went wrong.
+    """
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Waiting for a worker"
+        RUNNING = "RUNNING", "Being imported"
+        COMPLETE = "COMPLETE", "Import complete"
+        FAILED = "FAILED", "Import failed"
+        CANCELLED = "CANCELLED", "Import cancelled"
+
+    class Stage(models.TextChoices):
+        QUEUED = "QUEUED", "Waiting to start"
+        READ = "READ", "Reading plan file"
+        PARSE = "PARSE", "Parsing activities"
+        DIFF = "DIFF", "Comparing with current plan"
+        WRITE = "WRITE", "Saving activities"
+        DONE = "DONE", "Finished"
+
+    plan = models.ForeignKey(Plan, null=True, blank=True, on_delete=models.SET_NULL)
+    plan_name = models.CharField(max_length=100)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
+    session_id = models.CharField(max_length=50, null=True, blank=True)
+    update_flag = models.BooleanField(default=False)  # True for a re-upload of an existing plan
+    file = models.FileField(upload_to="plan_files", null=True, blank=True)  # New version of file for a re-upload
+    file_name = models.CharField(max_length=100, blank=True, default="")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    stage = models.CharField(max_length=10, choices=Stage.choices, default=Stage.QUEUED)
+    rows_read = models.PositiveIntegerField(default=0)
+    activities_added = models.PositiveIntegerField(default=0)
+    activities_updated = models.PositiveIntegerField(default=0)
+    activities_deleted = models.PositiveIntegerField(default=0)
+    file_hash = models.CharField(max_length=64, blank=True, default="")  # SHA-256 of the uploaded file
+    skipped_unchanged = models.BooleanField(default=False)  # Re-upload of an identical file, so nothing to import
+    cancel_requested = models.BooleanField(default=False)
+    error_message = models.TextField(blank=True, default="")
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            models.Index(fields=['session_id', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Import of {self.plan_name}: {self.status} ({self.stage})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.COMPLETE, self.Status.FAILED, self.Status.CANCELLED)
@@ -3,6 +3,7 @@ import os
 from calendar import monthrange
 from enum import Enum
 from dateutil.relativedelta import relativedelta
+import numpy as np
 
 
 def days_between_dates(start_date: date, end_date: date):
@@ -131,6 +132,10 @@ def increment_period(date, num_units, unit_type: DateIncrementUnit):
 
     return ret
 
+
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 1_000_000
+
+
 class DatePlotter:
     """
     Utility class which helps with calculating the x-coordinate for a visual.
@@ -216,3 +221,35 @@ class DatePlotter:
         midpoint = self.x_coordinate_for_date(date, mid_point=True)
         return midpoint
 
+    def batch_coordinates(self, start_ordinals, end_ordinals) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        Calculates left, width and midpoint for a whole set of activities in one pass, rather than calling left(),
+        width() and midpoint() for each activity.
+
+        Dates are passed as ordinals (date.toordinal()) so that the calculation can be done on integer arrays.
+
+        The results are exactly the same as the scalar methods.  Dividing one timedelta by another divides the two
+        durations in microseconds as integers, so the same is done here using int64 microseconds (which are held
+        exactly in a float64 for any realistic date range) before scaling to the plot width in the same order as
+        x_coordinate_for_date().
+
+        :param start_ordinals: Sequence of start dates as ordinals.
+        :param end_ordinals: Sequence of end dates as ordinals, same length as start_ordinals.
+        :return: Tuple of float64 arrays: left, width, midpoint.
+        """
+        start_ordinals = np.asarray(start_ordinals, dtype=np.int64)
+        end_ordinals = np.asarray(end_ordinals, dtype=np.int64)
+
+        earliest_ordinal = self.earliest_date.toordinal()
+        num_microseconds_in_visual = self.num_days_in_visual // timedelta(microseconds=1)
+
+        start_microseconds = (start_ordinals - earliest_ordinal) * MICROSECONDS_PER_DAY
+        end_microseconds = (end_ordinals - earliest_ordinal + 1) * MICROSECONDS_PER_DAY
+        mid_microseconds = start_microseconds + MICROSECONDS_PER_DAY // 2
+
+        left = self.x_plot_start + (start_microseconds / num_microseconds_in_visual) * self.activity_plot_width
+        right = self.x_plot_start + (end_microseconds / num_microseconds_in_visual) * self.activity_plot_width
+        midpoint = self.x_plot_start + (mid_microseconds / num_microseconds_in_visual) * self.activity_plot_width
+
+        return left, right - left, midpoint
+
@@ -6,10 +6,10 @@ def prettify_key(key: str) -> str:
     return ' '.join(word.capitalize() for word in key.split('_'))
 
 
-def print_formatted_dict_list(dict_list: list[dict]) -> None:
-    """Print a list of dictionaries in a formatted column layout with prettified headers."""
+def format_dict_list(dict_list: list[dict]) -> str:
+    """Format a list of dictionaries in a column layout with prettified headers, one line per dictionary."""
     if not dict_list:
-        return
+        return ""
 
     # Use first dictionary to establish field order
     first_dict = dict_list[0]
@@ -20,7 +20,8 @@ def print_formatted_dict_list(dict_list: list[dict]) -> None:
     for field in field_order:
         max_lengths[field] = max(len(str(d[field])) for d in dict_list) + 2  # Add space for comma and space
 
-    # Print each dictionary's data
+    # Format each dictionary's data
+    lines = []
     for dictionary in dict_list:
         line_parts = []
         for i, field in enumerate(field_order):
@@ -31,17 +32,20 @@ def print_formatted_dict_list(dict_list: list[dict]) -> None:
             line_parts.append(f"{pretty_key}: {padded_value}")
 
         # Join all parts without additional separators
-        print("".join(line_parts))
+        lines.append("".join(line_parts))
+    return "\n".join(lines)
 
 
-def print_banner(text: str, width: int = 80, border_char: str = "=") -> None:
-    """Print text in a banner with specified width and border character.
+def print_formatted_dict_list(dict_list: list[dict]) -> None:
+    """Print a list of dictionaries in a formatted column layout with prettified headers."""
+    if not dict_list:
+        return
 
-    Args:
-        text: The text to display in the banner
-        width: The total width of the banner (default: 80)
-        border_char: The character to use for the banner border (default: '=')
-    """
+    print(format_dict_list(dict_list))
+
+
+def format_banner(text: str, width: int = 80, border_char: str = "=") -> str:
+    """Format text in a banner with specified width and border character (see print_banner())."""
     # Calculate the content width (total width minus borders and padding)
     content_width = width - 8  # 3 chars on each side plus two spaces
 
@@ -49,14 +53,30 @@ def print_banner(text: str, width: int = 80, border_char: str = "=") -> None:
     wrapped_lines = textwrap.wrap(text, width=content_width)
 
     # Create the banner
-    print(border_char * width)
-    print(border_char * width)
-    print(f"{border_char * 3}{' ' * (width - 6)}{border_char * 3}")
+    lines = [
+        border_char * width,
+        border_char * width,
+        f"{border_char * 3}{' ' * (width - 6)}{border_char * 3}",
+    ]
 
     for line in wrapped_lines:
         padding = content_width - len(line)
-        print(f"{border_char * 3} {line}{' ' * padding} {border_char * 3}")
+        lines.append(f"{border_char * 3} {line}{' ' * padding} {border_char * 3}")
+
+    lines += [
+        f"{border_char * 3}{' ' * (width - 6)}{border_char * 3}",
+        border_char * width,
+        border_char * width,
+    ]
+    return "\n".join(lines)
 
-    print(f"{border_char * 3}{' ' * (width - 6)}{border_char * 3}")
-    print(border_char * width)
-    print(border_char * width)
+
+def print_banner(text: str, width: int = 80, border_char: str = "=") -> None:
+    """Print text in a banner with specified width and border character.
+
+    Args:
+        text: The text to display in the banner
+        width: The total width of the banner (default: 80)
+        border_char: The character to use for the banner border (default: '=')
+    """
+    print(format_banner(text, width, border_char))
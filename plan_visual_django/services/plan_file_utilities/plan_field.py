@@ -70,8 +70,8 @@ class PlanInputField:
     """
     Captures information for each field in each activity when reading the input plan file.
 
-    At the time of writing only Excel files are supported but this is a generic class and should support the needs
-    of other formats when they are added.
+    Used for every supported format.  Formats which don't have anything like an indent level (CSV, MS Project XML)
+    set the indent to zero.
 
     Information from the input file are placed within this class and then the parser will take the information it needs.
 
@@ -84,9 +84,12 @@ class PlanInputField:
             if self.is_valid_source(field_name):
                 setattr(self, field_name, field_data)
 
-    @staticmethod
-    def is_valid_source(source_name: str) -> bool:
-        return source_name in (source.value for source in PlanFieldInputSourceEnum)
+    # Checked for every field of every row read from a file, so worked out once rather than each time.
+    valid_source_names = frozenset(source.value for source in PlanFieldInputSourceEnum)
+
+    @classmethod
+    def is_valid_source(cls, source_name: str) -> bool:
+        return source_name in cls.valid_source_names
 
     def get_input_data(self, source: PlanFieldInputSourceEnum = PlanFieldInputSourceEnum.VALUE) -> Any:
         """
@@ -111,6 +114,8 @@ class PlanInputFieldTypeEnum(Enum): # Was RefactoredPlanFieldType
     STRING_nn_Days = ("STR_duration_msp", "String representing duration from MSP project in Excel")
     STRING_DATE_DMY_01 = ("STR_DATE_DMY_01", "String of form dd MMM YYYY")
     STRING_DATE_DMY_02 = ("STR_DATE_DMY_02", "String of form dd MMMMM YYYY HH:MM")
+    STRING_DATE_ISO = ("STR_DATE_ISO", "String of form YYYY-MM-DD, optionally followed by a time")
+    STRING_DURATION_ISO = ("STR_duration_iso", "ISO 8601 duration of working time, e.g. PT40H0M0S from MS Project XML")
     STRING_MILESTONE_YES_NO = ("STR_MSTONE_YES_NO", "Milestone flag as string, Yes or No")
     DATE = ("DATE", "Date (without time)")
 
@@ -153,6 +158,18 @@ class FileType(Enum):
         """Represents one of several field mappings from a Smartsheet export to Excel.  Note that Smartsheet
         doesn't have build-in columns for ID or Level, so there are no default names."""
         )
+    CSV_PLAN_01 = (
+        "CSV - Plan Visualiser CSV",
+        "csv-01-plan-01",
+        """Comma separated file with a heading row and one row per activity.  Columns are ID, Name, Duration (whole
+        days), Start and Finish (YYYY-MM-DD) and Level."""
+    )
+    MSP_XML_01 = (
+        "MS Project XML",
+        "msp-xml-01",
+        """Native MS Project XML file (File > Save As > XML in MS Project).  Fields are read from the elements of each
+        Task, using the element names from the MS Project XML schema."""
+    )
 
     def __init__(self, title, name, description):
         self.title = title
@@ -225,6 +242,22 @@ class FileTypes:
             PlanFieldEnum.END: PlanInputFieldSpecification("Finish", PlanInputFieldTypeEnum.DATE),
             PlanFieldEnum.LEVEL: PlanInputFieldSpecification("Task Name", PlanInputFieldTypeEnum.FLOAT, PlanFieldInputSourceEnum.INDENT)
         },
+        FileType.CSV_PLAN_01: {
+            PlanFieldEnum.STICKY_UID: PlanInputFieldSpecification("ID", PlanInputFieldTypeEnum.STRING),
+            PlanFieldEnum.NAME: PlanInputFieldSpecification("Name", PlanInputFieldTypeEnum.STRING),
+            PlanFieldEnum.DURATION: PlanInputFieldSpecification("Duration", PlanInputFieldTypeEnum.STRING),
+            PlanFieldEnum.START: PlanInputFieldSpecification("Start", PlanInputFieldTypeEnum.STRING_DATE_ISO),
+            PlanFieldEnum.END: PlanInputFieldSpecification("Finish", PlanInputFieldTypeEnum.STRING_DATE_ISO),
+            PlanFieldEnum.LEVEL: PlanInputFieldSpecification("Level", PlanInputFieldTypeEnum.STRING),
+        },
+        FileType.MSP_XML_01: {
+            PlanFieldEnum.STICKY_UID: PlanInputFieldSpecification("UID", PlanInputFieldTypeEnum.STRING),
+            PlanFieldEnum.NAME: PlanInputFieldSpecification("Name", PlanInputFieldTypeEnum.STRING),
+            PlanFieldEnum.DURATION: PlanInputFieldSpecification("Duration", PlanInputFieldTypeEnum.STRING_DURATION_ISO),
+            PlanFieldEnum.START: PlanInputFieldSpecification("Start", PlanInputFieldTypeEnum.STRING_DATE_ISO),
+            PlanFieldEnum.END: PlanInputFieldSpecification("Finish", PlanInputFieldTypeEnum.STRING_DATE_ISO),
+            PlanFieldEnum.LEVEL: PlanInputFieldSpecification("OutlineLevel", PlanInputFieldTypeEnum.STRING),
+        },
     }
 
     @classmethod
@@ -0,0 +1,407 @@
+"""
+Plan import service.
+
+Reading, parsing and saving a big plan can take longer than a web server will wait for a response, so rather than
+importing the plan while handling the upload request:
+- Each upload (new plan or new version of an existing plan) is recorded as a PlanImportJob.
+- The import is carried out by a bounded pool of worker threads in the server process, using read_and_parse_plan as
+  before.  Threads rather than processes, as the work is mostly reading the file and the database, and each thread has
+  its own database connection so this works the same with SQLite or Postgres and doesn't need a message broker.
+- As the import moves through its stages (read / parse / diff / write) the stage and number of rows read is saved on
+  the job, so the manage plans page can poll for progress.
+- An import can be cancelled up until it starts writing to the database.  Nothing is written until the last stage, and
+  that is done in a single transaction, so a cancelled or failed import leaves the plan as it was.  A new plan which
+  isn't imported is removed.
+- The number of imports each user (or anonymous session) can have waiting or running at once is limited.
+- A SHA-256 of each uploaded file is kept against the plan.  Re-uploading exactly the same file again is recorded as a
+  completed job straight away without reading the file.
+- While a process has jobs waiting for or being run by its pool, a heartbeat thread keeps their updated time current,
+  including while a job is writing to the database and not reporting progress.  A queued or running job whose heartbeat
+  stops (e.g. because the server was restarted) is marked as failed when its status is next checked.  The upload for a
+  lost job isn't tidied up then, as that is usually while handling a request for the job's status, but the next time an
+  import is started.
+
+Settings:
+- PLAN_IMPORT_MAX_WORKERS: Number of worker threads.  0 means imports are carried out in the requesting thread, which
+  is mainly for testing.
+- PLAN_IMPORT_MAX_PER_USER: Maximum number of queued or running imports for a user or session.
+- PLAN_IMPORT_JOB_TIMEOUT: Seconds without a heartbeat after which a queued or running job which isn't being tracked
+  by this process is assumed to have been lost and is marked as failed.  The heartbeat is sent four times in this
+  period.
+
+NOTE: The worker pool belongs to the process which created it, so where there are several server processes each has
+its own pool, but they share the job table.
+"""
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from typing import Dict, Optional, Set
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from plan_visual_django.exceptions import PlanImportCancelled, PlanImportLimitReached, PlanParseError, \
+    ExcelPlanSheetNotFound, SuppliedPlanIncompleteError
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Futures for the jobs submitted to the pool by this process.
+_futures: Dict[int, Future] = {}
+
+# Jobs waiting for or being run by this process, which are kept alive by its heartbeat.
+_live_job_ids: Set[int] = set()
+
+HEARTBEATS_PER_TIMEOUT = 4
+
+
+def get_executor() -> Optional[ThreadPoolExecutor]:
+    """
+    Returns the worker pool for this process, creating it the first time it's needed, or None if imports are
+    configured to run in the requesting thread.
+    """
+    global _executor
+
+    if settings.PLAN_IMPORT_MAX_WORKERS <= 0:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PLAN_IMPORT_MAX_WORKERS, thread_name_prefix="plan-import"
+            )
+            threading.Thread(target=_run_heartbeat, name="plan-import-heartbeat", daemon=True).start()
+        return _executor
+
+
+def send_heartbeat():
+    """
+    Refreshes the updated time of the unfinished jobs which this process is responsible for, so that other processes
+    don't take them to have been lost while they wait for a worker or are being written to the database.
+    """
+    from plan_visual_django.models import PlanImportJob
+
+    job_ids = list(_live_job_ids)
+    if job_ids:
+        PlanImportJob.objects.filter(
+            id__in=job_ids, status__in=[PlanImportJob.Status.QUEUED, PlanImportJob.Status.RUNNING]
+        ).update(updated=timezone.now())
+
+
+def _run_heartbeat():
+    while True:
+        time.sleep(settings.PLAN_IMPORT_JOB_TIMEOUT / HEARTBEATS_PER_TIMEOUT)
+        try:
+            send_heartbeat()
+        except Exception:
+            # e.g. the database is locked by an import which is writing.  Try again next time.
+            logger.exception("Failed to send plan import heartbeat")
+        finally:
+            connection.close()
+
+
+def get_user_import_jobs(current_user):
+    """
+    :param current_user: CurrentUser
+    :return: QuerySet of the import jobs for the current user or session, most recent first.
+    """
+    from plan_visual_django.models import PlanImportJob
+
+    owner_attribute, owner_value = current_user.get_identifier()
+    return PlanImportJob.objects.filter(**{owner_attribute: owner_value})
+
+
+def count_active_imports(current_user) -> int:
+    """
+    Number of imports queued or running for the current user or session, not counting any which have been lost.
+    """
+    from plan_visual_django.models import PlanImportJob
+
+    active_jobs = get_user_import_jobs(current_user).filter(
+        status__in=[PlanImportJob.Status.QUEUED, PlanImportJob.Status.RUNNING]
+    )
+    return sum(1 for job in active_jobs if not get_job_status(job).is_finished)
+
+
+def check_import_limit(current_user):
+    """
+    Raises PlanImportLimitReached if the current user or session already has as many imports queued or running as
+    they are allowed.  Checked before the upload is saved, so the limit can be exceeded if several uploads arrive at
+    the same moment.
+    """
+    if count_active_imports(current_user) >= settings.PLAN_IMPORT_MAX_PER_USER:
+        raise PlanImportLimitReached(
+            f"You already have {settings.PLAN_IMPORT_MAX_PER_USER} plan imports in progress, please wait for one to "
+            f"finish before uploading another plan"
+        )
+
+
+def calculate_file_hash(file) -> str:
+    """
+    SHA-256 of the contents of an uploaded or stored file, read in chunks so a big file isn't held in memory.
+
+    :param file: Django File (e.g. UploadedFile or FieldFile)
+    :return: Hex digest
+    """
+    file_hash = hashlib.sha256()
+    was_closed = file.closed
+    file.open('rb')
+    for chunk in file.chunks():
+        file_hash.update(chunk)
+    if was_closed:
+        file.close()
+    else:
+        file.seek(0)
+    return file_hash.hexdigest()
+
+
+def start_plan_import(current_user, plan, new_file=None):
+    """
+    Creates an import job for the plan and submits it to the worker pool.
+
+    :param current_user: CurrentUser
+    :param plan: For a new plan, the Plan record (already saved, with its file).  For a re-upload, the existing plan.
+    :param new_file: For a re-upload, the uploaded file.  Only replaces the plan's file once imported successfully.
+    :return: PlanImportJob.  If imports are run in the requesting thread (or there was nothing to import) it will
+             have finished.
+    """
+    from plan_visual_django.models import PlanImportJob
+
+    discard_lost_uploads()
+
+    owner_attribute, owner_value = current_user.get_identifier()
+    job = PlanImportJob(
+        plan=plan,
+        plan_name=plan.plan_name,
+        update_flag=new_file is not None,
+        file_hash=calculate_file_hash(plan.file if new_file is None else new_file),
+        **{owner_attribute: owner_value}
+    )
+    if new_file is not None:
+        job.file_name = new_file.name
+        if plan.file_hash and job.file_hash == plan.file_hash:
+            # Same file as last time, so the plan can't have changed.  The new copy of the file isn't kept.
+            logger.info(f"Re-upload of plan {plan.plan_name} is identical to the current file, not imported")
+            job.status = PlanImportJob.Status.COMPLETE
+            job.stage = PlanImportJob.Stage.DONE
+            job.skipped_unchanged = True
+            job.save()
+            return job
+        job.file = new_file
+    job.save()
+
+    executor = get_executor()
+    if executor is None:
+        run_import_job(job.id, close_connection=False)
+        job.refresh_from_db()
+    else:
+        # The job (and for a new plan the plan record) may have been saved in a transaction which the worker can't see
+        # until it has been committed.
+        transaction.on_commit(partial(_submit_job, executor, job.id))
+    return job
+
+
+def _submit_job(executor: ThreadPoolExecutor, job_id: int):
+    _live_job_ids.add(job_id)
+    future = executor.submit(run_import_job, job_id, close_connection=True)
+    _futures[job_id] = future
+    future.add_done_callback(partial(_forget_job, job_id))
+
+
+def _forget_job(job_id: int, _future: Future):
+    _futures.pop(job_id, None)
+    _live_job_ids.discard(job_id)
+
+
+def _record_progress(job_id: int, stage: str, rows_read: Optional[int] = None):
+    """
+    Progress callback for read_and_parse_plan.  Saves the stage reached on the job and stops the import if it has been
+    cancelled.
+    """
+    from plan_visual_django.models import PlanImportJob
+
+    fields = {'stage': stage, 'updated': timezone.now()}
+    if rows_read is not None:
+        fields['rows_read'] = rows_read
+    PlanImportJob.objects.filter(id=job_id).update(**fields)
+
+    if PlanImportJob.objects.filter(id=job_id, cancel_requested=True).exists():
+        raise PlanImportCancelled(f"Import job {job_id} cancelled")
+
+
+def _discard_upload(job):
+    """
+    Tidies up after an import which hasn't succeeded.  A new plan is removed altogether, for a re-upload the new file
+    is removed and the plan is left as it was.
+    """
+    from plan_visual_django.models import PlanImportJob
+
+    if job.update_flag:
+        if job.file:
+            job.file.delete(save=False)
+            PlanImportJob.objects.filter(id=job.id).update(file="")
+    elif job.plan is not None:
+        plan = job.plan
+        if plan.file:
+            plan.file.delete(save=False)
+        plan.delete()
+
+
+def _finish_job(job_id: int, status, error_message: str = "", **fields):
+    from plan_visual_django.models import PlanImportJob
+
+    PlanImportJob.objects.filter(id=job_id).update(
+        status=status, error_message=error_message, updated=timezone.now(), **fields
+    )
+
+
+def run_import_job(job_id: int, close_connection: bool):
+    """
+    Carries out the import for a job.  The outcome, including any error, is recorded on the job.
+
+    :param job_id:
+    :param close_connection: Whether to close the database connection at the end, for when this is running in a thread
+                             of the worker pool rather than the thread handling the request.
+    """
+    from plan_visual_django.models import PlanImportJob
+    from plan_visual_django.services.plan_file_utilities.plan_field import FileTypes
+    from plan_visual_django.services.plan_file_utilities.plan_parsing import read_and_parse_plan
+    from plan_visual_django.services.plan_file_utilities.plan_reader import get_file_reader
+
+    job = None
+    imported = False
+    _live_job_ids.add(job_id)
+    try:
+        # Only start the job if it is still queued, as it may have been cancelled while waiting for a worker.
+        started = PlanImportJob.objects.filter(id=job_id, status=PlanImportJob.Status.QUEUED).update(
+            status=PlanImportJob.Status.RUNNING, updated=timezone.now()
+        )
+        if not started:
+            return
+
+        job = PlanImportJob.objects.select_related('plan').get(id=job_id)
+        plan = job.plan
+        if job.update_flag:
+            # Read the new version of the file, but don't save it against the plan until it has been imported.
+            plan.file = job.file.name
+            plan.file_name = job.file_name
+
+        file_type, plan_field_mapping = FileTypes.get_file_type_by_name(plan.file_type_name)
+        try:
+            added, updated, deleted = read_and_parse_plan(
+                plan,
+                plan_field_mapping,
+                get_file_reader(file_type),
+                update_flag=job.update_flag,
+                progress=partial(_record_progress, job_id)
+            )
+        except PlanImportCancelled:
+            logger.info(f"Import of plan {job.plan_name} cancelled")
+            _discard_upload(job)
+            _finish_job(job_id, PlanImportJob.Status.CANCELLED)
+        except (PlanParseError, ExcelPlanSheetNotFound, SuppliedPlanIncompleteError) as exception:
+            logger.warning(f"Error parsing plan {job.plan_name}: {exception}")
+            _discard_upload(job)
+            _finish_job(job_id, PlanImportJob.Status.FAILED, f"Error parsing plan {job.plan_name}: {exception}")
+        else:
+            plan.file_hash = job.file_hash
+            if job.update_flag:
+                plan.save(update_fields=['file', 'file_name', 'file_hash'])
+            else:
+                plan.save(update_fields=['file_hash'])
+            imported = True
+            _finish_job(
+                job_id,
+                PlanImportJob.Status.COMPLETE,
+                stage=PlanImportJob.Stage.DONE,
+                activities_added=added,
+                activities_updated=updated,
+                activities_deleted=deleted
+            )
+    except Exception as exception:
+        logger.exception(f"Import job {job_id} failed")
+        if job is not None and not imported:
+            _discard_upload(job)
+        _finish_job(job_id, PlanImportJob.Status.FAILED, f"Unexpected error importing plan: {exception}")
+    finally:
+        if job_id not in _futures:
+            _live_job_ids.discard(job_id)
+        if close_connection:
+            connection.close()
+
+
+def _is_abandoned(job) -> bool:
+    if job.id in _live_job_ids:
+        return False
+    return timezone.now() - job.updated > timedelta(seconds=settings.PLAN_IMPORT_JOB_TIMEOUT)
+
+
+def get_job_status(job):
+    """
+    Brings the job up to date, marking it as failed if it has been lost.  The upload is left for
+    discard_lost_uploads() to tidy up.
+
+    :param job: PlanImportJob
+    :return: The job
+    """
+    from plan_visual_django.models import PlanImportJob
+
+    job.refresh_from_db()
+    if not job.is_finished and _is_abandoned(job):
+        logger.warning(f"Import job {job.id} for plan {job.plan_name} was not completed in time")
+        PlanImportJob.objects.filter(id=job.id, status=job.status, updated=job.updated).update(
+            status=PlanImportJob.Status.FAILED,
+            error_message="Import was not completed in time",
+            updated=timezone.now()
+        )
+        job.refresh_from_db()
+    return job
+
+
+def discard_lost_uploads():
+    """
+    Tidies up after imports which were marked as failed because they were lost.  Every other failed import has its
+    upload discarded as it fails, so these are the failed jobs which still have a new plan or a new file.
+    """
+    from plan_visual_django.models import PlanImportJob
+
+    lost_jobs = PlanImportJob.objects.filter(
+        Q(update_flag=False, plan__isnull=False) | Q(update_flag=True) & ~Q(file=""),
+        status=PlanImportJob.Status.FAILED
+    ).exclude(id__in=list(_live_job_ids)).select_related('plan')
+    for job in lost_jobs:
+        logger.info(f"Discarding upload for lost import job {job.id} for plan {job.plan_name}")
+        _discard_upload(job)
+
+
+def cancel_import_job(job):
+    """
+    Cancels the import.  A job which is waiting for a worker is cancelled straight away.  A running job stops at the
+    next point it reports progress, unless it has reached the point of writing to the database, in which case it will
+    complete.
+
+    :param job: PlanImportJob
+    :return: The job, with its latest status
+    """
+    from plan_visual_django.models import PlanImportJob
+
+    PlanImportJob.objects.filter(id=job.id).update(cancel_requested=True)
+    cancelled_while_queued = PlanImportJob.objects.filter(id=job.id, status=PlanImportJob.Status.QUEUED).update(
+        status=PlanImportJob.Status.CANCELLED, updated=timezone.now()
+    )
+    if cancelled_while_queued:
+        future = _futures.get(job.id)
+        if future is not None:
+            future.cancel()
+        job.refresh_from_db()
+        _discard_upload(job)
+
+    return get_job_status(job)
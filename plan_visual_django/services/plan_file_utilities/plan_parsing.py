@@ -1,69 +1,254 @@
+import hashlib
 import logging
+from datetime import datetime
+from typing import Dict, List, Set, Tuple
+
+from django.db import transaction
+from django.db.models import F
 
 from plan_visual_django.services.plan_file_utilities.plan_field import PlanFieldEnum, PlanFieldNameEnum
 
 logger = logging.getLogger(__name__)
 
 
-def update_plan_activity(plan, activity, action):
+# Batch size for bulk writes, to keep each statement within database parameter limits for big plans.
+BULK_BATCH_SIZE = 1000
+
+# Stages of an import reported to the progress callback of read_and_parse_plan (same values as PlanImportJob.Stage).
+IMPORT_STAGE_READ = "READ"
+IMPORT_STAGE_PARSE = "PARSE"
+IMPORT_STAGE_DIFF = "DIFF"
+IMPORT_STAGE_WRITE = "WRITE"
+
+# How often (in rows) progress is reported while rows are being read from the plan file.
+PROGRESS_ROWS_INTERVAL = 1000
+
+# Fields of an existing activity which are updated from a re-uploaded plan.
+PLAN_ACTIVITY_UPDATE_FIELDS = [
+    'activity_name', 'start_date', 'end_date', 'level', 'sequence_number', 'parent_unique_id', 'depth',
+    'subtree_end_sequence'
+]
+
+
+def get_milestone_flag(activity) -> bool:
     """
     NOTE - the following is a temporary hack.
     ToDo: Refactor to more generically handle the mapping of the input data to the plan fields for milestones.
     If the input file includes a milestone flag then use that to set the milestone flag in the plan.
     If not then use the duration to set the milestone flag.
 
-    If update_flag is True then we are updating an existing record.
+    :param activity:
+    :return:
+    """
+    if PlanFieldNameEnum.MILESTONE_FLAG.value in activity:
+        return activity[PlanFieldNameEnum.MILESTONE_FLAG.name]
+    else:
+        return activity[PlanFieldNameEnum.DURATION.value] == 0
+
+
+def as_date(value):
+    """
+    Dates read from Excel cells come through as datetimes but are stored as dates, so are converted before comparing
+    with the stored value (otherwise every activity would look changed).
+    """
+    return value.date() if isinstance(value, datetime) else value
+
+
+def calculate_activity_fingerprint(
+        activity_name, start_date, end_date, level, sequence_number, parent_unique_id="", depth=None,
+        subtree_end_sequence=None
+) -> str:
+    """
+    Hash of the fields of an activity which are updated on re-upload (PLAN_ACTIVITY_UPDATE_FIELDS).  Stored against
+    each PlanActivity so that a re-upload can tell which activities have changed without reading and comparing every
+    field of every activity.
+
+    The hierarchy fields are included as they can change when other activities change (e.g. a child is added at the
+    end of the activity's subtree), even if nothing about the activity itself has.
+
+    :return: 32 character hex string
+    """
+    key = "\x1f".join([
+        activity_name, str(as_date(start_date)), str(as_date(end_date)), str(level), str(sequence_number),
+        parent_unique_id, str(depth), str(subtree_end_sequence)
+    ])
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def get_activity_fingerprint(activity) -> str:
+    """
+    Fingerprint for a parsed activity, matching the one stored for the PlanActivity created from it.
+
+    :param activity: Parsed activity
+    :return:
+    """
+    return calculate_activity_fingerprint(
+        activity['activity_name'],
+        activity['start_date'],
+        activity['end_date'],
+        activity['level'] if 'level' in activity else 1,
+        activity['sequence_number'],
+        activity.get('parent_unique_id', ""),
+        activity.get('depth'),
+        activity.get('subtree_end_sequence'),
+    )
+
+
+def create_plan_activity(plan, activity):
+    """
+    Creates (but doesn't save) the PlanActivity for a newly added activity.
 
     :param plan:
-    :param activity:
-    :param update_flag:
+    :param activity: Parsed activity
     :return:
     """
+    from plan_visual_django.models import PlanActivity
+    return PlanActivity(
+        plan=plan,
+        unique_sticky_activity_id=activity['unique_sticky_activity_id'],
+        activity_name=activity['activity_name'],
+        milestone_flag=get_milestone_flag(activity),
+        start_date=as_date(activity['start_date']),
+        end_date=as_date(activity['end_date']),
+        level=activity['level'] if 'level' in activity else 1,
+        sequence_number=activity['sequence_number'],
+        parent_unique_id=activity.get('parent_unique_id', ""),
+        depth=activity.get('depth'),
+        subtree_end_sequence=activity.get('subtree_end_sequence'),
+        row_fingerprint=get_activity_fingerprint(activity),
+    )
+
 
-    # Check for delete action first as no point doing anything else if no record.
+def get_current_fingerprints(plan) -> Dict[str, Tuple[int, str]]:
+    """
+    :param plan:
+    :return: Dictionary of sticky id -> (PlanActivity id, fingerprint) for the activities currently in the plan.
+    """
     from plan_visual_django.models import PlanActivity
-    if action == "delete":
-        deleted_sticky_id = activity['unique_sticky_activity_id']
-        # Remove from plan
-        record = PlanActivity.objects.get(plan=plan, unique_sticky_activity_id=deleted_sticky_id)
-        record.delete()
-
-        # Remove from visuals
-        from plan_visual_django.models import PlanVisual, VisualActivity
-        visuals = PlanVisual.objects.filter(plan=plan)
-        for visual in visuals:
-            visual_activities = VisualActivity.objects.filter(visual=visual, unique_id_from_plan=deleted_sticky_id)
-            for visual_activity in visual_activities:
-                visual_activity.delete()
-    else:
-        if PlanFieldNameEnum.MILESTONE_FLAG.value in activity:
-            milestone_flag = activity[PlanFieldNameEnum.MILESTONE_FLAG.name]
-        else:
-            if activity[PlanFieldNameEnum.DURATION.value] == 0:
-                milestone_flag = True
-            else:
-                milestone_flag = False
-
-        if action == "update":
-            record = PlanActivity.objects.get(plan=plan, unique_sticky_activity_id=activity['unique_sticky_activity_id'])
-            record.activity_name = activity['activity_name']
-            record.start_date = activity['start_date']
-            record.end_date = activity['end_date']
-            record.level = activity['level'] if 'level' in activity else 1
-            record.sequence_number = activity['sequence_number']
-
-            record.save()
-        elif action == "add":
-            record = PlanActivity.objects.create(
-                plan=plan,
-                unique_sticky_activity_id=activity['unique_sticky_activity_id'],
-                activity_name=activity['activity_name'],
-                milestone_flag=milestone_flag,
-                start_date=activity['start_date'],
-                end_date=activity['end_date'],
-                level=activity['level'] if 'level' in activity else 1,
-                sequence_number=activity['sequence_number'],
-            )
+    return {
+        sticky_id: (activity_id, fingerprint) for activity_id, sticky_id, fingerprint in
+        PlanActivity.objects.filter(plan=plan).order_by().values_list('id', 'unique_sticky_activity_id', 'row_fingerprint')
+    }
+
+
+def get_visuals_including(plan, sticky_ids: List[str]) -> Set[int]:
+    """
+    :param plan:
+    :param sticky_ids:
+    :return: Ids of the plan's visuals which include any of the given activities.
+    """
+    from plan_visual_django.models import VisualActivity
+
+    visual_ids = set()
+    for batch_start in range(0, len(sticky_ids), BULK_BATCH_SIZE):
+        visual_ids.update(VisualActivity.objects.filter(
+            visual__plan=plan, unique_id_from_plan__in=sticky_ids[batch_start:batch_start + BULK_BATCH_SIZE]
+        ).order_by().values_list('visual_id', flat=True).distinct())
+    return visual_ids
+
+
+def apply_plan_changes(plan, new_activities, updated_activities, deleted_sticky_ids, current_fingerprints=None):
+    """
+    Writes the changes to the plan's activities to the database as a handful of bulk statements, all within one
+    transaction.  Activities still in the plan are only written if their fingerprint has changed.
+
+    Bulk writes don't send model signals, so the render revision is incremented here instead (see render_cache.py),
+    and only for visuals which include an activity which has changed or been removed.  Activities which have been
+    added to the plan aren't in any visual yet.
+
+    :param plan:
+    :param new_activities: Parsed activities which aren't in the plan yet.
+    :param updated_activities: Parsed activities which are already in the plan.
+    :param deleted_sticky_ids: Ids of activities in the plan which are no longer in the plan file.
+    :param current_fingerprints: Output from get_current_fingerprints(), read from the database if not supplied.
+    :return: Number of activities added, updated and deleted.
+    """
+    from plan_visual_django.models import Plan, PlanActivity, VisualActivity
+    from plan_visual_django.services.plan_file_utilities.plan_tree_cache import invalidate_plan_tree
+    from plan_visual_django.services.visual.model.swimlane_geometry import invalidate_swimlane_geometry
+    from plan_visual_django.services.visual.rendering.render_cache import bump_render_revision, \
+        deferred_render_revision_bumps
+
+    if current_fingerprints is None and len(updated_activities) > 0:
+        current_fingerprints = get_current_fingerprints(plan)
+
+    changed_records = []
+    for activity in updated_activities:
+        activity_id, current_fingerprint = current_fingerprints[activity['unique_sticky_activity_id']]
+        if get_activity_fingerprint(activity) != current_fingerprint:
+            record = create_plan_activity(plan, activity)
+            record.id = activity_id
+            changed_records.append(record)
+
+    deleted_sticky_ids = list(deleted_sticky_ids)
+    changed_sticky_ids = [record.unique_sticky_activity_id for record in changed_records]
+
+    with transaction.atomic():
+        PlanActivity.objects.bulk_create(
+            [create_plan_activity(plan, activity) for activity in new_activities], batch_size=BULK_BATCH_SIZE
+        )
+        PlanActivity.objects.bulk_update(
+            changed_records, PLAN_ACTIVITY_UPDATE_FIELDS + ['row_fingerprint'], batch_size=BULK_BATCH_SIZE
+        )
+
+        # Work out which visuals are affected before activities are removed from them.
+        visuals_with_deleted_activities = get_visuals_including(plan, deleted_sticky_ids)
+        affected_visual_ids = visuals_with_deleted_activities | get_visuals_including(plan, changed_sticky_ids)
+
+        # Deleted activities are removed from the plan and from every visual for the plan.  Deleting sends a signal for
+        # each record, which would increment the render revision of its visuals one record at a time, so revisions are
+        # only noted while deleting and then incremented once.  The signal for a plan activity increments every visual
+        # of the plan, so that is ignored here and only the visuals which include a deleted or changed activity are
+        # incremented.
+        with deferred_render_revision_bumps(include_plan_bumps=False):
+            for batch_start in range(0, len(deleted_sticky_ids), BULK_BATCH_SIZE):
+                batch = deleted_sticky_ids[batch_start:batch_start + BULK_BATCH_SIZE]
+                PlanActivity.objects.filter(plan=plan, unique_sticky_activity_id__in=batch).delete()
+                VisualActivity.objects.filter(visual__plan=plan, unique_id_from_plan__in=batch).delete()
+
+            if affected_visual_ids:
+                bump_render_revision(affected_visual_ids)
+
+        # New revision of the plan, so that every process builds a new tree for it (see plan_tree_cache.py).
+        plan_changed = len(new_activities) > 0 or len(changed_records) > 0 or len(deleted_sticky_ids) > 0
+        if plan_changed:
+            Plan.objects.filter(id=plan.id).update(revision=F('revision') + 1)
+            plan.revision += 1
+
+    for visual_id in visuals_with_deleted_activities:
+        invalidate_swimlane_geometry(visual_id)
+    if plan_changed:
+        invalidate_plan_tree(plan.id)
+
+    return len(new_activities), len(changed_records), len(deleted_sticky_ids)
+
+
+def add_hierarchy(parsed_data):
+    """
+    Works out where each activity sits in the plan hierarchy from the levels, and adds it to the parsed activities so
+    that it is stored against each PlanActivity.  Sequence numbers must already have been allocated.
+
+    If the levels don't make a valid hierarchy the plan is still imported, but without the hierarchy (as before the
+    hierarchy was stored) - it will fail when the plan tree is built in the same way.
+
+    :param parsed_data: Parsed activities in sequence order
+    :return:
+    """
+    from plan_visual_django.services.plan_file_utilities.plan_tree import calculate_hierarchy, InvalidPlanHierarchy
+
+    try:
+        parents, depths, subtree_ends = calculate_hierarchy(
+            [activity['level'] if 'level' in activity else 1 for activity in parsed_data]
+        )
+    except InvalidPlanHierarchy as error:
+        logger.warning(f"Plan hierarchy not stored: {error}")
+        return
+
+    # Sequence numbers run from 1 in plan order, so the sequence number for an index is one more than the index.
+    for activity, parent, depth, subtree_end in zip(parsed_data, parents, depths, subtree_ends):
+        activity['parent_unique_id'] = parsed_data[parent]['unique_sticky_activity_id'] if parent >= 0 else ""
+        activity['depth'] = depth
+        activity['subtree_end_sequence'] = subtree_end + 1
 
 
 def parse_plan_file(raw_data, headers, file_reader, plan_field_mapping):
@@ -72,11 +257,25 @@ def parse_plan_file(raw_data, headers, file_reader, plan_field_mapping):
 
 
 def read_plan_file(plan, file_reader):
-    raw_data, headers = file_reader.read(plan)
+    # Rows are streamed from the file straight into the parser rather than being read into a list first.
+    raw_data, headers = file_reader.iter_rows(plan)
     return raw_data, headers
 
 
-def read_and_parse_plan(plan, plan_field_mapping, file_reader, update_flag=False):
+def report_rows_read(rows, progress):
+    """
+    Passes rows through from the file reader, reporting the number read so far every PROGRESS_ROWS_INTERVAL rows and
+    once all rows have been read.
+    """
+    rows_read = 0
+    for rows_read, row in enumerate(rows, start=1):
+        if rows_read % PROGRESS_ROWS_INTERVAL == 0:
+            progress(IMPORT_STAGE_PARSE, rows_read=rows_read)
+        yield row
+    progress(IMPORT_STAGE_PARSE, rows_read=rows_read)
+
+
+def read_and_parse_plan(plan, plan_field_mapping, file_reader, update_flag=False, progress=None):
     """
     Reads and parses the uploaded plan in order to store plan within the database.
 
@@ -95,12 +294,21 @@ def read_and_parse_plan(plan, plan_field_mapping, file_reader, update_flag=False
     :param plan_field_mapping:
     :param file_reader:
     :param update_flag:
-    :return:
+    :param progress: Optional callable which is told as each stage of the import is reached, as
+                     progress(stage, **counts), where stage is one of the IMPORT_STAGE_ values.  Can raise an exception
+                     to stop the import (e.g. if it has been cancelled), which it will be before anything is written.
+    :return: Number of activities added, updated and deleted.
     """
+    if progress is None:
+        progress = lambda stage, **counts: None
+
     logger.debug(f'Reading plan: {plan}')
+    progress(IMPORT_STAGE_READ)
     raw_data, headers = read_plan_file(plan, file_reader)
+
+    progress(IMPORT_STAGE_PARSE, rows_read=0)
     parsed_data = parse_plan_file(
-        raw_data=raw_data,
+        raw_data=report_rows_read(raw_data, progress),
         headers=headers,
         plan_field_mapping=plan_field_mapping,
         file_reader=file_reader
@@ -110,34 +318,41 @@ def read_and_parse_plan(plan, plan_field_mapping, file_reader, update_flag=False
     # types of update, we apply the new sequence number as needed.
     for sequence_number, activity in enumerate(parsed_data, start=1):
         activity['sequence_number'] = sequence_number
+    add_hierarchy(parsed_data)
 
     if update_flag is False:
         # This is a new plan file so we simply add all records to the plan_activity table.
-        for activity in parsed_data:
-            update_plan_activity(plan, activity=activity, action="add")
+        progress(IMPORT_STAGE_WRITE)
+        return apply_plan_changes(plan, new_activities=parsed_data, updated_activities=[], deleted_sticky_ids=[])
     else:
-        new_activities, updated_activities, deleted_sticky_ids = analyse_plan_changes(parsed_data, plan)
-        for activity in new_activities:
-            update_plan_activity(plan, activity=activity, action="add")
-        for activity in updated_activities:
-            update_plan_activity(plan, activity=activity, action="update")
-        for deleted_sticky_id in deleted_sticky_ids:
-            # We don't have an activity (as it's gone from the plan) so create dummy one to pass unique id for deletion
-            activity = {'unique_sticky_activity_id': deleted_sticky_id}
-            update_plan_activity(plan, activity=activity, action="delete")
-            # Need to remove from the plan and from any visuals
-
-
-def analyse_plan_changes(new_parsed_activity_data, plan):
+        progress(IMPORT_STAGE_DIFF)
+        current_fingerprints = get_current_fingerprints(plan)
+        new_activities, updated_activities, deleted_sticky_ids = analyse_plan_changes(
+            parsed_data, plan, current_sticky_ids=current_fingerprints.keys()
+        )
+        progress(IMPORT_STAGE_WRITE)
+        return apply_plan_changes(
+            plan, new_activities, updated_activities, deleted_sticky_ids, current_fingerprints=current_fingerprints
+        )
+
+
+def analyse_plan_changes(new_parsed_activity_data, plan, current_sticky_ids=None):
     """
-    Takes the activities from a new version of an existing plan and applies changes to the plan.
+    Takes the activities from a new version of an existing plan and works out which activities have been added,
+    which are still in the plan and which have been removed.
 
     :param new_parsed_activity_data:
-    :return:
+    :param plan:
+    :param current_sticky_ids: Ids of the activities currently in the plan.  Read from the database if not supplied.
+    :return: New activities, activities still in the plan, ids of activities removed from the plan.
     """
     from plan_visual_django.models import PlanActivity
-    current_plan_sticky_ids = PlanActivity.objects.filter(plan=plan).values_list('unique_sticky_activity_id', flat=True)
-    new_plan_sticky_ids = [activity['unique_sticky_activity_id'] for activity in new_parsed_activity_data]
+    if current_sticky_ids is None:
+        current_sticky_ids = PlanActivity.objects.filter(plan=plan).values_list('unique_sticky_activity_id', flat=True)
+
+    # Sets so that checking whether each activity is in the old or new plan doesn't mean searching the whole plan.
+    current_plan_sticky_ids = set(current_sticky_ids)
+    new_plan_sticky_ids = {activity['unique_sticky_activity_id'] for activity in new_parsed_activity_data}
 
     new_activities = [activity for activity in new_parsed_activity_data if activity['unique_sticky_activity_id'] not in current_plan_sticky_ids]
     updated_activities = [activity for activity in new_parsed_activity_data if activity['unique_sticky_activity_id'] in current_plan_sticky_ids]
@@ -2,17 +2,25 @@
 Module which reads in plan data from the file in any supported format, and
 then parses the data to extract information for each activity.
 """
+import csv
+import io
+import math
 import re
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from datetime import datetime, date
+from itertools import islice
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Any, Callable, Optional, Tuple
 from plan_visual_django.exceptions import (
     SuppliedPlanIncompleteError,
-    ExcelPlanSheetNotFound
+    ExcelPlanSheetNotFound,
+    PlanParseError
 )
 from plan_visual_django.models import Plan
 import openpyxl as openpyxl
+from lxml import etree
 import logging
 from plan_visual_django.services.plan_file_utilities.plan_field import PlanFieldEnum, FileType, \
     PlanInputFieldSpecification, PlanInputField, PlanFieldInputSourceEnum
@@ -86,7 +94,7 @@ def convert_string_msp_duration_int(string) -> int:
     """
     if string is None:
         # Special case for now - return 0 if the string is None
-        print("Warning: convert_string_msp_duration_int called with None value")
+        logger.warning("convert_string_msp_duration_int called with None value")
         return 0
     if isinstance(string, str):
         matches = re.match(r"(\d+) (\w+)", string.strip())
@@ -124,6 +132,41 @@ def convert_string_date_dmy_02(date_str) -> date:
     return datetime.strptime(date_str, '%d %B %Y %H:%M').date()
 
 
+def convert_string_date_iso(date_str) -> date:
+    """
+    Format: '2022-06-10', or with a time as in MS Project XML, '2022-06-10T08:00:00'
+    :param date_str:
+    :return:
+    """
+    return datetime.fromisoformat(date_str.strip()).date()
+
+
+# MS Project XML holds durations as working time, using the default calendar of 8 working hours a day.
+HOURS_PER_WORKING_DAY = 8
+
+iso_duration_pattern = re.compile(
+    r"P(?:(\d+(?:\.\d+)?)D)?(?:T(?:(\d+(?:\.\d+)?)H)?(?:(\d+(?:\.\d+)?)M)?(?:(\d+(?:\.\d+)?)S)?)?"
+)
+
+
+def convert_string_iso_duration_int(string) -> int:
+    """
+    Parse an ISO 8601 duration of working time as used in MS Project XML (e.g. 'PT40H0M0S') to a whole number of
+    working days, rounding part days up so that only a zero duration is treated as a milestone.
+
+    :param string:
+    :return:
+    """
+    if not isinstance(string, str):
+        raise ValueError(f"Conversion expected ISO 8601 duration string but got type {type(string)}")
+    matches = iso_duration_pattern.fullmatch(string.strip())
+    if matches is None:
+        raise ValueError(f"Invalid duration {string}")
+    days, hours, minutes, seconds = (float(value) if value is not None else 0.0 for value in matches.groups())
+    working_hours = days * HOURS_PER_WORKING_DAY + hours + minutes / 60 + seconds / 3600
+    return math.ceil(working_hours / HOURS_PER_WORKING_DAY)
+
+
 def convert_int_string(int_val) -> str:
     return str(int_val)
 
@@ -157,6 +200,9 @@ convert_dispatch_table = {
     "STR_DATE_DMY_02": {
         'DATE': convert_string_date_dmy_02
     },
+    "STR_DATE_ISO": {
+        'DATE': convert_string_date_iso
+    },
     'STR_OR_INT': {
         'STR': convert_str_or_int_to_str,
     },
@@ -169,6 +215,9 @@ convert_dispatch_table = {
     'STR_duration_msp': {  # Typically used to decode a duration encoded as a number of days e.g. '345d'
         'INT': convert_string_msp_duration_int,
     },
+    'STR_duration_iso': {  # Duration in working time from MS Project XML e.g. 'PT40H0M0S'
+        'INT': convert_string_iso_duration_int,
+    },
     'INT': {
         'STR': convert_int_string,
         'INT': convert_pass_through,
@@ -198,6 +247,96 @@ def convert_dispatch(input_type: str, output_type: str, input_value: any) -> any
     return converted_value
 
 
+# Converters whose result only depends on the value passed in, so once a value has been converted the result can be
+# re-used when the same value appears again in the column.  Dates and durations in particular repeat a lot in a plan.
+cacheable_converters = frozenset([
+    convert_string_int,
+    convert_string_nnd_int,
+    convert_string_msp_duration_int,
+    convert_string_date_dmy_01,
+    convert_string_date_dmy_02,
+    convert_string_date_iso,
+    convert_string_iso_duration_int,
+    convert_str_yes_no_to_bool,
+])
+
+# Limit on the number of distinct values remembered for each column, so a column where every value is different
+# doesn't keep growing its cache.
+MAX_CACHED_VALUES_PER_COLUMN = 10_000
+
+# Number of rows parsed together, column by column.  Rows are still streamed from the file, a chunk at a time.
+PARSE_CHUNK_SIZE = 1000
+
+
+@dataclass
+class CompiledPlanField:
+    """
+    Everything needed to extract and convert one plan field from the input rows, worked out once for the file rather
+    than for every row.
+    """
+    plan_field_name: str
+    input_field_name: str
+    get_input_data: Callable[[PlanInputField], Any]
+    convert: Callable[[Any], Any]
+    cache: Optional[Dict[Any, Any]] = None
+
+    def convert_column(self, values: List[Any]) -> Tuple[List[Any], List[Tuple[int, Exception]]]:
+        """
+        Converts a column of values.
+
+        :param values:
+        :return: Converted values (None where conversion failed) and (index, exception) for each value which failed.
+        """
+        if self.convert is convert_pass_through:
+            return values, []
+
+        convert = self.convert if self.cache is None else self.convert_cached
+        try:
+            # Errors are rare, so try the whole column in one go, and only go value by value if there is one.
+            return [convert(value) for value in values], []
+        except (ValueError, TypeError):
+            pass
+
+        converted = []
+        failures = []
+        for index, value in enumerate(values):
+            try:
+                converted.append(convert(value))
+            except (ValueError, TypeError) as exception:
+                converted.append(None)
+                failures.append((index, exception))
+        return converted, failures
+
+    def convert_cached(self, value):
+        try:
+            return self.cache[value]
+        except KeyError:
+            converted = self.convert(value)
+            if len(self.cache) < MAX_CACHED_VALUES_PER_COLUMN:
+                self.cache[value] = converted
+            return converted
+
+
+@dataclass
+class ParseRowError:
+    """
+    A row from the plan file which couldn't be parsed, and so isn't included in the plan.
+    """
+    row_number: int  # Position of the row among the rows read from the file, starting at 1.
+    plan_field_name: str
+    input_value: Any
+    message: str
+
+    def __str__(self):
+        return f"Row {self.row_number}: can't read {self.plan_field_name} from {self.input_value!r} ({self.message})"
+
+
+def iter_chunks(rows: Iterable, chunk_size: int) -> Iterator[List]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
 class PlanParser():
     """
     Takes data from a plan which has already been read in into rows of data, with one row for each activity within the
@@ -213,51 +352,73 @@ class PlanParser():
         :param plan_data:
         """
         self.plan_field_mapping = plan_field_mapping
+        self.errors: List[ParseRowError] = []
+
+    def compile_field_mapping(self, headings: List) -> Tuple[CompiledPlanField, ...]:
+        """
+        Works out, once for the file, which input column each plan field comes from and the converter to use for it.
+
+        :param headings:
+        :return:
+        """
+        supplied_field_mapping: List[(PlanFieldEnum, PlanInputFieldSpecification)] = self.validate_input_fields(headings)
 
-    def parse(self, data: List[Dict], headings: List) -> List[Dict]:
+        compiled_fields = []
+        for plan_field, input_field in supplied_field_mapping:
+            convert = convert_dispatch_table[input_field.input_field_type.code][plan_field.value.field_type.value]
+            compiled_fields.append(CompiledPlanField(
+                plan_field_name=plan_field.value.field_name.value,
+                input_field_name=input_field.input_field_name,
+                get_input_data=attrgetter(input_field.input_field_source.value),
+                convert=convert,
+                cache={} if convert in cacheable_converters else None,
+            ))
+        return tuple(compiled_fields)
+
+    def parse(self, data: Iterable[Dict], headings: List) -> List[Dict]:
         """
         Take raw data from the plan and parse it into the correct type and value for each field required in order to
         construct the plan in the database.
 
-        :param data:
+        Rows are parsed a chunk at a time, converting each column of the chunk in one go.  Any row with a value which
+        can't be converted is left out of the plan, and recorded in self.errors.
+
+        :param data: Rows from the plan.  Can be a generator, as the rows are only read once.
         :param headings:
         :return:
         """
         # Get actual mapping of input fields to the target plan fields from input file
-        supplied_field_mapping: List[(PlanFieldEnum, PlanInputFieldSpecification)] = self.validate_input_fields(headings)
+        compiled_fields = self.compile_field_mapping(headings)
+        plan_field_names = [field.plan_field_name for field in compiled_fields]
 
+        self.errors = []
         parsed_data = []
+        first_row_number = 1
+        for chunk in iter_chunks(data, PARSE_CHUNK_SIZE):
+            columns = []
+            rejected_rows = set()
+            for field in compiled_fields:
+                get_input_data = field.get_input_data
+                input_values = [get_input_data(row[field.input_field_name]) for row in chunk]
+                converted_values, failures = field.convert_column(input_values)
+                for index, exception in failures:
+                    rejected_rows.add(index)
+                    self.errors.append(
+                        ParseRowError(first_row_number + index, field.plan_field_name, input_values[index], str(exception))
+                    )
+                columns.append(converted_values)
+
+            parsed_data.extend(
+                dict(zip(plan_field_names, row_values))
+                for index, row_values in enumerate(zip(*columns))
+                if index not in rejected_rows
+            )
+            first_row_number += len(chunk)
 
-        for plan_record in data:
-            parsed_data_record = {}
-            ignore_record = False
-
-            # We now have a definitive set of input fields mapped to the plan fields we need to store for the plan.
-            # Even so, we implement a touch of belt and braces here, checking that each field is in the received fields
-            # before processing them.
-            # ToDo: Re-visit whether need to check input field is in headings as we have already confirmed this by now.
-
-            plan_field: PlanFieldEnum
-            input_field: PlanInputFieldSpecification
-            for plan_field, input_field in supplied_field_mapping:
-                # Check whether this field is included in the mapping, and ignore field if not.
-                if input_field.input_field_name not in headings:
-                    parsed_data_record[plan_field.value.field_name] = "(n/a)"
-                else:
-                    # If we've had an error on this record then we will ignore remaining fields and not include the record
-                    # in the plan.
-                    if not ignore_record:
-                        # Should get exactly one match unless the field is optional and not included in the mapping
-                        mapped_field_column_raw_value = plan_record[input_field.input_field_name].get_input_data(input_field.input_field_source)
-                        try:
-                            field_parsed_value = convert_dispatch(input_field.input_field_type.code, plan_field.value.field_type.value, mapped_field_column_raw_value)
-                        except (ValueError, TypeError) as e:
-                            print(f"Error parsing record {plan_record}, ignoring record)")
-                            ignore_record = True
-                        else:
-                            parsed_data_record[plan_field.value.field_name.value] = field_parsed_value
-            if not ignore_record:
-                parsed_data.append(parsed_data_record)
+        if self.errors:
+            logger.warning(f"{len(self.errors)} errors parsing plan, rows with errors have been ignored")
+            for error in self.errors:
+                logger.debug(f"{error}")
 
         return parsed_data
 
@@ -311,6 +472,7 @@ class PlanFileReader(ABC):
 
     def __init__(self):
         self.parser = PlanParser
+        self.parse_errors: List[ParseRowError] = []
 
         self.pre_processing()
         self.post_processing()
@@ -332,6 +494,26 @@ class PlanFileReader(ABC):
         """
         pass
 
+    def iter_rows(self, plan: Plan) -> (Iterator[Dict], List):
+        """
+        Override where the format can be read one record at a time, to avoid holding the whole file in memory.
+
+        :param plan:
+        :return: Iterator of records and list of heading names of input file
+        """
+        records, headings = self.read(plan)
+        return iter(records), headings
+
+    def parse(self, raw_data, raw_data_headers, plan_field_mapping):
+        """
+        Parses the rows read from the file.  Rows which couldn't be parsed are left out, and are listed in
+        self.parse_errors afterwards.
+        """
+        parser = self.parser(plan_field_mapping=plan_field_mapping)
+        parsed_data = parser.parse(raw_data, raw_data_headers)
+        self.parse_errors = parser.errors
+        return parsed_data
+
     def post_processing(self):
         pass
 
@@ -395,73 +577,226 @@ class ExcelXLSFileReader(PlanFileReader):
         - Each row represents one activity.
         :return:
         """
+        rows, headings = self.iter_rows(plan)
+        return list(rows), headings
+
+    def iter_rows(self, plan: Plan) -> (Iterator[Dict], List):
+        """
+        Streams the activities from the Excel file one row at a time, so that the whole sheet never needs to be held in
+        memory.  The workbook is opened in read-only mode, which reads the sheet xml as rows are requested rather than
+        loading every cell up front.
+
+        Key features:
+        - The first row holds the headings, up to the first blank heading.
+        - Each row after that represents one activity.  Blank rows are skipped.
+        - Reading stops at the last row in the sheet.
+
+        :param plan:
+        :return: Iterator yielding a dictionary of heading -> PlanInputField for each activity, and list of headings.
+        """
         skip_rows = 0
 
-        wb_obj = openpyxl.load_workbook(plan.file.file, data_only=True)
-        name = Path(plan.file_name).stem
+        wb_obj = openpyxl.load_workbook(plan.file.file, read_only=True, data_only=True)
+        try:
+            name = Path(plan.file_name).stem
 
-        sheet_name = self.get_sheet_name(wb_obj.sheetnames, name, plan.file_type_name)
-        sheet = wb_obj[sheet_name]
-        start_row = 1 + skip_rows
+            sheet_name = self.get_sheet_name(wb_obj.sheetnames, name, plan.file_type_name)
+            sheet = wb_obj[sheet_name]
 
-        headings = self.get_headers(sheet, start_row)
-        table = {heading: [] for heading in headings}
+            # The dimensions recorded in the file aren't always right (depends on what created the file) so ignore them
+            # and read up to the last row which is actually in the sheet.
+            sheet.reset_dimensions()
+            start_row = 1 + skip_rows
 
-        num_blank_rows = 0
-        max_blank_rows = 100
-        read_row_num = start_row
-        while num_blank_rows <= max_blank_rows:
-            row_confirmed = self.read_row(read_row_num, sheet, headings, table)
-            if not row_confirmed:
-                num_blank_rows += 1
-            read_row_num += 1
+            headings = self.get_headers(sheet, start_row)
+        except Exception:
+            wb_obj.close()
+            raise
 
-        iterable_by_row = self.iterrows(table)
-        return iterable_by_row, headings
+        return self._generate_rows(wb_obj, sheet, start_row + 1, headings), headings
 
-    def parse(self, raw_data, raw_data_headers, plan_field_mapping):
-        parser = self.parser(plan_field_mapping=plan_field_mapping)
-        return parser.parse(raw_data, raw_data_headers)
+    @staticmethod
+    def _generate_rows(wb_obj, sheet, first_row: int, headings: List) -> Iterator[Dict]:
+        try:
+            if len(headings) == 0:
+                return
+            # Cells past the end of a short row are returned as empty cells so each row has a cell for every heading.
+            for row in sheet.iter_rows(min_row=first_row, max_col=len(headings), values_only=False):
+                if all(cell.value is None for cell in row):
+                    continue
+
+                # Capture both value and indent level as either could be needed in parsing.
+                yield {
+                    heading: PlanInputField(value=cell.value, indent=ExcelXLSFileReader.get_indent(cell))
+                    for heading, cell in zip(headings, row)
+                }
+        finally:
+            # Read only workbooks keep the file open until closed.
+            wb_obj.close()
 
     @staticmethod
-    def read_row(table_row_num, sheet, headings, table, skiprows=0):
-        maybe_row = {}
-        row_confirmed = False
-        for col, heading in enumerate(headings):
-            cell = sheet.cell(table_row_num + skiprows + 1, col + 1)
-
-            # Now capture both value and indent level as either could be needed in parsing.
-            cell_value = cell.value
-            cell_indent = cell.alignment.indent
-
-            maybe_row[heading] = PlanInputField(
-                value=cell_value,
-                indent=cell_indent
-            )
-            if cell_value is not None:
-                row_confirmed = True
-        if row_confirmed:
-            for heading in headings:
-                table[heading].append(maybe_row[heading])
-        return row_confirmed
+    def get_indent(cell) -> float:
+        """
+        Cells missing from the sheet xml are returned as empty cells without any style, so treat them as not indented.
+        """
+        alignment = cell.alignment
+        return alignment.indent if alignment is not None else 0.0
 
     @staticmethod
     def get_headers(sheet, start_row):
-        headings = []  # Need to store headings in column order so list not dict
-        blank = False
-        row = start_row
-        column = 1
-        while not blank:
-            maybe_heading = sheet.cell(row, column).value
-            if maybe_heading is not None:
+        """
+        Headings are held in column order (so list not dict), up to the first blank heading.
+        """
+        headings = []
+        for row in sheet.iter_rows(min_row=start_row, max_row=start_row, values_only=True):
+            for maybe_heading in row:
+                if maybe_heading is None:
+                    break
                 headings.append(maybe_heading)
-                column += 1
-            else:
-                blank = True
         return headings
 
+
+class CSVPlanFileReader(PlanFileReader):
+    """
+    Reads a plan from a CSV file, where the first row holds the headings and each row after that is one activity.
+
+    The file is read one row at a time.  All values are read as strings, with empty values treated as missing (None)
+    in the same way as empty cells in a spreadsheet.
+    """
+    encoding = "utf-8-sig"  # Allows for the byte order mark which Excel adds when saving as CSV.
+
+    def read(self, plan: Plan) -> (List[Dict], List):
+        rows, headings = self.iter_rows(plan)
+        return list(rows), headings
+
+    def iter_rows(self, plan: Plan) -> (Iterator[Dict], List):
+        """
+        :param plan:
+        :return: Iterator yielding a dictionary of heading -> PlanInputField for each activity, and list of headings.
+        """
+        plan.file.open("rb")
+        text_file = io.TextIOWrapper(plan.file.file, encoding=self.encoding, newline="")
+        try:
+            reader = csv.reader(text_file)
+            headings = self.get_headers(next(reader, []))
+        except (UnicodeDecodeError, csv.Error) as exception:
+            text_file.detach()
+            plan.file.close()
+            raise PlanParseError(f"Unable to read CSV file {plan.file_name}: {exception}")
+
+        return self._generate_rows(plan, text_file, reader, headings), headings
+
     @staticmethod
-    def iterrows(excel_table):
-        # Work out num rows by checking any of the column arrays
-        num_rows = len(next(iter(excel_table.values())))
-        return [{heading: excel_table[heading][row] for heading in excel_table} for row in range(num_rows)]
+    def get_headers(heading_row: List[str]) -> List[str]:
+        """
+        Headings are held in column order, up to the first blank heading.
+        """
+        headings = []
+        for maybe_heading in heading_row:
+            maybe_heading = maybe_heading.strip()
+            if maybe_heading == "":
+                break
+            headings.append(maybe_heading)
+        return headings
+
+    @staticmethod
+    def _generate_rows(plan: Plan, text_file, reader, headings: List) -> Iterator[Dict]:
+        try:
+            if len(headings) == 0:
+                return
+            for row in reader:
+                values = [value if value != "" else None for value in row[:len(headings)]]
+                if all(value is None for value in values):
+                    continue
+
+                # Short rows are padded so each row has a value for every heading.
+                values.extend([None] * (len(headings) - len(values)))
+                yield {heading: PlanInputField(value=value, indent=0.0) for heading, value in zip(headings, values)}
+        except (UnicodeDecodeError, csv.Error) as exception:
+            raise PlanParseError(f"Unable to read CSV file {plan.file_name}: {exception}")
+        finally:
+            # Leave the underlying file for the plan to close.
+            text_file.detach()
+            plan.file.close()
+
+
+class MSProjectXMLFileReader(PlanFileReader):
+    """
+    Reads a plan from a native MS Project XML file.
+
+    MS Project XML files can be very large (every task, resource, assignment and often timephased data), so rather
+    than loading the whole document the Task elements are streamed with lxml's iterparse, and each one is cleared once
+    it has been read so memory use stays flat however many tasks there are.  Reading stops at the end of the Tasks
+    element, as nothing after it (resources, assignments) is needed.
+
+    Each Task becomes one activity, with a field for each of the child elements listed in task_fields (nested elements
+    such as baselines and extended attributes are ignored).  The task with outline level 0 is the project summary task
+    which MS Project adds for the whole project, so it is left out, as are blank (null) tasks.
+    """
+    task_fields = [
+        "UID", "ID", "Name", "Duration", "Start", "Finish", "OutlineLevel", "OutlineNumber", "Milestone", "Summary"
+    ]
+
+    def read(self, plan: Plan) -> (List[Dict], List):
+        rows, headings = self.iter_rows(plan)
+        return list(rows), headings
+
+    def iter_rows(self, plan: Plan) -> (Iterator[Dict], List):
+        """
+        :param plan:
+        :return: Iterator yielding a dictionary of field name -> PlanInputField for each task, and list of field names.
+        """
+        headings = list(self.task_fields)
+        return self._generate_rows(plan, headings), headings
+
+    @staticmethod
+    def _local_name(tag: str) -> str:
+        # Files saved by MS Project put everything in the http://schemas.microsoft.com/project namespace.
+        return tag.rpartition("}")[2]
+
+    def _generate_rows(self, plan: Plan, headings: List) -> Iterator[Dict]:
+        wanted_fields = frozenset(headings) | {"IsNull"}
+        plan.file.open("rb")
+        try:
+            # Entities aren't expanded, as the file has been uploaded by a user.
+            tasks = etree.iterparse(
+                plan.file.file, events=("end",), tag=("{*}Task", "{*}Tasks"), resolve_entities=False, no_network=True
+            )
+            for _, element in tasks:
+                if self._local_name(element.tag) == "Tasks":
+                    break
+
+                task = {
+                    self._local_name(child.tag): child.text for child in element
+                    if isinstance(child.tag, str) and self._local_name(child.tag) in wanted_fields
+                }
+
+                # Done with this task, so free it along with any earlier siblings still held by the parent.
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+                if task.get("IsNull") == "1" or task.get("OutlineLevel") == "0":
+                    continue
+                yield {heading: PlanInputField(value=task.get(heading), indent=0.0) for heading in headings}
+        except etree.XMLSyntaxError as exception:
+            raise PlanParseError(f"Unable to read MS Project XML file {plan.file_name}: {exception}")
+        finally:
+            plan.file.close()
+
+
+# Reader for each supported file type.
+file_readers = {
+    FileType.EXCEL_MSP_EXPORT_DEFAULT: ExcelXLSFileReader,
+    FileType.SMARTSHEET_EXPORT_01: ExcelXLSFileReader,
+    FileType.CSV_PLAN_01: CSVPlanFileReader,
+    FileType.MSP_XML_01: MSProjectXMLFileReader,
+}
+
+
+def get_file_reader(file_type: FileType) -> PlanFileReader:
+    """
+    :param file_type:
+    :return: New reader for files of the given type.
+    """
+    return file_readers[file_type]()
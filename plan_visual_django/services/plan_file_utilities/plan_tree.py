@@ -1,7 +1,58 @@
-from anytree import Node, findall, RenderTree
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from anytree import Node, RenderTree
 from plan_visual_django.models import Plan, PlanActivity
 
 
+class InvalidPlanHierarchy(Exception):
+    def __init__(self, index: int, level: int):
+        super().__init__(f"Invalid level {level} for activity at position {index} in the plan")
+        self.index = index
+        self.level = level
+
+
+def calculate_hierarchy(levels: Sequence[int]) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Works out the hierarchy of a plan from the level of each activity in sequence order (see PlanTree for the rules).
+
+    :param levels: Level of each activity in sequence order.
+    :return: For each activity, the index of its parent (-1 for a top level activity), its depth (1 for a top level
+             activity) and the index just after the last activity in its subtree.
+    """
+    parents: List[int] = []
+    depths: List[int] = []
+    subtree_ends: List[int] = []
+
+    # Activities whose subtree may still have more activities added, from the top down, and the level of each one.
+    open_activities: List[int] = []
+    open_levels: List[int] = []
+    top_level = None
+
+    for index, level in enumerate(levels):
+        if top_level is None:
+            top_level = level
+        if level > (open_levels[-1] if open_levels else top_level - 1) + 1 or level < top_level:
+            raise InvalidPlanHierarchy(index, level)
+
+        # Close every open activity at the same level or below, as this activity is after the end of their subtrees.
+        while open_levels and open_levels[-1] >= level:
+            subtree_ends[open_activities.pop()] = index
+            open_levels.pop()
+
+        parent = open_activities[-1] if open_activities else -1
+        parents.append(parent)
+        depths.append(depths[parent] + 1 if parent >= 0 else 1)
+        subtree_ends.append(index + 1)
+
+        open_activities.append(index)
+        open_levels.append(level)
+
+    for index in open_activities:
+        subtree_ends[index] = len(levels)
+
+    return parents, depths, subtree_ends
+
+
 class PlanActivityTreeNode(Node):
     def __init__(self, name, id:str=None, activity:PlanActivity=None, **kwargs):
         super().__init__(name, **kwargs)
@@ -22,17 +73,44 @@ class PlanTree:
         current one.
       - If the level of the next activity goes down by one or more, it is a sibling of the most recent activity at the
         same level.
+
+    The tree is held as flat arrays indexed by position in the plan, with the root at index 0 and each activity at its
+    position in sequence order plus one:
+    - parent, depth, first child and next sibling of each node (-1 where there isn't one).
+    - Euler tour enter and exit indices.  As activities are in sequence order the plan is already a pre-order walk of
+      the tree, so a node is entered at its own index and the subtree of a node is the contiguous range
+      [enter, exit) - descendants and subtree queries are just slices.
+    - A dict from unique_sticky_activity_id to index so that looking up an activity by id doesn't search the tree.
+
+    An anytree view of the tree (PlanActivityTreeNode objects) is also available for code which walks nodes, such as
+    the auto-layout algorithm.  It is only built the first time it is asked for.
     """
+    ROOT_ID = "ROOT"
+
     # Helper to avoid repeated code in accessing either node or activity in getter type functions
     accesor = lambda node, return_as_nodes: node if return_as_nodes else node.activity
 
-    def __init__(self, plan: Plan):
+    def __init__(self, plan: Optional[Plan], activities: Optional[Iterable[PlanActivity]] = None):
+        """
+        :param plan:
+        :param activities: Activities in sequence order, if already read (otherwise they are read from the plan).
+        """
         self.plan: Plan = plan
-        self._parse_plan_to_tree()
+        self.root = None
+        self._nodes: Optional[List[PlanActivityTreeNode]] = None
+        self._node_view_lock = threading.Lock()  # Trees can be shared between threads (see plan_tree_cache.py)
+        self._parse_plan_to_tree(activities)
+
+    @classmethod
+    def from_activities(cls, activities: Iterable[PlanActivity]):
+        """
+        Builds a tree from activities which aren't necessarily saved in the database (for example to benchmark).
+        """
+        return cls(plan=None, activities=activities)
 
     def get_root(self):
         if self.root is None:
-            self._parse_plan_to_tree()
+            self._build_node_view()
         return self.root
 
     def get_activity_list(self):
@@ -50,16 +128,11 @@ class PlanTree:
         return self._get_activity_list(return_as_nodes=True)
 
     def get_plan_tree_activity_by_unique_id(self, unique_id: str):
-        if self.root is None:
-            self._parse_plan_to_tree()
-        matching_node = self._get_node_for_id(unique_id)
-        return matching_node.activity
+        index = self._get_index_for_id(unique_id)
+        return None if index is None else self.activities[index]
 
     def get_plan_tree_node_by_unique_id(self, unique_id: str):
-        if self.root is None:
-            self._parse_plan_to_tree()
-        matching_node = self._get_node_for_id(unique_id)
-        return matching_node
+        return self._get_node_for_id(unique_id)
 
     def get_plan_tree_child_activities_by_unique_id(self, unique_id: str):
         return self._get_children_by_unique_id(unique_id)
@@ -70,6 +143,39 @@ class PlanTree:
     def get_plan_tree_nodes_by_unique_id(self, unique_id: str):
         return self._get_children_by_unique_id(unique_id, return_as_nodes=True)
 
+    def get_plan_tree_descendant_activities_by_unique_id(self, unique_id: str) -> List[PlanActivity]:
+        """
+        All activities below the given one (not including it), in sequence order.
+        """
+        enter, exit_ = self._get_subtree_range(unique_id)
+        return self.activities[enter + 1:exit_]
+
+    def get_plan_tree_subtree_activities_by_unique_id(self, unique_id: str) -> List[PlanActivity]:
+        """
+        The given activity followed by all the activities below it, in sequence order.
+        """
+        enter, exit_ = self._get_subtree_range(unique_id)
+        return self.activities[max(enter, 1):exit_]
+
+    def get_plan_tree_parent_activity_by_unique_id(self, unique_id: str) -> Optional[PlanActivity]:
+        """
+        :return: Parent activity, or None for a top level activity.
+        """
+        parent = self.parent[self._get_index_for_id(unique_id, must_exist=True)]
+        return self.activities[parent] if parent > 0 else None
+
+    def get_plan_tree_depth_by_unique_id(self, unique_id: str):
+        return self.depth[self._get_index_for_id(unique_id, must_exist=True)]
+
+    def is_leaf_by_unique_id(self, unique_id: str) -> bool:
+        return self.first_child[self._get_index_for_id(unique_id, must_exist=True)] == -1
+
+    def get_subtree_range(self, unique_id: str) -> (int, int):
+        """
+        :return: Euler tour (enter, exit) indices for the activity, so that the subtree is activities[enter:exit].
+        """
+        return self._get_subtree_range(unique_id)
+
     def _get_activity_list(self, return_as_nodes: bool = False):
         """
         Get list of all activities in the tree but return either as activity records or nodes.
@@ -77,85 +183,129 @@ class PlanTree:
         :param return_as_nodes:
         :return:
         """
-        if self.root is None:
-            self._parse_plan_to_tree()
+        if return_as_nodes:
+            if self._nodes is None:
+                self._build_node_view()
+            return self._nodes[1:]
 
-        return [PlanTree.accesor(activity_node, return_as_nodes) for activity_node in self.root.descendants]
-
-    def _get_node_by_unique_id(self, unique_id, return_as_nodes: bool = False):
-        if self.root is None:
-            self._parse_plan_to_tree()
-
-        matching_node = self._get_node_for_id(unique_id)
-        return PlanTree.accesor(matching_node, return_as_nodes)
+        return self.activities[1:]
 
     def _get_children_by_unique_id(self, unique_id, return_as_nodes: bool = False):
-        if self.root is None:
-            self._parse_plan_to_tree()
-        matching_node = self._get_node_for_id(unique_id)
-        accesor = lambda node: node.activity if return_as_nodes else node
-        activity_children = [PlanTree.accesor(node, return_as_nodes) for node in matching_node.children]
+        child = self.first_child[self._get_index_for_id(unique_id, must_exist=True)]
+        children = []
+        while child != -1:
+            children.append(child)
+            child = self.next_sibling[child]
 
-        return activity_children
+        if return_as_nodes:
+            if self._nodes is None:
+                self._build_node_view()
+            return [self._nodes[index] for index in children]
+        return [self.activities[index] for index in children]
+
+    def _get_subtree_range(self, unique_id: str) -> (int, int):
+        index = self._get_index_for_id(unique_id, must_exist=True)
+        return self.enter[index], self.exit[index]
 
     def print_plan_tree(self):
-        for pre, _, node in RenderTree(self.root):
+        for pre, _, node in RenderTree(self.get_root()):
             print("%s%s" % (pre, node.name))
 
-    def _parse_plan_to_tree(self):
-        plan_activities = self.plan.planactivity_set.all()
-
-        root = Node(name="ROOT", id="ROOT")
-        current_node = root
-        current_level = None
-
-        for index, activity in enumerate(plan_activities, start=1):
-            next_level = activity.level
-            if index == 1:
-                # Need to carry out some initialisation so that the logic works on the first element
-                current_level = activity.level - 1
-            # Work out which case this is and add to tree structure accordingly
-            if next_level == current_level + 1:
-                # This is a child activity, so add as sub-node
-                activity_node = self._create_activity_node(parent=current_node, activity=activity)
-            elif next_level == current_level:
-                # This is a sibling so add to same parent
-                activity_node = self._create_activity_node(parent=current_node.parent, activity=activity)
-            elif next_level < current_level:
-                # This activity is the sibling of an activity at a lower level
-                # We have to find the parent at the right level to attach this sibling to
-                num_levels = current_level - next_level + 1
-                parent_node = current_node
-                for level in range(num_levels):
-                    parent_node = parent_node.parent
-                activity_node = self._create_activity_node(parent=parent_node, activity=activity)
-            else:
+    def _parse_plan_to_tree(self, activities: Optional[Iterable[PlanActivity]] = None):
+        if activities is None:
+            activities = self.plan.planactivity_set.all()
+        activities = list(activities)
+
+        # Use the hierarchy stored against the activities when the plan was imported if it's there, otherwise work it
+        # out from the levels.
+        if activities and all(activity.depth is not None for activity in activities):
+            parents, depths, subtree_ends = self._get_stored_hierarchy(activities)
+        else:
+            try:
+                parents, depths, subtree_ends = calculate_hierarchy([activity.level for activity in activities])
+            except InvalidPlanHierarchy as error:
+                activity = activities[error.index]
                 raise Exception(f"Invalid level for activity {activity.activity_name:<20} at level {activity.level} ")
 
-            current_level = next_level
-            current_node = activity_node
-        self.root = root
+        # Index 0 is the root, so arrays hold one entry more than the number of activities.
+        num_nodes = len(activities) + 1
+        self.activities: List[Optional[PlanActivity]] = [None] + activities
+        self.parent: List[int] = [-1] + [parent + 1 for parent in parents]
+        self.depth: List[int] = [0] + depths
+        self.enter: List[int] = list(range(num_nodes))
+        self.exit: List[int] = [num_nodes] + [subtree_end + 1 for subtree_end in subtree_ends]
+        self.first_child: List[int] = [-1] * num_nodes
+        self.next_sibling: List[int] = [-1] * num_nodes
 
-    def get_plan_tree_depth_by_unique_id(self, unique_id: str):
-        if self.root is None:
-            self._parse_plan_to_tree()
+        # Going through in sequence order finds the children of each node in order, so keep the last child found for
+        # each node to link up the next one.
+        last_child: Dict[int, int] = {}
+        for index in range(1, num_nodes):
+            parent = self.parent[index]
+            previous_sibling = last_child.get(parent)
+            if previous_sibling is None:
+                self.first_child[parent] = index
+            else:
+                self.next_sibling[previous_sibling] = index
+            last_child[parent] = index
+
+        self.index_by_id: Dict[str, int] = {self.ROOT_ID: 0}
+        self._duplicate_ids = set()
+        for index in range(1, num_nodes):
+            unique_id = self.activities[index].unique_sticky_activity_id
+            if unique_id in self.index_by_id:
+                self._duplicate_ids.add(unique_id)
+            else:
+                self.index_by_id[unique_id] = index
+
+    @staticmethod
+    def _get_stored_hierarchy(activities: List[PlanActivity]) -> Tuple[List[int], List[int], List[int]]:
+        """
+        Hierarchy from the columns stored against each activity, in the same form as calculate_hierarchy().
+        """
+        index_by_id = {}
+        index_by_sequence = {}
+        for index, activity in enumerate(activities):
+            index_by_id.setdefault(activity.unique_sticky_activity_id, index)
+            index_by_sequence[activity.sequence_number] = index
 
-        matching_node = self._get_node_for_id(unique_id)
-        return matching_node.depth
+        parents = [index_by_id[activity.parent_unique_id] if activity.parent_unique_id else -1 for activity in activities]
+        depths = [activity.depth for activity in activities]
+        subtree_ends = [index_by_sequence.get(activity.subtree_end_sequence, len(activities)) for activity in activities]
+        return parents, depths, subtree_ends
 
+    def _build_node_view(self):
+        """
+        Creates an anytree node for every activity, linked up in the same way as the arrays.
+        """
+        with self._node_view_lock:
+            if self._nodes is not None:
+                return
+            root = Node(name="ROOT", id=self.ROOT_ID)
+            nodes = [root]
+            for index in range(1, len(self.activities)):
+                nodes.append(self._create_activity_node(activity=self.activities[index], parent=nodes[self.parent[index]]))
+            self.root = root
+            self._nodes = nodes
 
     def _create_activity_node(self, activity, parent):
         activity_node = PlanActivityTreeNode(name=activity.activity_name, parent=parent, id=activity.unique_sticky_activity_id, activity=activity)
         return activity_node
 
-    def _get_node_for_id(self, unique_id: str):
+    def _get_index_for_id(self, unique_id: str, must_exist: bool = False) -> Optional[int]:
         """
-        Should only be one node for a given id, so find matching nodes and check that there is zero or one.
+        Should only be one activity for a given id, so check that the id isn't duplicated in the plan.
         """
-        matches = findall(self.root, filter_=lambda n: n.id == unique_id)
-        if len(matches) == 1:
-            return matches[0]
-        elif len(matches) == 0:
-            return None
-        else:
+        if unique_id in self._duplicate_ids:
             raise ValueError(f"More than one match found for unique id {unique_id} in plan")
+        if must_exist:
+            return self.index_by_id[unique_id]
+        return self.index_by_id.get(unique_id)
+
+    def _get_node_for_id(self, unique_id: str):
+        index = self._get_index_for_id(unique_id)
+        if index is None:
+            return None
+        if self._nodes is None:
+            self._build_node_view()
+        return self._nodes[index]
@@ -0,0 +1,150 @@
+"""
+In-process cache of built PlanTree objects.
+
+Building a plan tree means reading every activity of the plan and linking them up, and it was being done afresh for
+every request which needed the hierarchy, including each edit of a single activity in a visual.  Trees are now kept
+between requests, keyed by the id and revision of the plan.  The revision of a plan is incremented whenever a plan file
+is imported for it (see apply_plan_changes()), so a re-imported plan automatically gets a new tree, and old trees are
+eventually evicted.
+
+Activities which are saved or deleted one at a time through the ORM (e.g. through the admin) don't change the revision,
+but the signal handlers for PlanActivity remove any tree for the plan from the cache in this process (see
+plan_visual_django/signals.py).
+
+The cache is least recently used, limited both by the number of plans and by the total number of activities across the
+trees held (as a measure of memory used), configured by:
+- PLAN_TREE_CACHE_MAX_PLANS: Maximum number of trees held.  0 turns the cache off.
+- PLAN_TREE_CACHE_MAX_ACTIVITIES: Maximum number of activities across all trees held.  A plan with more activities
+  than this is never cached.
+
+NOTE: Trees are shared between requests (and threads), so must be treated as read only by callers.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from django.conf import settings
+
+from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree
+
+
+class PlanTreeCache:
+    """
+    Least recently used cache of PlanTree objects keyed by (plan id, plan revision).
+    """
+    def __init__(self):
+        self._trees: "OrderedDict[Tuple[int, int], PlanTree]" = OrderedDict()
+        self._num_activities = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def get_limits() -> Tuple[int, int]:
+        """
+        Read each time so that limits can be changed with override_settings.
+
+        :return: Maximum number of plans and maximum number of activities.
+        """
+        return settings.PLAN_TREE_CACHE_MAX_PLANS, settings.PLAN_TREE_CACHE_MAX_ACTIVITIES
+
+    def get(self, plan) -> PlanTree:
+        """
+        Returns the tree for the plan at its current revision, building it if it isn't already in the cache.
+
+        :param plan: Plan.  The revision used is the one on the instance, so it should have been read from the
+                     database for this request.
+        :return:
+        """
+        key = (plan.id, plan.revision)
+        with self._lock:
+            plan_tree = self._trees.get(key)
+            if plan_tree is not None:
+                self._trees.move_to_end(key)
+                self.hits += 1
+                return plan_tree
+            self.misses += 1
+
+        # Build outside the lock so that requests for other plans aren't held up.  If two requests build the same tree
+        # at the same time, the second one just replaces the first.
+        plan_tree = PlanTree(plan)
+        self.put(key, plan_tree)
+        return plan_tree
+
+    def put(self, key: Tuple[int, int], plan_tree: PlanTree):
+        max_plans, max_activities = self.get_limits()
+        size = len(plan_tree.get_activity_list())
+        if max_plans <= 0 or size > max_activities:
+            return
+
+        with self._lock:
+            previous = self._trees.pop(key, None)
+            if previous is not None:
+                self._num_activities -= len(previous.get_activity_list())
+
+            # Any older revision of the same plan won't be asked for again.
+            for stale_key in [cached_key for cached_key in self._trees if cached_key[0] == key[0]]:
+                self._remove(stale_key)
+
+            while self._trees and (len(self._trees) >= max_plans or self._num_activities + size > max_activities):
+                self._remove(next(iter(self._trees)))
+
+            self._trees[key] = plan_tree
+            self._num_activities += size
+
+    def invalidate(self, plan_id: int):
+        """
+        Removes any trees for the given plan.
+        """
+        with self._lock:
+            for key in [cached_key for cached_key in self._trees if cached_key[0] == plan_id]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+            self._num_activities = 0
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total > 0 else None,
+                "evictions": self.evictions,
+                "plans": len(self._trees),
+                "activities": self._num_activities,
+            }
+
+    def _remove(self, key: Tuple[int, int]):
+        """
+        Must be called with the lock held.
+        """
+        plan_tree = self._trees.pop(key)
+        self._num_activities -= len(plan_tree.get_activity_list())
+        self.evictions += 1
+
+
+# One cache for the process.
+plan_tree_cache = PlanTreeCache()
+
+
+def get_plan_tree(plan) -> PlanTree:
+    return plan_tree_cache.get(plan)
+
+
+def invalidate_plan_tree(plan_id: int):
+    plan_tree_cache.invalidate(plan_id)
+
+
+def get_plan_tree_cache_stats() -> Dict[str, Any]:
+    """
+    Hit and miss counts, and the number of plans and activities currently held, for this process.
+    """
+    return plan_tree_cache.get_stats()
@@ -0,0 +1,229 @@
+"""
+Generates synthetic plans of any size for measuring how the app scales, and writes them in each supported file type
+so that they can be imported in exactly the same way as a real plan.
+
+A synthetic plan is a list of activities in plan order with a well formed hierarchy:
+- The first activity is at level 1, and each activity is at most one level below the one before it (as PlanTree
+  expects).
+- Summary activities (those with children) span their children.
+- Milestones are only ever leaf activities, with the same start and end date.
+
+Generation is driven by a seeded random number generator, so the same options always give the same plan.
+"""
+import csv
+import io
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import openpyxl
+from openpyxl.styles import Alignment
+
+from plan_visual_django.services.plan_file_utilities.plan_field import FileType
+from plan_visual_django.services.plan_file_utilities.plan_reader import HOURS_PER_WORKING_DAY
+
+
+@dataclass
+class SyntheticActivity:
+    sticky_id: str
+    name: str
+    level: int
+    start_date: date
+    end_date: date
+    milestone_flag: bool = False
+
+    @property
+    def duration(self) -> int:
+        """
+        Duration in days as it appears in exported files, zero for a milestone.
+        """
+        return 0 if self.milestone_flag else (self.end_date - self.start_date).days + 1
+
+
+def generate_synthetic_plan(
+        num_activities: int,
+        max_depth: int = 4,
+        milestone_ratio: float = 0.1,
+        date_spread_days: int = 730,
+        start_date: date = date(2024, 1, 1),
+        seed: int = 0,
+        children_per_parent: Optional[int] = None
+) -> List[SyntheticActivity]:
+    """
+    :param num_activities:
+    :param max_depth: Deepest level of the hierarchy (1 gives a flat plan).
+    :param milestone_ratio: Proportion of leaf activities which are milestones.
+    :param date_spread_days: All activities fall between start_date and this many days later.
+    :param start_date:
+    :param seed: Seed for the random number generator.
+    :param children_per_parent: If given, every activity above max_depth has exactly this many children (the last
+                                one may have fewer) rather than the hierarchy being random, e.g. to make wide plans.
+    :return: Activities in plan order.
+    """
+    generator = random.Random(seed)
+
+    # Work out the shape of the hierarchy first.  Each level is picked from one below the previous activity up to the
+    # top, weighted towards staying around the middle of the hierarchy.
+    if children_per_parent:
+        levels = regular_levels(num_activities, max_depth, children_per_parent)
+    else:
+        levels = []
+        level = 0
+        for _ in range(num_activities):
+            deepest = min(level + 1, max_depth)
+            level = generator.choices(range(1, deepest + 1), weights=range(1, deepest + 1))[0]
+            levels.append(level)
+
+    activities = []
+    for index, level in enumerate(levels):
+        activities.append(SyntheticActivity(
+            sticky_id=f"SYN-{index + 1:06}",
+            name=f"Activity {index + 1} (level {level})",
+            level=level,
+            start_date=start_date,
+            end_date=start_date,
+        ))
+
+    # Leaves get their own dates, then summary activities are worked out from their children, bottom up.
+    last_day = max(date_spread_days, 1)
+    for index, activity in enumerate(activities):
+        is_leaf = index + 1 == len(activities) or levels[index + 1] <= activity.level
+        if not is_leaf:
+            continue
+        offset = generator.randrange(last_day)
+        if generator.random() < milestone_ratio:
+            activity.milestone_flag = True
+            activity.start_date = activity.end_date = start_date + timedelta(days=offset)
+        else:
+            length = generator.randint(1, max(min(60, last_day - offset), 1))
+            activity.start_date = start_date + timedelta(days=offset)
+            activity.end_date = activity.start_date + timedelta(days=length - 1)
+
+    # Working backwards, the activities at each level since the last activity one level up are the children of the
+    # next activity found one level up.
+    children_span: Dict[int, List[date]] = {}  # Level -> [earliest start, latest end] of activities at that level
+    for activity in reversed(activities):
+        span = children_span.pop(activity.level + 1, None)
+        if span is not None:
+            activity.start_date, activity.end_date = span
+        sibling_span = children_span.setdefault(activity.level, [activity.start_date, activity.end_date])
+        sibling_span[0] = min(sibling_span[0], activity.start_date)
+        sibling_span[1] = max(sibling_span[1], activity.end_date)
+
+    return activities
+
+
+def regular_levels(num_activities: int, max_depth: int, children_per_parent: int) -> List[int]:
+    """
+    Levels in plan order of a hierarchy where every activity above max_depth has children_per_parent children.
+    """
+    levels = []
+
+    def add_subtree(level):
+        levels.append(level)
+        if level < max_depth:
+            for _ in range(children_per_parent):
+                if len(levels) >= num_activities:
+                    return
+                add_subtree(level + 1)
+
+    while len(levels) < num_activities:
+        add_subtree(1)
+    return levels
+
+
+def create_msp_excel_export(activities: List[SyntheticActivity]) -> bytes:
+    """
+    Laid out like an MS Project export to Excel (excel-01-msp-export-default-01), with plan data on the Task_Data sheet.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    workbook.create_sheet("Summary")
+    sheet = workbook.create_sheet("Task_Data")
+    sheet.append(["ID", "Name", "Duration", "Start_Date", "Finish_Date", "Outline_Level", "Milestone"])
+    for activity in activities:
+        sheet.append([
+            activity.sticky_id, activity.name, f"{activity.duration} days",
+            datetime.combine(activity.start_date, time(8)).strftime("%d %B %Y %H:%M"),
+            datetime.combine(activity.end_date, time(17)).strftime("%d %B %Y %H:%M"),
+            activity.level, "Yes" if activity.milestone_flag else "No",
+        ])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def create_smartsheet_export(activities: List[SyntheticActivity]) -> bytes:
+    """
+    Laid out like a Smartsheet export to Excel (excel-02-smartsheet-export-01), where the level of each activity is
+    held as the indent of the task name, starting from no indent for the top level.
+    """
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Id", "Task Name", "Duration", "Start", "Finish"])
+    alignments = {}
+    for row_number, activity in enumerate(activities, start=2):
+        sheet.append([
+            activity.sticky_id, activity.name, f"{activity.duration}d",
+            datetime.combine(activity.start_date, time()), datetime.combine(activity.end_date, time()),
+        ])
+        indent = activity.level - 1
+        if indent not in alignments:
+            alignments[indent] = Alignment(indent=indent)
+        sheet.cell(row_number, 2).alignment = alignments[indent]
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def create_csv(activities: List[SyntheticActivity]) -> bytes:
+    """
+    CSV file as read by CSVPlanFileReader (csv-01-plan-01).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["ID", "Name", "Duration", "Start", "Finish", "Level"])
+    for activity in activities:
+        writer.writerow([
+            activity.sticky_id, activity.name, activity.duration, activity.start_date.isoformat(),
+            activity.end_date.isoformat(), activity.level
+        ])
+    return buffer.getvalue().encode()
+
+
+def create_msp_xml(activities: List[SyntheticActivity]) -> bytes:
+    """
+    MS Project XML file (msp-xml-01), with the sticky id of each activity as the task UID.
+    """
+    tasks = [
+        f"<Task><UID>{escape(activity.sticky_id)}</UID><ID>{index}</ID><Name>{escape(activity.name)}</Name>"
+        f"<Duration>PT{activity.duration * HOURS_PER_WORKING_DAY}H0M0S</Duration>"
+        f"<Start>{datetime.combine(activity.start_date, time(8)).isoformat()}</Start>"
+        f"<Finish>{datetime.combine(activity.end_date, time(17)).isoformat()}</Finish>"
+        f"<OutlineLevel>{activity.level}</OutlineLevel><Milestone>{int(activity.milestone_flag)}</Milestone></Task>"
+        for index, activity in enumerate(activities, start=1)
+    ]
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Project xmlns="http://schemas.microsoft.com/project"><Tasks>' + "".join(tasks) + "</Tasks></Project>\n"
+    ).encode()
+
+
+# Writer and file extension for each supported file type.
+synthetic_file_writers: Dict[FileType, Tuple[Callable[[List[SyntheticActivity]], bytes], str]] = {
+    FileType.EXCEL_MSP_EXPORT_DEFAULT: (create_msp_excel_export, "xlsx"),
+    FileType.SMARTSHEET_EXPORT_01: (create_smartsheet_export, "xlsx"),
+    FileType.CSV_PLAN_01: (create_csv, "csv"),
+    FileType.MSP_XML_01: (create_msp_xml, "xml"),
+}
+
+
+def write_synthetic_plan(activities: List[SyntheticActivity], file_type: FileType) -> (bytes, str):
+    """
+    :param activities: Output from generate_synthetic_plan()
+    :param file_type:
+    :return: Contents of the file, and the file extension to use for it.
+    """
+    create_file, extension = synthetic_file_writers[file_type]
+    return create_file(activities), extension
@@ -0,0 +1,152 @@
+"""
+Export of several visuals from a plan as a single PowerPoint deck, one slide per visual.
+
+Exporting the visuals of a plan one at a time means a new presentation for each one and the plotables for each visual
+being calculated one after the other.  Here:
+- The plotables for each visual are calculated in parallel, using the PowerPoint export worker pool (see
+  pptx_export.py).  Each worker reads the visual from the database itself, so only the visual id is passed to the
+  worker and only the plotables come back.
+- The deck is then assembled in one step, with each visual rendered onto its own slide of the same presentation.
+
+If the worker pool is disabled (PPTX_EXPORT_MAX_WORKERS=0) the plotables are calculated in the calling process.
+
+As with exporting a single visual, the deck isn't produced if the workers don't finish within PPTX_EXPORT_JOB_TIMEOUT
+or the pool breaks part way through.
+"""
+import io
+import logging
+import time
+from concurrent.futures import Executor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from pptx import Presentation
+
+from plan_visual_django.services.visual.export.pptx_export import get_executor, submit_to_executor, \
+    _replace_broken_executor
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_EXECUTOR = object()  # Marker for using the export worker pool, as None means run in the calling process.
+
+
+def generate_visual_plotables(visual_id: int) -> Dict[str, Iterable]:
+    """
+    Calculates the plotables for a visual.
+
+    :param visual_id:
+    :return: Output from VisualRenderSnapshot.get_plotables()
+    """
+    from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
+
+    return VisualRenderSnapshot(visual_id).get_plotables()
+
+
+def _generate_visual_plotables_in_worker(visual_id: int) -> Dict[str, Iterable]:
+    """
+    Runs in a worker process, which has its own database connection.  Worker processes are long-lived so make sure
+    the connection left from a previous export is still usable, and don't hold it open between exports.
+    """
+    close_old_connections()
+    try:
+        return generate_visual_plotables(visual_id)
+    finally:
+        close_old_connections()
+
+
+def generate_plotables_for_visuals(visual_ids: List[int], executor: Optional[Executor],
+                                   timeout: Optional[float] = None) -> Optional[List[Dict[str, Iterable]]]:
+    """
+    Calculates the plotables for each visual, in parallel if there is an executor.
+
+    :param visual_ids:
+    :param executor: Pool to calculate the plotables in, or None to calculate them in this process.
+    :param timeout: Maximum seconds to wait for all the visuals.  Defaults to PPTX_EXPORT_JOB_TIMEOUT.
+    :return: Plotables for each visual, in the same order as visual_ids, or None if the workers didn't finish in time
+             or the pool broke.
+    """
+    if executor is None:
+        return [generate_visual_plotables(visual_id) for visual_id in visual_ids]
+
+    futures = [
+        submit_to_executor(executor, _generate_visual_plotables_in_worker, visual_id) for visual_id in visual_ids
+    ]
+
+    # One deadline for the whole deck rather than a full timeout for each visual.
+    deadline = time.monotonic() + (settings.PPTX_EXPORT_JOB_TIMEOUT if timeout is None else timeout)
+    try:
+        return [future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures]
+    except BrokenProcessPool:
+        logger.warning(f"PowerPoint export worker pool broke while exporting visuals {visual_ids}")
+        _replace_broken_executor(executor)
+    except FutureTimeoutError:
+        logger.warning(f"Timed out waiting for PowerPoint export of visuals {visual_ids}")
+
+    # Don't leave the rest of the deck queued up for nothing.
+    for future in futures:
+        future.cancel()
+    return None
+
+
+def assemble_deck(plotables_for_visuals: List[Dict[str, Iterable]]) -> Presentation:
+    """
+    Renders each visual onto its own slide of a single presentation.
+
+    :param plotables_for_visuals: Plotables for each visual, in slide order.
+    :return:
+    """
+    from plan_visual_django.services.visual.rendering.renderers import PowerPointRenderer
+
+    presentation = Presentation()
+    blank_slide_layout = presentation.slide_layouts[6]
+    for _ in plotables_for_visuals:
+        presentation.slides.add_slide(blank_slide_layout)
+
+    for slide_index, visual_plotables in enumerate(plotables_for_visuals):
+        PowerPointRenderer(presentation=presentation, slide_index=slide_index).render_from_iterable(visual_plotables)
+
+    return presentation
+
+
+def get_visuals_for_deck(plan, visual_ids: Optional[Iterable[int]] = None):
+    """
+    Visuals from the plan to include in the deck, in the order they are listed for the plan.
+
+    :param plan:
+    :param visual_ids: Visuals to include, or None for all the plan's visuals.  Ids of visuals which don't belong to
+                       the plan are ignored.
+    :return: QuerySet of PlanVisual
+    """
+    visuals = plan.planvisual_set.order_by('id')
+    if visual_ids is not None:
+        visuals = visuals.filter(id__in=list(visual_ids))
+    return visuals
+
+
+def render_plan_deck_bytes(plan, visual_ids: Optional[Iterable[int]] = None, executor=_DEFAULT_EXECUTOR,
+                           timeout: Optional[float] = None) -> Optional[bytes]:
+    """
+    Exports visuals from a plan as a single PowerPoint deck.
+
+    :param plan: Plan
+    :param visual_ids: Visuals to include, or None for all the plan's visuals.
+    :param executor: Pool to calculate plotables in.  Defaults to the PowerPoint export worker pool, None calculates
+                     them in this process.
+    :param timeout: Maximum seconds to wait for the workers.  Defaults to PPTX_EXPORT_JOB_TIMEOUT.
+    :return: Contents of the .pptx file, or None if the export didn't finish in time or the worker pool broke.
+    """
+    if executor is _DEFAULT_EXECUTOR:
+        executor = get_executor()
+
+    ids_in_order = list(get_visuals_for_deck(plan, visual_ids).values_list('id', flat=True))
+    plotables_for_visuals = generate_plotables_for_visuals(ids_in_order, executor, timeout)
+    if plotables_for_visuals is None:
+        return None
+    presentation = assemble_deck(plotables_for_visuals)
+
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    return buffer.getvalue()
+
@@ -0,0 +1,374 @@
+"""
+PowerPoint export service.
+
+Building a presentation with python-pptx is CPU heavy, and for a big visual can take seconds, so rather than doing it
+in the process handling the request:
+- Each export is recorded as a VisualExportJob.
+- The plotables for the visual are calculated in the requesting process (that's where the database access is), then
+  passed to a bounded pool of worker processes which do the python-pptx work.
+- The generated file is kept on disk, keyed by the visual id and render revision, so downloading a visual which hasn't
+  changed since it was last exported is served straight from the file.
+- The files on disk are limited to a maximum total size, with the least recently used being removed first.
+
+Settings:
+- PPTX_EXPORT_MAX_WORKERS: Number of worker processes.  0 means exports are carried out in the requesting process,
+  which is mainly for testing.
+- PPTX_EXPORT_CACHE_DIR: Folder where generated files are kept.
+- PPTX_EXPORT_CACHE_MAX_BYTES: Maximum total size of generated files.
+- PPTX_EXPORT_JOB_TIMEOUT: Seconds after which a queued or running job which isn't being tracked by this process is
+  assumed to have been lost (e.g. because the server was restarted) and is replaced.
+
+NOTE: The worker pool belongs to the process which created it, so where there are several server processes each has
+its own pool, but they share the job table and the cached files.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PPTX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+
+JOB_POLL_INTERVAL = 0.2  # Seconds between checks on a job being run by another process
+
+
+class PptxArtefactCache:
+    """
+    Generated PowerPoint files held on disk, one file per visual and render revision.
+
+    Reading a file updates its modification time, which is used to decide which files are least recently used when the
+    total size of the files goes over the limit.
+    """
+    def __init__(self, directory: str | Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def path_for(self, visual_id: int, revision: int) -> Path:
+        return self.directory / f"visual-{visual_id}-revision-{revision}.pptx"
+
+    def contains(self, visual_id: int, revision: int) -> bool:
+        return self.path_for(visual_id, revision).exists()
+
+    def get(self, visual_id: int, revision: int) -> Optional[bytes]:
+        path = self.path_for(visual_id, revision)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # Not there, or evicted by another process between reading and updating the time.
+            return None
+        return data
+
+    def put(self, visual_id: int, revision: int, data: bytes):
+        """
+        Saves the file, writing to a temporary file first so that a partially written file is never read, and then
+        evicts older files if the cache is now too big.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(visual_id, revision)
+
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as temporary_file:
+            temporary_file.write(data)
+        os.replace(temporary_path, path)
+
+        self.evict(keep=path)
+
+    def evict(self, keep: Optional[Path] = None):
+        """
+        Removes least recently used files until the total size is within the limit.
+
+        :param keep: File not to remove even if it is the least recently used (i.e. the one just added).
+        """
+        files = []
+        for path in self.directory.glob("*.pptx"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total_size -= size
+            logger.info(f"Evicted {path.name} from PowerPoint export cache")
+
+    def total_size(self) -> int:
+        return sum(path.stat().st_size for path in self.directory.glob("*.pptx"))
+
+    def clear(self):
+        for path in self.directory.glob("*.pptx"):
+            path.unlink(missing_ok=True)
+
+
+def get_artefact_cache() -> PptxArtefactCache:
+    return PptxArtefactCache(settings.PPTX_EXPORT_CACHE_DIR, settings.PPTX_EXPORT_CACHE_MAX_BYTES)
+
+
+def render_pptx_bytes(visual_plotables) -> bytes:
+    """
+    Renders plotables for a visual as a PowerPoint presentation.  Runs in a worker process, so doesn't access the
+    database - everything it needs is in the plotables.
+
+    :param visual_plotables: Output from VisualRenderSnapshot.get_plotables()
+    :return: Contents of the .pptx file.
+    """
+    from plan_visual_django.services.visual.rendering.renderers import PowerPointRenderer
+
+    presentation = PowerPointRenderer().render_from_iterable(visual_plotables)
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    return buffer.getvalue()
+
+
+def _initialise_worker():
+    """
+    Worker processes are started fresh (rather than forked, which would copy the parent's database connections) so
+    need Django setting up before plotables, which include model instances, can be unpickled.
+    """
+    import django
+    django.setup()
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Futures for the jobs submitted to the pool by this process.
+_futures: Dict[int, Future] = {}
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Returns the worker pool for this process, creating it the first time it's needed, or None if exports are
+    configured to run in the requesting process.
+    """
+    global _executor
+
+    if settings.PPTX_EXPORT_MAX_WORKERS <= 0:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PPTX_EXPORT_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialise_worker,
+            )
+        return _executor
+
+
+def _replace_broken_executor(broken_executor: ProcessPoolExecutor) -> Optional[ProcessPoolExecutor]:
+    """
+    A pool can't be used again once one of its workers has died (e.g. killed for running out of memory), so start a
+    new one.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is broken_executor:
+            logger.warning("PowerPoint export worker pool is broken, starting a new one")
+            broken_executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+    return get_executor()
+
+
+def submit_to_executor(executor: ProcessPoolExecutor, fn, *args) -> Future:
+    """
+    Submits work to the export worker pool, replacing the pool if it is broken.
+    """
+    try:
+        return executor.submit(fn, *args)
+    except BrokenProcessPool:
+        return _replace_broken_executor(executor).submit(fn, *args)
+
+
+def _finish_job(job_id: int, visual_id: int, revision: int, get_pptx_bytes: Callable[[], bytes], close_connection: bool):
+    """
+    Saves the generated file and updates the job with the outcome.
+
+    :param get_pptx_bytes: Returns the generated file, or raises the exception from generating it.
+    :param close_connection: Whether to close the database connection at the end, for when this is running in a thread
+                             of the worker pool rather than the thread handling the request.
+    """
+    from plan_visual_django.models import VisualExportJob
+
+    try:
+        get_artefact_cache().put(visual_id, revision, get_pptx_bytes())
+        VisualExportJob.objects.filter(id=job_id).update(
+            status=VisualExportJob.Status.COMPLETE, updated=timezone.now()
+        )
+    except Exception as exception:
+        logger.exception(f"PowerPoint export of visual {visual_id} failed")
+        VisualExportJob.objects.filter(id=job_id).update(
+            status=VisualExportJob.Status.FAILED, error_message=str(exception), updated=timezone.now()
+        )
+    finally:
+        _futures.pop(job_id, None)
+        if close_connection:
+            connection.close()
+
+
+def _on_future_done(job_id: int, visual_id: int, revision: int, submitting_thread_id: int, future: Future):
+    _finish_job(
+        job_id,
+        visual_id,
+        revision,
+        future.result,
+        close_connection=threading.get_ident() != submitting_thread_id
+    )
+
+
+def _submit_job(job, visual):
+    from plan_visual_django.models import VisualExportJob
+    from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
+
+    visual_plotables = VisualRenderSnapshot(visual).get_plotables()
+
+    executor = get_executor()
+    if executor is None:
+        job.status = VisualExportJob.Status.RUNNING
+        job.save(update_fields=['status', 'updated'])
+        _finish_job(
+            job.id, visual.id, job.render_revision, partial(render_pptx_bytes, visual_plotables), close_connection=False
+        )
+        job.refresh_from_db()
+    else:
+        future = submit_to_executor(executor, render_pptx_bytes, visual_plotables)
+        _futures[job.id] = future
+        future.add_done_callback(partial(_on_future_done, job.id, visual.id, job.render_revision, threading.get_ident()))
+
+
+def _is_abandoned(job) -> bool:
+    if job.id in _futures:
+        return False
+    return timezone.now() - job.updated > timedelta(seconds=settings.PPTX_EXPORT_JOB_TIMEOUT)
+
+
+def request_visual_export(visual):
+    """
+    Returns a job for exporting the visual at its current revision.
+
+    - If the file has already been generated, returns a completed job straight away.
+    - If an export of this revision is already queued or running, returns that job.
+    - Otherwise creates a new job and submits it to the worker pool.
+
+    :param visual: PlanVisual
+    :return: VisualExportJob
+    """
+    from plan_visual_django.models import VisualExportJob
+
+    revision = visual.render_revision
+    jobs_for_revision = VisualExportJob.objects.filter(visual=visual, render_revision=revision)
+
+    if get_artefact_cache().contains(visual.id, revision):
+        job = jobs_for_revision.filter(status=VisualExportJob.Status.COMPLETE).first()
+        if job is None:
+            job = VisualExportJob.objects.create(
+                visual=visual, render_revision=revision, status=VisualExportJob.Status.COMPLETE
+            )
+        return job
+
+    job = jobs_for_revision.filter(
+        status__in=[VisualExportJob.Status.QUEUED, VisualExportJob.Status.RUNNING]
+    ).first()
+    if job is not None:
+        if not _is_abandoned(job):
+            return get_job_status(job)
+        job.status = VisualExportJob.Status.FAILED
+        job.error_message = "Export was not completed in time"
+        job.save(update_fields=['status', 'error_message', 'updated'])
+
+    job = VisualExportJob.objects.create(visual=visual, render_revision=revision)
+    _submit_job(job, visual)
+    return job
+
+
+def get_job_status(job):
+    """
+    Brings the job up to date.  Jobs are marked as running when a worker has picked them up, which is only known by
+    the process which submitted the job.
+
+    :param job: VisualExportJob
+    :return: The job
+    """
+    from plan_visual_django.models import VisualExportJob
+
+    future = _futures.get(job.id)
+    if future is not None and future.running() and job.status == VisualExportJob.Status.QUEUED:
+        VisualExportJob.objects.filter(id=job.id, status=VisualExportJob.Status.QUEUED).update(
+            status=VisualExportJob.Status.RUNNING, updated=timezone.now()
+        )
+    job.refresh_from_db()
+    return job
+
+
+def wait_for_job(job, timeout: float):
+    """
+    Waits until the job has finished or the timeout has passed.
+
+    :param job: VisualExportJob
+    :param timeout: Seconds
+    :return: The job, with its latest status
+    """
+    future = _futures.get(job.id)
+    if future is not None:
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeoutError:
+            pass
+        except Exception:
+            # Failure is recorded on the job.
+            pass
+        # The job is updated by a callback, which may not have run yet when result() returns.
+        deadline = time.monotonic() + timeout
+        while job.id in _futures and time.monotonic() < deadline:
+            time.sleep(JOB_POLL_INTERVAL / 10)
+    else:
+        # Job is being run by another process so just keep checking the job table.
+        deadline = time.monotonic() + timeout
+        job.refresh_from_db()
+        while not job.is_finished and time.monotonic() < deadline:
+            time.sleep(JOB_POLL_INTERVAL)
+            job.refresh_from_db()
+
+    return get_job_status(job)
+
+
+def get_visual_pptx(visual, timeout: Optional[float] = None) -> Optional[bytes]:
+    """
+    Returns the PowerPoint file for the visual at its current revision, from the cache if it's there, otherwise by
+    exporting it and waiting for the export to finish.
+
+    :param visual: PlanVisual
+    :param timeout: Maximum seconds to wait for an export.  Defaults to PPTX_EXPORT_JOB_TIMEOUT.
+    :return: Contents of the file, or None if the export failed or didn't finish in time.
+    """
+    cache = get_artefact_cache()
+    data = cache.get(visual.id, visual.render_revision)
+    if data is not None:
+        return data
+
+    job = request_visual_export(visual)
+    if not job.is_finished:
+        job = wait_for_job(job, settings.PPTX_EXPORT_JOB_TIMEOUT if timeout is None else timeout)
+
+    return cache.get(visual.id, visual.render_revision)
@@ -6,7 +6,7 @@ The main algorithm is the following:
 2. Creating swimlanes and activities by using the structure of the plan. (that is Level information).
 """
 import logging
-from typing import List
+from typing import Dict, List, Optional
 
 from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree
 from plan_visual_django.services.service_utilities.service_response import ServiceResponse
@@ -17,13 +17,92 @@ from plan_visual_django.models import SwimlaneForVisual, VisualActivity, PlanVis
     DEFAULT_HEIGHT_IN_TRACKS, DEFAULT_TEXT_HORIZONTAL_ALIGNMENT, DEFAULT_TEXT_VERTICAL_ALIGNMENT, DEFAULT_TEXT_FLOW, \
     Plan
 from plan_visual_django.services.general.date_utilities import proportion_between_dates
+from plan_visual_django.services.plan_file_utilities.plan_parsing import BULK_BATCH_SIZE
 from plan_visual_django.services.service_utilities.service_response import ServiceStatusCode
-from plan_visual_django.services.visual.model.full_autolayout_algorithm import build_initial_layout, LayoutOptions
+from plan_visual_django.services.visual.model.auto_layout_pool import build_layout
+from plan_visual_django.services.visual.model.full_autolayout_algorithm import LayoutOptions
+from plan_visual_django.services.visual.model.swimlane_geometry import invalidate_swimlane_geometry
+from plan_visual_django.services.visual.rendering.render_cache import bump_render_revision
 from plan_visual_django.services.visual.model.visual_settings import VisualSettings
 from django.db import transaction
 
 logger = logging.getLogger(__name__)
 
+
+class TrackAllocator:
+    """
+    Places activities at the bottom of swimlanes for one operation which adds or removes many activities.
+
+    Working out the next unused track of a swimlane means reading every activity in the swimlane, which was being done
+    for each activity added.  Instead the activities of the visual are read once when the allocator is created, the
+    highest track used in each swimlane is kept up to date in memory as activities are placed, and all the changes are
+    written in bulk by flush().
+    """
+    def __init__(self, visual: PlanVisual):
+        self.visual = visual
+        self.visual_activities: Dict[str, VisualActivity] = {
+            visual_activity.unique_id_from_plan: visual_activity for visual_activity in visual.visualactivity_set.all()
+        }
+        self._max_tracks: Dict[int, float] = {}  # Highest track used by enabled activities, by swimlane id
+        self._new_activities: List[VisualActivity] = []
+        self._changed_activities: Dict[int, VisualActivity] = {}
+
+    def get_visual_activity(self, unique_id_from_plan: str) -> Optional[VisualActivity]:
+        return self.visual_activities.get(unique_id_from_plan)
+
+    def get_max_track(self, swimlane: SwimlaneForVisual) -> float:
+        """
+        Same as SwimlaneForVisual.get_max_track(), but including the changes made through the allocator.
+        """
+        if swimlane.id not in self._max_tracks:
+            self._max_tracks[swimlane.id] = max((
+                visual_activity.get_highest_track_number() for visual_activity in self.visual_activities.values()
+                if visual_activity.enabled and visual_activity.swimlane_id == swimlane.id
+            ), default=0)
+        return self._max_tracks[swimlane.id]
+
+    def get_next_unused_track_number(self, swimlane: SwimlaneForVisual) -> float:
+        return self.get_max_track(swimlane) + 1
+
+    def place(self, visual_activity: VisualActivity, swimlane: SwimlaneForVisual):
+        """
+        Enables the activity (new or already in the visual) and puts it on the next unused track of the swimlane.
+        """
+        if visual_activity.enabled and visual_activity.swimlane_id is not None:
+            # Moving the activity may leave a different highest track where it was.
+            self._max_tracks.pop(visual_activity.swimlane_id, None)
+
+        track_number = self.get_next_unused_track_number(swimlane)
+        visual_activity.enabled = True
+        visual_activity.swimlane = swimlane
+        visual_activity.vertical_positioning_value = track_number
+        self._max_tracks[swimlane.id] = visual_activity.get_highest_track_number()
+
+        if visual_activity.pk is None:
+            self.visual_activities[visual_activity.unique_id_from_plan] = visual_activity
+            self._new_activities.append(visual_activity)
+        else:
+            self._changed_activities[visual_activity.pk] = visual_activity
+
+    def disable(self, visual_activity: VisualActivity):
+        if visual_activity.enabled:
+            visual_activity.enabled = False
+            self._max_tracks.pop(visual_activity.swimlane_id, None)
+            self._changed_activities[visual_activity.pk] = visual_activity
+
+    def flush(self):
+        """
+        Writes all the changes made through the allocator.
+        """
+        if self._new_activities or self._changed_activities:
+            VisualLayoutManager.save_visual_activities(
+                self.visual, self._new_activities, list(self._changed_activities.values()),
+                ['enabled', 'swimlane', 'vertical_positioning_value']
+            )
+        self._new_activities = []
+        self._changed_activities = {}
+
+
 class VisualLayoutManager:
     """
     Class which provides utilities for adding, moving or removing activities from a visual according to various
@@ -64,17 +143,25 @@ class VisualLayoutManager:
         except IntegrityError as e:
             raise DuplicateSwimlaneException("Swimlane already exists for milestones") from e
 
-        milestone_plan_activities = self.plan_activities.filter(milestone_flag=True).order_by('start_date')
+        milestone_plan_activities = list(self.plan_activities.filter(milestone_flag=True).order_by('start_date'))
 
         # Only proceed if there is at least one milestone
 
         if len(milestone_plan_activities) == 0:
             print("No milestones in plan, so can't create swimlane")
             return
-        earliest_milestone_date = milestone_plan_activities.first().start_date
-        latest_milestone_date = milestone_plan_activities.last().start_date
+        earliest_milestone_date = milestone_plan_activities[0].start_date
+        latest_milestone_date = milestone_plan_activities[-1].start_date
         mid_point_date = proportion_between_dates(earliest_milestone_date, latest_milestone_date, 0.5)
 
+        # Read the activities already in the visual once, rather than looking up each milestone in turn.
+        existing_visual_activities = {
+            visual_activity.unique_id_from_plan: visual_activity
+            for visual_activity in VisualActivity.objects.filter(visual=self.visual_for_plan)
+        }
+
+        new_visual_activities = []
+        moved_visual_activities = []
         for index, plan_activity_for_milestone in enumerate(milestone_plan_activities):
             # For now just have one milestone per track and add them in date order.
             track_number = index + 2  # Start at 2 as 1 is the swimlane header
@@ -87,14 +174,10 @@ class VisualLayoutManager:
                 text_flow = VisualActivity.TextFlow.FLOW_TO_LEFT
 
             # Check whether this activity from the plan is already in the visual
-            try:
-                plan_activity_for_milestone = VisualActivity.objects.get(
-                    visual=self.visual_for_plan, unique_id_from_plan=unique_id_from_plan
-                )
-            except VisualActivity.DoesNotExist:
+            visual_activity = existing_visual_activities.get(unique_id_from_plan)
+            if visual_activity is None:
                 # This milestone is not already in the visual so add it.
-
-                VisualActivity.objects.create(
+                new_visual_activities.append(VisualActivity(
                     visual=self.visual_for_plan,
                     swimlane=swimlane,
                     unique_id_from_plan=unique_id_from_plan,
@@ -106,17 +189,33 @@ class VisualLayoutManager:
                     text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE,
                     text_flow=text_flow,
                     plotable_style=milestone_plotable_style,
-                )
+                ))
             else:
                 # The milestone has been added but may have subsequently been disabled, so set enabled flag.
-                plan_activity_for_milestone.enabled = True
+                visual_activity.enabled = True
 
                 # Now move the activity to the swimlane and position it
-                plan_activity_for_milestone.swimlane = swimlane
-                plan_activity_for_milestone.track_number = track_number
+                visual_activity.swimlane = swimlane
+                visual_activity.vertical_positioning_value = track_number
+                moved_visual_activities.append(visual_activity)
 
-                plan_activity_for_milestone.save()
+        self.save_visual_activities(self.visual_for_plan, new_visual_activities, moved_visual_activities,
+                                    ['enabled', 'swimlane', 'vertical_positioning_value'])
 
+    @staticmethod
+    def save_visual_activities(visual: PlanVisual, new_visual_activities: List[VisualActivity],
+                               changed_visual_activities: List[VisualActivity] = (), changed_fields: List[str] = ()):
+        """
+        Writes the activities added to or changed in a visual by one of the layout schemes, in bulk and in one
+        transaction.  Bulk writes don't send save signals, so the visual's render revision and swimlane geometry are
+        updated here instead (see render_cache.py).
+        """
+        with transaction.atomic():
+            VisualActivity.objects.bulk_create(new_visual_activities, batch_size=BULK_BATCH_SIZE)
+            if changed_visual_activities:
+                VisualActivity.objects.bulk_update(changed_visual_activities, changed_fields, batch_size=BULK_BATCH_SIZE)
+            bump_render_revision([visual.id])
+        invalidate_swimlane_geometry(visual.id)
 
     def add_delete_activities(self, level:int, swimlane:SwimlaneForVisual, delete_flag:bool):
         """
@@ -128,64 +227,56 @@ class VisualLayoutManager:
         :param delete_flag:
         :return:
         """
+        track_allocator = TrackAllocator(self.visual_for_plan)
+
         # If delete_flag is set then simply set the disabled flag on all the activities in the visual at the specified level
         if delete_flag:
-            visual_activities = swimlane.get_visual_activities()
+            visual_activities = [
+                visual_activity for visual_activity in track_allocator.visual_activities.values()
+                if visual_activity.enabled and visual_activity.swimlane_id == swimlane.id
+            ]
+            # Levels of the plan activities for these visual activities, read in one go.
+            plan_activity_levels = dict(self.plan_activities.filter(
+                unique_sticky_activity_id__in=[visual_activity.unique_id_from_plan for visual_activity in visual_activities]
+            ).values_list('unique_sticky_activity_id', 'level'))
             for visual_activity in visual_activities:
                 # Check whether plan activity for this visual activity has the right level
-                plan_activity_for_visual_activity = self.plan_activities.filter(unique_sticky_activity_id=visual_activity.unique_id_from_plan)[0]
-
-                if level == 0 or plan_activity_for_visual_activity.level == level:
-                    visual_activity.enabled = False
-                    visual_activity.save()
+                if level == 0 or plan_activity_levels.get(visual_activity.unique_id_from_plan) == level:
+                    track_allocator.disable(visual_activity)
+            track_allocator.flush()
             return
 
         # Get all the activities from the plan at the specified level
         plan_activities = self.plan_activities.filter(level=level, milestone_flag=False)
 
-        # We want to know which activities are already in the visual and enabled.
-        # ToDo: Re-factor this snippet, it uses different ways to get similar data (activities for visual)
-        visual_activities = self.visual_for_plan.get_visual_activities(to_dict=False, include_disabled=False)
-        disabled_activities = self.visual_for_plan.visualactivity_set.filter(enabled=False)
-        enabled_ids_from_visual = [visual_activity.unique_id_from_plan for visual_activity in visual_activities]
-        disabled_ids_from_visual = [visual_activity.unique_id_from_plan for visual_activity in disabled_activities]
-
         for activity in plan_activities:
             # There are three cases:
             # 1. The activity is already in the visual and enabled.  In this case we do nothing.
             # 2. The activity is already in the visual but disabled.  In this case we enable it and move to unused track.
             # 3. The activity is not in the visual.  In this case we add it.
+            visual_activity = track_allocator.get_visual_activity(activity.unique_sticky_activity_id)
 
-            # Select the track number where this activity will go.
-            track_number = swimlane.get_next_unused_track_number()
-
-            if activity.unique_sticky_activity_id in enabled_ids_from_visual:
+            if visual_activity is not None and visual_activity.enabled:
                 # The activity is already in the visual and enabled so do nothing.
                 continue
 
-            if activity.unique_sticky_activity_id in disabled_ids_from_visual:
-                # The visual already exists but has been disabled so re-enable, switch to this swimlane and set track number.
-                visual_activity = self.visual_for_plan.visualactivity_set.filter(unique_id_from_plan=activity.unique_sticky_activity_id)[0]
-                visual_activity.enabled = True
-                visual_activity.swimlane = swimlane
-                visual_activity.vertical_positioning_value = track_number
-                visual_activity.save()
-                continue
+            if visual_activity is None:
+                # The activity is not already in the visual so add it.
+                visual_activity = VisualActivity(
+                    visual=self.visual_for_plan,
+                    unique_id_from_plan=activity.unique_sticky_activity_id,
+                    plotable_shape=self.visual_settings.default_activity_shape,
+                    height_in_tracks=1,
+                    text_horizontal_alignment=VisualActivity.HorizontalAlignment.CENTER,
+                    text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE,
+                    text_flow=VisualActivity.TextFlow.FLOW_TO_RIGHT,
+                    plotable_style=self.visual_settings.default_activity_plotable_style,
+                )
 
-            # The activity is not already in the visual so add it.
-            VisualActivity.objects.create(
-                visual=self.visual_for_plan,
-                swimlane=swimlane,
-                unique_id_from_plan=activity.unique_sticky_activity_id,
-                enabled=True,
-                plotable_shape=self.visual_settings.default_activity_shape,
-                vertical_positioning_value=track_number,
-                height_in_tracks=1,
-                text_horizontal_alignment=VisualActivity.HorizontalAlignment.CENTER,
-                text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE,
-                text_flow=VisualActivity.TextFlow.FLOW_TO_RIGHT,
-                plotable_style=self.visual_settings.default_activity_plotable_style,
-            )
+            # New activities, and disabled ones which are re-enabled, go on the next unused track of this swimlane.
+            track_allocator.place(visual_activity, swimlane)
+
+        track_allocator.flush()
 
     @staticmethod
     def sort_swimlane(swimlane, start_track=2):
@@ -239,10 +330,18 @@ class VisualLayoutManager:
 
         :param activities:
         :param swimlane_sequence_number:
-        :return:
+        :return: ServiceResponse for each activity.
         """
-        for activity_id in activity_ids:
-            self.add_activity_to_swimlane(activity_id, swimlane_sequence_number)
+        # Get swimlane where we want to place these activities
+        swimlane = self.visual_for_plan.get_swimlane_by_sequence_number(swimlane_sequence_number)
+
+        track_allocator = TrackAllocator(self.visual_for_plan)
+        responses = [
+            self._add_activity_to_swimlane(activity_id, swimlane, swimlane_sequence_number, track_allocator)
+            for activity_id in activity_ids
+        ]
+        track_allocator.flush()
+        return responses
 
     def add_activity_to_swimlane(self, activity_unique_id: str, swimlane_sequence_number: int):
         """
@@ -266,6 +365,14 @@ class VisualLayoutManager:
         :param swimlane_sequence_number:
         :return:
         """
+        return self.add_activities_to_swimlane([activity_unique_id], swimlane_sequence_number)[0]
+
+    def _add_activity_to_swimlane(self, activity_unique_id: str, swimlane: SwimlaneForVisual,
+                                  swimlane_sequence_number: int, track_allocator: TrackAllocator) -> ServiceResponse:
+        """
+        See add_activity_to_swimlane().  The change is made through the track allocator, so isn't written until it is
+        flushed.
+        """
         # I don't know whether this is the right way to do this!
         #
         # The logic is that I want to add this activity from the plan to the supplied visual.  But if I have previously
@@ -278,38 +385,32 @@ class VisualLayoutManager:
         # or not, but it avoids using GET incorrectly or having to access data before validation which seems wrong.
         #
         # Note - the above means we don't even need a serializer (which seems a bit wrong).
-
-        # Get swimlane where we want to place this activity
-        swimlane = self.visual_for_plan.get_swimlane_by_sequence_number(swimlane_sequence_number)
-
-        try:
-            visual_activity = self.visual_for_plan.visualactivity_set.get(unique_id_from_plan=activity_unique_id)
-        except VisualActivity.DoesNotExist:
+        visual_activity = track_allocator.get_visual_activity(activity_unique_id)
+        if visual_activity is None:
             # Need to create a new record for this activity in this visual.
 
             # if the plan activity for this visual activity is a milestone, plot as DIAMOND, else plot as RECTANGLE
-            plan_activity = self.visual_for_plan.plan.planactivity_set.get(unique_sticky_activity_id=activity_unique_id)
+            plan_activity = self.plan_tree.get_plan_tree_activity_by_unique_id(activity_unique_id)
+            if plan_activity is None:
+                raise PlanActivity.DoesNotExist(f"No activity with id {activity_unique_id} in plan")
             if plan_activity.milestone_flag is True:
-                initial_plotable_shape = self.visual_for_plan.default_milestone_shape
-                initial_plotable_style = self.visual_for_plan.default_milestone_plotable_style
+                initial_plotable_shape = self.visual_settings.default_milestone_shape
+                initial_plotable_style = self.visual_settings.default_milestone_plotable_style
             else:
-                initial_plotable_shape = self.visual_for_plan.default_activity_shape
-                initial_plotable_style = self.visual_for_plan.default_activity_plotable_style
+                initial_plotable_shape = self.visual_settings.default_activity_shape
+                initial_plotable_style = self.visual_settings.default_activity_plotable_style
 
             new_visual_activity = VisualActivity(
                 visual=self.visual_for_plan,
                 unique_id_from_plan=activity_unique_id,
-                vertical_positioning_value=swimlane.get_next_unused_track_number(),
                 height_in_tracks=DEFAULT_HEIGHT_IN_TRACKS,
                 text_horizontal_alignment=DEFAULT_TEXT_HORIZONTAL_ALIGNMENT,
                 text_vertical_alignment=DEFAULT_TEXT_VERTICAL_ALIGNMENT,
                 text_flow=DEFAULT_TEXT_FLOW,
                 plotable_shape=initial_plotable_shape,
                 plotable_style=initial_plotable_style,
-                swimlane_id=swimlane.id,
-                enabled=True
             )
-            new_visual_activity.save()
+            track_allocator.place(new_visual_activity, swimlane)
             status = ServiceResponse(
                 status=ServiceStatusCode.SUCCESS,
                 message=f"New activity added to visual {self.visual_for_plan} for Id = {activity_unique_id}",
@@ -320,11 +421,7 @@ class VisualLayoutManager:
             # There is already a record so we need to change the enabled flag to true.
             # Also don't want to retain vertical position as something else may be placed there.
             # Also need to update swimlane to one supplied.
-            visual_activity.enabled = True
-            visual_activity.vertical_positioning_value = swimlane.get_next_unused_track_number()
-            visual_activity.swimlane_id = swimlane.id
-
-            visual_activity.save()
+            track_allocator.place(visual_activity, swimlane)
             status = ServiceResponse(
                 status=ServiceStatusCode.SUCCESS,
                 message=f"Existing activity re-added to visual {self.visual_for_plan} for Id = {activity_unique_id} in swimlane {swimlane_sequence_number}",
@@ -344,13 +441,12 @@ class VisualLayoutManager:
         )
         return status
 
-    @classmethod
-    def create_full_visual(cls, plan: Plan):
+    @staticmethod
+    def full_visual_layout_options() -> LayoutOptions:
         """
-        Use algorithm to create a full visual from the plan.
-        :return:
+        Options used by the layout algorithm when creating a full visual from a plan.
         """
-        layout_options = LayoutOptions(
+        return LayoutOptions(
             max_lanes=5,
             max_tracks_per_lane=8,
             reserve_track_zero=True,
@@ -358,33 +454,47 @@ class VisualLayoutManager:
             label_window_start=None,
             label_window_end=None
         )
-        plan_tree = plan.get_plan_tree()
-        auto_layout = build_initial_layout(plan_tree, options=layout_options)
-
-        auto_visual: PlanVisual = PlanVisual.objects.create_with_defaults(plan=plan)
 
+    @classmethod
+    def create_full_visual(cls, plan: Plan):
+        """
+        Use algorithm to create a full visual from the plan.
+        :return:
+        """
+        plan_tree = plan.get_plan_tree()
+        auto_layout = build_layout(plan_tree, options=cls.full_visual_layout_options())
 
-        # Now add the activities to the visual
-        for lane in auto_layout["lanes"]:
+        # The visual, its swimlanes and its activities are created together, so a failure part way through doesn't
+        # leave a partly created visual behind.
+        with transaction.atomic():
+            auto_visual: PlanVisual = PlanVisual.objects.create_with_defaults(plan=plan)
             swimlanes = auto_visual.add_swimlanes_to_visual(
-                auto_visual.default_swimlane_plotable_style, lane["name"]
+                auto_visual.default_swimlane_plotable_style, *[lane["name"] for lane in auto_layout["lanes"]]
             )
-            swimlane = swimlanes[0]
-
-            for track_records in lane["tracks"]:
-                # Allow for activity record being None (need to fix so it doesn't happen!)
-                # ToDo: Fix at source so that lane['tracks'] doesn't include None values
-                if track_records is None:
-                    continue
-                for activity_record in track_records:
-                    plan_activity: PlanActivity = activity_record['activity']
-                    flow = activity_record['label_side']
-                    visual_activity_shape = \
-                        auto_visual.default_activity_shape if plan_activity.milestone_flag is False \
-                            else auto_visual.default_milestone_shape
-                    text_flow = VisualActivity.TextFlow.FLOW_TO_RIGHT if flow == "left" else VisualActivity.TextFlow.FLOW_TO_LEFT
-                    try:
-                        VisualActivity.objects.create(
+
+            # Build all the activities first, so they can be written in one go.  Each plan activity can only be in the
+            # visual once, so if the layout places one twice the first placement is kept.
+            added_ids = set()
+            visual_activities = []
+            for lane, swimlane in zip(auto_layout["lanes"], swimlanes):
+                for track_records in lane["tracks"]:
+                    # Allow for activity record being None (need to fix so it doesn't happen!)
+                    # ToDo: Fix at source so that lane['tracks'] doesn't include None values
+                    if track_records is None:
+                        continue
+                    for activity_record in track_records:
+                        plan_activity: PlanActivity = activity_record['activity']
+                        if plan_activity.unique_sticky_activity_id in added_ids:
+                            logger.warning(f"Activity already exists for plan activity {plan_activity.unique_sticky_activity_id}")
+                            continue
+                        added_ids.add(plan_activity.unique_sticky_activity_id)
+
+                        flow = activity_record['label_side']
+                        visual_activity_shape = \
+                            auto_visual.default_activity_shape if plan_activity.milestone_flag is False \
+                                else auto_visual.default_milestone_shape
+                        text_flow = VisualActivity.TextFlow.FLOW_TO_RIGHT if flow == "left" else VisualActivity.TextFlow.FLOW_TO_LEFT
+                        visual_activities.append(VisualActivity(
                             visual=auto_visual,
                             unique_id_from_plan=plan_activity.unique_sticky_activity_id,
                             enabled=True,
@@ -396,7 +506,7 @@ class VisualLayoutManager:
                             text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE,
                             text_flow=text_flow,
                             plotable_style=auto_visual.default_activity_plotable_style,
-                        )
-                    except IntegrityError as e:
-                        logger.warning(f"Activity already exists for plan activity {plan_activity.unique_sticky_activity_id}")
-        return auto_visual
\ No newline at end of file
+                        ))
+
+            cls.save_visual_activities(auto_visual, visual_activities)
+        return auto_visual
@@ -0,0 +1,94 @@
+"""
+Lays out the lanes of a full visual in parallel.
+
+Each lane (other than milestones) is coarsened and packed independently of the others, which for a big plan is most of
+the time taken to create a full visual, so for plans over a given size the lanes are sent to a pool of worker
+processes.  Lanes are sent as plain values (see LaneSnapshot in full_autolayout_algorithm.py) rather than model
+instances, and the results are put back together in lane order, so the layout is exactly the same as laying the plan
+out in the requesting process.
+
+Settings:
+- AUTO_LAYOUT_MAX_WORKERS: Number of worker processes.  0 means lanes are always laid out in the requesting process.
+- AUTO_LAYOUT_PARALLEL_MIN_ACTIVITIES: Plans with fewer activities than this are laid out in the requesting process,
+  where that's quicker than sending the lanes to the workers.
+
+NOTE: As with PowerPoint export, the worker pool belongs to the process which created it.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Optional
+
+from django.conf import settings
+
+if TYPE_CHECKING:
+    from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree
+    from plan_visual_django.services.visual.model.full_autolayout_algorithm import LayoutOptions
+
+logger = logging.getLogger(__name__)
+
+
+def _initialise_worker():
+    """
+    Worker processes are started fresh (rather than forked, which would copy the parent's database connections) so
+    need Django setting up before the layout code, which builds unsaved activity records, can be imported.
+    """
+    import django
+    django.setup()
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(num_activities: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Returns the worker pool for this process, creating it the first time it's needed, or None if a plan of this size
+    should be laid out in the requesting process.
+    """
+    global _executor
+
+    if settings.AUTO_LAYOUT_MAX_WORKERS <= 0 or num_activities < settings.AUTO_LAYOUT_PARALLEL_MIN_ACTIVITIES:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.AUTO_LAYOUT_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialise_worker,
+            )
+        return _executor
+
+
+def _discard_broken_executor(broken_executor: ProcessPoolExecutor):
+    """
+    A pool can't be used again once one of its workers has died, so drop it and a new one is started next time.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is broken_executor:
+            logger.warning("Auto-layout worker pool is broken, starting a new one")
+            broken_executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def build_layout(plan_tree: "PlanTree", options: Optional["LayoutOptions"] = None) -> dict:
+    """
+    Same as build_initial_layout(), but with the lanes laid out by the worker pool where the plan is big enough.
+    """
+    # Imported here as this module is also imported by the workers before Django is set up.
+    from plan_visual_django.services.visual.model.full_autolayout_algorithm import build_initial_layout
+
+    executor = get_executor(len(plan_tree.get_activity_list()))
+    if executor is None:
+        return build_initial_layout(plan_tree, options)
+
+    try:
+        return build_initial_layout(plan_tree, options, executor=executor)
+    except BrokenProcessPool:
+        _discard_broken_executor(executor)
+        return build_initial_layout(plan_tree, options)
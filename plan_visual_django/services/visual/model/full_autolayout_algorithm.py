@@ -1,8 +1,11 @@
 from __future__ import annotations
 from plan_visual_django.models import PlanActivity, Plan, CustomUser
 from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree, PlanActivityTreeNode
-from dataclasses import dataclass
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import Executor
+from dataclasses import dataclass, replace
 from datetime import date, timedelta
+import heapq
 from typing import Dict, List, Optional, Tuple, Iterable
 import statistics
 from django.test import TestCase
@@ -218,12 +221,7 @@ def initial_selection_for_lane(top_nodes: List[PlanActivityTreeNode]) -> List[Pl
                 continue  # milestones will go to the Milestones lane
             sel.append(Plannable(leaf))
     # Deterministic order
-    sel.sort(key=lambda p: (
-        p.act_node.activity.start_date,
-        -p.act_node.activity.duration,
-        p.act_node.name.lower(),
-        p.act_node.id,
-    ))
+    sel.sort(key=plannable_sort_key)
     return sel
 
 def promotable(node):
@@ -233,101 +231,226 @@ def promotable(node):
         and getattr(node, "activity", None) is not None  # must be drawable
     )
 
+
+def plannable_sort_key(p: Plannable) -> Tuple:
+    """Deterministic order for placing items: start, longest first, then name and id."""
+    return (
+        p.act_node.activity.start_date,
+        -p.act_node.activity.duration,
+        p.act_node.name.lower(),
+        p.act_node.id,
+    )
+
+
+def count_overlapping_pairs_pairwise(intervals: List[Tuple[date, date]]) -> int:
+    """Number of pairs of [start, end) intervals which overlap, comparing every pair."""
+    overlaps = 0
+    for i in range(len(intervals)):
+        for j in range(i + 1, len(intervals)):
+            a1, b1 = intervals[i]
+            a2, b2 = intervals[j]
+            if not (b1 <= a2 or b2 <= a1):
+                overlaps += 1
+    return overlaps
+
+
+def count_overlapping_pairs(intervals: List[Tuple[date, date]]) -> int:
+    """Number of pairs of [start, end) intervals which overlap.
+
+    Sweeps through the end points in date order keeping a count of the intervals open, so each interval overlaps all
+    of those open when it starts.  Ends sort before starts on the same date, as intervals which meet don't overlap.
+    """
+    if any(b <= a for a, b in intervals):
+        # Empty or reversed intervals can be "before" each other both ways round, which a sweep can't see.
+        return count_overlapping_pairs_pairwise(intervals)
+
+    events = sorted([(a, 1) for a, _b in intervals] + [(b, 0) for _a, b in intervals])
+    overlaps = 0
+    open_intervals = 0
+    for _point, is_start in events:
+        if is_start:
+            overlaps += open_intervals
+            open_intervals += 1
+        else:
+            open_intervals -= 1
+    return overlaps
+
+
+def cluster_interval(node: PlanActivityTreeNode) -> Tuple[date, date]:
+    """Interval of a cluster member for scoring (unlike Activity.interval(), not widened to at least one day)."""
+    return node.activity.start_date, node.activity.end_date + timedelta(days=1)
+
+
+class SiblingCluster:
+    """The children of a parent which are in the selection, with their overlap pressure kept up to date as children
+    are added.
+
+    The starts and ends of the children are held in sorted order, so the overlaps of a new child with those already
+    there can be counted from how many start after it ends and how many end before it starts, without comparing it
+    with each one.  The score is then only worked out again when the children change.
+    """
+
+    def __init__(self, parent: PlanActivityTreeNode, children: Iterable[PlanActivityTreeNode] = ()):
+        self.parent = parent
+        self.members: Dict[str, PlanActivityTreeNode] = {c.id: c for c in children}
+        intervals = [cluster_interval(c) for c in self.members.values()]
+        self.total_days = sum(max(1, (b - a).days) for a, b in intervals)
+        self.overlaps = count_overlapping_pairs(intervals)
+        self.starts = sorted(a for a, _b in intervals)
+        self.ends = sorted(b for _a, b in intervals)
+        self.has_empty_interval = any(b <= a for a, b in intervals)
+        self._score: Optional[Tuple] = None
+
+    def add(self, child: PlanActivityTreeNode):
+        a, b = cluster_interval(child)
+        self.members[child.id] = child
+        self.total_days += max(1, (b - a).days)
+        if self.has_empty_interval or b <= a:
+            # Starts and ends of empty intervals don't give the overlaps (see count_overlapping_pairs())
+            self.has_empty_interval = True
+            self.overlaps = count_overlapping_pairs([cluster_interval(c) for c in self.members.values()])
+        else:
+            starting_after = len(self.starts) - bisect_left(self.starts, b)
+            ending_before = bisect_right(self.ends, a)
+            self.overlaps += len(self.starts) - starting_after - ending_before
+        insort(self.starts, a)
+        insort(self.ends, b)
+        self._score = None
+
+    def score(self) -> Tuple:
+        """Score by overlap pressure (lowest first)."""
+        if self._score is None:
+            self._score = (
+                -(self.total_days * (1 + self.overlaps)),  # higher first
+                self.parent.activity.start_date,
+                -self.parent.activity.duration,
+                self.parent.name.lower(),
+                self.parent.activity.id,
+            )
+        return self._score
+
+
+class TrackDepth:
+    """Number of tracks needed by a changing set of intervals.
+
+    Greedy interval partitioning in start order needs exactly as many tracks as the greatest number of intervals
+    which overlap at any one point, so rather than re-packing everything each time an interval is added or removed
+    this keeps a count of intervals over each elementary segment between interval end points, in a segment tree which
+    supports adding to a range and reading the overall maximum in O(log n).
+    """
+
+    def __init__(self, points: Iterable[date]):
+        """
+        :param points: Every start and (exclusive) end of the intervals which will be added.
+        """
+        self.points = sorted(set(points))
+        self.index = {point: i for i, point in enumerate(self.points)}
+        size = 1
+        while size < max(len(self.points), 1):
+            size *= 2
+        self.size = size
+        self.max_below = [0] * (2 * size)  # Maximum count in the subtree, including adds applied at this node
+        self.added = [0] * (2 * size)  # Amount added to the whole range of the node
+
+    def add(self, interval: Tuple[date, date], amount: int):
+        left = self.index[interval[0]] + self.size
+        right = self.index[interval[1]] + self.size
+        first_leaf, last_leaf = left, right - 1
+        while left < right:
+            if left & 1:
+                self.max_below[left] += amount
+                self.added[left] += amount
+                left += 1
+            if right & 1:
+                right -= 1
+                self.max_below[right] += amount
+                self.added[right] += amount
+            left >>= 1
+            right >>= 1
+        self._rebuild(first_leaf)
+        self._rebuild(last_leaf)
+
+    def _rebuild(self, node: int):
+        node >>= 1
+        while node >= 1:
+            self.max_below[node] = max(self.max_below[2 * node], self.max_below[2 * node + 1]) + self.added[node]
+            node >>= 1
+
+    def tracks_needed(self) -> int:
+        return self.max_below[1]
+
+
 def coarsen_until_fits(top_nodes: List[PlanActivityTreeNode], selection: List[Plannable], max_tracks: int,
                         coarsen_log: List[CoarsenRecord]) -> List[Plannable]:
     """Greedy coarsening: iteratively replace densest sibling clusters with their parent until packing fits.
     Returns the final selection (list of Plannable).
-    """
-    # Build helper maps
-    by_id: Dict[str, PlanActivityTreeNode] = {n.id: n for t in top_nodes for n in iter_subtree(t)}
 
+    Each step only changes the children of the promoted parent and its own parent's cluster, so rather than
+    re-measuring and re-scoring everything after each step, the number of tracks needed is updated as items are
+    swapped (see TrackDepth) and clusters wait in a priority queue, re-scored only when their members change (see
+    SiblingCluster).
+    """
     current: List[Plannable] = list(selection)
-
-    while True:
-        tracks_needed = measure_tracks_needed(current)
-        if tracks_needed <= max_tracks:
-            return current
-        # Identify sibling clusters that exist in current selection
-        clusters: List[Tuple[PlanActivityTreeNode, List[PlanActivityTreeNode]]] = []  # (parent, children_present)
-        present_ids = {p.act_node.id for p in current}
-        # Consider parents that have ≥2 children present; more impact when coarsened
-        considered_parents: set[str] = set()
-        for p in current:
-            parent_node = p.act_node.parent
-
-            # If we are at the top of the tree we don't want to go any further
-            if not promotable(parent_node):
-                continue
-
-            children_present = [ch for ch in parent_node.children if ch.id in present_ids]
-            if len(children_present) >= 1:
-                clusters.append((parent_node, children_present))
-                considered_parents.add(parent_node.id)
-
-        if not clusters:
-            # Try promoting a single deepest item: pick the earliest-starting item's parent if exists
-            candidates = [by_id.get(p.act_node.parent) for p in current if p.act_node.parent.id in by_id]
-            candidates = [c for c in candidates if c is not None]
-            if not candidates:
-                return current  # cannot coarsen further
-            # Pick deterministically
-            parent_node = sorted(candidates, key=lambda n: (
-                n.act_node.activity.start_date,
-                -n.act_node.duration,
-                n.act_node.name.lower(),
-                n.act_node.id,
-            ))[0]
-            children_present = [ch for ch in parent_node.children if ch.act_node.id in present_ids]
-            clusters = [(parent_node, children_present)]
-
-        # Score clusters by overlap pressure
-        def cluster_score(item: Tuple[PlanActivityTreeNode, List[PlanActivityTreeNode]]) -> Tuple:
-            parent: PlanActivityTreeNode
-            children: List[PlanActivityTreeNode]
-
-            parent, children = item
-            total_days = sum(max(1, (c.activity.end_date - c.activity.start_date).days + 1) for c in children)
-            # Overlap proxy: number of pairwise overlaps among children
-            overlaps = 0
-            child_intervals = [(c.activity.start_date, c.activity.end_date + timedelta(days=1)) for c in children]
-            for i in range(len(child_intervals)):
-                for j in range(i+1, len(child_intervals)):
-                    a1, b1 = child_intervals[i]
-                    a2, b2 = child_intervals[j]
-                    if not (b1 <= a2 or b2 <= a1):
-                        overlaps += 1
-            return (
-                -(total_days * (1 + overlaps)),  # higher first
-                parent.activity.start_date,
-                -parent.activity.duration,
-                parent.name.lower(),
-                parent.activity.id,
-            )
-
-        clusters.sort(key=cluster_score)
-        best_parent, present_children = clusters[0]
+    if measure_tracks_needed(current) <= max_tracks:
+        return current
+
+    depth = TrackDepth(point for t in top_nodes for n in iter_subtree(t) for point in n.activity.interval())
+    present: Dict[str, Plannable] = {}
+    for p in current:
+        present[p.act_node.id] = p
+        depth.add(p.act_node.activity.interval(), 1)
+
+    # Sibling clusters present in the selection, keyed by parent id, and a queue of (score, version, parent id).
+    # Entries in the queue are ignored once the cluster has changed since it was scored.
+    clusters: Dict[str, SiblingCluster] = {}
+    versions: Dict[str, int] = {}
+    queue: List[Tuple[Tuple, int, str]] = []
+
+    def push(cluster: SiblingCluster):
+        versions[cluster.parent.id] = versions.get(cluster.parent.id, 0) + 1
+        heapq.heappush(queue, (cluster.score(), versions[cluster.parent.id], cluster.parent.id))
+
+    children_by_parent: Dict[str, List[PlanActivityTreeNode]] = {}
+    for p in current:
+        parent_node = p.act_node.parent
+        # If we are at the top of the tree we don't want to go any further
+        if promotable(parent_node):
+            children_by_parent.setdefault(parent_node.id, []).append(p.act_node)
+    for children in children_by_parent.values():
+        cluster = SiblingCluster(children[0].parent, children)
+        clusters[cluster.parent.id] = cluster
+        push(cluster)
+
+    while depth.tracks_needed() > max_tracks:
+        best_parent = None
+        while queue:
+            _score, version, parent_id = heapq.heappop(queue)
+            if version == versions[parent_id] and parent_id in clusters:
+                best_parent = clusters[parent_id].parent
+                break
+        if best_parent is None:
+            break  # cannot coarsen further
 
         # Replace children with parent in current selection
-        new_current: List[Plannable] = []
-        replaced_ids: List[str] = []
-        present_child_ids = {c.id for c in present_children}
-        for p in current:
-            if p.act_node.id in present_child_ids:
-                replaced_ids.append(p.act_node.id)
-                continue
-            new_current.append(p)
-        if best_parent.id not in {p.act_node.id for p in new_current}:
-            new_current.append(Plannable(best_parent))
+        present_children = clusters.pop(best_parent.id).members
+        for child_id, child_node in present_children.items():
+            depth.add(child_node.activity.interval(), -1)
+            del present[child_id]
+        if best_parent.id not in present:
+            present[best_parent.id] = Plannable(best_parent)
+            depth.add(best_parent.activity.interval(), 1)
+            grandparent = best_parent.parent
+            if promotable(grandparent):
+                if grandparent.id in clusters:
+                    clusters[grandparent.id].add(best_parent)
+                else:
+                    clusters[grandparent.id] = SiblingCluster(grandparent, [best_parent])
+                push(clusters[grandparent.id])
         # Log coarsen
-        coarsen_log.append(CoarsenRecord(parent_id=best_parent.id, replaced_children=sorted(replaced_ids)))
-        # Deterministic order
-        new_current.sort(key=lambda p: (
-            p.act_node.activity.start_date,
-            -p.act_node.activity.duration,
-            p.act_node.name.lower(),
-            p.act_node.id,
-        ))
-        current = new_current
+        coarsen_log.append(CoarsenRecord(parent_id=best_parent.id, replaced_children=sorted(present_children)))
+
+    # Deterministic order
+    return sorted(present.values(), key=plannable_sort_key)
 
 
 # -----------------------------
@@ -345,43 +468,33 @@ class Placement:
 
 
 def measure_tracks_needed(plannables: List[Plannable]) -> int:
-    """Greedy interval partitioning to count needed tracks (no affinity)."""
-    # Each track keeps the earliest time it becomes free
-    free_at: List[date] = []  # per track index (content tracks starting at 1 conceptually)
-    # Sort deterministically
-    ordered = sorted(plannables, key=lambda p: (
-        p.act_node.activity.start_date,
-        -p.act_node.activity.duration,
-        p.act_node.name.lower(),
-        p.act_node.id,
-    ))
-    for p in ordered:
-        s, e_excl = p.act_node.activity.interval()
-        # Find first track with free_at <= s
-        placed = False
-        for i in range(len(free_at)):
-            if free_at[i] <= s:
-                free_at[i] = e_excl
-                placed = True
-                break
-        if not placed:
-            free_at.append(e_excl)
+    """Greedy interval partitioning to count needed tracks (no affinity).
+
+    Items are taken in start order, each going on a track which has become free if there is one.  A min-heap of the
+    times at which each track becomes free means only the earliest needs checking.
+    """
+    free_at: List[date] = []  # heap of the time each track becomes free
+    for s, e_excl in sorted(p.act_node.activity.interval() for p in plannables):
+        if free_at and free_at[0] <= s:
+            heapq.heapreplace(free_at, e_excl)
+        else:
+            heapq.heappush(free_at, e_excl)
     return len(free_at)
 
 
 def pack_with_affinity(plannables: List[Plannable], label_midpoint: Optional[date]) -> Tuple[List[List[Placement]], int]:
     """Return tracks (index 1..N as list indices 0..N-1) and tracks_used.
     Track 0 (header) is NOT included here; caller can insert a None at index 0.
+
+    Tracks still in use are kept in a min-heap of when they become free, and free tracks in a min-heap of track index,
+    so finding the lowest free track doesn't mean checking every track.
     """
     # Sort deterministically
-    ordered = sorted(plannables, key=lambda p: (
-        p.act_node.activity.start_date,
-        -p.act_node.activity.duration,
-        p.act_node.name.lower(),
-        p.act_node.id,
-    ))
+    ordered = sorted(plannables, key=plannable_sort_key)
     # Track availability and last used by parent affinity
-    free_at: List[date] = []
+    busy: List[Tuple[date, int]] = []  # heap of (free at, track index) for tracks in use
+    free_tracks: List[int] = []  # heap of free track indices, which may include tracks taken since (see is_free)
+    is_free: List[bool] = []
     assignments: List[List[Placement]] = []
     parent_to_tracks: Dict[Optional[str], List[int]] = {}
 
@@ -395,30 +508,31 @@ def pack_with_affinity(plannables: List[Plannable], label_midpoint: Optional[dat
 
     for p in ordered:
         s, e_excl = p.act_node.activity.interval()
-        # Find all free tracks
-        free_tracks = [idx for idx, t in enumerate(free_at) if t <= s]
-        chosen_idx: Optional[int] = None
-        # Affinity: prefer a track previously used by this parent
+        # Items come in start order, so once a track is free it stays free until it is used again.
+        while busy and busy[0][0] <= s:
+            _free_at, idx = heapq.heappop(busy)
+            is_free[idx] = True
+            heapq.heappush(free_tracks, idx)
+
+        # Affinity: prefer a track previously used by this parent.  Every preferred track is at or after the first
+        # one the parent used, so the closest to it is the lowest free one.
         par = p.act_node.parent.id
-        preferred = parent_to_tracks.get(par, [])
-        preferred_free = [i for i in preferred if i in free_tracks]
+        preferred_free = [i for i in parent_to_tracks.get(par, []) if is_free[i]]
         if preferred_free:
-            # choose closest to the smallest preferred index (keeps siblings tight)
-            base = min(preferred)
-            chosen_idx = min(preferred_free, key=lambda i: abs(i - base))
-        elif free_tracks:
-            chosen_idx = min(free_tracks)
+            chosen_idx = min(preferred_free)
         else:
-            # Need a new track
-            chosen_idx = len(free_at)
-            free_at.append(date.min)  # placeholder; will set below
-            assignments.append([])
-        # Ensure assignments list long enough
-        while len(assignments) <= chosen_idx:
-            assignments.append([])
-            free_at.append(date.min)
+            while free_tracks and not is_free[free_tracks[0]]:
+                heapq.heappop(free_tracks)
+            if free_tracks:
+                chosen_idx = heapq.heappop(free_tracks)
+            else:
+                # Need a new track
+                chosen_idx = len(assignments)
+                assignments.append([])
+                is_free.append(False)
         # Place
-        free_at[chosen_idx] = e_excl
+        is_free[chosen_idx] = False
+        heapq.heappush(busy, (e_excl, chosen_idx))
         label_side = label_side_for(p.act_node.activity)
         placement = Placement(
             activity_id=p.act_node.id,
@@ -438,11 +552,95 @@ def pack_with_affinity(plannables: List[Plannable], label_midpoint: Optional[dat
     return assignments, tracks_used
 
 
+# -----------------------------
+# Laying out a lane
+# -----------------------------
+
+@dataclass
+class LaneLayout:
+    tracks: List[List[Placement]]
+    tracks_used: int
+    coarsened: List[CoarsenRecord]
+    excluded_missing_dates: List[str]
+
+
+def layout_lane(top_nodes: List[PlanActivityTreeNode], max_tracks: int, label_midpoint: Optional[date]) -> LaneLayout:
+    """Coarsen and pack one (non-milestone) lane.  Lanes don't depend on each other so can be laid out in any order."""
+    # Initial selection (leaves)
+    selection = initial_selection_for_lane(top_nodes)
+    # Drop items with missing dates (shouldn't happen with our dataclass, but keep hook)
+    sel = [p for p in selection if p.act_node.activity.start_date and p.act_node.activity.end_date]
+    missing = [p.act_node.id for p in selection if not (p.act_node.activity.start_date and p.act_node.activity.end_date)]
+
+    # Coarsen to fit
+    coarsened: List[CoarsenRecord] = []
+    final_sel = coarsen_until_fits(top_nodes, sel, max_tracks, coarsened)
+    # Pack with affinity
+    tracks, used = pack_with_affinity(final_sel, label_midpoint)
+    return LaneLayout(tracks=tracks, tracks_used=used, coarsened=coarsened, excluded_missing_dates=missing)
+
+
+@dataclass(frozen=True)
+class LaneSnapshot:
+    """The activities of a lane as plain values rather than model instances or tree nodes, so that the lane can be
+    laid out in another process (see layout_lane_snapshot()).
+    """
+    # (primary key, unique id, name, level, milestone flag, start date, end date) for every activity under the top
+    # nodes of the lane, in plan order.
+    activities: Tuple[Tuple, ...]
+    max_tracks: int
+    label_midpoint: Optional[date]
+
+    @classmethod
+    def from_top_nodes(cls, plan_tree: PlanTree, top_nodes: List[PlanActivityTreeNode], max_tracks: int,
+                       label_midpoint: Optional[date]) -> "LaneSnapshot":
+        # Each subtree is a slice of the plan, so putting the slices back in plan order gives a well formed plan.
+        subtrees = sorted(plan_tree.get_subtree_range(t.id) for t in top_nodes)
+        return cls(
+            activities=tuple(
+                (a.id, a.unique_sticky_activity_id, a.activity_name, a.level, a.milestone_flag, a.start_date, a.end_date)
+                for enter, exit_ in subtrees
+                for a in plan_tree.activities[enter:exit_]
+            ),
+            max_tracks=max_tracks,
+            label_midpoint=label_midpoint,
+        )
+
+
+def layout_lane_snapshot(snapshot: LaneSnapshot) -> LaneLayout:
+    """Lay out a lane from a snapshot, for running in a worker process.
+
+    The lane's activities are rebuilt as unsaved PlanActivity records (keeping their primary keys, which break ties
+    when scoring clusters) so that the layout is exactly the same as laying out the lane in the calling process.  The
+    placements returned don't include the activities, which the caller puts back (see build_initial_layout()).
+    """
+    activities = [
+        PlanActivity(
+            id=pk, unique_sticky_activity_id=unique_id, activity_name=name, level=level, milestone_flag=milestone_flag,
+            start_date=start_date, end_date=end_date, sequence_number=sequence_number,
+        )
+        for sequence_number, (pk, unique_id, name, level, milestone_flag, start_date, end_date)
+        in enumerate(snapshot.activities, start=1)
+    ]
+    plan_tree = PlanTree.from_activities(activities)
+    top_nodes = plan_tree.get_plan_tree_child_nodes_by_unique_id(PlanTree.ROOT_ID)
+    lane = layout_lane(top_nodes, snapshot.max_tracks, snapshot.label_midpoint)
+    lane.tracks = [[replace(placement, activity=None) for placement in track] for track in lane.tracks]
+    return lane
+
+
 # -----------------------------
 # Main entry point
 # -----------------------------
 
-def build_initial_layout(plan_tree: PlanTree, options: Optional[LayoutOptions] = None) -> dict:
+def build_initial_layout(plan_tree: PlanTree, options: Optional[LayoutOptions] = None,
+                         executor: Optional[Executor] = None) -> dict:
+    """
+    :param plan_tree:
+    :param options:
+    :param executor: If given, the lanes other than the milestones lane are laid out in parallel by submitting them to
+                     the executor (see layout_lane_snapshot()).  The layout is the same either way.
+    """
     activity_nodes = plan_tree.get_node_list()
     options = options or LayoutOptions()
 
@@ -463,11 +661,12 @@ def build_initial_layout(plan_tree: PlanTree, options: Optional[LayoutOptions] =
         seen: set[str] = set()
         members: List[PlanActivity] = []
         for t in top_nodes:
-            for n in iter_subtree(t):
-                if n.id in seen:
+            # Subtree is a slice of the plan in sequence order, the same order as walking the nodes.
+            for activity in plan_tree.get_plan_tree_subtree_activities_by_unique_id(t.id):
+                if activity.unique_sticky_activity_id in seen:
                     continue
-                seen.add(n.id)
-                members.append(n.activity)
+                seen.add(activity.unique_sticky_activity_id)
+                members.append(activity)
         return members
 
     # Label midpoint (timeline midpoint) for label side heuristic
@@ -517,31 +716,47 @@ def build_initial_layout(plan_tree: PlanTree, options: Optional[LayoutOptions] =
     lane_entries: List[Tuple[str, List[PlanActivityTreeNode]]] = lane_defs
 
     # Order lanes (after milestones) by median start of *selected* members
-    ordered_lane_entries: List[Tuple[str, List[PlanActivityTreeNode], date, List[Plannable]]] = []
+    ordered_lane_entries: List[Tuple[str, List[PlanActivityTreeNode], date, List[PlanActivity]]] = []
     for name, top_nodes in lane_entries:
-        # Initial selection (leaves)
-        selection = initial_selection_for_lane(top_nodes)
         # Median start based on member activities (all nodes under top_nodes)
         members = lane_members_from_top_nodes(top_nodes)
         med = median_start_date_of_members(members)
-        ordered_lane_entries.append((name, top_nodes, med, selection))
+        ordered_lane_entries.append((name, top_nodes, med, members))
 
     ordered_lane_entries.sort(key=lambda t: (t[2], t[0].lower()))
 
+    if executor is not None and len(ordered_lane_entries) > 1:
+        # Lanes are laid out in the workers but results are taken in lane order, so the layout doesn't depend on which
+        # lane finishes first.
+        futures = [
+            executor.submit(layout_lane_snapshot, LaneSnapshot.from_top_nodes(
+                plan_tree, top_nodes, options.max_tracks_per_lane, label_mid
+            ))
+            for _name, top_nodes, _med, _members in ordered_lane_entries
+        ]
+        lane_layouts = []
+        for future, (_name, _top_nodes, _med, members) in zip(futures, ordered_lane_entries):
+            lane = future.result()
+            activities_by_id = {a.unique_sticky_activity_id: a for a in members}
+            lane.tracks = [
+                [replace(placement, activity=activities_by_id[placement.activity_id]) for placement in track]
+                for track in lane.tracks
+            ]
+            lane_layouts.append(lane)
+    else:
+        lane_layouts = [
+            layout_lane(top_nodes, options.max_tracks_per_lane, label_mid)
+            for _name, top_nodes, _med, _members in ordered_lane_entries
+        ]
+
     notes_excluded: List[str] = []
     coarsen_records: List[CoarsenRecord] = []
 
     order_idx = 1  # 0 is milestones
-    for name, top_nodes, _med, selection in ordered_lane_entries:
-        # Drop items with missing dates (shouldn't happen with our dataclass, but keep hook)
-        sel = [p for p in selection if p.act_node.activity.start_date and p.act_node.activity.end_date]
-        missing = [p.act_node.id for p in selection if not (p.act_node.activity.start_date and p.act_node.activity.end_date)]
-        notes_excluded.extend(missing)
-
-        # Coarsen to fit
-        final_sel = coarsen_until_fits(top_nodes, sel, options.max_tracks_per_lane, coarsen_records)
-        # Pack with affinity
-        tracks, used = pack_with_affinity(final_sel, label_mid)
+    for (name, _top_nodes, _med, _members), lane in zip(ordered_lane_entries, lane_layouts):
+        notes_excluded.extend(lane.excluded_missing_dates)
+        coarsen_records.extend(lane.coarsened)
+        tracks, used = lane.tracks, lane.tracks_used
         # Build tracks list with reserved header
         tracks_list: List[Optional[List[dict]]] = [None] if options.reserve_track_zero else []
         for idx, track in enumerate(tracks, start=1):
@@ -657,3 +872,36 @@ class LayoutTests(TestCase):
         alpha_lane = next(l for l in lay["lanes"] if l["name"] == "Alpha")
         self.assertIn("overflow", alpha_lane)
 
+
+    def test_incremental_measures_match_packing(self):
+        nodes = [n for n in self.plan_tree.get_node_list() if not n.activity.milestone_flag]
+        plannables = [Plannable(n) for n in nodes]
+        intervals = [n.activity.interval() for n in nodes]
+
+        depth = TrackDepth(point for interval in intervals for point in interval)
+        for interval in intervals:
+            depth.add(interval, 1)
+        _tracks, tracks_used = pack_with_affinity(plannables, None)
+        self.assertEqual(tracks_used, measure_tracks_needed(plannables))
+        self.assertEqual(tracks_used, depth.tracks_needed())
+
+        # Taking out the children of Alpha leaves Alpha overlapping only with Beta and its children.
+        for interval in intervals[1:4]:
+            depth.add(interval, -1)
+        self.assertEqual(measure_tracks_needed([plannables[0]] + plannables[4:]), depth.tracks_needed())
+
+        brute_force = sum(
+            1 for i in range(len(intervals)) for j in range(i + 1, len(intervals))
+            if not (intervals[i][1] <= intervals[j][0] or intervals[j][1] <= intervals[i][0])
+        )
+        self.assertEqual(brute_force, count_overlapping_pairs(intervals))
+
+    def test_cluster_score_kept_up_to_date(self):
+        alpha = self.plan_tree.get_plan_tree_node_by_unique_id("A")
+        beta_children = self.plan_tree.get_plan_tree_child_nodes_by_unique_id("B")
+
+        cluster = SiblingCluster(alpha, beta_children[:1])
+        for child in beta_children[1:]:
+            cluster.score()
+            cluster.add(child)
+        self.assertEqual(SiblingCluster(alpha, beta_children).score(), cluster.score())
@@ -74,6 +74,11 @@ class PlotableShapeName(Enum):
         self.label = label
         self.cls = cls        # associated behaviour class
 
+    def __reduce_ex__(self, protocol):
+        # Enum pickles members by value, but as the value is replaced in __init__ it can't be used to look the member
+        # up again, so pickle by name instead (needed to pass plotables to the PowerPoint export worker processes).
+        return getattr, (self.__class__, self._name_)
+
     @property
     def id(self):
         return self._id
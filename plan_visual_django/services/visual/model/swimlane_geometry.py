@@ -0,0 +1,194 @@
+"""
+Vertical geometry of the swimlanes in a visual.
+
+The top of a swimlane depends upon the height of every visible swimlane above it, and the height of a swimlane depends
+upon the highest track used by any of its activities.  Working this out from scratch for each swimlane and then again
+for each activity (to find the top of its track) made rendering quadratic in the number of swimlanes, multiplied by the
+number of activities.
+
+SwimlaneGeometry works out the height of each swimlane once, then keeps a running (prefix) sum of heights and gaps down
+the visual so that the top of any swimlane or track is a simple lookup.
+
+A geometry is only valid until a swimlane, activity, timeline or the visual itself changes, so each one records the
+generation of the visual it was built from.  The generation for a visual is bumped by signal handlers whenever any of
+those records are saved or deleted (see plan_visual_django/signals.py).
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+# Generation counter for each visual (keyed by visual id).  Only needs to be in-process, as geometries are only ever
+# held on model instances for the duration of a request.
+_geometry_generations: Dict[int, int] = {}
+
+
+def get_swimlane_geometry_generation(visual_id: int) -> int:
+    return _geometry_generations.get(visual_id, 0)
+
+
+def invalidate_swimlane_geometry(visual_id: int):
+    """
+    Marks any swimlane geometry already calculated for the given visual as out of date.
+
+    :param visual_id:
+    :return:
+    """
+    _geometry_generations[visual_id] = get_swimlane_geometry_generation(visual_id) + 1
+
+
+class SwimlaneGeometry:
+    """
+    Table of tops and heights for every swimlane in a visual, built in one pass down the swimlanes.
+
+    Swimlanes which have no enabled activities aren't visible and take up no space, but still have a top (the position
+    they would be plotted at) so that they can be looked up in the same way as visible ones.
+    """
+    def __init__(
+            self,
+            swimlanes: Iterable,
+            max_tracks: Dict[int, float],
+            swimlane_area_top: float,
+            track_height: float,
+            track_gap: float,
+            swimlane_gap: float,
+            generation: int = 0,
+    ):
+        """
+        :param swimlanes: SwimlaneForVisual records for the visual, in sequence number order.
+        :param max_tracks: Highest track used by enabled activities, keyed by swimlane id.  Swimlanes with no enabled
+                           activities should be omitted.
+        :param swimlane_area_top: Top of the first swimlane (i.e. the height of the timelines plus the gap below them).
+        :param track_height:
+        :param track_gap:
+        :param swimlane_gap:
+        :param generation: Generation of the visual at the point the geometry was calculated.
+        """
+        self.swimlane_area_top = swimlane_area_top
+        self.track_height = track_height
+        self.track_gap = track_gap
+        self.swimlane_gap = swimlane_gap
+        self.generation = generation
+
+        self.swimlanes = list(swimlanes)
+        self.visible_swimlanes = [swimlane for swimlane in self.swimlanes if swimlane.id in max_tracks]
+
+        # prefix_heights[k] is the total height of the first k visible swimlanes, not including gaps.
+        self.visible_sequence_numbers = [swimlane.sequence_number for swimlane in self.visible_swimlanes]
+        self.prefix_heights = [0]
+        for swimlane in self.visible_swimlanes:
+            self.prefix_heights.append(self.prefix_heights[-1] + self.get_height_of_tracks(max_tracks[swimlane.id]))
+
+        self.tops_and_heights: Dict[int, Tuple[float, float]] = {}
+        for swimlane in self.swimlanes:
+            num_previous = self._num_visible_before(swimlane.sequence_number)
+            previous_area_height = self.get_swimlane_area_height(num_previous)
+
+            # If height of all previous swimlanes is zero then this is the first visible swimlane so don't add a gap.
+            gap = 0 if previous_area_height == 0 else self.swimlane_gap
+            top = self.swimlane_area_top + previous_area_height + gap
+            height = self.get_height_of_tracks(max_tracks.get(swimlane.id, 0))
+            self.tops_and_heights[swimlane.id] = (top, height)
+
+    @classmethod
+    def from_records(cls, visual, swimlanes, visual_activities, timelines_height, generation=0):
+        """
+        Builds geometry from records which have already been loaded, so doesn't access the database.
+
+        :param visual: PlanVisual (only used for its layout settings).
+        :param swimlanes: All the swimlanes for the visual in sequence number order.
+        :param visual_activities: Enabled activities for the visual.
+        :param timelines_height: Height of all enabled timelines including gaps.
+        :param generation:
+        :return:
+        """
+        max_tracks = {}
+        for activity in visual_activities:
+            highest_track = activity.get_highest_track_number()
+            if activity.swimlane_id not in max_tracks or highest_track > max_tracks[activity.swimlane_id]:
+                max_tracks[activity.swimlane_id] = highest_track
+
+        return cls(
+            swimlanes,
+            max_tracks,
+            timelines_height + visual.timeline_to_swimlane_gap,
+            visual.track_height,
+            visual.track_gap,
+            visual.swimlane_gap,
+            generation=generation,
+        )
+
+    @classmethod
+    def for_visual(cls, visual):
+        """
+        Builds geometry for a visual from the database, using a fixed number of queries.
+
+        :param visual: PlanVisual
+        :return:
+        """
+        generation = get_swimlane_geometry_generation(visual.id)
+        swimlanes = list(visual.swimlaneforvisual_set.all())
+
+        max_tracks = {}
+        track_data = visual.visualactivity_set.filter(enabled=True).values_list(
+            'swimlane_id', 'vertical_positioning_value', 'height_in_tracks'
+        )
+        for swimlane_id, vertical_positioning_value, height_in_tracks in track_data:
+            highest_track = vertical_positioning_value + height_in_tracks - 1
+            if swimlane_id not in max_tracks or highest_track > max_tracks[swimlane_id]:
+                max_tracks[swimlane_id] = highest_track
+
+        return cls(
+            swimlanes,
+            max_tracks,
+            visual.get_timelines_height() + visual.timeline_to_swimlane_gap,
+            visual.track_height,
+            visual.track_gap,
+            visual.swimlane_gap,
+            generation=generation,
+        )
+
+    def _num_visible_before(self, sequence_number) -> int:
+        return bisect_left(self.visible_sequence_numbers, sequence_number)
+
+    def get_height_of_tracks(self, num_tracks: float) -> float:
+        return num_tracks * self.track_height + max(0, num_tracks - 1) * self.track_gap
+
+    def get_swimlane_area_height(self, num_swimlanes: int) -> float:
+        """
+        Height of the area covered by the first num_swimlanes visible swimlanes, including the gaps between them but
+        not after the last one.
+        """
+        return self.prefix_heights[num_swimlanes] + max(0, num_swimlanes - 1) * self.swimlane_gap
+
+    def get_swimlane_area_dimensions(self, sequence_number=None) -> Tuple[float, float, float]:
+        """
+        Returns top, left and height of the area containing the visible swimlanes, or just those with a sequence number
+        less than the one given.  Width isn't included as it isn't a property of the swimlanes.
+        """
+        if sequence_number:
+            num_swimlanes = self._num_visible_before(sequence_number)
+        else:
+            num_swimlanes = len(self.visible_swimlanes)
+
+        return self.swimlane_area_top, 0, self.get_swimlane_area_height(num_swimlanes)
+
+    def get_visible_swimlanes(self, sequence_number=None) -> List:
+        if sequence_number:
+            return self.visible_swimlanes[:self._num_visible_before(sequence_number)]
+        return self.visible_swimlanes
+
+    def get_swimlane_top(self, swimlane_id: int) -> float:
+        top, _ = self.tops_and_heights[swimlane_id]
+        return top
+
+    def get_swimlane_height(self, swimlane_id: int) -> float:
+        _, height = self.tops_and_heights[swimlane_id]
+        return height
+
+    def get_top_of_track(self, swimlane_id: int, track_number: float) -> float:
+        """
+        The top of a track in a swimlane is the top of the swimlane, plus the height of all the previous tracks, plus
+        the track gap if this isn't the first track in the swimlane.
+        """
+        additional_gap = 0 if track_number == 1 else self.track_gap
+
+        return self.get_swimlane_top(swimlane_id) + self.get_height_of_tracks(track_number - 1) + additional_gap
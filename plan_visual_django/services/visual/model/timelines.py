@@ -63,6 +63,22 @@ class Timeline(VisualElementCollection):
             return YearTimeline(start_date, end_date, timeline)
         return None
 
+    @staticmethod
+    def calculate_period_coordinates(date_plotter: DatePlotter, periods: [(date, date)]) -> ([float], [float]):
+        """
+        Calculates left and width for all the periods of a timeline in one go using the batch calculation in the
+        DatePlotter.
+
+        :param date_plotter:
+        :param periods: List of tuples of start and end date for each period in the timeline.
+        :return: List of left values and list of width values, one for each period.
+        """
+        left, width, _ = date_plotter.batch_coordinates(
+            [period_start_date.toordinal() for period_start_date, _ in periods],
+            [period_end_date.toordinal() for _, period_end_date in periods],
+        )
+        return left.tolist(), width.tolist()
+
 
 class MonthTimeline(Timeline):
     def __init__(self, start_date: datetime.date, end_date: datetime.date, timeline_record):
@@ -80,15 +96,21 @@ class MonthTimeline(Timeline):
         date_plotter = DatePlotter(self.visual_start_date, self.visual_end_date, x_plot_start, x_plot_end)
 
         num_periods = num_months_between_dates(self.visual_start_date, self.visual_end_date)
+        periods = []
         for period_num in range(0, num_periods):
             period_start_date = month_increment(self.visual_start_date, period_num)
             period_end_date = last_day_of_month(period_start_date)
+            periods.append((period_start_date, period_end_date))
+
+        lefts, widths = self.calculate_period_coordinates(date_plotter, periods)
+
+        for period_num, (period_start_date, period_end_date) in enumerate(periods):
 
             # ToDo: Implement settings to specify format of month text
             text = period_start_date.strftime("%b-%y")
 
-            left = date_plotter.left(period_start_date)
-            width = date_plotter.width(period_start_date, period_end_date)
+            left = lefts[period_num]
+            width = widths[period_num]
 
             height = self.timeline_record.timeline_height
 
@@ -161,15 +183,21 @@ class HalfYearTimeline(Timeline):
         date_plotter = DatePlotter(self.visual_start_date, self.visual_end_date, x_plot_start, x_plot_end)
 
         num_periods = num_months_between_dates(self.visual_start_date, self.visual_end_date) // 6
+        periods = []
         for period_num in range(0, num_periods):
             period_start_date = month_increment(self.visual_start_date, period_num * 6)
             period_end_date = last_day_of_month(month_increment(period_start_date, 6-1))
+            periods.append((period_start_date, period_end_date))
+
+        lefts, widths = self.calculate_period_coordinates(date_plotter, periods)
+
+        for period_num, (period_start_date, period_end_date) in enumerate(periods):
 
             # ToDo: Implement settings to specify format of month text
             text = f'{period_start_date.strftime("%b-%y")} - {period_end_date.strftime("%b-%y")}'
 
-            left = date_plotter.left(period_start_date)
-            width = date_plotter.width(period_start_date, period_end_date)
+            left = lefts[period_num]
+            width = widths[period_num]
 
             height = self.timeline_record.timeline_height
 
@@ -255,15 +283,21 @@ class YearTimeline(Timeline):
         date_plotter = DatePlotter(self.visual_start_date, self.visual_end_date, x_plot_start, x_plot_end)
 
         num_periods = num_months_between_dates(self.visual_start_date, self.visual_end_date) // 12
+        periods = []
         for period_num in range(0, num_periods):
             period_start_date = month_increment(self.visual_start_date, period_num * 12)
             period_end_date = last_day_of_month(month_increment(period_start_date, 12-1))
+            periods.append((period_start_date, period_end_date))
+
+        lefts, widths = self.calculate_period_coordinates(date_plotter, periods)
+
+        for period_num, (period_start_date, period_end_date) in enumerate(periods):
 
             # ToDo: Implement settings to specify format of month text
             text = f'{period_start_date.strftime("%Y")}'
 
-            left = date_plotter.left(period_start_date)
-            width = date_plotter.width(period_start_date, period_end_date)
+            left = lefts[period_num]
+            width = widths[period_num]
 
             height = self.timeline_record.timeline_height
 
@@ -334,15 +368,21 @@ class QuarterTimeline(Timeline):
         date_plotter = DatePlotter(self.visual_start_date, self.visual_end_date, x_plot_start, x_plot_end)
 
         num_periods = num_months_between_dates(self.visual_start_date, self.visual_end_date) // 3
+        periods = []
         for period_num in range(0, num_periods):
             period_start_date = month_increment(self.visual_start_date, period_num * 3)
             period_end_date = last_day_of_month(month_increment(period_start_date, 3-1))
+            periods.append((period_start_date, period_end_date))
+
+        lefts, widths = self.calculate_period_coordinates(date_plotter, periods)
+
+        for period_num, (period_start_date, period_end_date) in enumerate(periods):
 
             # ToDo: Implement settings to specify format of month text
             text = f'{period_start_date.strftime("%b-%y")} - {period_end_date.strftime("%b-%y")}'
 
-            left = date_plotter.left(period_start_date)
-            width = date_plotter.width(period_start_date, period_end_date)
+            left = lefts[period_num]
+            width = widths[period_num]
 
             height = self.timeline_record.timeline_height
 
@@ -0,0 +1,235 @@
+"""
+Compact storage for large numbers of plotables.
+
+A RectangleBasedPlotable is a full Python object with its own attribute dictionary, a reference to a PlotableStyle
+and boxed floats for its position and size.  For a visual with tens of thousands of shapes that adds up to a lot of
+memory, and working out the bounds of the visual means calling four methods on every plotable.
+
+A PlotableStore holds the same information as a collection of RectangleBasedPlotables, but column by column:
+- top, left, width and height are held in arrays of doubles, so bounds can be calculated with vector min/max.
+- Styles are interned - each distinct style is held once and each row holds an index into the style table.
+- Plotable ids and text are held in a string table, which is a single buffer of UTF-8 encoded text plus an array of
+  offsets into it, so there is no separate Python string object for each id or piece of text.  Each row holds an index
+  into the table.
+- Shape, text alignment and text flow are held in a small value table in the same way.
+
+The store is iterable and indexable, yielding a PlotableRow for each plotable.  A PlotableRow is a lightweight view
+onto one row of the store which behaves like a RectangleBasedPlotable, so renderers and anything else which uses the
+Plotable accessors work unchanged.
+"""
+from array import array
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from plan_visual_django.services.visual.model.plotable_shapes import PlotableShapeName
+from plan_visual_django.services.visual.rendering.plotables import RectangleBasedPlotable
+
+
+class PlotableStore:
+    def __init__(self):
+        # Geometry columns
+        self._top = array('d')
+        self._left = array('d')
+        self._width = array('d')
+        self._height = array('d')
+
+        # Columns of indexes into the tables below
+        self._plotable_id_indexes = array('i')
+        self._text_indexes = array('i')
+        self._style_indexes = array('i')
+        self._shape_indexes = array('h')
+        self._text_vertical_alignment_indexes = array('h')
+        self._text_flow_indexes = array('h')
+        self._external_text_flags = array('b')
+
+        self._string_data = bytearray()
+        self._string_offsets = array('q', [0])
+        self._styles: List[Any] = []
+        self._style_index: Dict[Any, int] = {}
+        self._values: List[Any] = []
+        self._value_index: Dict[Tuple[type, Hashable], int] = {}
+
+    @staticmethod
+    def _intern(value, table: List, index: Dict, key=None) -> int:
+        key = value if key is None else key
+        position = index.get(key)
+        if position is None:
+            position = len(table)
+            table.append(value)
+            index[key] = position
+        return position
+
+    def _add_string(self, value: Optional[str]) -> int:
+        """
+        Adds a string to the string table.  None is represented by an index of -1.
+
+        :return: Index of the string in the string table.
+        """
+        if value is None:
+            return -1
+        self._string_data += value.encode()
+        self._string_offsets.append(len(self._string_data))
+        return len(self._string_offsets) - 2
+
+    def get_string(self, index: int) -> Optional[str]:
+        if index == -1:
+            return None
+        return self._string_data[self._string_offsets[index]:self._string_offsets[index + 1]].decode()
+
+    def _intern_style(self, style) -> int:
+        # Styles are keyed on their id where they have one, so that different instances of the same style share an
+        # entry.
+        style_key = (type(style), getattr(style, 'id', None) or id(style))
+        return self._intern(style, self._styles, self._style_index, key=style_key)
+
+    def _intern_value(self, value) -> int:
+        # Keyed on type as well as value so that (for example) an enum member and the equal plain string are kept
+        # distinct.
+        return self._intern(value, self._values, self._value_index, key=(type(value), value))
+
+    def append(
+            self,
+            plotable_id: str,
+            plotable_shape_name: PlotableShapeName,
+            top: float,
+            left: float,
+            width: float,
+            height: float,
+            format,
+            text_vertical_alignment,
+            text_flow,
+            text: str,
+            external_text_flag: bool
+    ) -> int:
+        """
+        Adds a plotable to the store.  Takes the same arguments as get_plotable().
+
+        :return: Index of the new row.
+        """
+        self._top.append(top)
+        self._left.append(left)
+        self._width.append(width)
+        self._height.append(height)
+
+        self._plotable_id_indexes.append(self._add_string(plotable_id))
+        self._text_indexes.append(self._add_string(text))
+        self._style_indexes.append(self._intern_style(format))
+        self._shape_indexes.append(self._intern_value(plotable_shape_name))
+        self._text_vertical_alignment_indexes.append(self._intern_value(text_vertical_alignment))
+        self._text_flow_indexes.append(self._intern_value(text_flow))
+        self._external_text_flags.append(1 if external_text_flag else 0)
+
+        return len(self._top) - 1
+
+    def append_plotable(self, plotable: RectangleBasedPlotable) -> int:
+        return self.append(
+            plotable.plotable_id,
+            plotable.shape,
+            top=plotable.top,
+            left=plotable.left,
+            width=plotable.width,
+            height=plotable.height,
+            format=plotable.format,
+            text_vertical_alignment=plotable.text_vertical_alignment,
+            text_flow=plotable.text_flow,
+            text=plotable.text,
+            external_text_flag=plotable.external_text_flag
+        )
+
+    def __len__(self):
+        return len(self._top)
+
+    def __getitem__(self, index: int) -> "PlotableRow":
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Plotable index {index} out of range")
+        return PlotableRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PlotableRow(self, index)
+
+    def get_bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Calculates the enclosing rectangle of all the plotables in the store.
+
+        Right and bottom are calculated as left + width and top + height for each row, exactly as
+        RectangleBasedPlotable.get_right() and get_bottom() do, before taking the maximum.
+
+        :return: (min_left, min_top, max_right, max_bottom), or None if the store is empty.
+        """
+        if len(self) == 0:
+            return None
+
+        top = np.frombuffer(self._top, dtype=np.float64)
+        left = np.frombuffer(self._left, dtype=np.float64)
+        width = np.frombuffer(self._width, dtype=np.float64)
+        height = np.frombuffer(self._height, dtype=np.float64)
+
+        return (
+            float(left.min()),
+            float(top.min()),
+            float((left + width).max()),
+            float((top + height).max()),
+        )
+
+
+class PlotableRow(RectangleBasedPlotable):
+    """
+    View onto a single plotable in a PlotableStore.  Provides the same attributes and methods as a
+    RectangleBasedPlotable but reads everything from the store, so is cheap to create and holds no data of its own.
+    """
+    # These are constants used when rendering.  Fixed for all rows in a store.
+    inside_text_margin = 5
+    outside_text_margin = 5
+
+    def __init__(self, store: PlotableStore, index: int):
+        # Deliberately doesn't call super().__init__() as all the attributes are read from the store.
+        self._store = store
+        self._index = index
+
+    @property
+    def plotable_id(self) -> str:
+        return self._store.get_string(self._store._plotable_id_indexes[self._index])
+
+    @property
+    def shape(self) -> PlotableShapeName:
+        return self._store._values[self._store._shape_indexes[self._index]]
+
+    @property
+    def top(self) -> float:
+        return self._store._top[self._index]
+
+    @property
+    def left(self) -> float:
+        return self._store._left[self._index]
+
+    @property
+    def width(self) -> float:
+        return self._store._width[self._index]
+
+    @property
+    def height(self) -> float:
+        return self._store._height[self._index]
+
+    @property
+    def format(self):
+        return self._store._styles[self._store._style_indexes[self._index]]
+
+    @property
+    def text_vertical_alignment(self):
+        return self._store._values[self._store._text_vertical_alignment_indexes[self._index]]
+
+    @property
+    def text_flow(self):
+        return self._store._values[self._store._text_flow_indexes[self._index]]
+
+    @property
+    def text(self) -> str:
+        return self._store.get_string(self._store._text_indexes[self._index])
+
+    @property
+    def external_text_flag(self) -> bool:
+        return self._store._external_text_flags[self._index] == 1
@@ -0,0 +1,245 @@
+"""
+Compact binary format for rendered canvas output.
+
+The JSON output from CanvasRenderer repeats the same keys (shape_plot_dims, fill_color, stroke_color etc.) and the same
+color strings for every object.  The binary format holds the same information column by column:
+- Geometry is held as arrays of float32.
+- Colors are held once in a palette, with each object holding a uint16 index into it.
+- Every other string (plotable ids, shape names, text, alignment) is held once in a string table, with each object
+  holding a uint32 index into it.
+
+Decoding gives the same structure as the JSON output, except that coordinates have float32 precision, which is far
+more than is needed to plot on a canvas.  The matching browser decoder is decode_canvas_binary() in ui_src/drawing.ts.
+
+Layout (all values little endian, every section starts on a 4 byte boundary):
+
+Header
+    4 bytes  magic "PVCB"
+    uint16   version
+    uint16   number of layers
+    uint32   number of strings
+    uint32   number of palette colors
+String table
+    uint32   offsets[number of strings + 1] - start of each string within the text block, plus end of the last one
+    bytes    text block - UTF-8 encoded strings, one after another
+Palette
+    uint32   string index of each color
+For each layer
+    uint32   string index of layer name, number of shapes, number of text objects, (reserved)
+    Shapes:  float32 top[], left[], width[], height[], line_width[]
+             uint32  plotable_id[], shape_name[]
+             uint16  fill_color[], stroke_color[]
+    Text:    float32 x[], y[], font_size[]
+             uint32  plotable_id[], text[], text_align[], text_baseline[]
+             uint16  font_color[]
+    uint8    kind[] - 0 for a shape, 1 for text, giving the order the shapes and text objects are plotted in.
+
+A string index of 0xFFFFFFFF represents None.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+CANVAS_BINARY_MEDIA_TYPE = "application/vnd.plan-visualiser.canvas"
+CANVAS_BINARY_MAGIC = b"PVCB"
+CANVAS_BINARY_VERSION = 1
+
+NULL_STRING_INDEX = 0xFFFFFFFF
+SHAPE_KIND = 0
+TEXT_KIND = 1
+
+_HEADER_DTYPE = np.dtype([
+    ("magic", "S4"), ("version", "<u2"), ("num_layers", "<u2"), ("num_strings", "<u4"), ("num_colors", "<u4")
+])
+_LAYER_HEADER_DTYPE = np.dtype("<u4")
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NULL_STRING_INDEX
+        position = self.index.get(value)
+        if position is None:
+            position = len(self.strings)
+            self.strings.append(value)
+            self.index[value] = position
+        return position
+
+
+def _padded(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 4)
+
+
+def encode_canvas_binary(rendered: Dict[str, List[Dict[str, Any]]]) -> bytes:
+    """
+    Encodes output from CanvasRenderer.render_from_iterable() in the binary format.
+
+    :param rendered: Dictionary of layer name -> list of canvas objects.
+    :return:
+    """
+    strings = _StringTable()
+    palette: List[int] = []
+    palette_index: Dict[str, int] = {}
+
+    def color_index(color: str) -> int:
+        position = palette_index.get(color)
+        if position is None:
+            position = len(palette)
+            if position > 0xFFFF:
+                raise ValueError("Too many distinct colors for binary canvas format")
+            palette.append(strings.add(color))
+            palette_index[color] = position
+        return position
+
+    layer_sections = []
+    for layer_name, canvas_objects in rendered.items():
+        shapes = [canvas_object for canvas_object in canvas_objects if canvas_object["shape_type"] != "text"]
+        texts = [canvas_object for canvas_object in canvas_objects if canvas_object["shape_type"] == "text"]
+
+        section = [
+            np.array([strings.add(layer_name), len(shapes), len(texts), 0], dtype="<u4").tobytes(),
+
+            np.array([
+                [shape["shape_plot_dims"][dimension] for shape in shapes]
+                for dimension in ("top", "left", "width", "height")
+            ] + [[shape["stoke_line_width"] for shape in shapes]], dtype="<f4").tobytes(),
+            np.array([
+                [strings.add(shape["plotable_id"]) for shape in shapes],
+                [strings.add(shape["shape_name"]) for shape in shapes],
+            ], dtype="<u4").tobytes(),
+            _padded(np.array([
+                [color_index(shape["fill_color"]) for shape in shapes],
+                [color_index(shape["stroke_color"]) for shape in shapes],
+            ], dtype="<u2").tobytes()),
+
+            np.array([
+                [text["shape_plot_dims"]["x"] for text in texts],
+                [text["shape_plot_dims"]["y"] for text in texts],
+                [text["font_size"] for text in texts],
+            ], dtype="<f4").tobytes(),
+            np.array([
+                [strings.add(text["plotable_id"]) for text in texts],
+                [strings.add(text["text"]) for text in texts],
+                [strings.add(text["shape_plot_dims"]["text_align"]) for text in texts],
+                [strings.add(text["shape_plot_dims"]["text_baseline"]) for text in texts],
+            ], dtype="<u4").tobytes(),
+            _padded(np.array([color_index(text["fill_color"]) for text in texts], dtype="<u2").tobytes()),
+
+            _padded(np.array([
+                TEXT_KIND if canvas_object["shape_type"] == "text" else SHAPE_KIND for canvas_object in canvas_objects
+            ], dtype="u1").tobytes()),
+        ]
+        layer_sections.append(b"".join(section))
+
+    encoded_strings = [string.encode() for string in strings.strings]
+    offsets = np.cumsum([0] + [len(encoded) for encoded in encoded_strings], dtype="<u4")
+
+    header = np.array(
+        [(CANVAS_BINARY_MAGIC, CANVAS_BINARY_VERSION, len(rendered), len(strings.strings), len(palette))],
+        dtype=_HEADER_DTYPE
+    )
+
+    return b"".join([
+        header.tobytes(),
+        offsets.astype("<u4").tobytes(),
+        _padded(b"".join(encoded_strings)),
+        np.array(palette, dtype="<u4").tobytes(),
+        *layer_sections,
+    ])
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+
+    def read(self, dtype, count: int) -> np.ndarray:
+        values = np.frombuffer(self.data, dtype=dtype, count=count, offset=self.position)
+        self.position += values.nbytes
+        self.position += -self.position % 4
+        return values
+
+    def read_bytes(self, length: int) -> bytes:
+        values = self.data[self.position:self.position + length]
+        self.position += length + (-length % 4)
+        return values
+
+
+def decode_canvas_binary(data: bytes) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Decodes the binary format back into the same structure as the output from CanvasRenderer.render_from_iterable().
+    Mainly for testing, as decoding is normally done in the browser.
+
+    :param data:
+    :return:
+    """
+    reader = _Reader(data)
+    header = reader.read(_HEADER_DTYPE, 1)[0]
+    if header["magic"] != CANVAS_BINARY_MAGIC:
+        raise ValueError("Not a binary canvas payload")
+    if header["version"] != CANVAS_BINARY_VERSION:
+        raise ValueError(f"Unsupported binary canvas version {header['version']}")
+
+    offsets = reader.read("<u4", int(header["num_strings"]) + 1)
+    text_block = reader.read_bytes(int(offsets[-1]))
+    strings = [text_block[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+
+    def string(index) -> Optional[str]:
+        return None if index == NULL_STRING_INDEX else strings[index]
+
+    palette = [strings[index] for index in reader.read("<u4", int(header["num_colors"]))]
+
+    rendered = {}
+    for _ in range(int(header["num_layers"])):
+        name_index, num_shapes, num_texts, _reserved = (int(value) for value in reader.read("<u4", 4))
+
+        top, left, width, height, line_width = reader.read("<f4", 5 * num_shapes).reshape(5, num_shapes).tolist()
+        shape_ids, shape_names = reader.read("<u4", 2 * num_shapes).reshape(2, num_shapes).tolist()
+        fill_colors, stroke_colors = reader.read("<u2", 2 * num_shapes).reshape(2, num_shapes).tolist()
+
+        x, y, font_size = reader.read("<f4", 3 * num_texts).reshape(3, num_texts).tolist()
+        text_ids, texts, text_aligns, text_baselines = reader.read("<u4", 4 * num_texts).reshape(4, num_texts).tolist()
+        font_colors = reader.read("<u2", num_texts).tolist()
+
+        kinds = reader.read("u1", num_shapes + num_texts)
+
+        layer = []
+        shape_number = 0
+        text_number = 0
+        for kind in kinds:
+            if kind == SHAPE_KIND:
+                i = shape_number
+                shape_number += 1
+                layer.append({
+                    "plotable_id": string(shape_ids[i]),
+                    "shape_type": "rectangle",
+                    "shape_name": string(shape_names[i]),
+                    "shape_plot_dims": {"top": top[i], "left": left[i], "width": width[i], "height": height[i]},
+                    "fill_color": palette[fill_colors[i]],
+                    "stroke_color": palette[stroke_colors[i]],
+                    "stoke_line_width": line_width[i],
+                })
+            else:
+                i = text_number
+                text_number += 1
+                layer.append({
+                    "plotable_id": string(text_ids[i]),
+                    "shape_type": "text",
+                    "text": string(texts[i]),
+                    "shape_name": None,
+                    "shape_plot_dims": {
+                        "x": x[i],
+                        "y": y[i],
+                        "text_align": string(text_aligns[i]),
+                        "text_baseline": string(text_baselines[i]),
+                    },
+                    "fill_color": palette[font_colors[i]],
+                    "font_size": font_size[i],
+                })
+        rendered[strings[name_index]] = layer
+
+    return rendered
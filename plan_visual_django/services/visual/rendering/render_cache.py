@@ -0,0 +1,233 @@
+"""
+Server side cache of rendered visuals.
+
+Rendering a visual for the browser means calculating every plotable, which is wasted effort when nothing has changed
+since the last time the visual was requested (e.g. when the user refreshes the page).
+
+Each PlanVisual has a render_revision which is incremented by signal handlers (see plan_visual_django/signals.py)
+whenever anything which affects how the visual is rendered is saved or deleted.  Rendered output is cached against the
+visual id and revision, so a change to the visual automatically means that the old output is no longer used, and it
+will eventually be evicted from the cache.
+
+The cache used is the Django cache with alias "rendered_visuals", so the backend (local memory, file based or
+database table) and the maximum number of entries are configured through the CACHES setting.  If no cache of that name
+is configured the default cache is used.
+
+NOTE: Revisions are only incremented when records are saved or deleted through the ORM in the normal way.  Any code
+which changes records using QuerySet.update() or bulk_create()/bulk_update() needs to call bump_render_revision()
+itself.  Code which deletes many records through the ORM (which sends a signal for every record) can use
+deferred_render_revision_bumps() so that each visual's revision is only incremented once.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from django.core.cache import caches, InvalidCacheBackendError
+from django.db.models import F, Q
+
+logger = logging.getLogger(__name__)
+
+RENDERED_VISUAL_CACHE_ALIAS = "rendered_visuals"
+RENDER_CACHE_HITS_KEY = "rendered-visual-stats:hits"
+RENDER_CACHE_MISSES_KEY = "rendered-visual-stats:misses"
+
+
+def get_render_cache():
+    try:
+        return caches[RENDERED_VISUAL_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def make_render_cache_key(visual_id: int, revision: int, layer: str) -> str:
+    return f"rendered-visual:{visual_id}:{revision}:{layer}"
+
+
+def get_or_render(visual, layer: str, render_function: Callable[[], Any]) -> Tuple[Any, bool]:
+    """
+    Returns the rendered output for the given layer of the visual at its current revision, calling render_function
+    to generate it if it isn't already in the cache.
+
+    :param visual: PlanVisual.  The revision used is the one on the instance, so it should have been read from the
+                   database for this request.
+    :param layer: Name used to distinguish different parts of the visual which are rendered separately (e.g. the
+                  whole visual, just the timelines etc.)
+    :param render_function: Function with no arguments which returns the rendered output.  If it returns None then
+                            nothing is cached.
+    :return: Tuple of the rendered output and a flag indicating whether it came from the cache.
+    """
+    cache = get_render_cache()
+    key = make_render_cache_key(visual.id, visual.render_revision, layer)
+
+    rendered = cache.get(key)
+    if rendered is not None:
+        _increment_counter(RENDER_CACHE_HITS_KEY)
+        return rendered, True
+
+    rendered = render_function()
+    if rendered is not None:
+        cache.set(key, rendered)
+    _increment_counter(RENDER_CACHE_MISSES_KEY)
+    return rendered, False
+
+
+def get_cached_render(visual, layer: str) -> Optional[Any]:
+    """
+    Returns the cached output for the given layer of the visual at its current revision, or None if it isn't in the
+    cache, counting the lookup as a hit or miss.  For callers which can't use get_or_render() because they don't
+    produce the whole rendered output in one go (e.g. when streaming).
+
+    :param visual: PlanVisual
+    :param layer:
+    :return:
+    """
+    rendered = get_render_cache().get(make_render_cache_key(visual.id, visual.render_revision, layer))
+    _increment_counter(RENDER_CACHE_HITS_KEY if rendered is not None else RENDER_CACHE_MISSES_KEY)
+    return rendered
+
+
+def render_cache_headers(visual, cache_hit: bool) -> Dict[str, str]:
+    """
+    Response headers which tell the client which revision of the visual has been returned and whether it came from the
+    cache.
+    """
+    return {
+        "X-Render-Revision": str(visual.render_revision),
+        "X-Render-Cache": "HIT" if cache_hit else "MISS",
+    }
+
+
+def _increment_counter(key: str):
+    cache = get_render_cache()
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Counter has been evicted since it was added so just start again.
+        cache.set(key, 1, timeout=None)
+
+
+def get_render_cache_stats() -> Dict[str, Any]:
+    """
+    Returns hit and miss counts for the rendered visual cache.  Note that if the cache is local memory then the counts
+    are just for the current process.
+    """
+    cache = get_render_cache()
+    hits = cache.get(RENDER_CACHE_HITS_KEY, 0)
+    misses = cache.get(RENDER_CACHE_MISSES_KEY, 0)
+    total = hits + misses
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total > 0 else None,
+    }
+
+
+def reset_render_cache_stats():
+    get_render_cache().delete_many([RENDER_CACHE_HITS_KEY, RENDER_CACHE_MISSES_KEY])
+
+
+class _DeferredBumps(threading.local):
+    def __init__(self):
+        self.depth = 0
+        self.ignore_plan_depth = 0
+        self.visual_ids: Set[int] = set()
+        self.plan_ids: Set[int] = set()
+
+
+_deferred_bumps = _DeferredBumps()
+
+
+@contextmanager
+def deferred_render_revision_bumps(include_plan_bumps: bool = True):
+    """
+    Within the block, visuals whose render revision would be incremented are only noted, and then each is incremented
+    once at the end of the block with a single update.  Blocks can be nested, in which case the revisions are
+    incremented at the end of the outermost block.
+
+    :param include_plan_bumps: False to ignore increments for every visual of a plan within the block (e.g. from the
+                               signal sent when a plan activity is deleted), where the caller works out and increments
+                               the revisions of just the visuals which are affected.
+    """
+    _deferred_bumps.depth += 1
+    if not include_plan_bumps:
+        _deferred_bumps.ignore_plan_depth += 1
+    try:
+        yield
+    finally:
+        _deferred_bumps.depth -= 1
+        if not include_plan_bumps:
+            _deferred_bumps.ignore_plan_depth -= 1
+        outermost = _deferred_bumps.depth == 0
+        if outermost:
+            # Taken even if the block failed, so they aren't carried over to the next block.
+            visual_ids, plan_ids = _deferred_bumps.visual_ids, _deferred_bumps.plan_ids
+            _deferred_bumps.visual_ids, _deferred_bumps.plan_ids = set(), set()
+
+    if outermost and (visual_ids or plan_ids):
+        from plan_visual_django.models import PlanVisual
+
+        PlanVisual.objects.filter(Q(id__in=visual_ids) | Q(plan_id__in=plan_ids)).update(
+            render_revision=F("render_revision") + 1
+        )
+
+
+def bump_render_revision(visual_ids: Iterable[int]):
+    """
+    Increments the render revision for each of the given visuals so that any cached output is no longer used.
+
+    Uses QuerySet.update() so that it doesn't trigger save signals for the visuals themselves.
+
+    :param visual_ids: Ids of visuals, or a queryset returning ids.
+    :return:
+    """
+    from plan_visual_django.models import PlanVisual
+
+    if _deferred_bumps.depth > 0:
+        _deferred_bumps.visual_ids.update(visual_ids)
+        return
+
+    PlanVisual.objects.filter(id__in=visual_ids).update(render_revision=F("render_revision") + 1)
+
+
+def bump_render_revision_for_plan(plan_id: int):
+    from plan_visual_django.models import PlanVisual
+
+    if _deferred_bumps.ignore_plan_depth > 0:
+        return
+    if _deferred_bumps.depth > 0:
+        _deferred_bumps.plan_ids.add(plan_id)
+        return
+
+    PlanVisual.objects.filter(plan_id=plan_id).update(render_revision=F("render_revision") + 1)
+
+
+def bump_render_revision_for_styles(style_ids: Iterable[int]):
+    """
+    Increments the render revision for every visual which includes an activity, swimlane or timeline which uses one
+    of the given styles.
+    """
+    from plan_visual_django.models import PlanVisual
+
+    visual_ids = PlanVisual.objects.filter(
+        Q(visualactivity__plotable_style_id__in=style_ids) |
+        Q(swimlaneforvisual__plotable_style_id__in=style_ids) |
+        Q(timelineforvisual__plotable_style_odd_id__in=style_ids) |
+        Q(timelineforvisual__plotable_style_even_id__in=style_ids)
+    ).values_list("id", flat=True).distinct()
+
+    bump_render_revision(list(visual_ids))
+
+
+def bump_render_revision_for_colors(color_ids: Iterable[int]):
+    from plan_visual_django.models import PlotableStyle
+
+    style_ids = PlotableStyle.objects.filter(
+        Q(fill_color_id__in=color_ids) |
+        Q(line_color_id__in=color_ids) |
+        Q(font_color_id__in=color_ids)
+    ).values_list("id", flat=True)
+
+    bump_render_revision_for_styles(list(style_ids))
@@ -0,0 +1,151 @@
+"""
+Changelog of rendered visuals, used to send the browser only the plotables which have changed since the revision of the
+visual it last received, rather than the whole visual after every edit.
+
+For each revision of a visual which is rendered, a hash of each rendered object is recorded against a key which
+identifies the object within its layer.  The key is the object's plotable_id, but as plotable_ids aren't guaranteed to
+be unique (e.g. quarter timeline labels) any repeated id within a layer has "#n" appended, where n counts previous
+occurrences of the same id in that layer.  The browser can work out the same keys from the data it already holds.
+
+Only the most recent MAX_CHANGELOG_REVISIONS revisions are kept for each visual.  If the revision the browser asks
+about is no longer in the changelog then the full rendered visual is returned instead.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from plan_visual_django.services.visual.rendering.render_cache import get_render_cache
+
+MAX_CHANGELOG_REVISIONS = 10
+
+LayerHashes = Dict[str, List[Tuple[str, str]]]
+
+
+def make_changelog_cache_key(visual_id: int) -> str:
+    return f"rendered-visual-changelog:{visual_id}"
+
+
+def hash_rendered_object(rendered_object: Dict[str, Any]) -> str:
+    serialised = json.dumps(rendered_object, sort_keys=True, default=str)
+    return hashlib.blake2b(serialised.encode(), digest_size=8).hexdigest()
+
+
+def get_rendered_object_keys(rendered_objects: List[Dict[str, Any]]) -> List[str]:
+    """
+    Returns a key for each object in a layer of a rendered visual which is unique within the layer.
+    """
+    occurrences = {}
+    keys = []
+    for rendered_object in rendered_objects:
+        plotable_id = rendered_object["plotable_id"]
+        occurrence = occurrences.get(plotable_id, 0)
+        occurrences[plotable_id] = occurrence + 1
+        keys.append(plotable_id if occurrence == 0 else f"{plotable_id}#{occurrence}")
+    return keys
+
+
+def get_layer_hashes(rendered: Dict[str, List[Dict[str, Any]]]) -> LayerHashes:
+    return {
+        layer: list(zip(get_rendered_object_keys(rendered_objects), map(hash_rendered_object, rendered_objects)))
+        for layer, rendered_objects in rendered.items()
+    }
+
+
+def record_rendered_revision(visual, rendered: Dict[str, List[Dict[str, Any]]], layer_hashes: LayerHashes = None):
+    """
+    Adds hashes for the rendered visual at its current revision to the changelog for the visual, if they aren't
+    there already, dropping the oldest revision if the changelog is full.
+
+    :param visual: PlanVisual
+    :param rendered: Output from CanvasRenderer for the whole visual.
+    :param layer_hashes: Hashes for rendered, if they have already been calculated.
+    :return:
+    """
+    cache = get_render_cache()
+    key = make_changelog_cache_key(visual.id)
+
+    changelog = cache.get(key, {})
+    if visual.render_revision in changelog:
+        return
+
+    changelog[visual.render_revision] = layer_hashes if layer_hashes is not None else get_layer_hashes(rendered)
+    for revision in sorted(changelog)[:-MAX_CHANGELOG_REVISIONS]:
+        del changelog[revision]
+
+    cache.set(key, changelog)
+
+
+def get_recorded_revision(visual_id: int, revision: int) -> Optional[LayerHashes]:
+    return get_render_cache().get(make_changelog_cache_key(visual_id), {}).get(revision)
+
+
+def get_rendered_changes(visual, since_revision: Optional[int], rendered: Dict[str, List[Dict[str, Any]]]) -> Dict:
+    """
+    Works out which rendered objects have been added, changed or removed since the given revision of the visual.
+
+    Returns a dictionary with:
+    - revision: Current revision of the visual.
+    - since: Revision the changes are relative to.
+    - full: True if the revision isn't in the changelog, in which case "layers" holds the full rendered visual.
+    - changed: For each layer, dictionary of key to rendered object for objects added or changed.
+    - removed: For each layer, list of keys of objects no longer in the layer.
+    - order: For each layer where objects have been added, removed or re-ordered, the keys of all the objects in the
+             layer in the order they should be plotted.
+
+    :param visual: PlanVisual
+    :param since_revision: Revision of the visual the client already has.
+    :param rendered: Output from CanvasRenderer for the whole visual at its current revision.
+    :return:
+    """
+    current_hashes = get_layer_hashes(rendered)
+    record_rendered_revision(visual, rendered, current_hashes)
+
+    previous_hashes = None
+    if since_revision is not None and since_revision <= visual.render_revision:
+        previous_hashes = get_recorded_revision(visual.id, since_revision)
+
+    if previous_hashes is None:
+        return {
+            "revision": visual.render_revision,
+            "since": since_revision,
+            "full": True,
+            "layers": rendered,
+        }
+
+    changed = {}
+    removed = {}
+    order = {}
+    for layer, layer_hashes in current_hashes.items():
+        previous_layer_hashes = dict(previous_hashes.get(layer, []))
+        layer_keys = [key for key, _ in layer_hashes]
+
+        layer_changes = {
+            key: rendered_object
+            for (key, object_hash), rendered_object in zip(layer_hashes, rendered[layer])
+            if previous_layer_hashes.get(key) != object_hash
+        }
+        if layer_changes:
+            changed[layer] = layer_changes
+
+        current_keys = set(layer_keys)
+        layer_removed = [key for key, _ in previous_hashes.get(layer, []) if key not in current_keys]
+        if layer_removed:
+            removed[layer] = layer_removed
+
+        if layer_keys != [key for key, _ in previous_hashes.get(layer, [])]:
+            order[layer] = layer_keys
+
+    # Layers which have disappeared altogether
+    for layer, previous_layer_hashes in previous_hashes.items():
+        if layer not in current_hashes and previous_layer_hashes:
+            removed[layer] = [key for key, _ in previous_layer_hashes]
+            order[layer] = []
+
+    return {
+        "revision": visual.render_revision,
+        "since": since_revision,
+        "full": False,
+        "changed": changed,
+        "removed": removed,
+        "order": order,
+    }
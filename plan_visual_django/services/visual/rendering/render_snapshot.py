@@ -0,0 +1,292 @@
+"""
+Single pass render engine for a visual.
+
+Calculating the plotables for a visual through the model methods (SwimlaneForVisual.get_plotable(),
+VisualActivity.get_plotable() etc.) means that each object goes back to the database for the information it needs
+about its neighbours, so the number of queries grows with the number of swimlanes and activities.
+
+A VisualRenderSnapshot loads everything needed to plot the visual in a fixed number of queries and then calculates
+all the plotables in memory.  The plotables for each layer are held in a PlotableStore rather than as individual
+Plotable objects, but the rows of a store behave as the plotables returned by the model methods, so can be passed
+straight to any VisualRenderer.
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from plan_visual_django.models import PlanVisual, PlanActivity, PlotableStyle, VisualActivity, SwimlaneForVisual, \
+    TimelineForVisual
+from plan_visual_django.services.general.date_utilities import DatePlotter, format_date_for_visual_activity
+from plan_visual_django.services.plan_file_utilities.plan_parsing import extract_summary_plan_info
+from plan_visual_django.services.visual.model.plotable_shapes import PlotableShapeName
+from plan_visual_django.services.visual.model.swimlane_geometry import SwimlaneGeometry
+from plan_visual_django.services.visual.model.timelines import Timeline
+from plan_visual_django.services.visual.rendering.plotable_store import PlotableStore
+from plan_visual_django.services.visual.rendering.plotables import Plotable
+
+logger = logging.getLogger(__name__)
+
+
+class VisualRenderSnapshot:
+    """
+    Holds all the records required to plot a visual, loaded in bulk, and calculates plotables from them without any
+    further database access.
+
+    The snapshot reflects the state of the database at the time it was created, so it should be created for each
+    render and not held onto across requests.
+    """
+    def __init__(self, visual: PlanVisual | int):
+        if isinstance(visual, PlanVisual):
+            self.visual = visual
+        else:
+            self.visual = PlanVisual.objects.select_related('plan').get(id=visual)
+
+        self.timeline_records: List[TimelineForVisual] = []
+        self.swimlane_records: List[SwimlaneForVisual] = []
+        self.visual_activity_records: List[VisualActivity] = []
+        self.plan_activities: Dict[str, PlanActivity] = {}
+        self.plotable_styles: Dict[int, PlotableStyle] = {}
+
+        self._load()
+
+        self.visual_start_date, self.visual_end_date = self._calculate_visual_date_range()
+        self.date_plotter = DatePlotter(self.visual_start_date, self.visual_end_date, 0, self.visual.width)
+        self.swimlane_geometry = SwimlaneGeometry.from_records(
+            self.visual,
+            self.swimlane_records,
+            self.visual_activity_records,
+            self.get_timelines_height(),
+        )
+
+    def _load(self):
+        """
+        Loads all records for the visual.  The number of queries doesn't depend upon the number of swimlanes,
+        timelines or activities in the visual.
+        """
+        enabled_visual_activities = VisualActivity.objects.filter(visual_id=self.visual.id, enabled=True)
+
+        self.timeline_records = list(TimelineForVisual.objects.filter(plan_visual_id=self.visual.id))
+        self.swimlane_records = list(SwimlaneForVisual.objects.filter(plan_visual_id=self.visual.id))
+        self.visual_activity_records = list(enabled_visual_activities)
+
+        # Join visual activities to the plan using a sub-query rather than a list of ids, so that the query doesn't
+        # grow with the number of activities.
+        plan_activities = PlanActivity.objects.filter(
+            plan_id=self.visual.plan_id,
+            unique_sticky_activity_id__in=enabled_visual_activities.values('unique_id_from_plan')
+        )
+        self.plan_activities = {activity.unique_sticky_activity_id: activity for activity in plan_activities}
+
+        # Load each style used anywhere in the visual exactly once, with its colors and font.
+        style_ids = set()
+        for timeline in self.timeline_records:
+            style_ids.add(timeline.plotable_style_odd_id)
+            if timeline.plotable_style_even_id is not None:
+                style_ids.add(timeline.plotable_style_even_id)
+        style_ids.update(swimlane.plotable_style_id for swimlane in self.swimlane_records)
+        style_ids.update(activity.plotable_style_id for activity in self.visual_activity_records)
+
+        styles = PlotableStyle.objects.filter(id__in=style_ids).select_related(
+            'fill_color', 'line_color', 'font_color', 'font'
+        )
+        self.plotable_styles = {style.id: style for style in styles}
+
+        # Attach the shared style instances to each record so that code which follows the foreign key (e.g. the
+        # Timeline classes) doesn't go back to the database.
+        for timeline in self.timeline_records:
+            timeline.plan_visual = self.visual
+            timeline.plotable_style_odd = self.plotable_styles[timeline.plotable_style_odd_id]
+            if timeline.plotable_style_even_id is not None:
+                timeline.plotable_style_even = self.plotable_styles[timeline.plotable_style_even_id]
+        for swimlane in self.swimlane_records:
+            swimlane.plan_visual = self.visual
+            swimlane.plotable_style = self.plotable_styles[swimlane.plotable_style_id]
+        for activity in self.visual_activity_records:
+            activity.visual = self.visual
+            activity.plotable_style = self.plotable_styles[activity.plotable_style_id]
+
+    def _calculate_visual_date_range(self):
+        """
+        In memory equivalent of PlanVisual.get_visual_earliest_latest_date().
+        """
+        if len(self.plan_activities) == 0:
+            plan_info = extract_summary_plan_info(self.visual.plan)
+            _, earliest_start_date = plan_info['earliest_start_date']
+            _, latest_end_date = plan_info['latest_end_date']
+        else:
+            earliest_start_date = min(activity.start_date for activity in self.plan_activities.values())
+            latest_end_date = max(activity.end_date for activity in self.plan_activities.values())
+
+        timeline_objects = [
+            Timeline.from_data_record(earliest_start_date, latest_end_date, timeline)
+            for timeline in self.get_enabled_timelines()
+        ]
+        if len(timeline_objects) == 0:
+            return earliest_start_date, latest_end_date
+
+        date_ranges = [timeline.calculate_date_range() for timeline in timeline_objects]
+        visual_start_date = min(start_date for start_date, _ in date_ranges)
+        visual_end_date = max(end_date for _, end_date in date_ranges)
+
+        return visual_start_date, visual_end_date
+
+    def get_enabled_timelines(self) -> List[TimelineForVisual]:
+        return [timeline for timeline in self.timeline_records if timeline.enabled]
+
+    def get_timelines_height(self, sequence_num: Optional[int] = None) -> float:
+        """
+        Height of all enabled timelines (or those above the timeline with the given sequence number) including the
+        gap below each one.
+        """
+        timelines = self.get_enabled_timelines()
+        if sequence_num is not None:
+            timelines = [timeline for timeline in timelines if timeline.sequence_number < sequence_num]
+
+        timeline_height = sum(timeline.timeline_height for timeline in timelines)
+        timeline_height += self.visual.timeline_gap * len(timelines)
+
+        return timeline_height
+
+    def get_timeline_plotables(self, sequence_number: Optional[int] = None) -> List[PlotableStore]:
+        """
+        Returns a list of plotables for each timeline.  Matches PlanVisual.get_timeline_plotables(), which returns
+        all enabled timelines, or all timelines above the one with the given sequence number.
+        """
+        if sequence_number:
+            timelines = [timeline for timeline in self.timeline_records if timeline.sequence_number < sequence_number]
+        else:
+            timelines = self.get_enabled_timelines()
+
+        return [self._get_plotables_for_timeline(timeline) for timeline in timelines]
+
+    def _get_plotables_for_timeline(self, timeline_record: TimelineForVisual) -> PlotableStore:
+        timeline = Timeline.from_data_record(self.visual_start_date, self.visual_end_date, timeline_record)
+        timeline.initialise_collection()
+        top_offset = self.get_timelines_height(sequence_num=timeline_record.sequence_number)
+        collection = timeline.create_collection(
+            visual_settings=self.visual,
+            timeline_settings={},
+            top_offset=top_offset,
+            left_offset=0
+        )
+
+        store = PlotableStore()
+        for element in collection.collection:
+            element.add_to_store(store)
+        return store
+
+    def get_swimlane_plotables(self, sequence_number: Optional[int] = None) -> PlotableStore:
+        swimlane_plotables = PlotableStore()
+        for swimlane in self.swimlane_geometry.get_visible_swimlanes(sequence_number=sequence_number):
+            swimlane_plotables.append(
+                f"swimlane-{swimlane.id}",
+                PlotableShapeName.RECTANGLE,
+                top=self.swimlane_geometry.get_swimlane_top(swimlane.id),
+                left=0,
+                width=self.visual.width,
+                height=self.swimlane_geometry.get_swimlane_height(swimlane.id),
+                format=swimlane.plotable_style,
+                text_vertical_alignment=VisualActivity.VerticalAlignment.TOP,
+                text_flow=VisualActivity.TextFlow.FLOW_TO_RIGHT,
+                text=swimlane.swim_lane_name,
+                external_text_flag=False
+            )
+        return swimlane_plotables
+
+    def _calculate_activity_x_coordinates(self) -> Dict[str, Tuple[float, float, float]]:
+        """
+        Calculates left, width and midpoint for every plan activity in the visual in a single batch.
+
+        :return: Dictionary of unique_sticky_activity_id to (left, width, midpoint)
+        """
+        plan_activities = list(self.plan_activities.values())
+        left, width, midpoint = self.date_plotter.batch_coordinates(
+            [plan_activity.start_date.toordinal() for plan_activity in plan_activities],
+            [plan_activity.end_date.toordinal() for plan_activity in plan_activities],
+        )
+        return {
+            plan_activity.unique_sticky_activity_id: coordinates
+            for plan_activity, coordinates in zip(plan_activities, zip(left.tolist(), width.tolist(), midpoint.tolist()))
+        }
+
+    def get_visual_activity_plotables(self) -> PlotableStore:
+        plotables = PlotableStore()
+        x_coordinates = self._calculate_activity_x_coordinates()
+        for visual_activity in self.visual_activity_records:
+            self._add_plotable_for_activity(plotables, visual_activity, x_coordinates)
+        return plotables
+
+    def get_visual_activity_plotable(self, unique_id: str) -> Optional[Plotable]:
+        for visual_activity in self.visual_activity_records:
+            if visual_activity.unique_id_from_plan == unique_id:
+                store = PlotableStore()
+                row_index = self._add_plotable_for_activity(store, visual_activity)
+                return None if row_index is None else store[row_index]
+        return None
+
+    def _add_plotable_for_activity(self, store: PlotableStore, visual_activity: VisualActivity, x_coordinates=None):
+        """
+        In memory equivalent of VisualActivity.get_plotable(), adding the plotable to the given store.
+
+        :param store:
+        :param visual_activity:
+        :param x_coordinates: Output from _calculate_activity_x_coordinates() if already calculated for the visual.
+        :return: Index of the plotable within the store, or None if the activity can't be plotted.
+        """
+        plan_activity = self.plan_activities.get(visual_activity.unique_id_from_plan)
+        if plan_activity is None:
+            logger.warning(f"No plan activity for visual activity {visual_activity.unique_id_from_plan}, not plotted")
+            return None
+
+        if x_coordinates is not None:
+            activity_left, activity_width, activity_midpoint = x_coordinates[plan_activity.unique_sticky_activity_id]
+        else:
+            activity_left = self.date_plotter.left(plan_activity.start_date)
+            activity_width = self.date_plotter.width(plan_activity.start_date, plan_activity.end_date)
+            activity_midpoint = self.date_plotter.midpoint(plan_activity.start_date)
+
+        activity_top = self.swimlane_geometry.get_top_of_track(
+            visual_activity.swimlane_id,
+            visual_activity.vertical_positioning_value
+        )
+        activity_height = self.swimlane_geometry.get_height_of_tracks(visual_activity.height_in_tracks)
+
+        text_flow_value = visual_activity.get_text_flow().value
+
+        if plan_activity.milestone_flag is True:
+            left = activity_midpoint - self.visual.milestone_width / 2
+            width = self.visual.milestone_width
+            date_toggle = self.visual.milestone_date_toggle
+        else:
+            left = activity_left
+            width = activity_width
+            date_toggle = self.visual.activity_date_toggle
+
+        text = format_date_for_visual_activity(
+            plan_activity.activity_name,
+            date_toggle,
+            text_flow_value,
+            plan_activity.end_date
+        )
+        return store.append(
+            plotable_id="activity-" + visual_activity.unique_id_from_plan,
+            plotable_shape_name=PlotableShapeName.get_by_value(visual_activity.plotable_shape),
+            top=activity_top,
+            left=left,
+            width=width,
+            height=activity_height,
+            format=visual_activity.plotable_style,
+            text_vertical_alignment=visual_activity.get_vertical_alignment(),
+            text_flow=text_flow_value,
+            text=text,
+            external_text_flag=True if plan_activity.milestone_flag else False
+        )
+
+    def get_plotables(self) -> Dict[str, PlotableStore | List[PlotableStore]]:
+        """
+        Returns all plotables for the visual organised by layer, in the same structure as PlanVisual.get_plotables().
+        """
+        return {
+            "timelines": self.get_timeline_plotables(),
+            "swimlanes": self.get_swimlane_plotables(),
+            "visual_activities": self.get_visual_activity_plotables(),
+        }
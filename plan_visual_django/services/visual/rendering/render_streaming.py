@@ -0,0 +1,55 @@
+"""
+Streaming of rendered visuals as JSON.
+
+For a visual with tens of thousands of plotables, rendering every plotable to a canvas object and then serialising the
+whole structure in one go means that the browser gets nothing until all the work is done, and the complete rendered
+output is held in memory along with its serialised form.
+
+Instead the layers can be rendered lazily (see CanvasRenderer.iter_render()) and serialised a few hundred objects at a
+time, so that rendering and serialisation overlap, memory use doesn't grow with the size of the visual and the first
+bytes reach the browser almost straight away.  The JSON produced is the same structure as the non-streamed response.
+"""
+from typing import Dict, Iterable, Iterator
+
+from rest_framework.utils.encoders import JSONEncoder
+
+DEFAULT_OBJECTS_PER_CHUNK = 500
+
+
+def stream_json_layers(layers: Dict[str, Iterable[dict]], objects_per_chunk: int = DEFAULT_OBJECTS_PER_CHUNK) -> Iterator[str]:
+    """
+    Serialises a dictionary of layer name to rendered objects as a JSON object, yielding the output in chunks.
+
+    The rendered objects for each layer can be any iterable, including a generator, and are only consumed as each chunk
+    is produced.
+
+    :param layers: Dictionary of layer_name -> iterable of rendered objects (e.g. output from
+                   CanvasRenderer.iter_render() or cached output from CanvasRenderer.render_from_iterable())
+    :param objects_per_chunk: Number of rendered objects to serialise before yielding a chunk.
+    :return: Generator of strings which together make up the JSON document.
+    """
+    # Use the same encoder as DRF so that the streamed output matches the output from a Response.
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    chunk = ["{"]
+    for layer_number, (layer_name, rendered_objects) in enumerate(layers.items()):
+        if layer_number > 0:
+            chunk.append(",")
+        chunk.append(f"{encoder.encode(layer_name)}:[")
+
+        num_objects_in_chunk = 0
+        for object_number, rendered_object in enumerate(rendered_objects):
+            if object_number > 0:
+                chunk.append(",")
+            chunk.append(encoder.encode(rendered_object))
+
+            num_objects_in_chunk += 1
+            if num_objects_in_chunk >= objects_per_chunk:
+                yield "".join(chunk)
+                chunk = []
+                num_objects_in_chunk = 0
+
+        chunk.append("]")
+    chunk.append("}")
+
+    yield "".join(chunk)
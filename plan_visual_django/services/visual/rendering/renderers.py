@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Iterable, Dict, List, Optional, Tuple
+from typing import Iterable, Iterator, Dict, List, Optional, Tuple
 from plan_visual_django.services.visual.rendering.plotables import RectangleBasedPlotable, Plotable
+from plan_visual_django.services.visual.rendering.plotable_store import PlotableStore
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.shapes import MSO_SHAPE
@@ -54,6 +55,21 @@ class VisualRenderer(ABC):
         else:
             raise TypeError(f"Expected Plotable or Iterable, got {type(plotable_iterable)}")
 
+    def _iter_plotables(self, plotable_iterable: Plotable | Iterable) -> Iterator[Plotable]:
+        """
+        Generator version of _render_iterable(), which yields each plotable in turn from an arbitrarily nested
+        iterable of plotables rather than rendering it.
+
+        :param plotable_iterable: Either a single Plotable or an iterable containing Plotables and/or nested iterables
+        """
+        if isinstance(plotable_iterable, Plotable):
+            yield plotable_iterable
+        elif isinstance(plotable_iterable, Iterable):
+            for item in plotable_iterable:
+                yield from self._iter_plotables(item)
+        else:
+            raise TypeError(f"Expected Plotable or Iterable, got {type(plotable_iterable)}")
+
     def _calculate_visual_bounds(self, visual_plotables: Dict[str, Iterable]):
         """
         Calculate the total dimensions of the visual by examining all plotables.
@@ -67,16 +83,21 @@ class VisualRenderer(ABC):
         max_bottom = float('-inf')
 
         # Updates visual bounds based on plotable dimensions
-        def update_bounds(plotable: Plotable):
+        def update_bounds(left, top, right, bottom):
             nonlocal min_left, min_top, max_right, max_bottom
-            min_left = min(min_left, plotable.get_left())
-            min_top = min(min_top, plotable.get_top())
-            max_right = max(max_right, plotable.get_right())
-            max_bottom = max(max_bottom, plotable.get_bottom())
+            min_left = min(min_left, left)
+            min_top = min(min_top, top)
+            max_right = max(max_right, right)
+            max_bottom = max(max_bottom, bottom)
 
         def traverse(item):
             if isinstance(item, Plotable):
-                update_bounds(item)
+                update_bounds(item.get_left(), item.get_top(), item.get_right(), item.get_bottom())
+            elif isinstance(item, PlotableStore):
+                # Bounds for the whole store are calculated in one go rather than plotable by plotable.
+                store_bounds = item.get_bounds()
+                if store_bounds is not None:
+                    update_bounds(*store_bounds)
             elif isinstance(item, Iterable):
                 for sub_item in item:
                     traverse(sub_item)
@@ -194,6 +215,24 @@ class CanvasRenderer(VisualRenderer):
 
         return self.canvas_objects
 
+    def iter_render(self, visual_plotables: Dict[str, Iterable]) -> Dict[str, Iterator[dict]]:
+        """
+        Lazy version of render_from_iterable().  Returns a generator of canvas objects for each layer, so that each
+        plotable is only rendered when the output for it is needed (e.g. when streaming the response to the browser)
+        and the rendered output for the whole visual is never held in memory at once.
+
+        :param visual_plotables: Dictionary of layer_name -> plotables
+        :return: Dictionary of layer_name -> generator of rendered canvas objects
+        """
+        return {
+            layer_name: self._iter_canvas_objects(plotable_iterable)
+            for layer_name, plotable_iterable in visual_plotables.items()
+        }
+
+    def _iter_canvas_objects(self, plotable_iterable: Plotable | Iterable) -> Iterator[dict]:
+        for plotable in self._iter_plotables(plotable_iterable):
+            yield from self.render_plotable(plotable)
+
     def _render_iterable(self, plotable_iterable: Plotable | Iterable):
         """
         Override to accumulate rendered objects in current layer.
@@ -54,6 +54,27 @@ class VisualElement:
         )
         return plotable
 
+    def add_to_store(self, store):
+        """
+        Equivalent of plot_element() which adds the plotable to a PlotableStore rather than creating a Plotable object.
+
+        :param store: PlotableStore
+        :return: Index of the plotable within the store.
+        """
+        return store.append(
+            plotable_id=self.plotable_id,
+            plotable_shape_name=self.shape,
+            top=self.top,
+            left=self.left,
+            width=self.width,
+            height=self.height,
+            format=self.plotable_style,
+            text_vertical_alignment=self.text_vertical_alignment,
+            text_flow=self.text_flow,
+            text=self.text,
+            external_text_flag=self.external_text_flag
+        )
+
     def render_element(self, renderer):
         plotable = self.plot_element()
         renderer.render_plotable(plotable)
@@ -0,0 +1,101 @@
+"""
+Signal handlers for the plan_visual_django app.  Connected when the app is ready (see apps.py).
+
+Changes to anything which affects how a visual is plotted need to:
+- Invalidate the in-process swimlane geometry for the visual.
+- Increment the render revision for the visual so that cached rendered output is no longer used.
+
+Changes to the activities of a plan also need to remove the plan's tree from the in-process plan tree cache.
+
+Handlers ignore raw saves (i.e. when loading fixtures).
+"""
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from plan_visual_django.models import PlanVisual, TimelineForVisual, SwimlaneForVisual, VisualActivity, PlanActivity, \
+    PlotableStyle, Color, Plan
+from plan_visual_django.services.plan_file_utilities.plan_tree_cache import invalidate_plan_tree
+from plan_visual_django.services.visual.model.swimlane_geometry import invalidate_swimlane_geometry
+from plan_visual_django.services.visual.rendering.render_cache import bump_render_revision, \
+    bump_render_revision_for_plan, bump_render_revision_for_styles, bump_render_revision_for_colors
+
+
+@receiver(pre_save, sender=PlanVisual)
+def plan_visual_saving(sender, instance, raw=False, **kwargs):
+    """
+    Increment the revision as part of the save itself.  Base the new revision on the value in the database rather than
+    on this instance, as the revision may have been incremented since the instance was read.
+    """
+    if raw or instance.pk is None:
+        return
+    current_revision = PlanVisual.objects.filter(pk=instance.pk).values_list('render_revision', flat=True).first()
+    if current_revision is not None:
+        instance.render_revision = current_revision + 1
+
+
+@receiver(post_save, sender=PlanVisual)
+def plan_visual_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and 'render_revision' not in update_fields:
+        # Revision was incremented on the instance but not included in the save.
+        PlanVisual.objects.filter(pk=instance.pk).update(render_revision=instance.render_revision)
+    invalidate_swimlane_geometry(instance.id)
+
+
+@receiver(post_delete, sender=PlanVisual)
+def plan_visual_deleted(sender, instance, **kwargs):
+    invalidate_swimlane_geometry(instance.id)
+
+
+@receiver([post_save, post_delete], sender=TimelineForVisual)
+@receiver([post_save, post_delete], sender=SwimlaneForVisual)
+def visual_component_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_swimlane_geometry(instance.plan_visual_id)
+    bump_render_revision([instance.plan_visual_id])
+
+
+@receiver([post_save, post_delete], sender=VisualActivity)
+def visual_activity_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_swimlane_geometry(instance.visual_id)
+    bump_render_revision([instance.visual_id])
+
+
+@receiver([post_save, post_delete], sender=PlanActivity)
+def plan_activity_changed(sender, instance, raw=False, **kwargs):
+    # The plan tree is dropped even for raw saves, as fixtures can load different activities for a plan id which has
+    # been used before.
+    invalidate_plan_tree(instance.plan_id)
+    if raw:
+        return
+    bump_render_revision_for_plan(instance.plan_id)
+
+
+@receiver(post_save, sender=Plan)
+def plan_saved(sender, instance, created=False, raw=False, **kwargs):
+    # A new plan may reuse the id of one which has been removed (e.g. rolled back), so make sure no tree is left for it.
+    if created or raw:
+        invalidate_plan_tree(instance.id)
+
+
+@receiver(post_delete, sender=Plan)
+def plan_deleted(sender, instance, **kwargs):
+    invalidate_plan_tree(instance.id)
+
+
+@receiver([post_save, post_delete], sender=PlotableStyle)
+def plotable_style_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_render_revision_for_styles([instance.id])
+
+
+@receiver([post_save, post_delete], sender=Color)
+def color_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_render_revision_for_colors([instance.id])
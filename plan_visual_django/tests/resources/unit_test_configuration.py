@@ -12,3 +12,5 @@ test_fixtures_folder = 'resources/test_fixtures'
 test_data_base_folder = os.path.join(settings.BASE_DIR, 'plan_visual_django', 'tests')
 excel_input_files_folder = os.path.join(test_data_base_folder, "resources", "input_files", "excel_plan_files")
 excel_reimported_files_folder = os.path.join(test_data_base_folder, "resources", "input_files", "excel_plan_files_reimport")
+csv_input_files_folder = os.path.join(test_data_base_folder, "resources", "input_files", "csv_plan_files")
+msp_xml_input_files_folder = os.path.join(test_data_base_folder, "resources", "input_files", "ms_project_xml_files")
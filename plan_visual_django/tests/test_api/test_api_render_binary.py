@@ -0,0 +1,100 @@
+import os
+from ddt import ddt, data
+from django.test import TestCase
+from plan_visual_django.services.visual.rendering.render_binary import encode_canvas_binary, decode_canvas_binary, \
+    CANVAS_BINARY_MEDIA_TYPE
+from plan_visual_django.services.visual.rendering.render_cache import get_render_cache
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+@ddt
+class TestApiRenderBinary(TestCase):
+    """
+    Checks that the binary canvas format decodes to the same output as the JSON format, and that it is returned when
+    the client asks for it.
+    """
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    visual_id = 4  # From test fixtures
+
+    def setUp(self):
+        get_render_cache().clear()
+
+    def assertRenderedEqual(self, expected, actual):
+        """
+        Binary format holds coordinates as float32 so numbers are compared approximately.
+        """
+        self.assertEqual(list(expected), list(actual))
+        for layer_name in expected:
+            self.assertEqual(len(expected[layer_name]), len(actual[layer_name]))
+            for expected_object, actual_object in zip(expected[layer_name], actual[layer_name]):
+                self.assertEqual(set(expected_object), set(actual_object))
+                for field_name, expected_value in expected_object.items():
+                    actual_value = actual_object[field_name]
+                    if isinstance(expected_value, dict):
+                        self.assertEqual(set(expected_value), set(actual_value))
+                        for dimension, expected_dimension in expected_value.items():
+                            if isinstance(expected_dimension, str):
+                                self.assertEqual(expected_dimension, actual_value[dimension])
+                            else:
+                                self.assertAlmostEqual(expected_dimension, actual_value[dimension], places=3)
+                    elif isinstance(expected_value, (int, float)):
+                        self.assertAlmostEqual(expected_value, actual_value, places=3)
+                    else:
+                        self.assertEqual(expected_value, actual_value)
+
+    @data("", "activities/", "swimlanes/", "timelines/", "timelines/2/", "swimlanes/2/", "activities/ID-024/")
+    def test_binary_matches_json(self, url_prefix):
+        url = f"/api/v1/rendered/canvas/visuals/{url_prefix}{self.visual_id}/"
+        if url_prefix.count("/") > 1:
+            # Urls for a single timeline, swimlane or activity have visual id first.
+            layer, key, _ = url_prefix.split("/")
+            url = f"/api/v1/rendered/canvas/visuals/{layer}/{self.visual_id}/{key}/"
+
+        json_response = self.client.get(url)
+        binary_response = self.client.get(url, HTTP_ACCEPT=CANVAS_BINARY_MEDIA_TYPE)
+
+        self.assertEqual(200, binary_response.status_code)
+        self.assertEqual(CANVAS_BINARY_MEDIA_TYPE, binary_response.headers["Content-Type"])
+        self.assertIn("Accept", binary_response.headers["Vary"])
+        self.assertRenderedEqual(json_response.json(), decode_canvas_binary(binary_response.content))
+
+    def test_json_is_default(self):
+        response = self.client.get(f"/api/v1/rendered/canvas/visuals/{self.visual_id}/", HTTP_ACCEPT="*/*")
+
+        self.assertEqual("application/json", response.headers["Content-Type"])
+
+    def test_binary_is_smaller(self):
+        json_response = self.client.get(f"/api/v1/rendered/canvas/visuals/{self.visual_id}/")
+        binary_response = self.client.get(
+            f"/api/v1/rendered/canvas/visuals/{self.visual_id}/", HTTP_ACCEPT=CANVAS_BINARY_MEDIA_TYPE
+        )
+
+        self.assertLess(len(binary_response.content), len(json_response.content) / 2)
+
+    def test_binary_not_streamed(self):
+        response = self.client.get(
+            f"/api/v1/rendered/canvas/visuals/{self.visual_id}/?stream=true", HTTP_ACCEPT=CANVAS_BINARY_MEDIA_TYPE
+        )
+
+        self.assertFalse(response.streaming)
+        self.assertEqual(CANVAS_BINARY_MEDIA_TYPE, response.headers["Content-Type"])
+
+    def test_missing_activity_is_not_binary(self):
+        response = self.client.get(
+            f"/api/v1/rendered/canvas/visuals/activities/{self.visual_id}/ID-999/", HTTP_ACCEPT=CANVAS_BINARY_MEDIA_TYPE
+        )
+
+        self.assertEqual(404, response.status_code)
+        self.assertEqual(b"", response.content)
+
+    @data({}, {"timelines": []}, {"timelines": [], "swimlanes": []})
+    def test_empty_layers(self, rendered):
+        self.assertEqual(rendered, decode_canvas_binary(encode_canvas_binary(rendered)))
+
+    def test_invalid_payload(self):
+        with self.assertRaises(ValueError):
+            decode_canvas_binary(b"JSON" + bytes(12))
@@ -0,0 +1,148 @@
+import importlib.util
+import os
+from unittest import mock
+from ddt import ddt, data
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase
+from plan_visual_django.models import PlanVisual, VisualActivity, PlanActivity, PlotableStyle, Color, SwimlaneForVisual
+from plan_visual_django.services.visual.rendering.render_cache import get_render_cache, reset_render_cache_stats, \
+    get_render_cache_stats, deferred_render_revision_bumps
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+from plan_visualiser_2023_02.settings import base_settings
+
+
+@ddt
+class TestApiRenderCache(TestCase):
+    """
+    Checks that rendered output is cached against the revision of the visual and that changes to anything which
+    affects the visual cause it to be rendered again.
+    """
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    visual_id = 4  # From test fixtures
+
+    def setUp(self):
+        get_render_cache().clear()
+        reset_render_cache_stats()
+
+    def get_rendered(self, url_suffix=""):
+        response = self.client.get(f"/api/v1/rendered/canvas/visuals/{url_suffix}{self.visual_id}/")
+        self.assertEqual(200, response.status_code)
+        return response
+
+    @data("", "activities/", "swimlanes/", "timelines/")
+    def test_second_request_is_cache_hit(self, url_suffix):
+        first_response = self.get_rendered(url_suffix)
+        second_response = self.get_rendered(url_suffix)
+
+        self.assertEqual("MISS", first_response.headers["X-Render-Cache"])
+        self.assertEqual("HIT", second_response.headers["X-Render-Cache"])
+        self.assertEqual(first_response.json(), second_response.json())
+
+        stats = get_render_cache_stats()
+        self.assertEqual((1, 1), (stats["hits"], stats["misses"]))
+
+    def test_visual_activity_change_invalidates_cache(self):
+        first_response = self.get_rendered()
+
+        activity = VisualActivity.objects.get(visual_id=self.visual_id, unique_id_from_plan="ID-026")
+        activity.vertical_positioning_value = 2
+        activity.save()
+
+        second_response = self.get_rendered()
+
+        self.assertEqual("MISS", second_response.headers["X-Render-Cache"])
+        self.assertGreater(int(second_response.headers["X-Render-Revision"]), int(first_response.headers["X-Render-Revision"]))
+        self.assertNotEqual(first_response.json(), second_response.json())
+
+    def test_visual_change_invalidates_cache(self):
+        # Read the visual before an activity changes so that the instance has an out of date revision, to check
+        # that saving it doesn't take the revision back to one which has already been cached.
+        visual = PlanVisual.objects.get(id=self.visual_id)
+
+        activity = VisualActivity.objects.get(visual_id=self.visual_id, unique_id_from_plan="ID-026")
+        activity.vertical_positioning_value = 2
+        activity.save()
+        first_response = self.get_rendered()
+
+        visual.width = 500
+        visual.save()
+
+        second_response = self.get_rendered()
+        self.assertEqual("MISS", second_response.headers["X-Render-Cache"])
+        self.assertNotEqual(first_response.json(), second_response.json())
+
+    def test_plan_activity_change_invalidates_cache(self):
+        self.get_rendered()
+
+        plan_activity = PlanActivity.objects.get(plan_id=2, unique_sticky_activity_id="ID-024")
+        plan_activity.activity_name = "Renamed activity"
+        plan_activity.save()
+
+        response = self.get_rendered()
+        self.assertEqual("MISS", response.headers["X-Render-Cache"])
+        self.assertIn("Renamed activity", [item["text"] for item in response.json()["visual_activities"] if "text" in item])
+
+    def test_color_change_invalidates_cache(self):
+        self.get_rendered()
+
+        style = PlotableStyle.objects.get(pk=104)  # Used by activities in visual 4
+        color = Color.objects.get(pk=style.fill_color_id)
+        color.red = 1 if color.red != 1 else 2
+        color.save()
+
+        response = self.get_rendered()
+        self.assertEqual("MISS", response.headers["X-Render-Cache"])
+
+    def test_change_to_other_visual_does_not_invalidate_cache(self):
+        self.get_rendered()
+
+        swimlane = SwimlaneForVisual.objects.get(pk=100)  # Belongs to visual 1
+        swimlane.swim_lane_name = "Renamed swimlane"
+        swimlane.save()
+
+        response = self.get_rendered()
+        self.assertEqual("HIT", response.headers["X-Render-Cache"])
+
+    def test_deferred_revision_bumps(self):
+        revision_before = PlanVisual.objects.get(id=self.visual_id).render_revision
+        activities = VisualActivity.objects.filter(visual_id=self.visual_id)
+        self.assertGreater(activities.count(), 1)
+
+        # Django sends a signal for each activity deleted.
+        with self.assertNumQueries(3):  # Read the activities, delete them, one update for all of the signals.
+            with deferred_render_revision_bumps():
+                with deferred_render_revision_bumps():
+                    activities.delete()
+
+        self.assertEqual(revision_before + 1, PlanVisual.objects.get(id=self.visual_id).render_revision)
+
+    def test_cache_stats_endpoint(self):
+        self.get_rendered()
+        self.get_rendered()
+        self.get_rendered()
+
+        response = self.client.get("/api/v1/rendered/canvas/visuals/cache-stats/")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"hits": 2, "misses": 1, "hit_ratio": 2/3}, response.json())
+
+
+class TestRenderCacheSettings(SimpleTestCase):
+    @staticmethod
+    def load_settings():
+        # Loaded as a separate module so that the settings in use aren't changed.
+        spec = importlib.util.spec_from_file_location("render_cache_test_settings", base_settings.__file__)
+        spec.loader.exec_module(importlib.util.module_from_spec(spec))
+
+    def test_unknown_backend(self):
+        with mock.patch.dict(os.environ, {"RENDER_CACHE_BACKEND": "redis"}):
+            with self.assertRaisesRegex(ImproperlyConfigured, "'redis' not recognised.*locmem, file, db, none"):
+                self.load_settings()
+
+    def test_known_backend(self):
+        with mock.patch.dict(os.environ, {"RENDER_CACHE_BACKEND": "FILE"}):
+            self.load_settings()
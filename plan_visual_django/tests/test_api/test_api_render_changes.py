@@ -0,0 +1,122 @@
+import os
+from django.test import TestCase
+from plan_visual_django.models import VisualActivity
+from plan_visual_django.services.visual.rendering.render_cache import get_render_cache
+from plan_visual_django.services.visual.rendering.render_changelog import get_rendered_object_keys
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+def apply_changes(rendered, changes):
+    """
+    Python version of apply_visual_changes() in the browser code, used to check that applying the changes to the
+    previous rendered visual gives the current one.
+    """
+    if changes["full"]:
+        return changes["layers"]
+
+    updated = dict(rendered)
+    for layer in set(changes["changed"]) | set(changes["removed"]) | set(changes["order"]):
+        rendered_objects = rendered.get(layer, [])
+        keys = get_rendered_object_keys(rendered_objects)
+        objects_by_key = dict(zip(keys, rendered_objects))
+        for key in changes["removed"].get(layer, []):
+            del objects_by_key[key]
+        objects_by_key.update(changes["changed"].get(layer, {}))
+        ordered_keys = changes["order"].get(layer, [key for key in keys if key in objects_by_key])
+        updated[layer] = [objects_by_key[key] for key in ordered_keys]
+    return updated
+
+
+class TestApiRenderChanges(TestCase):
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    visual_id = 4  # From test fixtures
+
+    def setUp(self):
+        get_render_cache().clear()
+
+    def get_full(self):
+        response = self.client.get(f"/api/v1/rendered/canvas/visuals/{self.visual_id}/")
+        return int(response.headers["X-Render-Revision"]), response.json()
+
+    def get_changes(self, since=None):
+        url = f"/api/v1/rendered/canvas/visuals/changes/{self.visual_id}/"
+        if since is not None:
+            url += f"?since={since}"
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        return response.json()
+
+    def update_activity(self, unique_id, **fields):
+        activity = VisualActivity.objects.get(visual_id=self.visual_id, unique_id_from_plan=unique_id)
+        for field_name, value in fields.items():
+            setattr(activity, field_name, value)
+        activity.save()
+
+    def test_full_visual_returned_without_revision(self):
+        revision, rendered = self.get_full()
+
+        changes = self.get_changes()
+
+        self.assertTrue(changes["full"])
+        self.assertEqual(revision, changes["revision"])
+        self.assertEqual(rendered, changes["layers"])
+
+    def test_full_visual_returned_for_unknown_revision(self):
+        revision, rendered = self.get_full()
+
+        changes = self.get_changes(since=revision + 100)
+
+        self.assertTrue(changes["full"])
+        self.assertEqual(rendered, changes["layers"])
+
+    def test_no_changes_for_current_revision(self):
+        revision, _ = self.get_full()
+
+        changes = self.get_changes(since=revision)
+
+        self.assertFalse(changes["full"])
+        self.assertEqual(({}, {}, {}), (changes["changed"], changes["removed"], changes["order"]))
+
+    def test_changed_activity_only(self):
+        revision, rendered = self.get_full()
+
+        # Moving activity within its swimlane so that swimlane doesn't change height.
+        self.update_activity("ID-025", vertical_positioning_value=2)
+        changes = self.get_changes(since=revision)
+
+        self.assertFalse(changes["full"])
+        self.assertEqual(["visual_activities"], list(changes["changed"]))
+        self.assertEqual({"activity-ID-025", "activity-ID-025-text"}, set(changes["changed"]["visual_activities"]))
+        self.assertEqual({}, changes["removed"])
+
+        new_revision, new_rendered = self.get_full()
+        self.assertEqual(new_revision, changes["revision"])
+        self.assertEqual(new_rendered, apply_changes(rendered, changes))
+
+    def test_removed_activity(self):
+        revision, rendered = self.get_full()
+
+        self.update_activity("ID-026", enabled=False)
+        changes = self.get_changes(since=revision)
+
+        self.assertIn("activity-ID-026", changes["removed"]["visual_activities"])
+        self.assertIn("visual_activities", changes["order"])
+
+        _, new_rendered = self.get_full()
+        self.assertEqual(new_rendered, apply_changes(rendered, changes))
+
+    def test_changes_across_several_revisions(self):
+        revision, rendered = self.get_full()
+
+        self.update_activity("ID-001", enabled=True)
+        self.get_full()
+        self.update_activity("ID-024", height_in_tracks=1)
+        changes = self.get_changes(since=revision)
+
+        self.assertFalse(changes["full"])
+        _, new_rendered = self.get_full()
+        self.assertEqual(new_rendered, apply_changes(rendered, changes))
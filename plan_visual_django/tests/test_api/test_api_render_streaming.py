@@ -0,0 +1,77 @@
+import json
+import os
+from ddt import ddt, data
+from django.test import TestCase
+from plan_visual_django.models import PlanVisual
+from plan_visual_django.services.visual.rendering.render_cache import get_render_cache
+from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
+from plan_visual_django.services.visual.rendering.render_streaming import stream_json_layers
+from plan_visual_django.services.visual.rendering.renderers import CanvasRenderer
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+@ddt
+class TestApiRenderStreaming(TestCase):
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    visual_id = 4  # From test fixtures
+
+    def setUp(self):
+        get_render_cache().clear()
+
+    def get_streamed(self, stream_value="true"):
+        response = self.client.get(f"/api/v1/rendered/canvas/visuals/{self.visual_id}/?stream={stream_value}")
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        return response, json.loads(b"".join(response.streaming_content))
+
+    @data("true", "1", "yes", "True")
+    def test_streamed_matches_non_streamed(self, stream_value):
+        expected = self.client.get(f"/api/v1/rendered/canvas/visuals/{self.visual_id}/").json()
+        get_render_cache().clear()
+
+        response, streamed = self.get_streamed(stream_value)
+
+        self.assertEqual("MISS", response.headers["X-Render-Cache"])
+        self.assertEqual("application/json", response.headers["Content-Type"])
+        self.assertEqual(expected, streamed)
+
+    def test_streamed_from_cache(self):
+        expected = self.client.get(f"/api/v1/rendered/canvas/visuals/{self.visual_id}/").json()
+
+        response, streamed = self.get_streamed()
+
+        self.assertEqual("HIT", response.headers["X-Render-Cache"])
+        self.assertEqual(expected, streamed)
+
+    def test_not_streamed_without_param(self):
+        response = self.client.get(f"/api/v1/rendered/canvas/visuals/{self.visual_id}/?stream=false")
+
+        self.assertFalse(response.streaming)
+
+    def test_empty_visual_not_streamed(self):
+        visual = PlanVisual.objects.get(pk=self.visual_id)
+        visual.visualactivity_set.all().delete()
+
+        response = self.client.get(f"/api/v1/rendered/canvas/visuals/{self.visual_id}/?stream=true")
+
+        self.assertEqual(204, response.status_code)
+
+    @data(1, 2, 1000)
+    def test_stream_json_layers_chunking(self, objects_per_chunk):
+        plotables = VisualRenderSnapshot(self.visual_id).get_plotables()
+        expected = CanvasRenderer().render_from_iterable(plotables)
+
+        chunks = list(stream_json_layers(CanvasRenderer().iter_render(plotables), objects_per_chunk=objects_per_chunk))
+
+        self.assertEqual(expected, json.loads("".join(chunks)))
+        num_objects = sum(len(layer) for layer in expected.values())
+        self.assertEqual(num_objects // objects_per_chunk + 1, len(chunks))
+
+    def test_stream_json_layers_empty_layers(self):
+        chunks = list(stream_json_layers({"timelines": [], "swimlanes": iter([])}))
+
+        self.assertEqual({"timelines": [], "swimlanes": []}, json.loads("".join(chunks)))
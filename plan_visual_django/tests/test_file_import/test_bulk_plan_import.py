@@ -0,0 +1,208 @@
+"""
+Tests for the set based import and re-import of plan activities, checking that only what has changed is written and
+that the number of database queries doesn't grow with the size of the plan.
+"""
+import os
+from datetime import date, datetime
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from plan_visual_django.models import Plan, PlanActivity, PlanVisual, VisualActivity
+from plan_visual_django.services.plan_file_utilities.plan_parsing import read_and_parse_plan, \
+    calculate_activity_fingerprint
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+class ParsedDataReader:
+    """
+    Stands in for a file reader, returning activities as if they had already been read and parsed from a plan file.
+    """
+    def __init__(self, activities):
+        self.activities = activities
+
+    def iter_rows(self, plan):
+        return iter([]), []
+
+    def parse(self, raw_data, headers, plan_field_mapping):
+        return [dict(activity) for activity in self.activities]
+
+
+def make_activity(sticky_id, name=None, start=date(2024, 1, 1), end=date(2024, 1, 5), level=1):
+    return {
+        'unique_sticky_activity_id': sticky_id,
+        'activity_name': name if name is not None else f"Activity {sticky_id}",
+        'duration': (end - start).days,
+        'start_date': start,
+        'end_date': end,
+        'level': level,
+    }
+
+
+class TestBulkPlanImport(TestCase):
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    plan_id = 2  # From test fixtures, activities ID-001 to ID-026 and visuals 1 and 4
+    visual_id = 4  # Includes ID-001, ID-024, ID-025 and ID-026
+    other_visual_id = 1  # Only includes ID-001
+
+    def setUp(self):
+        self.plan = Plan.objects.get(id=self.plan_id)
+
+        # Re-upload the plan as it is, so that sequence numbers are set and later uploads only differ by the test change.
+        self.activities = [
+            {
+                'unique_sticky_activity_id': record.unique_sticky_activity_id,
+                'activity_name': record.activity_name,
+                'duration': (record.end_date - record.start_date).days,
+                'start_date': record.start_date,
+                'end_date': record.end_date,
+                'level': record.level,
+            }
+            for record in PlanActivity.objects.filter(plan=self.plan).order_by('unique_sticky_activity_id')
+        ]
+        self.reupload(self.activities)
+
+    def reupload(self, activities):
+        read_and_parse_plan(self.plan, None, ParsedDataReader(activities), update_flag=True)
+
+    def render_revision(self, visual_id=visual_id):
+        return PlanVisual.objects.get(id=visual_id).render_revision
+
+    def test_new_plan_created_in_bulk(self):
+        plan = Plan.objects.create(user=self.plan.user, plan_name="Bulk", file_name="bulk.xlsx", file_type_name="x")
+        activities = [make_activity(f"N-{index}") for index in range(2500)]
+
+        with CaptureQueriesContext(connection) as queries:
+            read_and_parse_plan(plan, None, ParsedDataReader(activities))
+
+        # Activities are inserted in batches (size depends on the database) rather than one at a time.
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertLess(len(inserts), 50)
+
+        records = list(PlanActivity.objects.filter(plan=plan).order_by('sequence_number'))
+        self.assertEqual(2500, len(records))
+        self.assertEqual(list(range(1, 2501)), [record.sequence_number for record in records])
+
+    def test_no_change_writes_nothing(self):
+        revision_before = self.render_revision()
+
+        with self.assertNumQueries(3):  # Read current activities, savepoint and release.
+            self.reupload(self.activities)
+
+        self.assertEqual(revision_before, self.render_revision())
+
+    def test_datetimes_compared_as_dates(self):
+        # Excel date cells are read as datetimes.
+        activities = [
+            dict(activity, start_date=datetime.combine(activity['start_date'], datetime.min.time()))
+            for activity in self.activities
+        ]
+        with self.assertNumQueries(3):
+            self.reupload(activities)
+
+    def test_only_changed_activities_updated(self):
+        activities = [dict(activity) for activity in self.activities]
+        activities[3]['activity_name'] = "Renamed"
+        activities[7]['end_date'] = date(2030, 1, 1)
+        revision_before = self.render_revision()
+
+        with self.assertNumQueries(6):  # Read, savepoint, update, find visuals including changed activities, plan revision, release.
+            self.reupload(activities)
+
+        self.assertEqual("Renamed", PlanActivity.objects.get(plan=self.plan, unique_sticky_activity_id="ID-004").activity_name)
+        self.assertEqual(date(2030, 1, 1), PlanActivity.objects.get(plan=self.plan, unique_sticky_activity_id="ID-008").end_date)
+
+        # Neither activity is in the visual, so its cached rendering is still valid.
+        self.assertEqual(revision_before, self.render_revision())
+
+    def test_only_affected_visuals_invalidated(self):
+        activities = [dict(activity) for activity in self.activities]
+        activities[24]['activity_name'] = "Renamed"  # ID-025
+        revision_before = self.render_revision()
+        other_revision_before = self.render_revision(self.other_visual_id)
+
+        with self.assertNumQueries(7):  # Read, savepoint, update, find visuals, bump render revision, plan revision, release.
+            self.reupload(activities)
+
+        self.assertEqual(revision_before + 1, self.render_revision())
+        self.assertEqual(other_revision_before, self.render_revision(self.other_visual_id))
+
+    def test_fingerprint_kept_up_to_date(self):
+        record = PlanActivity.objects.get(plan=self.plan, unique_sticky_activity_id="ID-004")
+        record.activity_name = "Renamed"
+        record.save(update_fields=['activity_name'])
+
+        record.refresh_from_db()
+        self.assertEqual(
+            calculate_activity_fingerprint(
+                "Renamed", record.start_date, record.end_date, record.level, record.sequence_number,
+                record.parent_unique_id, record.depth, record.subtree_end_sequence
+            ),
+            record.row_fingerprint
+        )
+
+        # Re-uploading the activity as it was changes it back.
+        with self.assertNumQueries(6):
+            self.reupload(self.activities)
+        self.assertEqual(self.activities[3]['activity_name'], PlanActivity.objects.get(id=record.id).activity_name)
+
+    def test_added_and_deleted(self):
+        activities = [activity for activity in self.activities if activity['unique_sticky_activity_id'] != "ID-026"]
+        activities.append(make_activity("ID-100"))
+        self.assertTrue(VisualActivity.objects.filter(visual_id=self.visual_id, unique_id_from_plan="ID-026").exists())
+
+        self.reupload(activities)
+
+        sticky_ids = set(PlanActivity.objects.filter(plan=self.plan).values_list('unique_sticky_activity_id', flat=True))
+        self.assertNotIn("ID-026", sticky_ids)
+        self.assertIn("ID-100", sticky_ids)
+        self.assertEqual(26, PlanActivity.objects.get(plan=self.plan, unique_sticky_activity_id="ID-100").sequence_number)
+        self.assertFalse(VisualActivity.objects.filter(visual__plan=self.plan, unique_id_from_plan="ID-026").exists())
+
+    def test_delete_only_invalidates_affected_visuals(self):
+        revision_before = self.render_revision()
+        other_revision_before = self.render_revision(self.other_visual_id)
+
+        # ID-026 is only in the visual.
+        self.reupload([activity for activity in self.activities if activity['unique_sticky_activity_id'] != "ID-026"])
+
+        self.assertEqual(revision_before + 1, self.render_revision())
+        self.assertEqual(other_revision_before, self.render_revision(self.other_visual_id))
+
+    def test_delete_leaves_other_plans_alone(self):
+        other_activities = VisualActivity.objects.exclude(visual__plan=self.plan).count()
+
+        self.reupload(self.activities[:5])
+
+        self.assertEqual(5, PlanActivity.objects.filter(plan=self.plan).count())
+        self.assertEqual(other_activities, VisualActivity.objects.exclude(visual__plan=self.plan).count())
+
+    def test_many_deleted_in_bulk(self):
+        query_counts = []
+        for num_deleted in (20, 2000):
+            deleted_ids = [f"DEL-{num_deleted}-{index}" for index in range(num_deleted)]
+            self.reupload(self.activities + [make_activity(sticky_id) for sticky_id in deleted_ids])
+            # Put one of the activities to be deleted in the visual, by copying one already there.
+            visual_activity = VisualActivity.objects.get(visual_id=self.visual_id, unique_id_from_plan="ID-026")
+            visual_activity.pk, visual_activity.unique_id_from_plan = None, deleted_ids[0]
+            visual_activity.save()
+            revision_before = self.render_revision()
+
+            with CaptureQueriesContext(connection) as queries:
+                self.reupload(self.activities)
+
+            # Deletes are batched by the database, but each visual's revision is only incremented once.
+            revision_updates = [
+                query for query in queries.captured_queries
+                if query['sql'].startswith('UPDATE "plan_visual_django_planvisual"')
+            ]
+            query_counts.append(len(queries))
+            self.assertEqual(1, len(revision_updates))
+            self.assertEqual(revision_before + 1, self.render_revision())
+            self.assertFalse(PlanActivity.objects.filter(plan=self.plan, unique_sticky_activity_id__in=deleted_ids).exists())
+            self.assertFalse(VisualActivity.objects.filter(unique_id_from_plan__in=deleted_ids).exists())
+
+        self.assertLess(query_counts[1], 100)
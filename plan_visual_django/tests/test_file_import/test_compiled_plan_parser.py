@@ -0,0 +1,102 @@
+"""
+Tests for parsing plan rows with the compiled field mapping, in particular rows with errors and rows spread across
+more than one chunk.
+"""
+import io
+from contextlib import redirect_stdout
+from datetime import date
+from operator import attrgetter
+from unittest import mock
+from ddt import ddt, data
+from django.test import TestCase
+from plan_visual_django.services.plan_file_utilities import plan_reader
+from plan_visual_django.services.plan_file_utilities.plan_field import FileTypes, PlanInputField
+from plan_visual_django.services.plan_file_utilities.plan_reader import PlanParser, ExcelXLSFileReader, \
+    CompiledPlanField
+
+
+def msp_row(row_id, duration="5 days", start="10 June 2022 08:00", finish="15 June 2022 08:00", level=1):
+    values = {
+        "ID": row_id, "Name": f"Activity {row_id}", "Duration": duration, "Start_Date": start, "Finish_Date": finish,
+        "Outline_Level": level,
+    }
+    return {heading: PlanInputField(value=value, indent=0) for heading, value in values.items()}
+
+
+@ddt
+class TestCompiledPlanParser(TestCase):
+    headings = ["ID", "Name", "Duration", "Start_Date", "Finish_Date", "Outline_Level"]
+
+    def setUp(self):
+        _, self.plan_field_mapping = FileTypes.get_file_type_by_name("excel-01-msp-export-default-01")
+
+    def test_compiled_once_per_file(self):
+        compiled_fields = PlanParser(self.plan_field_mapping).compile_field_mapping(self.headings)
+
+        self.assertEqual(
+            ["unique_sticky_activity_id", "activity_name", "duration", "start_date", "end_date", "level"],
+            [field.plan_field_name for field in compiled_fields]
+        )
+        # Dates are converted from strings, so repeated values are converted once.
+        self.assertIsNotNone(compiled_fields[3].cache)
+        self.assertIsNone(compiled_fields[1].cache)
+
+    @data(1, 2, 1000)
+    def test_rows_across_chunks(self, chunk_size):
+        rows = [msp_row(str(index), start=f"{index + 1} June 2022 08:00") for index in range(5)]
+
+        with mock.patch.object(plan_reader, "PARSE_CHUNK_SIZE", chunk_size):
+            parsed = PlanParser(self.plan_field_mapping).parse(iter(rows), self.headings)
+
+        self.assertEqual([str(index) for index in range(5)], [row["unique_sticky_activity_id"] for row in parsed])
+        self.assertEqual([date(2022, 6, index + 1) for index in range(5)], [row["start_date"] for row in parsed])
+
+    @data(1, 2, 1000)
+    def test_errors_collected(self, chunk_size):
+        rows = [
+            msp_row("1"),
+            msp_row("2", duration="five days"),
+            msp_row("3"),
+            msp_row("4", start="not a date", finish=None),
+        ]
+        parser = PlanParser(self.plan_field_mapping)
+
+        output = io.StringIO()
+        with mock.patch.object(plan_reader, "PARSE_CHUNK_SIZE", chunk_size), redirect_stdout(output):
+            parsed = parser.parse(iter(rows), self.headings)
+
+        self.assertEqual(["1", "3"], [row["unique_sticky_activity_id"] for row in parsed])
+        self.assertEqual(
+            [(2, "duration"), (4, "end_date"), (4, "start_date")],
+            sorted((error.row_number, error.plan_field_name) for error in parser.errors)
+        )
+        self.assertEqual("", output.getvalue())
+
+    def test_errors_available_from_reader(self):
+        reader = ExcelXLSFileReader()
+
+        parsed = reader.parse(iter([msp_row("1"), msp_row("2", duration="x")]), self.headings, self.plan_field_mapping)
+
+        self.assertEqual(1, len(parsed))
+        self.assertEqual(
+            ["Row 2: can't read duration from 'x' (Invalid string x)"], [str(error) for error in reader.parse_errors]
+        )
+
+    def test_cached_values_reused(self):
+        convert = mock.Mock(side_effect=plan_reader.convert_string_date_dmy_02)
+        field = CompiledPlanField("start_date", "Start_Date", attrgetter("value"), convert, cache={})
+
+        converted, failures = field.convert_column(["10 June 2022 08:00", "11 June 2022 08:00"] * 5)
+
+        self.assertEqual([date(2022, 6, 10), date(2022, 6, 11)] * 5, converted)
+        self.assertEqual([], failures)
+        self.assertEqual(2, convert.call_count)
+
+    def test_cache_limited(self):
+        field = CompiledPlanField("level", "Outline_Level", attrgetter("value"), plan_reader.convert_string_int, cache={})
+
+        with mock.patch.object(plan_reader, "MAX_CACHED_VALUES_PER_COLUMN", 3):
+            converted, _ = field.convert_column([str(value) for value in range(10)])
+
+        self.assertEqual(list(range(10)), converted)
+        self.assertEqual(3, len(field.cache))
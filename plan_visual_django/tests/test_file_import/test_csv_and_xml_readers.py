@@ -0,0 +1,181 @@
+"""
+Tests for reading plans from CSV and MS Project XML files, which should give the same activities as the Excel version
+of the same plan (PV-Test-03).
+"""
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+from datetime import date
+from unittest import mock
+from ddt import ddt, data, unpack
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from plan_visual_django.exceptions import PlanParseError
+from plan_visual_django.models import Plan, PlanActivity, PlanImportJob
+from plan_visual_django.services.plan_file_utilities.plan_field import FileTypes, FileType
+from plan_visual_django.services.plan_file_utilities.plan_reader import CSVPlanFileReader, MSProjectXMLFileReader, \
+    get_file_reader, convert_string_iso_duration_int
+from plan_visual_django.tests.resources.unit_test_configuration import csv_input_files_folder, \
+    msp_xml_input_files_folder, test_data_base_folder, test_fixtures_folder
+
+User = get_user_model()
+
+media_root = tempfile.mkdtemp()
+
+expected_activities = [
+    ("ID-0007", "Project Start", 0, date(2023, 1, 1), date(2023, 1, 1), 1),
+    ("ID-0001", "Activity 1", 15, date(2023, 1, 2), date(2023, 1, 20), 1),
+    ("ID-0002", "Activity 2", 15, date(2023, 1, 2), date(2023, 1, 20), 2),
+    ("ID-0005", "Activity 5", 10, date(2023, 1, 2), date(2023, 1, 13), 3),
+    ("ID-0006", "Another activity", 5, date(2023, 1, 16), date(2023, 1, 20), 3),
+    ("ID-0003", "Activity 3", 5, date(2023, 1, 23), date(2023, 1, 27), 1),
+    ("ID-0004", "Activity 4", 10, date(2023, 1, 30), date(2023, 2, 10), 1),
+]
+
+
+def read_and_parse(reader, file_type: FileType, file_object, file_name="PV-Test-03"):
+    plan = mock.Mock(spec=Plan)
+    plan.file_type_name = file_type.file_type_name
+    plan.file_name = file_name
+    plan.file = File(file_object)
+    _, plan_field_mapping = FileTypes.get_file_type_by_name(file_type.file_type_name)
+    rows, headings = reader.iter_rows(plan)
+    return reader.parse(rows, headings, plan_field_mapping)
+
+
+def as_tuples(parsed, sticky_ids=None):
+    return [
+        (
+            sticky_ids[index] if sticky_ids is not None else activity['unique_sticky_activity_id'],
+            activity['activity_name'], activity['duration'], activity['start_date'], activity['end_date'],
+            activity['level']
+        )
+        for index, activity in enumerate(parsed)
+    ]
+
+
+def msp_xml(num_tasks: int) -> bytes:
+    tasks = "".join(
+        f"<Task><UID>{uid}</UID><Name>Task {uid}</Name><Duration>PT8H0M0S</Duration>"
+        f"<Start>2024-01-01T08:00:00</Start><Finish>2024-01-01T17:00:00</Finish><OutlineLevel>1</OutlineLevel></Task>"
+        for uid in range(1, num_tasks + 1)
+    )
+    return f'<Project xmlns="http://schemas.microsoft.com/project"><Tasks>{tasks}</Tasks></Project>'.encode()
+
+
+@ddt
+class TestCSVAndXMLReaders(TestCase):
+    def test_csv(self):
+        with open(os.path.join(csv_input_files_folder, "PV-Test-03.csv"), "rb") as file:
+            parsed = read_and_parse(CSVPlanFileReader(), FileType.CSV_PLAN_01, file)
+
+        self.assertEqual(expected_activities, as_tuples(parsed))
+
+    def test_msp_xml(self):
+        with open(os.path.join(msp_xml_input_files_folder, "PV-Test-03.xml"), "rb") as file:
+            parsed = read_and_parse(MSProjectXMLFileReader(), FileType.MSP_XML_01, file)
+
+        # MS Project ids are numbers, and the project summary task and blank task are left out.
+        self.assertEqual(["7", "1", "2", "5", "6", "3", "4"], [activity['unique_sticky_activity_id'] for activity in parsed])
+        self.assertEqual(
+            expected_activities, as_tuples(parsed, [activity[0] for activity in expected_activities])
+        )
+
+    def test_msp_xml_without_namespace(self):
+        xml = msp_xml(2).replace(b' xmlns="http://schemas.microsoft.com/project"', b"")
+
+        parsed = read_and_parse(MSProjectXMLFileReader(), FileType.MSP_XML_01, io.BytesIO(xml))
+
+        self.assertEqual(["1", "2"], [activity['unique_sticky_activity_id'] for activity in parsed])
+
+    def test_msp_xml_invalid(self):
+        with self.assertRaises(PlanParseError):
+            read_and_parse(MSProjectXMLFileReader(), FileType.MSP_XML_01, io.BytesIO(msp_xml(2)[:-20]))
+
+    def test_msp_xml_memory_flat(self):
+        """
+        Tasks are cleared as they are read, so memory used while reading doesn't grow with the number of tasks.
+        """
+        reader = MSProjectXMLFileReader()
+        peaks = []
+        for num_tasks in (1000, 10000):
+            plan = mock.Mock(spec=Plan)
+            plan.file_name = "big.xml"
+            plan.file = File(io.BytesIO(msp_xml(num_tasks)))
+            rows, _ = reader.iter_rows(plan)
+            tracemalloc.start()
+            count = sum(1 for _ in rows)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.assertEqual(num_tasks, count)
+            peaks.append(peak)
+
+        self.assertLess(peaks[1], peaks[0] * 2)
+
+    def test_csv_short_and_blank_rows(self):
+        # Starts with the byte order mark added by Excel.
+        csv_data = "\ufeffID,Name,Duration,Start,Finish,Level\nA,First,1,2024-01-01,2024-01-01,1\n,,,,,\nB,Second,2,2024-01-02\n"
+
+        plan = mock.Mock(spec=Plan)
+        plan.file_name = "short.csv"
+        plan.file = File(io.BytesIO(csv_data.encode()))
+        rows, headings = CSVPlanFileReader().iter_rows(plan)
+        rows = list(rows)
+
+        self.assertEqual(["ID", "Name", "Duration", "Start", "Finish", "Level"], headings)
+        self.assertEqual(["A", "B"], [row["ID"].value for row in rows])
+        self.assertIsNone(rows[1]["Finish"].value)
+
+    @data(
+        ("PT0H0M0S", 0),
+        ("PT8H0M0S", 1),
+        ("PT40H0M0S", 5),
+        ("PT4H30M0S", 1),
+        ("P1DT8H0M0S", 2),
+    )
+    @unpack
+    def test_iso_duration(self, duration, expected_days):
+        self.assertEqual(expected_days, convert_string_iso_duration_int(duration))
+
+    @data(*FileType)
+    def test_reader_for_every_file_type(self, file_type):
+        self.assertIsNotNone(get_file_reader(file_type))
+
+
+@override_settings(MEDIA_ROOT=media_root, PLAN_IMPORT_MAX_WORKERS=0)
+@ddt
+class TestImportCSVAndXML(TestCase):
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+    @data(
+        (csv_input_files_folder, "PV-Test-03.csv", FileType.CSV_PLAN_01),
+        (msp_xml_input_files_folder, "PV-Test-03.xml", FileType.MSP_XML_01),
+    )
+    @unpack
+    def test_add_plan(self, folder, file_name, file_type):
+        self.client.force_login(User.objects.get(id=1))
+        with open(os.path.join(folder, file_name), "rb") as file:
+            self.client.post("/pv/add-plan", {
+                'plan_name': f'Plan from {file_name}',
+                'file': SimpleUploadedFile(file_name, file.read()),
+                'file_type_name': file_type.file_type_name,
+            })
+
+        job = PlanImportJob.objects.get(plan_name=f'Plan from {file_name}')
+        self.assertEqual(PlanImportJob.Status.COMPLETE, job.status)
+        self.assertEqual(
+            [activity[1] for activity in expected_activities],
+            list(PlanActivity.objects.filter(plan=job.plan).order_by('sequence_number').values_list('activity_name', flat=True))
+        )
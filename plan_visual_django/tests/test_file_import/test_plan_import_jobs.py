@@ -0,0 +1,312 @@
+"""
+Tests for importing plans through import jobs.  Imports are run in the test thread (PLAN_IMPORT_MAX_WORKERS=0) as
+worker threads can't see the test database.
+"""
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from plan_visual_django.models import Plan, PlanImportJob, PlanActivity
+from plan_visual_django.services.plan_file_utilities.plan_field import FileTypes
+from plan_visual_django.services.plan_file_utilities import plan_import
+from plan_visual_django.services.plan_file_utilities.plan_import import run_import_job, get_job_status, \
+    cancel_import_job, discard_lost_uploads, send_heartbeat
+from plan_visual_django.services.plan_file_utilities import plan_parsing
+from plan_visual_django.services.plan_file_utilities.plan_parsing import read_and_parse_plan
+from plan_visual_django.services.plan_file_utilities.plan_reader import ExcelXLSFileReader
+from plan_visual_django.tests.resources.unit_test_configuration import excel_reimported_files_folder, \
+    test_data_base_folder, test_fixtures_folder
+
+User = get_user_model()
+
+media_root = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=media_root, PLAN_IMPORT_MAX_WORKERS=0, PLAN_IMPORT_MAX_PER_USER=2)
+class TestPlanImportJobs(TestCase):
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    user_id = 1
+    file_type_name = "excel-02-smartsheet-export-01"
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.get(id=self.user_id)
+        self.client.force_login(self.user)
+
+    @staticmethod
+    def plan_file(file_name):
+        with open(os.path.join(excel_reimported_files_folder, file_name), 'rb') as file:
+            return SimpleUploadedFile(file_name, file.read())
+
+    def add_plan(self, file_name="PV-Test-03.xlsx", file_type_name=file_type_name):
+        return self.client.post("/pv/add-plan", {
+            'plan_name': 'PV-Test-03',
+            'file': self.plan_file(file_name),
+            'file_type_name': file_type_name,
+        })
+
+    def re_upload_plan(self, plan, file_name):
+        return self.client.post(f"/pv/re-upload-plan/{plan.id}", {'file': self.plan_file(file_name)})
+
+    def create_queued_job(self):
+        job_number = PlanImportJob.objects.count() + 1
+        plan = Plan.objects.create(
+            user=self.user, plan_name=f"Queued {job_number}", file_name=f"Queued-{job_number}.xlsx",
+            file_type_name=self.file_type_name, file=self.plan_file("PV-Test-03.xlsx")
+        )
+        return PlanImportJob.objects.create(plan=plan, plan_name=plan.plan_name, user=self.user)
+
+    def test_add_plan(self):
+        self.add_plan()
+
+        job = PlanImportJob.objects.get(user=self.user)
+        self.assertEqual(PlanImportJob.Status.COMPLETE, job.status)
+        self.assertEqual(PlanImportJob.Stage.DONE, job.stage)
+        self.assertGreater(job.rows_read, 0)
+        self.assertEqual(job.activities_added, PlanActivity.objects.filter(plan=job.plan).count())
+        self.assertGreater(job.activities_added, 0)
+
+    def test_add_plan_failure_removes_plan(self):
+        plans_before = Plan.objects.count()
+
+        # File doesn't have the sheet expected for an MS Project export.
+        self.add_plan(file_type_name="excel-01-msp-export-default-01")
+
+        job = PlanImportJob.objects.get(user=self.user)
+        self.assertEqual(PlanImportJob.Status.FAILED, job.status)
+        self.assertNotEqual("", job.error_message)
+        self.assertIsNone(job.plan)
+        self.assertEqual(plans_before, Plan.objects.count())
+
+    def test_corrupt_file_removes_plan(self):
+        plans_before = Plan.objects.count()
+
+        # Not a workbook at all, so fails when the file is opened rather than when it is parsed.
+        self.client.post("/pv/add-plan", {
+            'plan_name': 'PV-Test-03',
+            'file': SimpleUploadedFile("broken.xlsx", b"not a workbook"),
+            'file_type_name': self.file_type_name,
+        })
+
+        job = PlanImportJob.objects.get(user=self.user)
+        self.assertEqual(PlanImportJob.Status.FAILED, job.status)
+        self.assertIsNone(job.plan)
+        self.assertEqual(plans_before, Plan.objects.count())
+
+        # Nothing is left behind to stop the plan being uploaded again.
+        self.add_plan()
+        self.assertEqual(PlanImportJob.Status.COMPLETE, PlanImportJob.objects.filter(user=self.user).first().status)
+
+    def test_re_upload(self):
+        self.add_plan()
+        plan = PlanImportJob.objects.get(user=self.user).plan
+
+        self.re_upload_plan(plan, "PV-Test-03-t03-activity-deleted.xlsx")
+
+        job = PlanImportJob.objects.filter(user=self.user, update_flag=True).get()
+        plan.refresh_from_db()
+        self.assertEqual(PlanImportJob.Status.COMPLETE, job.status)
+        self.assertEqual(1, job.activities_deleted)
+        self.assertEqual(job.file.name, plan.file.name)
+        self.assertEqual("PV-Test-03-t03-activity-deleted.xlsx", plan.file_name)
+
+    def test_file_hash_saved(self):
+        self.add_plan()
+        plan = PlanImportJob.objects.get(user=self.user).plan
+
+        self.re_upload_plan(plan, "PV-Test-03-t03-activity-deleted.xlsx")
+
+        job = PlanImportJob.objects.filter(user=self.user, update_flag=True).get()
+        plan.refresh_from_db()
+        self.assertEqual(64, len(job.file_hash))
+        self.assertEqual(job.file_hash, plan.file_hash)
+        self.assertNotEqual(job.file_hash, PlanImportJob.objects.get(user=self.user, update_flag=False).file_hash)
+
+    def test_identical_re_upload_skipped(self):
+        self.add_plan()
+        plan = PlanImportJob.objects.get(user=self.user).plan
+        file_before = plan.file.name
+
+        with mock.patch.object(plan_parsing, "read_and_parse_plan") as read_and_parse:
+            response = self.re_upload_plan(plan, "PV-Test-03.xlsx")
+
+        read_and_parse.assert_not_called()
+        job = PlanImportJob.objects.filter(user=self.user, update_flag=True).get()
+        plan.refresh_from_db()
+        self.assertEqual(PlanImportJob.Status.COMPLETE, job.status)
+        self.assertTrue(job.skipped_unchanged)
+        self.assertFalse(job.file)
+        self.assertEqual(file_before, plan.file.name)
+        self.assertIn("nothing to update", [str(message) for message in response.wsgi_request._messages][-1])
+
+    def test_failed_re_upload_leaves_plan(self):
+        self.add_plan()
+        plan = PlanImportJob.objects.get(user=self.user).plan
+        file_before = plan.file.name
+        activities_before = PlanActivity.objects.filter(plan=plan).count()
+
+        # Change the file type so the new file can't be read.
+        Plan.objects.filter(id=plan.id).update(file_type_name="excel-01-msp-export-default-01")
+        self.re_upload_plan(plan, "PV-Test-03-t03-activity-deleted.xlsx")
+
+        job = PlanImportJob.objects.filter(user=self.user, update_flag=True).get()
+        plan.refresh_from_db()
+        self.assertEqual(PlanImportJob.Status.FAILED, job.status)
+        self.assertEqual(file_before, plan.file.name)
+        self.assertEqual(activities_before, PlanActivity.objects.filter(plan=plan).count())
+
+    def test_progress_stages(self):
+        self.add_plan()
+        plan = PlanImportJob.objects.get(user=self.user).plan
+        _, plan_field_mapping = FileTypes.get_file_type_by_name(self.file_type_name)
+
+        stages = []
+        read_and_parse_plan(
+            plan, plan_field_mapping, ExcelXLSFileReader(), update_flag=True,
+            progress=lambda stage, **counts: stages.append((stage, counts))
+        )
+
+        self.assertEqual(["READ", "PARSE", "PARSE", "DIFF", "WRITE"], [stage for stage, _ in stages])
+        self.assertEqual({'rows_read': 0}, stages[1][1])
+        self.assertGreater(stages[2][1]['rows_read'], 0)
+
+    def test_limit_per_user(self):
+        self.create_queued_job()
+        self.create_queued_job()
+        plans_before = Plan.objects.count()
+
+        response = self.add_plan()
+
+        self.assertEqual(plans_before, Plan.objects.count())
+        self.assertIn("plan imports in progress", [str(message) for message in response.wsgi_request._messages][0])
+
+    def test_lost_jobs_not_counted(self):
+        for _ in range(2):
+            job = self.create_queued_job()
+            PlanImportJob.objects.filter(id=job.id).update(updated=timezone.now() - timedelta(days=1))
+
+        self.add_plan()
+
+        self.assertEqual(1, PlanImportJob.objects.filter(status=PlanImportJob.Status.COMPLETE).count())
+        self.assertEqual(2, PlanImportJob.objects.filter(status=PlanImportJob.Status.FAILED).count())
+
+    def test_lost_job_failed(self):
+        job = self.create_queued_job()
+        PlanImportJob.objects.filter(id=job.id).update(
+            status=PlanImportJob.Status.RUNNING, updated=timezone.now() - timedelta(days=1)
+        )
+
+        job = get_job_status(job)
+
+        # Checking the status doesn't remove the plan, that is left until the next import is started.
+        self.assertEqual(PlanImportJob.Status.FAILED, job.status)
+        self.assertIsNotNone(job.plan)
+
+        self.add_plan()
+
+        job.refresh_from_db()
+        self.assertIsNone(job.plan)
+        self.assertEqual(1, Plan.objects.filter(user=self.user).count())
+
+    def test_lost_re_upload_discarded(self):
+        self.add_plan()
+        plan = PlanImportJob.objects.get(user=self.user).plan
+        file_before = plan.file.name
+        job = PlanImportJob.objects.create(
+            plan=plan, plan_name=plan.plan_name, user=self.user, update_flag=True, status=PlanImportJob.Status.FAILED,
+            file=self.plan_file("PV-Test-03-t03-activity-deleted.xlsx")
+        )
+        new_file = job.file.name
+
+        discard_lost_uploads()
+
+        job.refresh_from_db()
+        plan.refresh_from_db()
+        self.assertFalse(job.file)
+        self.assertFalse(job.file.storage.exists(new_file))
+        self.assertEqual(file_before, plan.file.name)
+
+    def test_live_job_not_lost(self):
+        job = self.create_queued_job()
+        stale = timezone.now() - timedelta(days=1)
+        PlanImportJob.objects.filter(id=job.id).update(status=PlanImportJob.Status.RUNNING, updated=stale)
+
+        # Job is being run by this process (e.g. it is in the middle of writing the plan), so its heartbeat keeps it
+        # up to date for any other process checking on it.
+        with mock.patch.object(plan_import, "_live_job_ids", {job.id}):
+            send_heartbeat()
+            self.assertEqual(PlanImportJob.Status.RUNNING, get_job_status(job).status)
+
+        self.assertGreater(job.updated, stale)
+        self.assertEqual(PlanImportJob.Status.RUNNING, get_job_status(job).status)
+
+    def test_cancel_queued(self):
+        job = self.create_queued_job()
+        plan_id = job.plan_id
+
+        job = cancel_import_job(job)
+
+        self.assertEqual(PlanImportJob.Status.CANCELLED, job.status)
+        self.assertFalse(Plan.objects.filter(id=plan_id).exists())
+
+        # The worker doesn't start a cancelled job.
+        run_import_job(job.id, close_connection=False)
+        job.refresh_from_db()
+        self.assertEqual(PlanImportJob.Status.CANCELLED, job.status)
+
+    def test_cancel_running(self):
+        job = self.create_queued_job()
+        PlanImportJob.objects.filter(id=job.id).update(cancel_requested=True)
+
+        run_import_job(job.id, close_connection=False)
+
+        job.refresh_from_db()
+        self.assertEqual(PlanImportJob.Status.CANCELLED, job.status)
+        self.assertEqual(PlanImportJob.Stage.READ, job.stage)
+        self.assertIsNone(job.plan)
+
+    def test_api_job_status(self):
+        self.add_plan()
+        job = PlanImportJob.objects.get(user=self.user)
+
+        response = self.client.get(f"/api/v1/plan-import/jobs/{job.id}/")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("COMPLETE", response.data["status"])
+        self.assertTrue(response.data["is_finished"])
+
+    def test_api_job_list(self):
+        self.add_plan()
+
+        response = self.client.get("/api/v1/plan-import/jobs/")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len(response.data))
+
+    def test_api_other_users_job(self):
+        job = self.create_queued_job()
+        self.client.force_login(User.objects.exclude(id=self.user_id).first())
+
+        self.assertEqual(404, self.client.get(f"/api/v1/plan-import/jobs/{job.id}/").status_code)
+        self.assertEqual(404, self.client.post(f"/api/v1/plan-import/jobs/{job.id}/cancel/").status_code)
+
+    def test_api_cancel(self):
+        job = self.create_queued_job()
+
+        response = self.client.post(f"/api/v1/plan-import/jobs/{job.id}/cancel/")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("CANCELLED", response.data["status"])
@@ -0,0 +1,101 @@
+"""
+Tests for streaming of rows from Excel plan files, checking the cases which the whole file reader used to handle by
+probing cell by cell - blank rows, short rows and indents.
+"""
+import io
+import types
+from datetime import datetime
+from unittest import mock
+from django.core.files import File
+from django.test import TestCase
+from openpyxl import Workbook
+from openpyxl.styles import Alignment
+from plan_visual_django.models import Plan
+from plan_visual_django.services.plan_file_utilities.plan_field import PlanFieldInputSourceEnum, FileTypes
+from plan_visual_django.services.plan_file_utilities.plan_reader import ExcelXLSFileReader
+
+
+class TestStreamingExcelRead(TestCase):
+    headings = ["Id", "Level #", "Task Name", "Duration", "Start", "Finish"]
+
+    @staticmethod
+    def create_plan(workbook: Workbook) -> Plan:
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+
+        plan = mock.Mock(spec=Plan)
+        plan.file_type_name = "excel-02-smartsheet-export-01"
+        plan.file = File(buffer)
+        plan.file_name = "Streaming-Test.xlsx"
+        return plan
+
+    def create_workbook(self, num_rows: int, blank_rows_after=()) -> Workbook:
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(self.headings)
+        row_num = 2
+        for index in range(num_rows):
+            sheet.append([float(index + 1), 0, f"Activity {index + 1}", "1d", datetime(2024, 1, 1), datetime(2024, 1, 2)])
+            sheet.cell(row_num, 3).alignment = Alignment(indent=index % 3)
+            row_num += 1
+            if index in blank_rows_after:
+                # Leave a gap of 150 blank rows, which is more than the old reader would look past.
+                row_num += 150
+                for _ in range(150):
+                    sheet.append([])
+        return workbook
+
+    def test_rows_are_streamed(self):
+        rows, headings = ExcelXLSFileReader().iter_rows(self.create_plan(self.create_workbook(5)))
+
+        self.assertIsInstance(rows, types.GeneratorType)
+        self.assertEqual(self.headings, headings)
+        self.assertEqual(5, len(list(rows)))
+
+    def test_blank_rows_skipped(self):
+        records, _ = ExcelXLSFileReader().read(self.create_plan(self.create_workbook(6, blank_rows_after=(1, 3))))
+
+        self.assertEqual(
+            [f"Activity {index + 1}" for index in range(6)],
+            [record["Task Name"].get_input_data(PlanFieldInputSourceEnum.VALUE) for record in records]
+        )
+
+    def test_indent_extracted(self):
+        records, _ = ExcelXLSFileReader().read(self.create_plan(self.create_workbook(6)))
+
+        self.assertEqual(
+            [0, 1, 2, 0, 1, 2],
+            [record["Task Name"].get_input_data(PlanFieldInputSourceEnum.INDENT) for record in records]
+        )
+        self.assertEqual(0, records[0]["Id"].get_input_data(PlanFieldInputSourceEnum.INDENT))
+
+    def test_short_rows_padded(self):
+        workbook = Workbook()
+        workbook.active.append(self.headings)
+        workbook.active.append(["ID-1", 1])
+
+        records, _ = ExcelXLSFileReader().read(self.create_plan(workbook))
+
+        self.assertEqual(self.headings, list(records[0]))
+        self.assertIsNone(records[0]["Finish"].get_input_data(PlanFieldInputSourceEnum.VALUE))
+        self.assertEqual(0, records[0]["Finish"].get_input_data(PlanFieldInputSourceEnum.INDENT))
+
+    def test_workbook_closed_when_finished(self):
+        rows, _ = ExcelXLSFileReader().iter_rows(self.create_plan(self.create_workbook(3)))
+
+        # Close is called on the workbook by the generator once the last row has been read.
+        workbook = rows.gi_frame.f_locals["wb_obj"]
+        with mock.patch.object(workbook, "close", wraps=workbook.close) as close:
+            list(rows)
+        close.assert_called_once()
+
+    def test_streamed_rows_parse(self):
+        file_reader = ExcelXLSFileReader()
+        _, plan_field_mapping = FileTypes.get_file_type_by_name("excel-02-smartsheet-export-01")
+
+        rows, headings = file_reader.iter_rows(self.create_plan(self.create_workbook(4)))
+        parsed = file_reader.parse(rows, headings, plan_field_mapping=plan_field_mapping)
+
+        self.assertEqual(4, len(parsed))
+        self.assertEqual([0, 1, 2, 0], [activity["level"] for activity in parsed])
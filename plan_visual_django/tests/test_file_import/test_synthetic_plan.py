@@ -0,0 +1,89 @@
+"""
+Tests for the synthetic plans used to benchmark the app, checking that the hierarchy is well formed and that the files
+written for each file type are read back as the same plan.
+"""
+import io
+from datetime import date
+from unittest import mock
+from ddt import ddt, data
+from django.core.files import File
+from django.test import TestCase
+from plan_visual_django.models import Plan
+from plan_visual_django.services.plan_file_utilities.plan_field import FileType, FileTypes
+from plan_visual_django.services.plan_file_utilities.plan_parsing import as_date
+from plan_visual_django.services.plan_file_utilities.plan_reader import get_file_reader
+from plan_visual_django.services.plan_file_utilities.synthetic_plan import generate_synthetic_plan, \
+    write_synthetic_plan
+
+
+@ddt
+class TestSyntheticPlan(TestCase):
+    def setUp(self):
+        self.activities = generate_synthetic_plan(500, max_depth=5, milestone_ratio=0.2, date_spread_days=365)
+
+    def test_hierarchy(self):
+        self.assertEqual(1, self.activities[0].level)
+        for previous, activity in zip(self.activities, self.activities[1:]):
+            self.assertLessEqual(activity.level, previous.level + 1)
+        self.assertEqual(5, max(activity.level for activity in self.activities))
+
+    def test_summary_activities_span_children(self):
+        for index, activity in enumerate(self.activities):
+            children_end = index + 1
+            while children_end < len(self.activities) and self.activities[children_end].level > activity.level:
+                children_end += 1
+            descendants = self.activities[index + 1:children_end]
+            if descendants:
+                self.assertFalse(activity.milestone_flag)
+                self.assertEqual(min(child.start_date for child in descendants), activity.start_date)
+                self.assertEqual(max(child.end_date for child in descendants), activity.end_date)
+
+    def test_dates_and_milestones(self):
+        milestones = [activity for activity in self.activities if activity.milestone_flag]
+
+        self.assertTrue(all(activity.start_date == activity.end_date for activity in milestones))
+        self.assertGreater(len(milestones), 0)
+        self.assertTrue(all(
+            date(2024, 1, 1) <= activity.start_date <= activity.end_date <= date(2025, 1, 1)
+            for activity in self.activities
+        ))
+
+    def test_same_seed_same_plan(self):
+        self.assertEqual(self.activities, generate_synthetic_plan(500, max_depth=5, milestone_ratio=0.2, date_spread_days=365))
+        self.assertNotEqual(self.activities, generate_synthetic_plan(500, max_depth=5, milestone_ratio=0.2, date_spread_days=365, seed=1))
+
+    def test_children_per_parent(self):
+        activities = generate_synthetic_plan(10, max_depth=2, children_per_parent=4)
+
+        self.assertEqual([1, 2, 2, 2, 2, 1, 2, 2, 2, 2], [activity.level for activity in activities])
+
+    @data(*FileType)
+    def test_read_back(self, file_type):
+        file_data, extension = write_synthetic_plan(self.activities, file_type)
+
+        plan = mock.Mock(spec=Plan)
+        plan.file_type_name = file_type.file_type_name
+        plan.file_name = f"synthetic.{extension}"
+        plan.file = File(io.BytesIO(file_data))
+        _, plan_field_mapping = FileTypes.get_file_type_by_name(file_type.file_type_name)
+        reader = get_file_reader(file_type)
+        rows, headings = reader.iter_rows(plan)
+        parsed = reader.parse(rows, headings, plan_field_mapping)
+
+        self.assertEqual([], reader.parse_errors)
+        self.assertEqual(
+            [
+                (activity.sticky_id, activity.name, activity.start_date, activity.end_date, activity.milestone_flag)
+                for activity in self.activities
+            ],
+            [
+                (
+                    row['unique_sticky_activity_id'], row['activity_name'], as_date(row['start_date']),
+                    as_date(row['end_date']), row['duration'] == 0
+                )
+                for row in parsed
+            ]
+        )
+        # Smartsheet levels are the indent of the task name, which starts at zero.
+        level_offset = 1 if file_type == FileType.SMARTSHEET_EXPORT_01 else 0
+        self.assertEqual([activity.level for activity in self.activities], [row['level'] + level_offset for row in parsed])
@@ -0,0 +1,118 @@
+"""
+Tests for the hierarchy columns stored against each activity when a plan is imported, and the queries which use them.
+"""
+from datetime import date, timedelta
+from django.test import TestCase
+from plan_visual_django.models import Plan, PlanActivity, CustomUser
+from plan_visual_django.services.plan_file_utilities.plan_parsing import read_and_parse_plan
+from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree
+
+
+class ParsedDataReader:
+    """
+    Stands in for a file reader, returning activities as if they had already been read and parsed from a plan file.
+    """
+    def __init__(self, activities):
+        self.activities = activities
+
+    def iter_rows(self, plan):
+        return iter([]), []
+
+    def parse(self, raw_data, headers, plan_field_mapping):
+        return [dict(activity) for activity in self.activities]
+
+
+class TestPlanHierarchy(TestCase):
+    # (sequence, level), same shape as the main plan in test_plan_tree
+    levels = [(1, 1), (2, 2), (3, 2), (4, 3), (5, 3), (6, 2), (7, 3), (8, 3), (9, 1), (10, 2), (11, 2), (12, 3)]
+
+    def setUp(self):
+        self.plan = Plan.objects.create(
+            user=CustomUser.objects.create(), plan_name="Hierarchy", file_name="hierarchy.xlsx", file_type_name="x"
+        )
+        self.import_plan(self.levels)
+
+    def import_plan(self, levels, update_flag=False):
+        activities = [
+            {
+                'unique_sticky_activity_id': f"ID-{sequence:02}",
+                'activity_name': f"Activity {sequence:02}",
+                'duration': 1,
+                'start_date': date(2024, 1, 1) + timedelta(days=sequence),
+                'end_date': date(2024, 1, 2) + timedelta(days=sequence),
+                'level': level,
+            }
+            for sequence, level in levels
+        ]
+        read_and_parse_plan(self.plan, None, ParsedDataReader(activities), update_flag=update_flag)
+
+    def activity(self, unique_id):
+        return PlanActivity.objects.get(plan=self.plan, unique_sticky_activity_id=unique_id)
+
+    @staticmethod
+    def ids(activities):
+        return [activity.unique_sticky_activity_id for activity in activities]
+
+    def test_hierarchy_stored(self):
+        expected = [
+            ("ID-01", "", 1, 9),
+            ("ID-03", "ID-01", 2, 6),
+            ("ID-05", "ID-03", 3, 6),
+            ("ID-08", "ID-06", 3, 9),
+            ("ID-09", "", 1, 13),
+            ("ID-12", "ID-11", 3, 13),
+        ]
+        for unique_id, parent, depth, subtree_end in expected:
+            with self.subTest(unique_id):
+                activity = self.activity(unique_id)
+                self.assertEqual((parent, depth, subtree_end),
+                                 (activity.parent_unique_id, activity.depth, activity.subtree_end_sequence))
+
+    def test_hierarchy_queries(self):
+        activity = self.activity("ID-01")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(["ID-02", "ID-03", "ID-06"], self.ids(PlanActivity.objects.children_of(activity)))
+        with self.assertNumQueries(1):
+            self.assertEqual([f"ID-{sequence:02}" for sequence in range(2, 9)],
+                             self.ids(PlanActivity.objects.descendants_of(activity)))
+        with self.assertNumQueries(1):
+            self.assertEqual((date(2024, 1, 2), date(2024, 1, 10)), PlanActivity.objects.rollup_dates(activity))
+
+        self.assertEqual([], self.ids(PlanActivity.objects.descendants_of(self.activity("ID-12"))))
+
+    def test_queries_without_stored_hierarchy(self):
+        PlanActivity.objects.filter(plan=self.plan).update(parent_unique_id="", depth=None, subtree_end_sequence=None)
+        activity = self.activity("ID-03")
+
+        self.assertEqual(["ID-04", "ID-05"], self.ids(PlanActivity.objects.children_of(activity)))
+        self.assertEqual(["ID-04", "ID-05"], self.ids(PlanActivity.objects.descendants_of(activity)))
+        self.assertEqual((date(2024, 1, 4), date(2024, 1, 7)), PlanActivity.objects.rollup_dates(activity))
+
+    def test_hierarchy_updated_on_reupload(self):
+        # ID-13 is added to the end of the subtree of ID-11 and ID-09, and ID-05 moves up a level.
+        self.import_plan([(sequence, 2 if sequence == 5 else level) for sequence, level in self.levels] + [(13, 3)],
+                         update_flag=True)
+
+        self.assertEqual(["ID-12", "ID-13"], self.ids(PlanActivity.objects.children_of(self.activity("ID-11"))))
+        self.assertEqual(14, self.activity("ID-09").subtree_end_sequence)
+        self.assertEqual(["ID-02", "ID-03", "ID-05", "ID-06"],
+                         self.ids(PlanActivity.objects.children_of(self.activity("ID-01"))))
+        self.assertEqual(["ID-04"], self.ids(PlanActivity.objects.descendants_of(self.activity("ID-03"))))
+
+    def test_plan_tree_same_with_stored_hierarchy(self):
+        stored_tree = PlanTree(self.plan)
+        PlanActivity.objects.filter(plan=self.plan).update(parent_unique_id="", depth=None, subtree_end_sequence=None)
+        replayed_tree = PlanTree(self.plan)
+
+        for attribute in ('parent', 'depth', 'first_child', 'next_sibling', 'enter', 'exit'):
+            with self.subTest(attribute):
+                self.assertEqual(getattr(replayed_tree, attribute), getattr(stored_tree, attribute))
+
+    def test_invalid_hierarchy_not_stored(self):
+        plan = Plan.objects.create(user=self.plan.user, plan_name="Bad", file_name="bad.xlsx", file_type_name="x")
+        self.plan = plan
+        self.import_plan([(1, 1), (2, 3)])
+
+        self.assertEqual([None, None], [activity.depth for activity in PlanActivity.objects.filter(plan=plan)])
+        self.assertRaises(Exception, PlanTree, plan)
@@ -151,6 +151,69 @@ class TestPlanTree(TestCase):
 
         self.assertRaises(Exception, self._set_up_plan_tree, self.test_plan_tree_data_big_jump)
 
+    def test_plan_tree_descendants(self):
+        """
+        Descendants and subtrees are slices of the plan in sequence order.
+        """
+        expected_results_data = [
+            ("ROOT", [f"ID-{sequence:02}" for sequence in range(1, 21)]),
+            ("ID-01", ["ID-02", "ID-03", "ID-04", "ID-05", "ID-06", "ID-07", "ID-08"]),
+            ("ID-03", ["ID-04", "ID-05"]),
+            ("ID-08", []),
+            ("ID-17", ["ID-18", "ID-19", "ID-20"]),
+            ("ID-19", ["ID-20"]),
+        ]
+
+        plan_tree = self._set_up_plan_tree(self.test_plan_tree_data_main)
+        for id, expected_descendants in expected_results_data:
+            with self.subTest(f"Descendants for id {id}"):
+                descendants = plan_tree.get_plan_tree_descendant_activities_by_unique_id(id)
+                subtree = plan_tree.get_plan_tree_subtree_activities_by_unique_id(id)
+                self.assertEqual(expected_descendants, [activity.unique_sticky_activity_id for activity in descendants])
+                expected_subtree = expected_descendants if id == "ROOT" else [id] + expected_descendants
+                self.assertEqual(expected_subtree, [activity.unique_sticky_activity_id for activity in subtree])
+                self.assertEqual(len(expected_descendants) == 0, plan_tree.is_leaf_by_unique_id(id))
+
+    def test_plan_tree_parent(self):
+        expected_results_data = [
+            ("ID-01", None),
+            ("ID-02", "ID-01"),
+            ("ID-05", "ID-03"),
+            ("ID-06", "ID-01"),
+            ("ID-09", None),
+            ("ID-20", "ID-19"),
+        ]
+
+        plan_tree = self._set_up_plan_tree(self.test_plan_tree_data_main)
+        for id, expected_parent in expected_results_data:
+            with self.subTest(f"Parent for id {id}"):
+                parent = plan_tree.get_plan_tree_parent_activity_by_unique_id(id)
+                self.assertEqual(expected_parent, None if parent is None else parent.unique_sticky_activity_id)
+
+    def test_plan_tree_node_view(self):
+        """
+        The anytree nodes should be linked up in the same way as the tree arrays.
+        """
+        plan_tree = self._set_up_plan_tree(self.test_plan_tree_data_main)
+
+        nodes = plan_tree.get_node_list()
+        self.assertEqual([activity.unique_sticky_activity_id for activity in plan_tree.get_activity_list()],
+                         [node.id for node in nodes])
+        for node in nodes:
+            with self.subTest(f"Node for id {node.id}"):
+                self.assertIs(node, plan_tree.get_plan_tree_node_by_unique_id(node.id))
+                self.assertEqual(plan_tree.get_plan_tree_depth_by_unique_id(node.id), node.depth)
+                self.assertEqual(
+                    [activity.unique_sticky_activity_id for activity in
+                     plan_tree.get_plan_tree_descendant_activities_by_unique_id(node.id)],
+                    [descendant.id for descendant in node.descendants]
+                )
+        self.assertIsNone(plan_tree.get_plan_tree_node_by_unique_id("ID-99"))
+        self.assertIsNone(plan_tree.get_plan_tree_activity_by_unique_id("ID-99"))
+
+    def test_plan_tree_level_below_first_activity(self):
+        self.assertRaises(Exception, self._set_up_plan_tree, [(1, 2), (2, 3), (3, 1)])
+
     def _set_up_plan_tree(self, plan_data):
         activity_name_prefix = "Activity"
         dummy_file = ContentFile(b"This is some dummy content", name="dummy.txt")
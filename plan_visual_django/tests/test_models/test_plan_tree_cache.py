@@ -0,0 +1,145 @@
+"""
+Tests for the in-process cache of plan trees, checking that trees are reused until the plan changes and that the cache
+keeps within its limits.
+"""
+import os
+from datetime import date
+from django.test import TestCase, override_settings
+from plan_visual_django.models import Plan, PlanActivity
+from plan_visual_django.services.plan_file_utilities.plan_parsing import read_and_parse_plan
+from plan_visual_django.services.plan_file_utilities.plan_tree_cache import plan_tree_cache, get_plan_tree_cache_stats
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+class ParsedDataReader:
+    """
+    Stands in for a file reader, returning activities as if they had already been read and parsed from a plan file.
+    """
+    def __init__(self, activities):
+        self.activities = activities
+
+    def iter_rows(self, plan):
+        return iter([]), []
+
+    def parse(self, raw_data, headers, plan_field_mapping):
+        return [dict(activity) for activity in self.activities]
+
+
+class TestPlanTreeCache(TestCase):
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    plan_id = 2  # From test fixtures, activities ID-001 to ID-026
+
+    def setUp(self):
+        plan_tree_cache.clear()
+        plan_tree_cache.reset_stats()
+        self.plan = Plan.objects.get(id=self.plan_id)
+
+        self.other_plan = Plan.objects.create(
+            user=self.plan.user, plan_name="Other", file_name="other.xlsx", file_type_name="x"
+        )
+        read_and_parse_plan(self.other_plan, None, ParsedDataReader([
+            {
+                'unique_sticky_activity_id': f"OTHER-{index}",
+                'activity_name': f"Other {index}",
+                'duration': 0,
+                'start_date': date(2024, 1, 1),
+                'end_date': date(2024, 1, 1),
+                'level': 1,
+            }
+            for index in range(5)
+        ]))
+
+    def reupload(self, activities):
+        read_and_parse_plan(self.plan, None, ParsedDataReader(activities), update_flag=True)
+
+    def current_activities(self):
+        return [
+            {
+                'unique_sticky_activity_id': record.unique_sticky_activity_id,
+                'activity_name': record.activity_name,
+                'duration': (record.end_date - record.start_date).days,
+                'start_date': record.start_date,
+                'end_date': record.end_date,
+                'level': record.level,
+            }
+            for record in PlanActivity.objects.filter(plan=self.plan)
+        ]
+
+    def test_tree_reused(self):
+        plan_tree = self.plan.get_plan_tree()
+
+        with self.assertNumQueries(1):  # Just reading the plan, the tree comes from the cache.
+            plan = Plan.objects.get(id=self.plan_id)
+            self.assertIs(plan_tree, plan.get_plan_tree())
+
+        self.assertEqual({"hits": 1, "misses": 1}, {key: get_plan_tree_cache_stats()[key] for key in ("hits", "misses")})
+
+    def test_reimport_changes_revision(self):
+        activities = self.current_activities()
+        self.reupload(activities)
+        revision = Plan.objects.get(id=self.plan_id).revision
+        plan_tree = self.plan.get_plan_tree()
+
+        # Nothing has changed so the revision and tree stay the same.
+        self.reupload(activities)
+        self.assertEqual(revision, Plan.objects.get(id=self.plan_id).revision)
+        self.assertIs(plan_tree, Plan.objects.get(id=self.plan_id).get_plan_tree())
+
+        activities[0]['activity_name'] = "Renamed"
+        self.reupload(activities)
+        plan = Plan.objects.get(id=self.plan_id)
+        self.assertEqual(revision + 1, plan.revision)
+
+        new_plan_tree = plan.get_plan_tree()
+        self.assertIsNot(plan_tree, new_plan_tree)
+        self.assertEqual("Renamed", new_plan_tree.get_activity_list()[0].activity_name)
+        self.assertEqual(1, get_plan_tree_cache_stats()["plans"])
+
+    def test_activity_saved_invalidates_tree(self):
+        plan_tree = self.plan.get_plan_tree()
+
+        PlanActivity.objects.create(
+            plan=self.plan, unique_sticky_activity_id="ID-999", activity_name="Added", start_date=date(2024, 1, 1),
+            end_date=date(2024, 1, 1), level=1, sequence_number=999
+        )
+
+        new_plan_tree = self.plan.get_plan_tree()
+        self.assertIsNot(plan_tree, new_plan_tree)
+        self.assertEqual("ID-999", new_plan_tree.get_activity_list()[-1].unique_sticky_activity_id)
+
+    @override_settings(PLAN_TREE_CACHE_MAX_PLANS=1)
+    def test_evicted_when_max_plans_reached(self):
+        self.plan.get_plan_tree()
+        self.other_plan.get_plan_tree()
+        self.plan.get_plan_tree()
+
+        stats = get_plan_tree_cache_stats()
+        self.assertEqual((0, 3, 2, 1), (stats["hits"], stats["misses"], stats["evictions"], stats["plans"]))
+
+    def test_evicted_when_max_activities_reached(self):
+        plan_size = PlanActivity.objects.filter(plan=self.plan).count()
+        other_plan_size = 5
+
+        with override_settings(PLAN_TREE_CACHE_MAX_ACTIVITIES=plan_size + other_plan_size - 1):
+            self.plan.get_plan_tree()
+            self.other_plan.get_plan_tree()
+            self.assertEqual(other_plan_size, get_plan_tree_cache_stats()["activities"])
+
+        # Plans which are too big aren't cached at all.
+        plan_tree_cache.clear()
+        with override_settings(PLAN_TREE_CACHE_MAX_ACTIVITIES=plan_size - 1):
+            self.assertIsNot(self.plan.get_plan_tree(), self.plan.get_plan_tree())
+            self.assertEqual(0, get_plan_tree_cache_stats()["plans"])
+
+    def test_stats_api(self):
+        self.plan.get_plan_tree()
+        self.plan.get_plan_tree()
+
+        response = self.client.get("/api/v1/model/plans/tree-cache-stats/")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(0.5, response.json()["hit_ratio"])
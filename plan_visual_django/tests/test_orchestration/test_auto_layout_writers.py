@@ -0,0 +1,198 @@
+"""
+Tests for the layout schemes which write many visual activities at once (full visual and milestone swimlane), checking
+that the activities are placed as laid out and are written in bulk rather than one query per activity.
+"""
+import os
+from datetime import date, timedelta
+from unittest import mock
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from plan_visual_django.models import Plan, PlanVisual, PlotableStyle, SwimlaneForVisual, VisualActivity
+from plan_visual_django.services.plan_file_utilities.plan_parsing import read_and_parse_plan
+from plan_visual_django.services.service_utilities.service_response import ServiceStatusCode
+from plan_visual_django.services.visual.model.auto_layout import VisualLayoutManager
+from plan_visual_django.services.visual.model.auto_layout_pool import build_layout
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+class ParsedDataReader:
+    """
+    Stands in for a file reader, returning activities as if they had already been read and parsed from a plan file.
+    """
+    def __init__(self, activities):
+        self.activities = activities
+
+    def iter_rows(self, plan):
+        return iter([]), []
+
+    def parse(self, raw_data, headers, plan_field_mapping):
+        return [dict(activity) for activity in self.activities]
+
+
+class TestAutoLayoutWriters(TestCase):
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    plan_id = 2  # From test fixtures, activities ID-001 to ID-026
+    visual_id = 4  # From test fixtures, includes milestones ID-025 and ID-026
+
+    def create_plan(self, num_top_levels, children_per_top_level):
+        plan = Plan.objects.create(
+            user=Plan.objects.get(id=self.plan_id).user, plan_name=f"Plan {num_top_levels}x{children_per_top_level}",
+            file_name="plan.xlsx", file_type_name="x"
+        )
+        activities = []
+        for top_level in range(num_top_levels):
+            activities.append({'level': 1, 'duration': 30})
+            # Every tenth child is a milestone (no duration).
+            activities.extend({'level': 2, 'duration': 0 if index % 10 == 0 else index % 20}
+                              for index in range(children_per_top_level))
+        read_and_parse_plan(plan, None, ParsedDataReader([
+            {
+                'unique_sticky_activity_id': f"BIG-{index:04}",
+                'activity_name': f"Activity {index:04}",
+                'duration': activity['duration'],
+                'start_date': date(2024, 1, 1) + timedelta(days=index % 30),
+                'end_date': date(2024, 1, 1) + timedelta(days=index % 30 + activity['duration']),
+                'level': activity['level'],
+            }
+            for index, activity in enumerate(activities)
+        ]))
+        return plan
+
+    def test_full_visual_matches_layout(self):
+        plan = Plan.objects.get(id=self.plan_id)
+        layout = build_layout(plan.get_plan_tree(), VisualLayoutManager.full_visual_layout_options())
+
+        visual = VisualLayoutManager.create_full_visual(plan)
+
+        placed = {
+            placement["activity_id"]: (lane["name"], placement["track_index"])
+            for lane in layout["lanes"] for track in lane["tracks"] if track for placement in track
+        }
+        visual_activities = {
+            visual_activity.unique_id_from_plan: (visual_activity.swimlane.swim_lane_name,
+                                                  visual_activity.vertical_positioning_value)
+            for visual_activity in VisualActivity.objects.filter(visual=visual).select_related("swimlane")
+        }
+        self.assertEqual(placed, visual_activities)
+        self.assertEqual([lane["name"] for lane in layout["lanes"]],
+                         [swimlane.swim_lane_name for swimlane in visual.swimlaneforvisual_set.order_by("sequence_number")])
+
+    def test_full_visual_written_in_bulk(self):
+        small_plan = self.create_plan(3, 10)
+        big_plan = self.create_plan(3, 300)
+
+        query_counts = []
+        for plan in (small_plan, big_plan):
+            with CaptureQueriesContext(connection) as queries:
+                visual = VisualLayoutManager.create_full_visual(plan)
+            # The number of inserts depends on how many rows the database takes in one statement.
+            query_counts.append(len([
+                query for query in queries.captured_queries
+                if not query['sql'].startswith('INSERT INTO "plan_visual_django_visualactivity"')
+            ]))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertLess(len(queries), 30)
+        self.assertGreater(VisualActivity.objects.filter(visual=visual).count(), 50)
+
+    def test_full_visual_created_in_one_transaction(self):
+        plan = Plan.objects.get(id=self.plan_id)
+        visual_ids = set(PlanVisual.objects.values_list("id", flat=True))
+        swimlane_count = SwimlaneForVisual.objects.count()
+
+        with mock.patch.object(VisualActivity.objects, "bulk_create", side_effect=DatabaseError("Write failed")):
+            with self.assertRaises(DatabaseError):
+                VisualLayoutManager.create_full_visual(plan)
+
+        # Nothing is left of the visual, including its swimlanes.
+        self.assertEqual(visual_ids, set(PlanVisual.objects.values_list("id", flat=True)))
+        self.assertEqual(swimlane_count, SwimlaneForVisual.objects.count())
+
+    def test_milestone_swimlane(self):
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        revision = visual.render_revision
+        style = PlotableStyle.objects.get(id=104)
+        existing_ids = set(VisualActivity.objects.filter(visual=visual).values_list("id", flat=True))
+
+        with CaptureQueriesContext(connection) as queries:
+            VisualLayoutManager(self.visual_id).create_milestone_swimlane(style, style, visual.default_milestone_shape)
+
+        swimlane = SwimlaneForVisual.objects.get(plan_visual=visual, swim_lane_name="Milestones")
+        milestones = list(swimlane.visualactivity_set.order_by("vertical_positioning_value"))
+        self.assertEqual(["ID-026", "ID-005", "ID-009", "ID-015", "ID-020", "ID-025"],
+                         [milestone.unique_id_from_plan for milestone in milestones])
+        self.assertEqual(list(range(2, 8)), [milestone.vertical_positioning_value for milestone in milestones])
+        self.assertTrue(all(milestone.enabled for milestone in milestones))
+
+        # Milestones already in the visual are moved rather than added again.
+        self.assertEqual({"ID-025", "ID-026"},
+                         {milestone.unique_id_from_plan for milestone in milestones if milestone.id in existing_ids})
+        self.assertLess(len(queries), 20)
+        self.assertGreater(PlanVisual.objects.get(id=self.visual_id).render_revision, revision)
+
+    @staticmethod
+    def count_queries_excluding_writes(queries):
+        # The number of inserts and updates depends on how many rows the database takes in one statement.
+        return len([
+            query for query in queries.captured_queries
+            if not query['sql'].startswith(('INSERT INTO "plan_visual_django_visualactivity"',
+                                            'UPDATE "plan_visual_django_visualactivity"'))
+        ])
+
+    def test_add_level_in_constant_queries(self):
+        query_counts = []
+        for plan in (self.create_plan(3, 10), self.create_plan(3, 300)):
+            # Copy the settings of an existing visual for an empty visual of this plan.
+            visual = PlanVisual.objects.get(id=self.visual_id)
+            visual.pk, visual.plan = None, plan
+            visual.save()
+            swimlane, = visual.add_swimlanes_to_visual(visual.default_swimlane_plotable_style, "Lane")
+            layout_manager = VisualLayoutManager(visual.id)
+
+            with CaptureQueriesContext(connection) as queries:
+                layout_manager.add_delete_activities(2, swimlane, delete_flag=False)
+            query_counts.append(self.count_queries_excluding_writes(queries))
+
+            # Milestones aren't added, and each activity goes on the next track down.
+            tracks = list(swimlane.visualactivity_set.order_by("vertical_positioning_value")
+                          .values_list("vertical_positioning_value", flat=True))
+            self.assertEqual(list(range(1, len(tracks) + 1)), tracks)
+            self.assertEqual(plan.planactivity_set.filter(level=2, milestone_flag=False).count(), len(tracks))
+
+            with CaptureQueriesContext(connection) as queries:
+                layout_manager.add_delete_activities(2, swimlane, delete_flag=True)
+            query_counts.append(self.count_queries_excluding_writes(queries))
+            self.assertFalse(swimlane.visualactivity_set.filter(enabled=True).exists())
+
+        self.assertEqual(query_counts[:2], query_counts[2:])
+        self.assertLess(max(query_counts), 20)
+
+    def test_add_activities_to_swimlane(self):
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        revision = visual.render_revision
+        swimlane = SwimlaneForVisual.objects.get(plan_visual=visual, id=4)
+        max_track = swimlane.get_max_track()
+
+        # ID-001 is already in the visual but disabled, ID-026 is already in this swimlane.
+        responses = VisualLayoutManager(self.visual_id).add_activities_to_swimlane(
+            ["ID-002", "ID-001", "ID-026", "ID-005"], swimlane.sequence_number
+        )
+
+        self.assertTrue(all(response.status == ServiceStatusCode.SUCCESS for response in responses))
+        self.assertTrue(responses[1].message.startswith("Existing activity re-added"))
+        added = {
+            visual_activity.unique_id_from_plan: visual_activity
+            for visual_activity in VisualActivity.objects.filter(
+                visual=visual, unique_id_from_plan__in=["ID-002", "ID-001", "ID-026", "ID-005"]
+            )
+        }
+        self.assertEqual([max_track + track for track in range(1, 5)],
+                         [added[unique_id].vertical_positioning_value for unique_id in ["ID-002", "ID-001", "ID-026", "ID-005"]])
+        self.assertTrue(all(activity.enabled and activity.swimlane_id == swimlane.id for activity in added.values()))
+        self.assertEqual(visual.default_milestone_shape, added["ID-005"].plotable_shape)
+        self.assertGreater(PlanVisual.objects.get(id=self.visual_id).render_revision, revision)
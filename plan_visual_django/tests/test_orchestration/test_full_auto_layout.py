@@ -0,0 +1,281 @@
+"""
+Tests for the full auto-layout, checking that the incremental measures used when coarsening and packing lanes (heaps of
+free tracks, TrackDepth, and sibling clusters scored as they change) give exactly the same layout as re-measuring
+everything with the original first-fit versions, which are kept here as a reference.
+"""
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from unittest import mock
+from ddt import ddt, data, unpack
+from django.test import TestCase
+from plan_visual_django.models import Plan, PlanActivity
+from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree
+from plan_visual_django.services.plan_file_utilities.synthetic_plan import generate_synthetic_plan
+from plan_visual_django.services.visual.model import full_autolayout_algorithm
+from plan_visual_django.services.visual.model.full_autolayout_algorithm import CoarsenRecord, LayoutOptions, \
+    Placement, Plannable, SiblingCluster, TrackDepth, build_initial_layout, coarsen_until_fits, \
+    count_overlapping_pairs, initial_selection_for_lane, measure_tracks_needed, pack_with_affinity, \
+    plannable_sort_key, promotable
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+def _reference_measure_tracks_needed(plannables: List[Plannable]) -> int:
+    """
+    Original first-fit count of tracks, checking every track for each item.
+    """
+    free_at: List[date] = []
+    for p in sorted(plannables, key=plannable_sort_key):
+        s, e_excl = p.act_node.activity.interval()
+        for i in range(len(free_at)):
+            if free_at[i] <= s:
+                free_at[i] = e_excl
+                break
+        else:
+            free_at.append(e_excl)
+    return len(free_at)
+
+
+def _reference_cluster_score(parent, children) -> Tuple:
+    """
+    Original score of a sibling cluster, comparing every pair of children for overlaps.
+    """
+    total_days = sum(max(1, (c.activity.end_date - c.activity.start_date).days + 1) for c in children)
+    overlaps = 0
+    child_intervals = [(c.activity.start_date, c.activity.end_date + timedelta(days=1)) for c in children]
+    for i in range(len(child_intervals)):
+        for j in range(i + 1, len(child_intervals)):
+            a1, b1 = child_intervals[i]
+            a2, b2 = child_intervals[j]
+            if not (b1 <= a2 or b2 <= a1):
+                overlaps += 1
+    return (
+        -(total_days * (1 + overlaps)),
+        parent.activity.start_date,
+        -parent.activity.duration,
+        parent.name.lower(),
+        parent.activity.id,
+    )
+
+
+def _reference_coarsen_until_fits(top_nodes, selection: List[Plannable], max_tracks: int,
+                                  coarsen_log: List[CoarsenRecord]) -> List[Plannable]:
+    """
+    Original coarsening, re-measuring the selection and re-scoring every sibling cluster after each step.
+    """
+    current = list(selection)
+    while _reference_measure_tracks_needed(current) > max_tracks:
+        present_ids = {p.act_node.id for p in current}
+        clusters = []
+        for p in current:
+            parent_node = p.act_node.parent
+            if promotable(parent_node):
+                clusters.append((parent_node, [ch for ch in parent_node.children if ch.id in present_ids]))
+        if not clusters:
+            return current
+
+        best_parent, present_children = min(clusters, key=lambda cluster: _reference_cluster_score(*cluster))
+        present_child_ids = {c.id for c in present_children}
+        new_current = [p for p in current if p.act_node.id not in present_child_ids]
+        if best_parent.id not in {p.act_node.id for p in new_current}:
+            new_current.append(Plannable(best_parent))
+        coarsen_log.append(CoarsenRecord(parent_id=best_parent.id, replaced_children=sorted(present_child_ids)))
+        current = sorted(new_current, key=plannable_sort_key)
+    return current
+
+
+def _reference_pack_with_affinity(plannables: List[Plannable],
+                                  label_midpoint: Optional[date]) -> Tuple[List[List[Placement]], int]:
+    """
+    Original packing, checking every track for each item.
+    """
+    free_at: List[date] = []
+    assignments: List[List[Placement]] = []
+    parent_to_tracks: Dict[Optional[str], List[int]] = {}
+
+    for p in sorted(plannables, key=plannable_sort_key):
+        s, e_excl = p.act_node.activity.interval()
+        free_tracks = [idx for idx, t in enumerate(free_at) if t <= s]
+        par = p.act_node.parent.id
+        preferred = parent_to_tracks.get(par, [])
+        preferred_free = [i for i in preferred if i in free_tracks]
+        if preferred_free:
+            base = min(preferred)
+            chosen_idx = min(preferred_free, key=lambda i: abs(i - base))
+        elif free_tracks:
+            chosen_idx = min(free_tracks)
+        else:
+            chosen_idx = len(free_at)
+            free_at.append(date.min)
+            assignments.append([])
+        free_at[chosen_idx] = e_excl
+
+        if not label_midpoint:
+            label_side = "left"
+        else:
+            center_ord = (s.toordinal() + (e_excl - timedelta(days=1)).toordinal()) / 2
+            label_side = "left" if center_ord <= label_midpoint.toordinal() else "right"
+        assignments[chosen_idx].append(Placement(
+            activity_id=p.act_node.id,
+            activity=p.act_node.activity,
+            start=p.act_node.activity.start_date,
+            end=p.act_node.activity.end_date,
+            track_index=chosen_idx + 1,
+            label_side=label_side,
+        ))
+        parent_to_tracks.setdefault(par, [])
+        if chosen_idx not in parent_to_tracks[par]:
+            parent_to_tracks[par].append(chosen_idx)
+
+    return assignments, len(assignments)
+
+
+def build_reference_layout(plan_tree: PlanTree, options: LayoutOptions) -> dict:
+    """
+    Layout of the plan using the original measuring, coarsening and packing.
+    """
+    with mock.patch.multiple(
+            full_autolayout_algorithm,
+            measure_tracks_needed=_reference_measure_tracks_needed,
+            coarsen_until_fits=_reference_coarsen_until_fits,
+            pack_with_affinity=_reference_pack_with_affinity,
+    ):
+        return build_initial_layout(plan_tree, options)
+
+
+def synthetic_plan_tree(num_activities: int, max_depth: int, children_per_parent: Optional[int] = None) -> PlanTree:
+    return PlanTree.from_activities([
+        PlanActivity(
+            id=sequence_number,
+            unique_sticky_activity_id=activity.sticky_id,
+            activity_name=activity.name,
+            level=activity.level,
+            milestone_flag=activity.milestone_flag,
+            start_date=activity.start_date,
+            end_date=activity.end_date,
+            sequence_number=sequence_number,
+        )
+        for sequence_number, activity in enumerate(
+            generate_synthetic_plan(num_activities, max_depth=max_depth, children_per_parent=children_per_parent),
+            start=1
+        )
+    ])
+
+
+@ddt
+class TestFullAutoLayout(TestCase):
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    plan_id = 2  # From test fixtures
+
+    def get_plan_trees(self):
+        return {
+            "fixture plan": Plan.objects.get(id=self.plan_id).get_plan_tree(),
+            "synthetic plan": synthetic_plan_tree(400, max_depth=4),
+        }
+
+    def test_track_counts_match_first_fit(self):
+        generator = random.Random(0)
+        for name, plan_tree in self.get_plan_trees().items():
+            plannables = [Plannable(node) for node in plan_tree.get_node_list() if not node.activity.milestone_flag]
+            for subset_size in (len(plannables), len(plannables) // 2, 10, 1):
+                subset = generator.sample(plannables, subset_size)
+                depth = TrackDepth(point for p in plannables for point in p.act_node.activity.interval())
+                for p in subset:
+                    depth.add(p.act_node.activity.interval(), 1)
+
+                with self.subTest(plan=name, activities=subset_size):
+                    expected = _reference_measure_tracks_needed(subset)
+                    self.assertEqual(expected, measure_tracks_needed(subset))
+                    self.assertEqual(expected, depth.tracks_needed())
+                    self.assertEqual(expected, pack_with_affinity(subset, None)[1])
+
+    @data(2, 5, 8)
+    def test_coarsening_matches_first_fit(self, max_tracks):
+        for name, plan_tree in self.get_plan_trees().items():
+            for top_node in plan_tree.get_plan_tree_child_nodes_by_unique_id(plan_tree.get_root().id):
+                selection = initial_selection_for_lane([top_node])
+                expected_log, log = [], []
+                expected = _reference_coarsen_until_fits([top_node], selection, max_tracks, expected_log)
+                actual = coarsen_until_fits([top_node], selection, max_tracks, log)
+
+                with self.subTest(plan=name, lane=top_node.id):
+                    self.assertEqual(expected, actual)
+                    self.assertEqual(expected_log, log)
+
+    @data(
+        ("fixture plan", 2), ("fixture plan", 8),
+        ("synthetic plan", 2), ("synthetic plan", 5), ("synthetic plan", 12),
+    )
+    @unpack
+    def test_layout_matches_first_fit(self, plan_name, max_tracks):
+        plan_tree = self.get_plan_trees()[plan_name]
+        options = LayoutOptions(max_tracks_per_lane=max_tracks)
+
+        expected = build_reference_layout(plan_tree, options)
+        layout = build_initial_layout(plan_tree, options)
+
+        self.assertEqual(expected, layout)
+        # Make sure the comparison covers coarsening (where the lanes don't fit) and more than one lane.
+        self.assertGreater(len(layout["lanes"]), 2)
+        if plan_name == "synthetic plan" and max_tracks < 12:
+            self.assertGreater(len(layout["notes"]["coarsened"]), 0)
+
+    def test_overlap_counts_match_pairwise(self):
+        generator = random.Random(0)
+        base = date(2025, 1, 1)
+        for trial in range(200):
+            # Few distinct dates, so plenty of intervals meet end to start or are identical.
+            intervals = []
+            for _ in range(generator.randint(0, 30)):
+                start = base + timedelta(days=generator.randint(0, 10))
+                intervals.append((start, start + timedelta(days=generator.randint(1, 5))))
+            intervals += intervals[:generator.randint(0, 3)]  # Identical intervals
+            if trial % 4 == 0:
+                # Zero length intervals (a milestone without the extra day).
+                intervals += [(start, start) for start, _end in intervals[:generator.randint(1, 3)]]
+            generator.shuffle(intervals)
+
+            expected = sum(
+                1 for i in range(len(intervals)) for j in range(i + 1, len(intervals))
+                if not (intervals[i][1] <= intervals[j][0] or intervals[j][1] <= intervals[i][0])
+            )
+            with self.subTest(trial=trial):
+                self.assertEqual(expected, count_overlapping_pairs(intervals))
+
+    def test_cluster_score_matches_pairwise(self):
+        generator = random.Random(0)
+        plan_tree = synthetic_plan_tree(400, max_depth=3, children_per_parent=20)
+        for parent in plan_tree.get_node_list():
+            children = list(parent.children)
+            if len(children) < 2:
+                continue
+            generator.shuffle(children)
+
+            # Children added one at a time, as when their parent's siblings are coarsened.
+            cluster = SiblingCluster(parent, children[:1])
+            for child in children[1:]:
+                cluster.score()
+                cluster.add(child)
+
+            with self.subTest(parent=parent.id):
+                self.assertEqual(_reference_cluster_score(parent, children), cluster.score())
+                self.assertEqual(_reference_cluster_score(parent, children), SiblingCluster(parent, children).score())
+        self.assertTrue(any(child.activity.milestone_flag for child in plan_tree.get_node_list()))
+
+    @data(2, 8)
+    def test_wide_plan_promotes_clusters_in_same_order(self, max_tracks):
+        # Every summary activity has 30 children, so each lane has many sibling clusters of the same size.
+        plan_tree = synthetic_plan_tree(2000, max_depth=3, children_per_parent=30)
+        options = LayoutOptions(max_tracks_per_lane=max_tracks)
+
+        expected = build_reference_layout(plan_tree, options)
+        layout = build_initial_layout(plan_tree, options)
+
+        self.assertEqual(expected["notes"]["coarsened"], layout["notes"]["coarsened"])
+        self.assertEqual(expected, layout)
+        self.assertGreater(len(layout["notes"]["coarsened"]), 10)
@@ -0,0 +1,73 @@
+"""
+Tests for laying out the lanes of a full visual in parallel, checking that the layout is exactly the same as laying out
+every lane in the calling process.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from ddt import ddt, data
+from django.test import TestCase, override_settings
+from plan_visual_django.models import PlanActivity
+from plan_visual_django.services.plan_file_utilities.plan_tree import PlanTree
+from plan_visual_django.services.plan_file_utilities.synthetic_plan import generate_synthetic_plan
+from plan_visual_django.services.visual.model import auto_layout_pool
+from plan_visual_django.services.visual.model.auto_layout_pool import _initialise_worker, get_executor
+from plan_visual_django.services.visual.model.full_autolayout_algorithm import LayoutOptions, build_initial_layout
+
+
+@ddt
+class TestParallelAutoLayout(TestCase):
+    def setUp(self):
+        activities = [
+            PlanActivity(
+                id=sequence_number,
+                unique_sticky_activity_id=activity.sticky_id,
+                activity_name=activity.name,
+                level=activity.level,
+                milestone_flag=activity.milestone_flag,
+                start_date=activity.start_date,
+                end_date=activity.end_date,
+                sequence_number=sequence_number,
+            )
+            for sequence_number, activity in enumerate(generate_synthetic_plan(600, max_depth=4), start=1)
+        ]
+        self.plan_tree = PlanTree.from_activities(activities)
+
+    @data(2, 8)
+    def test_same_layout_as_in_process(self, max_tracks):
+        options = LayoutOptions(max_tracks_per_lane=max_tracks)
+        expected = build_initial_layout(self.plan_tree, options)
+
+        # Threads run the same lane snapshots as the worker processes, without the time taken to start them.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            layout = build_initial_layout(self.plan_tree, options, executor=executor)
+
+        self.assertGreater(len(layout["lanes"]), 2)
+        self.assertEqual(expected, layout)
+
+    def test_layout_in_worker_processes(self):
+        options = LayoutOptions(max_tracks_per_lane=4)
+        expected = build_initial_layout(self.plan_tree, options)
+
+        with ProcessPoolExecutor(
+                max_workers=2, mp_context=multiprocessing.get_context("spawn"), initializer=_initialise_worker
+        ) as executor:
+            layout = build_initial_layout(self.plan_tree, options, executor=executor)
+
+        self.assertEqual(expected, layout)
+        placed = [placement for lane in layout["lanes"] for track in lane["tracks"] if track for placement in track]
+        self.assertTrue(all(
+            placement["activity"] is self.plan_tree.get_plan_tree_activity_by_unique_id(placement["activity_id"])
+            for placement in placed
+        ))
+
+    def test_pool_only_used_for_big_plans(self):
+        self.addCleanup(setattr, auto_layout_pool, "_executor", None)
+        # Stand in for the pool so that no processes are started.
+        auto_layout_pool._executor = executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+
+        with override_settings(AUTO_LAYOUT_MAX_WORKERS=2, AUTO_LAYOUT_PARALLEL_MIN_ACTIVITIES=600):
+            self.assertIsNone(get_executor(599))
+            self.assertIs(executor, get_executor(600))
+        with override_settings(AUTO_LAYOUT_MAX_WORKERS=0, AUTO_LAYOUT_PARALLEL_MIN_ACTIVITIES=0):
+            self.assertIsNone(get_executor(600))
@@ -0,0 +1,114 @@
+import os
+import random
+from ddt import ddt, data
+from django.test import TestCase
+from plan_visual_django.models import PlanVisual, VisualActivity, PlotableStyle
+from plan_visual_django.services.visual.model.plotable_shapes import PlotableShapeName
+from plan_visual_django.services.visual.rendering.plotable_store import PlotableStore
+from plan_visual_django.services.visual.rendering.plotables import get_plotable
+from plan_visual_django.services.visual.rendering.renderers import VisualRenderer
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+@ddt
+class TestPlotableStore(TestCase):
+    """
+    Checks that the rows of a PlotableStore behave exactly as the RectangleBasedPlotables they replace and that bounds
+    calculated from the store match those calculated plotable by plotable.
+    """
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json')
+    ]
+
+    @staticmethod
+    def create_random_plotables(num_plotables, style):
+        randomiser = random.Random(num_plotables)
+        return [
+            get_plotable(
+                f"activity-{index}",
+                PlotableShapeName.RECTANGLE,
+                top=randomiser.uniform(-50, 1000),
+                left=randomiser.uniform(-50, 1000),
+                width=randomiser.uniform(0, 300),
+                height=randomiser.uniform(0, 40),
+                format=style,
+                text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE,
+                text_flow=VisualActivity.TextFlow.FLOW_TO_RIGHT,
+                text=f"Activity {index}",
+                external_text_flag=False
+            )
+            for index in range(num_plotables)
+        ]
+
+    def test_rows_match_plotables(self):
+        visual = PlanVisual.objects.get(pk=4)
+        plotables = visual.get_visual_activity_plotables() + visual.get_swimlane_plotables()
+
+        store = PlotableStore()
+        for plotable in plotables:
+            store.append_plotable(plotable)
+
+        self.assertEqual(len(plotables), len(store))
+        for plotable, row in zip(plotables, store):
+            with self.subTest(plotable_id=plotable.plotable_id):
+                for field_name in (
+                    "plotable_id", "shape", "top", "left", "width", "height", "format",
+                    "text_vertical_alignment", "text_flow", "text", "external_text_flag",
+                ):
+                    self.assertEqual(getattr(plotable, field_name), getattr(row, field_name))
+                self.assertEqual(plotable.get_dimensions(), row.get_dimensions())
+                self.assertEqual(plotable.get_text_x(), row.get_text_x())
+                self.assertEqual(plotable.get_text_y(), row.get_text_y())
+
+    @data(1, 10, 1000)
+    def test_bounds_match_plotables(self, num_plotables):
+        plotables = self.create_random_plotables(num_plotables, PlotableStyle.objects.get(pk=102))
+        store = PlotableStore()
+        for plotable in plotables:
+            store.append_plotable(plotable)
+
+        renderer = VisualRenderer()
+        self.assertEqual(
+            renderer._calculate_visual_bounds({"activities": plotables}),
+            renderer._calculate_visual_bounds({"activities": store})
+        )
+
+    def test_visual_dimensions_unchanged(self):
+        visual = PlanVisual.objects.get(pk=4)
+        legacy_plotables = {
+            "timelines": visual.get_timeline_plotables(),
+            "swimlanes": visual.get_swimlane_plotables(),
+            "visual_activities": visual.get_visual_activity_plotables(),
+        }
+
+        expected = visual._get_dimensions_recursive(legacy_plotables)
+        actual = visual._get_dimensions_recursive(visual.get_plotables())
+
+        self.assertEqual(expected, actual)
+
+    def test_empty_store(self):
+        store = PlotableStore()
+
+        self.assertIsNone(store.get_bounds())
+        self.assertEqual([], list(store))
+        self.assertEqual(0, VisualRenderer()._calculate_visual_bounds({"activities": store})[4])
+
+    def test_store_indexing(self):
+        store = PlotableStore()
+        for plotable in self.create_random_plotables(3, PlotableStyle.objects.get(pk=102)):
+            store.append_plotable(plotable)
+
+        self.assertEqual("activity-2", store[-1].plotable_id)
+        self.assertEqual("activity-0", store[0].plotable_id)
+        with self.assertRaises(IndexError):
+            store[3]
+
+    def test_styles_interned(self):
+        store = PlotableStore()
+        for plotable in self.create_random_plotables(5, PlotableStyle.objects.get(pk=102)):
+            store.append_plotable(plotable)
+        for plotable in self.create_random_plotables(5, PlotableStyle.objects.get(pk=102)):
+            store.append_plotable(plotable)
+
+        self.assertEqual(1, len({id(row.format) for row in store}))
@@ -0,0 +1,150 @@
+import io
+import os
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+from ddt import ddt, data, unpack
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from pptx import Presentation
+from plan_visual_django.models import Plan
+from plan_visual_django.services.visual.export.pptx_deck_export import render_plan_deck_bytes, \
+    generate_plotables_for_visuals, generate_visual_plotables
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+class InlineExecutor(Executor):
+    """
+    Runs submitted work straight away, standing in for the worker pool (worker processes can't see the test database).
+    """
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, /, *args, **kwargs):
+        self.submitted.append(args)
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+class FailingExecutor(Executor):
+    """
+    Stands in for a worker pool which breaks part way through (the first visual's future fails), or which never gets
+    round to the work (no future completes).
+    """
+    def __init__(self, broken: bool):
+        self.broken = broken
+        self.futures = []
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        if self.broken and not self.futures:
+            future.set_exception(BrokenProcessPool("A worker process terminated abruptly"))
+        self.futures.append(future)
+        return future
+
+
+@ddt
+@override_settings(PPTX_EXPORT_MAX_WORKERS=0)
+class TestPptxDeckExport(TestCase):
+    """
+    Checks export of several visuals from a plan into a single deck.  Plotables are calculated in the test process as
+    worker processes can't see the test database.
+    """
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    plan_id = 2  # From test fixtures, has visuals 1 and 4
+    plan_owner_id = 7
+
+    @staticmethod
+    def shape_count(slide):
+        return len(slide.shapes)
+
+    @data(
+        (None, [1, 4]),
+        ([4], [4]),
+        ([4, 1], [1, 4]),
+        ([4, 999], [4]),
+    )
+    @unpack
+    def test_one_slide_per_visual(self, visual_ids, expected_visual_ids):
+        plan = Plan.objects.get(id=self.plan_id)
+        deck = Presentation(io.BytesIO(render_plan_deck_bytes(plan, visual_ids)))
+
+        self.assertEqual(len(expected_visual_ids), len(deck.slides))
+
+        # Each slide should match the slide from exporting that visual on its own.
+        for slide, visual_id in zip(deck.slides, expected_visual_ids):
+            single = Presentation(io.BytesIO(render_plan_deck_bytes(plan, [visual_id])))
+            self.assertEqual(self.shape_count(single.slides[0]), self.shape_count(slide))
+
+    def test_parallel_matches_serial(self):
+        visual_ids = [1, 4]
+        executor = InlineExecutor()
+        parallel = generate_plotables_for_visuals(visual_ids, executor)
+        serial = generate_plotables_for_visuals(visual_ids, None)
+
+        for parallel_plotables, serial_plotables in zip(parallel, serial):
+            self.assertEqual(list(serial_plotables), list(parallel_plotables))
+            self.assertEqual(len(serial_plotables["visual_activities"]), len(parallel_plotables["visual_activities"]))
+
+        # Each visual is a separate piece of work for the pool.
+        self.assertEqual([(1,), (4,)], executor.submitted)
+
+    @data(True, False)
+    def test_failed_workers(self, broken):
+        executor = FailingExecutor(broken)
+        with mock.patch(
+                "plan_visual_django.services.visual.export.pptx_deck_export._replace_broken_executor"
+        ) as replace_broken_executor:
+            deck = render_plan_deck_bytes(Plan.objects.get(id=self.plan_id), executor=executor, timeout=0.1)
+
+        self.assertIsNone(deck)
+        self.assertEqual(broken, replace_broken_executor.called)
+        # Work still waiting for the pool is abandoned.
+        self.assertTrue(all(future.cancelled() for future in executor.futures[1:]))
+
+    @data(True, False)
+    def test_download_failed_workers(self, broken):
+        self.client.force_login(get_user_model().objects.get(id=self.plan_owner_id))
+
+        with mock.patch(
+                "plan_visual_django.services.visual.export.pptx_deck_export.get_executor",
+                return_value=FailingExecutor(broken)
+        ), mock.patch("plan_visual_django.services.visual.export.pptx_deck_export._replace_broken_executor"), \
+                override_settings(PPTX_EXPORT_JOB_TIMEOUT=0.1):
+            response = self.client.get(f"/pv/download-plan-pptx/{self.plan_id}")
+
+        self.assertEqual(503, response.status_code)
+
+    def test_download(self):
+        self.client.force_login(get_user_model().objects.get(id=self.plan_owner_id))
+
+        response = self.client.get(f"/pv/download-plan-pptx/{self.plan_id}?visual=4&visual=1")
+
+        self.assertEqual(200, response.status_code)
+        self.assertIn('filename="Plan_1.pptx"', response.headers["Content-Disposition"])
+        self.assertEqual(2, len(Presentation(io.BytesIO(response.content)).slides))
+
+    @data("?visual=x", "?visual=")
+    def test_download_invalid_visual(self, query):
+        self.client.force_login(get_user_model().objects.get(id=self.plan_owner_id))
+
+        response = self.client.get(f"/pv/download-plan-pptx/{self.plan_id}{query}")
+
+        self.assertEqual(400, response.status_code)
+
+    def test_download_no_visuals(self):
+        self.client.force_login(get_user_model().objects.get(id=self.plan_owner_id))
+
+        response = self.client.get(f"/pv/download-plan-pptx/{self.plan_id}?visual=999")
+
+        self.assertRedirects(response, f"/pv/manage-visuals/{self.plan_id}/", fetch_redirect_response=False)
+
+    def test_generate_visual_plotables(self):
+        plotables = generate_visual_plotables(4)
+
+        self.assertGreater(len(plotables["visual_activities"]), 0)
@@ -0,0 +1,201 @@
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from pptx import Presentation
+from plan_visual_django.models import PlanVisual, VisualActivity, VisualExportJob
+from plan_visual_django.services.visual.export.pptx_export import PptxArtefactCache, get_artefact_cache, \
+    get_visual_pptx, render_pptx_bytes, request_visual_export, _initialise_worker
+from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+class TestPptxArtefactCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_get_returns_what_was_put(self):
+        cache = PptxArtefactCache(self.directory, 1000)
+        cache.put(1, 3, b"presentation")
+
+        self.assertEqual(b"presentation", cache.get(1, 3))
+        self.assertIsNone(cache.get(1, 4))
+        self.assertIsNone(cache.get(2, 3))
+
+    def test_least_recently_used_evicted(self):
+        cache = PptxArtefactCache(self.directory, 250)
+        for visual_id in range(1, 4):
+            cache.put(visual_id, 0, bytes(100))
+            # Make sure modification times differ even where the file system has coarse timestamps.
+            os.utime(cache.path_for(visual_id, 0), (visual_id, visual_id))
+
+        # Total was 300 bytes so oldest has gone.
+        self.assertFalse(cache.contains(1, 0))
+
+        # Reading visual 2 makes visual 3 the least recently used.
+        cache.get(2, 0)
+        cache.put(4, 0, bytes(100))
+
+        self.assertTrue(cache.contains(2, 0))
+        self.assertFalse(cache.contains(3, 0))
+        self.assertTrue(cache.contains(4, 0))
+        self.assertLessEqual(cache.total_size(), 250)
+
+    def test_file_bigger_than_cache_kept(self):
+        cache = PptxArtefactCache(self.directory, 50)
+        cache.put(1, 0, bytes(100))
+
+        self.assertEqual(bytes(100), cache.get(1, 0))
+
+
+class TestPptxExport(TestCase):
+    """
+    Checks the export of visuals to PowerPoint through the export service.  Exports are run in the test process
+    (PPTX_EXPORT_MAX_WORKERS=0), apart from one test which checks that rendering works in a worker process.
+    """
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json')
+    ]
+
+    visual_id = 4  # From test fixtures
+    visual_owner_id = 7
+    other_user_id = 8
+
+    def setUp(self):
+        cache_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_directory)
+
+        settings_override = override_settings(
+            PPTX_EXPORT_MAX_WORKERS=0,
+            PPTX_EXPORT_CACHE_DIR=cache_directory,
+            PPTX_EXPORT_CACHE_MAX_BYTES=10 * 1024 * 1024,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_export_is_valid_presentation(self):
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        pptx_bytes = get_visual_pptx(visual)
+
+        presentation = Presentation(io.BytesIO(pptx_bytes))
+        self.assertGreater(len(presentation.slides), 0)
+
+        job = VisualExportJob.objects.get(visual=visual)
+        self.assertEqual(VisualExportJob.Status.COMPLETE, job.status)
+        self.assertEqual(visual.render_revision, job.render_revision)
+
+    def test_repeat_export_uses_cache(self):
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        first_job = request_visual_export(visual)
+        second_job = request_visual_export(visual)
+
+        self.assertEqual(first_job.id, second_job.id)
+        self.assertEqual(1, VisualExportJob.objects.filter(visual=visual).count())
+
+    def test_change_to_visual_exports_again(self):
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        first_job = request_visual_export(visual)
+
+        activity = VisualActivity.objects.get(visual_id=self.visual_id, unique_id_from_plan="ID-026")
+        activity.vertical_positioning_value = 2
+        activity.save()
+
+        visual.refresh_from_db()
+        second_job = request_visual_export(visual)
+
+        self.assertNotEqual(first_job.id, second_job.id)
+        self.assertGreater(second_job.render_revision, first_job.render_revision)
+        self.assertTrue(get_artefact_cache().contains(self.visual_id, second_job.render_revision))
+
+    def test_failed_export_recorded(self):
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        with self.settings(PPTX_EXPORT_CACHE_DIR=os.devnull):
+            # Can't create the cache folder so the export fails.
+            job = request_visual_export(visual)
+
+        self.assertEqual(VisualExportJob.Status.FAILED, job.status)
+        self.assertNotEqual("", job.error_message)
+
+    def test_download_served_from_cache(self):
+        self.client.force_login(get_user_model().objects.get(id=self.visual_owner_id))
+
+        first_response = self.client.get(f"/pv/download-visual-pptx/{self.visual_id}")
+        second_response = self.client.get(f"/pv/download-visual-pptx/{self.visual_id}")
+
+        self.assertEqual(200, first_response.status_code)
+        self.assertEqual(first_response.content, second_response.content)
+        self.assertEqual(1, VisualExportJob.objects.filter(visual_id=self.visual_id).count())
+
+    def test_export_api(self):
+        self.client.force_login(get_user_model().objects.get(id=self.visual_owner_id))
+        response = self.client.post(f"/api/v1/export/pptx/visuals/{self.visual_id}/")
+        self.assertEqual(200, response.status_code)
+
+        job_data = response.json()
+        self.assertEqual(VisualExportJob.Status.COMPLETE, job_data["status"])
+        self.assertEqual(f"/pv/download-visual-pptx/{self.visual_id}", job_data["download_url"])
+
+        status_response = self.client.get(f"/api/v1/export/pptx/jobs/{job_data['id']}/")
+        self.assertEqual(200, status_response.status_code)
+        self.assertEqual(job_data["id"], status_response.json()["id"])
+
+    def test_export_api_queued_job(self):
+        self.client.force_login(get_user_model().objects.get(id=self.visual_owner_id))
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        job = VisualExportJob.objects.create(visual=visual, render_revision=visual.render_revision)
+
+        # Job isn't stale yet so is returned rather than a new export being started.
+        response = self.client.post(f"/api/v1/export/pptx/visuals/{self.visual_id}/")
+
+        self.assertEqual(202, response.status_code)
+        self.assertEqual(job.id, response.json()["id"])
+        self.assertIsNone(response.json()["download_url"])
+
+    def test_stale_job_replaced(self):
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        stale_job = VisualExportJob.objects.create(visual=visual, render_revision=visual.render_revision)
+
+        with self.settings(PPTX_EXPORT_JOB_TIMEOUT=-1):
+            job = request_visual_export(visual)
+
+        stale_job.refresh_from_db()
+        self.assertEqual(VisualExportJob.Status.FAILED, stale_job.status)
+        self.assertEqual(VisualExportJob.Status.COMPLETE, job.status)
+
+    def test_missing_visual_and_job(self):
+        self.client.force_login(get_user_model().objects.get(id=self.visual_owner_id))
+        self.assertEqual(404, self.client.post("/api/v1/export/pptx/visuals/999/").status_code)
+        self.assertEqual(404, self.client.get("/api/v1/export/pptx/jobs/999/").status_code)
+
+    def test_other_users_visual_and_job(self):
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        job = VisualExportJob.objects.create(visual=visual, render_revision=visual.render_revision)
+        self.client.force_login(get_user_model().objects.get(id=self.other_user_id))
+
+        self.assertEqual(404, self.client.post(f"/api/v1/export/pptx/visuals/{self.visual_id}/").status_code)
+        self.assertEqual(404, self.client.get(f"/api/v1/export/pptx/jobs/{job.id}/").status_code)
+        self.assertEqual([job.id], list(VisualExportJob.objects.values_list("id", flat=True)))
+
+    def test_anonymous_user(self):
+        visual = PlanVisual.objects.get(id=self.visual_id)
+        job = VisualExportJob.objects.create(visual=visual, render_revision=visual.render_revision)
+
+        self.assertEqual(404, self.client.post(f"/api/v1/export/pptx/visuals/{self.visual_id}/").status_code)
+        self.assertEqual(404, self.client.get(f"/api/v1/export/pptx/jobs/{job.id}/").status_code)
+
+    def test_render_in_worker_process(self):
+        visual_plotables = VisualRenderSnapshot(self.visual_id).get_plotables()
+
+        with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=_initialise_worker
+        ) as executor:
+            worker_bytes = executor.submit(render_pptx_bytes, visual_plotables).result(timeout=120)
+
+        presentation = Presentation(io.BytesIO(worker_bytes))
+        self.assertGreater(len(presentation.slides), 0)
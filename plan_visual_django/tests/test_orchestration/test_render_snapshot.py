@@ -0,0 +1,129 @@
+import os
+from ddt import ddt, data
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from plan_visual_django.models import PlanVisual, Plan, PlotableStyle, VisualActivity, TimelineForVisual
+from plan_visual_django.services.visual.model.plotable_shapes import PlotableShapeName
+from plan_visual_django.services.visual.rendering.render_snapshot import VisualRenderSnapshot
+from plan_visual_django.services.visual.rendering.renderers import CanvasRenderer
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+@ddt
+class TestVisualRenderSnapshot(TestCase):
+    """
+    Checks that the plotables calculated by the bulk loaded snapshot are identical to those calculated by the
+    per-object model methods, and that the number of queries used doesn't grow with the size of the visual.
+    """
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json')
+    ]
+
+    @staticmethod
+    def create_visual(num_activities):
+        """
+        Creates a visual for plan 2 from the fixtures with three swimlanes, two enabled timelines and one disabled
+        timeline, and adds the first num_activities activities from the plan spread across the swimlanes and tracks.
+
+        :param num_activities:
+        :return:
+        """
+        plan = Plan.objects.get(pk=2)
+        style = PlotableStyle.objects.get(pk=102)
+        default_style = PlotableStyle.objects.get(style_name="app_user_style_01")
+        visual = PlanVisual.objects.create_with_defaults(
+            plan=plan,
+            default_activity_plotable_style=default_style,
+            default_milestone_plotable_style=default_style,
+            default_swimlane_plotable_style=default_style,
+            default_timeline_plotable_style_odd=default_style,
+            default_timeline_plotable_style_even=default_style,
+            track_height=10,
+            track_gap=3,
+            swimlane_gap=5,
+            timeline_gap=2,
+            timeline_to_swimlane_gap=7
+        )
+        swimlanes = visual.add_swimlanes_to_visual(style, "Swimlane 1", "Swimlane 2", "Swimlane 3")
+
+        timelines = [
+            (TimelineForVisual.TimelineLabelType.MONTHS.value, True),
+            (TimelineForVisual.TimelineLabelType.QUARTERS.value, True),
+            (TimelineForVisual.TimelineLabelType.HALF_YEAR.value, False),
+        ]
+        for sequence_number, (timeline_type, enabled) in enumerate(timelines, start=1):
+            TimelineForVisual.objects.create(
+                plan_visual=visual,
+                timeline_type=timeline_type,
+                timeline_name=timeline_type,
+                timeline_height=15,
+                plotable_style_odd=style,
+                plotable_style_even=default_style,
+                sequence_number=sequence_number,
+                enabled=enabled
+            )
+
+        for index, activity in enumerate(plan.planactivity_set.all()[:num_activities], start=1):
+            VisualActivity.objects.create(
+                visual=visual,
+                unique_id_from_plan=activity.unique_sticky_activity_id,
+                enabled=index % 7 != 0,
+                swimlane=swimlanes[index % 2],  # Leave third swimlane empty so it isn't visible
+                plotable_shape=PlotableShapeName.DIAMOND.value if activity.milestone_flag else PlotableShapeName.BULLET.value,
+                vertical_positioning_value=index % 4 + 1,
+                height_in_tracks=1 + index % 2,
+                text_horizontal_alignment=VisualActivity.HorizontalAlignment.CENTER.value,
+                text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE.value,
+                text_flow=VisualActivity.TextFlow.FLOW_TO_RIGHT.value,
+                plotable_style=style if index % 3 else default_style,
+            )
+        return visual
+
+    @data(1, 5, 26)
+    def test_snapshot_matches_model_methods(self, num_activities):
+        visual = self.create_visual(num_activities)
+
+        legacy_plotables = {
+            "timelines": visual.get_timeline_plotables(),
+            "swimlanes": visual.get_swimlane_plotables(),
+            "visual_activities": visual.get_visual_activity_plotables(),
+        }
+        snapshot_plotables = VisualRenderSnapshot(visual.id).get_plotables()
+
+        expected = CanvasRenderer().render_from_iterable(legacy_plotables)
+        actual = CanvasRenderer().render_from_iterable(snapshot_plotables)
+
+        self.assertEqual(expected, actual)
+
+    @data(2, 3)
+    def test_snapshot_matches_model_methods_for_sequence_number(self, sequence_number):
+        visual = self.create_visual(26)
+        snapshot = VisualRenderSnapshot(visual.id)
+
+        expected = CanvasRenderer().render_from_iterable({
+            "timelines": visual.get_timeline_plotables(sequence_number=sequence_number),
+            "swimlanes": visual.get_swimlane_plotables(sequence_number=sequence_number),
+        })
+        actual = CanvasRenderer().render_from_iterable({
+            "timelines": snapshot.get_timeline_plotables(sequence_number=sequence_number),
+            "swimlanes": snapshot.get_swimlane_plotables(sequence_number=sequence_number),
+        })
+
+        self.assertEqual(expected, actual)
+
+    def test_query_count_independent_of_visual_size(self):
+        """
+        Renders a small and a large visual and checks that the same number of queries is used for both.
+        """
+        query_counts = []
+        for num_activities in (2, 26):
+            visual = self.create_visual(num_activities)
+            with CaptureQueriesContext(connection) as context:
+                VisualRenderSnapshot(visual.id).get_plotables()
+            query_counts.append(len(context.captured_queries))
+
+        small_visual_count, large_visual_count = query_counts
+        self.assertEqual(small_visual_count, large_visual_count)
+        self.assertLessEqual(large_visual_count, 6)
@@ -0,0 +1,132 @@
+import os
+from ddt import ddt, data, unpack
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from plan_visual_django.models import PlanVisual, Plan, PlotableStyle, VisualActivity
+from plan_visual_django.services.visual.model.plotable_shapes import PlotableShapeName
+from plan_visual_django.tests.resources.unit_test_configuration import test_fixtures_folder, test_data_base_folder
+
+
+@ddt
+class TestSwimlaneGeometry(TestCase):
+    """
+    Visual used for the tests has track height 10, track gap 3, swimlane gap 5 and no timelines.
+    - Swimlane 1 has activities on tracks 1 and 3 so is 3 tracks high (36).
+    - Swimlane 2 has no enabled activities so isn't visible.
+    - Swimlane 3 has an activity on track 2 which is 2 tracks high, so is also 3 tracks high (36).
+    """
+    fixtures = [
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'auth_test_fixtures.json'),
+        os.path.join(test_data_base_folder, test_fixtures_folder, 'test_fixtures.json')
+    ]
+
+    def setUp(self):
+        plan = Plan.objects.get(pk=2)
+        self.style = PlotableStyle.objects.get(pk=102)
+        self.visual = PlanVisual.objects.create_with_defaults(
+            plan=plan,
+            default_activity_plotable_style=self.style,
+            default_milestone_plotable_style=self.style,
+            default_swimlane_plotable_style=self.style,
+            default_timeline_plotable_style_odd=self.style,
+            default_timeline_plotable_style_even=self.style,
+            track_height=10,
+            track_gap=3,
+            swimlane_gap=5,
+            timeline_gap=0,
+            timeline_to_swimlane_gap=0
+        )
+        self.swimlanes = self.visual.add_swimlanes_to_visual(self.style, "Swimlane 1", "Swimlane 2", "Swimlane 3")
+
+        activities = [
+            ("ID-001", True, 0, 1, 1),
+            ("ID-002", True, 0, 3, 1),
+            ("ID-003", False, 1, 1, 1),
+            ("ID-004", True, 2, 2, 2),
+        ]
+        for sticky_id, enabled, swimlane_index, track_number, height_in_tracks in activities:
+            self.add_activity(sticky_id, enabled, self.swimlanes[swimlane_index], track_number, height_in_tracks)
+
+    def add_activity(self, sticky_id, enabled, swimlane, track_number, height_in_tracks=1):
+        return VisualActivity.objects.create(
+            visual=self.visual,
+            unique_id_from_plan=sticky_id,
+            enabled=enabled,
+            swimlane=swimlane,
+            plotable_shape=PlotableShapeName.RECTANGLE.value,
+            vertical_positioning_value=track_number,
+            height_in_tracks=height_in_tracks,
+            text_horizontal_alignment=VisualActivity.HorizontalAlignment.CENTER.value,
+            text_vertical_alignment=VisualActivity.VerticalAlignment.MIDDLE.value,
+            text_flow=VisualActivity.TextFlow.FLOW_TO_LEFT.value,
+            plotable_style=self.style,
+        )
+
+    @data(
+        (0, 0, 36),
+        (1, 41, 0),
+        (2, 41, 36),
+    )
+    @unpack
+    def test_swimlane_top_and_height(self, swimlane_index, expected_top, expected_height):
+        geometry = self.visual.get_swimlane_geometry()
+        swimlane = self.swimlanes[swimlane_index]
+
+        self.assertEqual(expected_top, geometry.get_swimlane_top(swimlane.id))
+        self.assertEqual(expected_height, geometry.get_swimlane_height(swimlane.id))
+
+    @data(
+        (0, 1, 0),
+        (0, 3, 26),
+        (2, 1, 41),
+        (2, 2, 54),
+    )
+    @unpack
+    def test_top_of_track(self, swimlane_index, track_number, expected_top):
+        swimlane = self.swimlanes[swimlane_index]
+
+        self.assertEqual(expected_top, self.visual.get_swimlane_geometry().get_top_of_track(swimlane.id, track_number))
+        self.assertEqual(expected_top, swimlane.get_top_of_track(track_number))
+
+    @data(
+        (None, 77),
+        (2, 36),
+        (3, 36),
+        (1, 0),
+    )
+    @unpack
+    def test_swimlane_area_dimensions(self, sequence_number, expected_height):
+        top, left, width, height = self.visual.get_swimlanesforvisual_dimensions(sequence_number)
+
+        self.assertEqual((0, 0, self.visual.width, expected_height), (top, left, width, height))
+
+    def test_geometry_reused_until_visual_changes(self):
+        geometry = self.visual.get_swimlane_geometry()
+        self.assertIs(geometry, self.visual.get_swimlane_geometry())
+
+        # Moving an activity down in swimlane 1 makes it 5 tracks high, which pushes swimlane 3 down.
+        activity = self.visual.visualactivity_set.get(unique_id_from_plan="ID-002")
+        activity.vertical_positioning_value = 5
+        activity.save()
+
+        updated_geometry = self.visual.get_swimlane_geometry()
+        self.assertIsNot(geometry, updated_geometry)
+        self.assertEqual(62, updated_geometry.get_swimlane_height(self.swimlanes[0].id))
+        self.assertEqual(67, updated_geometry.get_swimlane_top(self.swimlanes[2].id))
+
+    def test_swimlane_plotable_queries_independent_of_activity_count(self):
+        """
+        Plotting the swimlanes shouldn't need extra queries as more activities and tracks are added.
+        """
+        def count_queries():
+            visual = PlanVisual.objects.get(pk=self.visual.pk)
+            with CaptureQueriesContext(connection) as context:
+                visual.get_swimlane_plotables()
+            return len(context.captured_queries)
+
+        initial_count = count_queries()
+        for track_number, sticky_id in enumerate(["ID-010", "ID-011", "ID-012", "ID-013", "ID-014"], start=4):
+            self.add_activity(sticky_id, True, self.swimlanes[2 * (track_number % 2)], track_number)
+
+        self.assertEqual(initial_count, count_queries())
@@ -0,0 +1,51 @@
+"""
+Checks that the batch calculation of x coordinates in DatePlotter gives exactly the same results as calculating each
+activity separately, as the results need to be interchangeable.
+"""
+import random
+from datetime import date, timedelta
+from ddt import ddt, data, unpack
+from django.test import TestCase
+from plan_visual_django.services.general.date_utilities import DatePlotter
+
+
+@ddt
+class TestDatePlotterBatch(TestCase):
+    @data(
+        # earliest_date, latest_date, x_plot_start, x_plot_end
+        (date(2023, 1, 1), date(2023, 12, 31), 0, 1000),
+        (date(2023, 1, 1), date(2023, 12, 31), 0, 1234.5),
+        (date(2022, 11, 1), date(2026, 4, 30), 17, 899.37),
+        (date(1995, 2, 28), date(2040, 2, 29), 3.25, 7000),
+        (date(2024, 2, 29), date(2024, 2, 29), 0, 600),
+    )
+    @unpack
+    def test_batch_matches_scalar(self, earliest_date, latest_date, x_plot_start, x_plot_end):
+        date_plotter = DatePlotter(earliest_date, latest_date, x_plot_start, x_plot_end)
+
+        randomiser = random.Random(earliest_date.toordinal())
+        num_days = (latest_date - earliest_date).days
+        start_dates = [earliest_date + timedelta(days=randomiser.randint(0, num_days)) for _ in range(500)]
+        end_dates = [
+            start_date + timedelta(days=randomiser.randint(0, (latest_date - start_date).days))
+            for start_date in start_dates
+        ]
+
+        left, width, midpoint = date_plotter.batch_coordinates(
+            [start_date.toordinal() for start_date in start_dates],
+            [end_date.toordinal() for end_date in end_dates],
+        )
+
+        for index, (start_date, end_date) in enumerate(zip(start_dates, end_dates)):
+            with self.subTest(start_date=start_date, end_date=end_date):
+                # Exact comparison deliberately - must be the same to the last bit.
+                self.assertEqual(date_plotter.left(start_date), left[index])
+                self.assertEqual(date_plotter.width(start_date, end_date), width[index])
+                self.assertEqual(date_plotter.midpoint(start_date), midpoint[index])
+
+    def test_batch_with_no_activities(self):
+        date_plotter = DatePlotter(date(2023, 1, 1), date(2023, 12, 31), 0, 1000)
+
+        left, width, midpoint = date_plotter.batch_coordinates([], [])
+
+        self.assertEqual((0, 0, 0), (len(left), len(width), len(midpoint)))
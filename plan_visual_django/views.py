@@ -8,27 +8,26 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction, IntegrityError
 from django.db.models import ProtectedError
 from django.forms import inlineformset_factory, formset_factory
-from django.http import HttpResponseRedirect, HttpResponseForbidden, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponseForbidden, HttpResponse, HttpResponseBadRequest
 from django.urls import reverse
 from django.views.generic import DetailView, ListView
-from plan_visual_django.exceptions import DuplicateSwimlaneException, PlanParseError, ExcelPlanSheetNotFound, \
-    SuppliedPlanIncompleteError
+from plan_visual_django.exceptions import DuplicateSwimlaneException, PlanImportLimitReached
 from plan_visual_django.forms import PlanForm, VisualFormForAdd, VisualFormForEdit, ReUploadPlanForm, \
     VisualSwimlaneFormForEdit, VisualTimelineFormForEdit, ColorForm, PlotableStyleForm, \
     SwimlaneDropdownForm, CustomLoginForm
 from plan_visual_django.models import Plan, PlanVisual, SwimlaneForVisual, PlotableStyle, TimelineForVisual, Color, \
-    StaticContent, HelpText
+    StaticContent, HelpText, PlanImportJob
 from plan_visual_django.services.general.color_utilities import ColorLib
 from plan_visual_django.services.plan_file_utilities.plan_field import FileTypes, FileType
-from plan_visual_django.services.plan_file_utilities.plan_parsing import read_and_parse_plan
-from plan_visual_django.services.plan_file_utilities.plan_reader import ExcelXLSFileReader
+from plan_visual_django.services.plan_file_utilities.plan_import import check_import_limit, start_plan_import, \
+    get_user_import_jobs
 from plan_visual_django.services.auth.user_services import get_current_user, \
     CurrentUser
 from plan_visual_django.services.visual.model.auto_layout import VisualLayoutManager
 from plan_visual_django.services.visual.model.visual_settings import VisualSettings
-from plan_visual_django.services.visual.rendering.renderers import PowerPointRenderer
+from plan_visual_django.services.visual.export.pptx_export import get_visual_pptx, PPTX_CONTENT_TYPE
+from plan_visual_django.services.visual.export.pptx_deck_export import render_plan_deck_bytes, get_visuals_for_deck
 import logging
-import io
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import login, get_user_model
@@ -64,6 +63,23 @@ def get_session_user_identifier(request):
     return f"session_{request.session.session_key}"
 
 
+def report_import_job(request, job, success_message):
+    """
+    Adds a message for the outcome of an import job, which will only be known if the import was carried out while
+    handling the request.
+    """
+    if job.skipped_unchanged:
+        messages.info(request, f"Plan file is the same as the current version of {job.plan_name}, nothing to update")
+    elif job.status == job.Status.COMPLETE:
+        messages.success(request, success_message)
+    elif job.status == job.Status.FAILED:
+        messages.error(request, job.error_message)
+    elif job.status == job.Status.CANCELLED:
+        messages.info(request, f"Import of plan {job.plan_name} cancelled")
+    else:
+        messages.info(request, f"Plan {job.plan_name} is being imported, progress is shown below")
+
+
 def add_plan(request):
     """
     Uploads and imports a new plan file and associates it with either the authenticated user
@@ -96,22 +112,18 @@ def add_plan(request):
             setattr(plan, plan_user_attribute, plan_user_value)
             plan.file_name = plan.file.name
 
-            # Use atomic transaction to ensure all operations succeed or none are committed
-            with transaction.atomic():
-                try:
-                    plan.save()
-                    logger.info(f"Plan record added for {'anonymous user' if current_user.is_anonymous() else current_user.user.username}, file: {plan.file.name}")
-
-                    # Parse the plan after saving
-                    file_type, plan_field_mapping = FileTypes.get_file_type_by_name(plan.file_type_name)
-                    file_reader = ExcelXLSFileReader()
+            try:
+                check_import_limit(current_user)
+            except PlanImportLimitReached as e:
+                messages.error(request, f"{e}")
+                return HttpResponseRedirect(reverse('manage-plans'))
 
-                    read_and_parse_plan(plan, plan_field_mapping, file_reader)
+            plan.save()
+            logger.info(f"Plan record added for {'anonymous user' if current_user.is_anonymous() else current_user.user.username}, file: {plan.file.name}")
 
-                    messages.success(request, "New plan saved successfully")
-                except (PlanParseError, ExcelPlanSheetNotFound, SuppliedPlanIncompleteError) as e:
-                    messages.error(request, f"Error parsing plan {plan.file.path}: {e}")
-                    transaction.set_rollback(True)
+            # The plan is parsed and its activities saved by an import job, as for a big plan this can take a while.
+            job = start_plan_import(current_user, plan)
+            report_import_job(request, job, "New plan saved successfully")
 
         else:
             messages.error(request, "Plan validation failed. Please check the form.")
@@ -133,7 +145,6 @@ def add_plan(request):
         raise ValueError(f"Unrecognized METHOD {request.method}")
 
 
-@transaction.atomic  # Ensure that if there is an error either on uploading the plan or parsing the plan no records saved
 def re_upload_plan(request, pk):
     """
     Re uploads an existing plan to reflect changes made to the plan.  This is useful if the user has made changes to
@@ -145,6 +156,8 @@ def re_upload_plan(request, pk):
     - If it doesn't then add a new record.
     - If the unique_sticky_activity_id exists in the database but not in the plan then delete the record.
 
+    This is carried out by an import job (see plan_import.py), and if the import fails the plan is left as it was.
+
     :param pk:
     :param request:
     :return:
@@ -168,29 +181,17 @@ def re_upload_plan(request, pk):
             # of the file.  We will use this to modify the existing plan record.
             # Not sure if this is best practice but should work!
 
-            plan_record.file = plan_form.cleaned_data['file']
-            plan_record.file_name = plan_form.cleaned_data['file'].name
-            plan_record.save()
-
-            logger.debug(f"File uploaded for user {current_user.user.username}, plan {plan_record.plan_name}")
-            logger.debug(f"Re-importing plan for user {current_user.user.username}, plan is {plan_record.plan_name}")
-
-            # Have saved the record, now parse the plan and store activities.
-            # Only store fields which are part of the plan for the given file type.
-
-            file_type, plan_mapped_fields = FileTypes.get_file_type_by_name(plan_record.file_type_name)
-            file_reader = ExcelXLSFileReader()
-
             try:
-                read_and_parse_plan(plan_record, plan_mapped_fields, file_reader, update_flag=True)
-            except PlanParseError as e:
-                messages.error(request, f"Plan parse error parsing {plan_record.file.path}, {e}")
-                transaction.set_rollback(True)
-            except ExcelPlanSheetNotFound as e:
+                check_import_limit(current_user)
+            except PlanImportLimitReached as e:
                 messages.error(request, f"{e}")
-                transaction.set_rollback(True)
-            else:
-                messages.success(request, "Updated plan saved successfully")
+                return HttpResponseRedirect(reverse('manage-plans'))
+
+            # The new version of the file is held on the import job, and only replaces the plan's file once the plan has
+            # been re-imported successfully.
+            logger.debug(f"Re-importing plan for user {current_user.user.username}, plan is {plan_record.plan_name}")
+            job = start_plan_import(current_user, plan_record, new_file=plan_form.cleaned_data['file'])
+            report_import_job(request, job, "Updated plan saved successfully")
 
         else:
             messages.error(request, "Re-uploaded version of plan upload failed validation")
@@ -391,13 +392,19 @@ def manage_plans(request):
     for plan_file in plan_files:
         plan_file.file_type_title = FileType.from_name(plan_file.file_type_name).title
 
+    # Imports still in progress are listed so that the page can poll for their progress.
+    import_jobs = get_user_import_jobs(current_user).filter(
+        status__in=[PlanImportJob.Status.QUEUED, PlanImportJob.Status.RUNNING]
+    )
+
     help_text = HelpText.get_help_text("manage-plans")
     context = {
         'help_text': help_text,
         'primary_heading': "Manage Plans",
         'secondary_heading': "",
         'user': current_user.user,
-        'plan_files': plan_files
+        'plan_files': plan_files,
+        'import_jobs': import_jobs
     }
     return render(request, "plan_visual_django/pv_manage_plans.html", context)
 
@@ -725,24 +732,59 @@ def download_visual_pptx(request, visual_id):
         messages.error(request, "You do not have access to this visual")
         return HttpResponseForbidden("You do not have permission to download this visual.")
 
-    # Get plotables for the visual
-    visual_plotables = visual.get_plotables()
-
-    # Create renderer and render
-    renderer = PowerPointRenderer()
-    presentation = renderer.render_from_iterable(visual_plotables)
-
-    # Save to a BytesIO buffer
-    buffer = io.BytesIO()
-    presentation.save(buffer)
-    buffer.seek(0)
+    # File is generated by the export worker pool, or taken from the export cache if the visual hasn't changed since it
+    # was last exported.
+    pptx_bytes = get_visual_pptx(visual)
+    if pptx_bytes is None:
+        return HttpResponse("PowerPoint export is not available at the moment, please try again.", status=503)
 
     # Prepare the response
     filename = f"{visual.name.replace(' ', '_')}.pptx"
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.presentationml.presentation'
-    )
+    response = HttpResponse(pptx_bytes, content_type=PPTX_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    return response
+
+
+@login_required
+def download_plan_pptx(request, plan_id):
+    """
+    Renders visuals from a plan as a single PowerPoint deck, one slide per visual, and returns it as a download.
+
+    All the plan's visuals are included unless specific visuals are chosen using the visual query parameter, which
+    can be repeated (e.g. ?visual=4&visual=5).
+
+    :param request:
+    :param plan_id:
+    :return:
+    """
+    current_user = CurrentUser(request)
+    try:
+        plan = Plan.objects.get(id=plan_id)
+    except Plan.DoesNotExist:
+        messages.error(request, "Plan does not exist")
+        return HttpResponseRedirect(reverse('manage-plans'))
+
+    if not current_user.has_access_to_object(plan):
+        messages.error(request, "You do not have access to this plan")
+        return HttpResponseForbidden("You do not have permission to download this plan.")
+
+    visual_ids = request.GET.getlist("visual")
+    try:
+        visual_ids = [int(visual_id) for visual_id in visual_ids] if visual_ids else None
+    except ValueError:
+        return HttpResponseBadRequest("Visual ids must be numbers")
+
+    if not get_visuals_for_deck(plan, visual_ids).exists():
+        messages.error(request, "No visuals to download for this plan")
+        return HttpResponseRedirect(reverse('manage-visuals', args=[plan_id]))
+
+    pptx_bytes = render_plan_deck_bytes(plan, visual_ids)
+    if pptx_bytes is None:
+        return HttpResponse("PowerPoint export is not available at the moment, please try again.", status=503)
+
+    filename = f"{plan.plan_name.replace(' ', '_')}.pptx"
+    response = HttpResponse(pptx_bytes, content_type=PPTX_CONTENT_TYPE)
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
     return response
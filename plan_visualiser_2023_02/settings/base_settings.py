@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from django.contrib.messages import constants as messages
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 SECRET_KEY = os.getenv('SECRET_KEY', 'dummy-secret-key-for-dev')
@@ -94,6 +95,87 @@ LOGGING = {
     },
 }
 
+# ------------------------------------------
+# Cache Configuration
+# ------------------------------------------
+# Rendered visuals are cached against the visual's render revision (see
+# plan_visual_django/services/visual/rendering/render_cache.py).  The backend can be selected from the environment:
+#   locmem: In-process memory (default).  Least recently used entries are evicted once MAX_ENTRIES is reached.
+#   file:   File based, shared between processes on the same machine.
+#   db:     Database table, shared between all processes.  Table needs creating with `manage.py createcachetable`.
+#   none:   Disable caching of rendered visuals.
+RENDER_CACHE_BACKEND = os.getenv('RENDER_CACHE_BACKEND', 'locmem').lower()
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv('RENDER_CACHE_MAX_ENTRIES', '500'))
+
+render_cache_backends = {
+    "locmem": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "rendered-visuals"},
+    "file": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": os.path.join(BASE_DIR, "devops/cache/rendered_visuals")},
+    "db": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "rendered_visual_cache"},
+    "none": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+if RENDER_CACHE_BACKEND not in render_cache_backends:
+    raise ImproperlyConfigured(
+        f"RENDER_CACHE_BACKEND '{RENDER_CACHE_BACKEND}' not recognised, must be one of: "
+        f"{', '.join(render_cache_backends)}"
+    )
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "rendered_visuals": {
+        **render_cache_backends[RENDER_CACHE_BACKEND],
+        "TIMEOUT": None,  # Entries are never out of date as key includes the revision, so just rely on eviction.
+        "OPTIONS": {"MAX_ENTRIES": RENDER_CACHE_MAX_ENTRIES},
+    },
+}
+
+# ------------------------------------------
+# PowerPoint Export
+# ------------------------------------------
+# PowerPoint files are generated by a pool of worker processes and kept on disk against the visual's render revision
+# (see plan_visual_django/services/visual/export/pptx_export.py).
+#   PPTX_EXPORT_MAX_WORKERS:     Number of worker processes.  0 generates files in the requesting process.
+#   PPTX_EXPORT_CACHE_DIR:       Folder where generated files are kept.
+#   PPTX_EXPORT_CACHE_MAX_BYTES: Once generated files take up more than this, least recently used files are removed.
+#   PPTX_EXPORT_JOB_TIMEOUT:     Seconds to wait for an export before giving up.
+PPTX_EXPORT_MAX_WORKERS = int(os.getenv('PPTX_EXPORT_MAX_WORKERS', '2'))
+PPTX_EXPORT_CACHE_DIR = os.getenv('PPTX_EXPORT_CACHE_DIR', os.path.join(BASE_DIR, "devops/cache/pptx_exports"))
+PPTX_EXPORT_CACHE_MAX_BYTES = int(os.getenv('PPTX_EXPORT_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+PPTX_EXPORT_JOB_TIMEOUT = int(os.getenv('PPTX_EXPORT_JOB_TIMEOUT', '300'))
+
+# ------------------------------------------
+# Auto-layout
+# ------------------------------------------
+# The lanes of a full visual are laid out by a pool of worker processes for big plans
+# (see plan_visual_django/services/visual/model/auto_layout_pool.py).
+#   AUTO_LAYOUT_MAX_WORKERS:             Number of worker processes.  0 lays out every plan in the requesting process.
+#   AUTO_LAYOUT_PARALLEL_MIN_ACTIVITIES: Plans with fewer activities than this are laid out in the requesting process.
+AUTO_LAYOUT_MAX_WORKERS = int(os.getenv('AUTO_LAYOUT_MAX_WORKERS', '2'))
+AUTO_LAYOUT_PARALLEL_MIN_ACTIVITIES = int(os.getenv('AUTO_LAYOUT_PARALLEL_MIN_ACTIVITIES', '5000'))
+
+# ------------------------------------------
+# Plan Import
+# ------------------------------------------
+# Uploaded plans are imported by a pool of worker threads, with progress recorded on a PlanImportJob
+# (see plan_visual_django/services/plan_file_utilities/plan_import.py).
+#   PLAN_IMPORT_MAX_WORKERS:  Number of worker threads.  0 imports the plan in the requesting thread.
+#   PLAN_IMPORT_MAX_PER_USER: Maximum number of imports a user (or anonymous session) can have queued or running.
+#   PLAN_IMPORT_JOB_TIMEOUT:  Seconds without a heartbeat after which an import is assumed to have been lost.
+PLAN_IMPORT_MAX_WORKERS = int(os.getenv('PLAN_IMPORT_MAX_WORKERS', '2'))
+PLAN_IMPORT_MAX_PER_USER = int(os.getenv('PLAN_IMPORT_MAX_PER_USER', '2'))
+PLAN_IMPORT_JOB_TIMEOUT = int(os.getenv('PLAN_IMPORT_JOB_TIMEOUT', '600'))
+
+# ------------------------------------------
+# Plan Tree Cache
+# ------------------------------------------
+# Trees built from the activities of a plan are kept in each process between requests, keyed by plan revision
+# (see plan_visual_django/services/plan_file_utilities/plan_tree_cache.py).
+#   PLAN_TREE_CACHE_MAX_PLANS:      Maximum number of plans whose trees are kept.  0 turns the cache off.
+#   PLAN_TREE_CACHE_MAX_ACTIVITIES: Maximum number of activities across all the trees kept, to limit memory used.
+PLAN_TREE_CACHE_MAX_PLANS = int(os.getenv('PLAN_TREE_CACHE_MAX_PLANS', '50'))
+PLAN_TREE_CACHE_MAX_ACTIVITIES = int(os.getenv('PLAN_TREE_CACHE_MAX_ACTIVITIES', '500000'))
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
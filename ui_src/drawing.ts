@@ -39,3 +39,108 @@ export function initialise_canvas(settings: any) {
     return context
 }
 
+
+// Media type for the compact binary format of the rendered canvas endpoints (see render_binary.py on the server).
+export const CANVAS_BINARY_MEDIA_TYPE = "application/vnd.plan-visualiser.canvas"
+
+const CANVAS_BINARY_MAGIC = "PVCB"
+const CANVAS_BINARY_VERSION = 1
+const NULL_STRING_INDEX = 0xFFFFFFFF
+
+export function decode_canvas_binary(buffer: ArrayBuffer): any {
+  // Decodes the binary canvas format into the same structure as the JSON returned by the rendered canvas endpoints,
+  // so that the plotting code doesn't need to know which format was used.
+  //
+  // Arrays are read as typed array views directly onto the buffer (every section starts on a 4 byte boundary).  Typed
+  // arrays use the platform byte order, and the format is little endian, which is what all mainstream browsers use.
+  let position = 0
+
+  function read_array<T>(array_type: { new(buffer: ArrayBuffer, offset: number, length: number): T, BYTES_PER_ELEMENT: number }, length: number): T {
+    const values = new array_type(buffer, position, length)
+    position += length * array_type.BYTES_PER_ELEMENT
+    position += (4 - position % 4) % 4
+    return values
+  }
+
+  const header = new DataView(buffer, 0, 16)
+  const magic = String.fromCharCode(header.getUint8(0), header.getUint8(1), header.getUint8(2), header.getUint8(3))
+  if (magic !== CANVAS_BINARY_MAGIC) {
+    throw new Error("Not a binary canvas payload")
+  }
+  const version = header.getUint16(4, true)
+  if (version !== CANVAS_BINARY_VERSION) {
+    throw new Error(`Unsupported binary canvas version ${version}`)
+  }
+  const num_layers = header.getUint16(6, true)
+  const num_strings = header.getUint32(8, true)
+  const num_colors = header.getUint32(12, true)
+  position = 16
+
+  const offsets = read_array(Uint32Array, num_strings + 1)
+  const text_block = read_array(Uint8Array, offsets[num_strings])
+  const text_decoder = new TextDecoder()
+  const strings: string[] = []
+  for (let i = 0; i < num_strings; i++) {
+    strings.push(text_decoder.decode(text_block.subarray(offsets[i], offsets[i + 1])))
+  }
+  const string = (index: number) => index === NULL_STRING_INDEX ? null : strings[index]
+
+  const palette = Array.from(read_array(Uint32Array, num_colors), (index: number) => strings[index])
+
+  const rendered: any = {}
+  for (let layer_number = 0; layer_number < num_layers; layer_number++) {
+    const [name_index, num_shapes, num_texts] = read_array(Uint32Array, 4)
+
+    const shape_dims = read_array(Float32Array, 5 * num_shapes)
+    const shape_strings = read_array(Uint32Array, 2 * num_shapes)
+    const shape_colors = read_array(Uint16Array, 2 * num_shapes)
+
+    const text_dims = read_array(Float32Array, 3 * num_texts)
+    const text_strings = read_array(Uint32Array, 4 * num_texts)
+    const text_colors = read_array(Uint16Array, num_texts)
+
+    const kinds = read_array(Uint8Array, num_shapes + num_texts)
+
+    const layer: any[] = []
+    let shape_number = 0
+    let text_number = 0
+    for (const kind of kinds) {
+      if (kind === 0) {
+        const i = shape_number++
+        layer.push({
+          plotable_id: string(shape_strings[i]),
+          shape_type: "rectangle",
+          shape_name: string(shape_strings[num_shapes + i]),
+          shape_plot_dims: {
+            top: shape_dims[i],
+            left: shape_dims[num_shapes + i],
+            width: shape_dims[2 * num_shapes + i],
+            height: shape_dims[3 * num_shapes + i],
+          },
+          fill_color: palette[shape_colors[i]],
+          stroke_color: palette[shape_colors[num_shapes + i]],
+          stoke_line_width: shape_dims[4 * num_shapes + i],
+        })
+      } else {
+        const i = text_number++
+        layer.push({
+          plotable_id: string(text_strings[i]),
+          shape_type: "text",
+          text: string(text_strings[num_texts + i]),
+          shape_name: null,
+          shape_plot_dims: {
+            x: text_dims[i],
+            y: text_dims[num_texts + i],
+            text_align: string(text_strings[2 * num_texts + i]),
+            text_baseline: string(text_strings[3 * num_texts + i]),
+          },
+          fill_color: palette[text_colors[i]],
+          font_size: text_dims[2 * num_texts + i],
+        })
+      }
+    }
+    rendered[strings[name_index]] = layer
+  }
+
+  return rendered
+}
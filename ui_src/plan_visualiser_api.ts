@@ -1,6 +1,7 @@
 // Functions which access API to get data with some simple pre-processing where necessary - no business logic!
 
 import axios, {HttpStatusCode} from "axios";
+import {CANVAS_BINARY_MEDIA_TYPE, decode_canvas_binary} from "./drawing";
 
 async function api_get(url_string: string) {
   const base_url = ""
@@ -11,6 +12,19 @@ async function api_get(url_string: string) {
   return await axios.get(base_url + url_string)
 }
 
+async function api_get_binary(url_string: string) {
+  // Asks for the compact binary format, for the rendered canvas endpoints which support it.  The endpoint may still
+  // return JSON (e.g. for errors) so the caller needs to check the content type.
+  const base_url = ""
+  axios.defaults.xsrfCookieName = 'csrftoken'
+  axios.defaults.xsrfHeaderName = "X-CSRFTOKEN"
+
+  return await axios.get(base_url + url_string, {
+    responseType: 'arraybuffer',
+    headers: {'Accept': CANVAS_BINARY_MEDIA_TYPE}
+  })
+}
+
 export async function api_post(url_string: string, data: undefined | object) {
   const base_url = ""
   axios.defaults.xsrfCookieName = 'csrftoken'
@@ -72,17 +86,80 @@ export async function get_visual_activity_data(visual_id: number) {
   // There is an enabled flag which indicates whether the activity is currently in the visual.
   console.log(`Requesting activity data for visual ${visual_id}`)
 
+  // If we already have this visual then just ask for what has changed since the revision we have.
+  const current_revision = (window as any).visual_revision
+  if (current_revision !== undefined && (window as any).visual_revision_visual_id === visual_id) {
+    const changes_url_string = `/api/v1/rendered/canvas/visuals/changes/${visual_id}/?since=${current_revision}`
+    const changes_response = await api_get(changes_url_string);
+
+    if (changes_response.status === HttpStatusCode.NoContent) {
+      console.log(`No activity data returned for visual ${visual_id}`);
+      (window as any).visual_activity_data = {};
+      (window as any).visual_revision = undefined
+    } else {
+      console.log(`Changes since revision ${current_revision} returned for visual ${visual_id}`);
+      apply_visual_changes(changes_response.data)
+    }
+    return
+  }
+
   const url_string = `/api/v1/rendered/canvas/visuals/${visual_id}/`
-  const response = await api_get(url_string);
+  const response = await api_get_binary(url_string);
 
   if (response.status === HttpStatusCode.NoContent) {
     // No activities in visual so use empty object
     console.log(`No activity data returned for visual ${visual_id}`);
-    (window as any).visual_activity_data = {}
+    (window as any).visual_activity_data = {};
+    (window as any).visual_revision = undefined
   } else {
     console.log(`Activity data returned for visual ${visual_id}`);
-    (window as any).visual_activity_data = response.data
+    if (String(response.headers['content-type']).startsWith(CANVAS_BINARY_MEDIA_TYPE)) {
+      (window as any).visual_activity_data = decode_canvas_binary(response.data);
+    } else {
+      (window as any).visual_activity_data = JSON.parse(new TextDecoder().decode(response.data));
+    }
+    (window as any).visual_revision = Number(response.headers['x-render-revision']);
+    (window as any).visual_revision_visual_id = visual_id
+  }
+}
+
+function rendered_object_keys(rendered_objects: any[]): string[] {
+  // Key for each rendered object which is unique within its layer - must match keys generated on the server.
+  // Repeated plotable ids have #n appended where n is the number of previous occurrences of that id.
+  const occurrences = new Map<string, number>()
+  return rendered_objects.map((rendered_object: any) => {
+    const plotable_id = rendered_object.plotable_id
+    const occurrence = occurrences.get(plotable_id) ?? 0
+    occurrences.set(plotable_id, occurrence + 1)
+    return occurrence === 0 ? plotable_id : `${plotable_id}#${occurrence}`
+  })
+}
+
+export function apply_visual_changes(changes: any) {
+  // Applies changes to the rendered visual returned from the changes endpoint to the visual data we already have.
+  if (changes.full) {
+    (window as any).visual_activity_data = changes.layers
+  } else {
+    const visual_data = (window as any).visual_activity_data
+    const layers = new Set([
+      ...Object.keys(changes.changed), ...Object.keys(changes.removed), ...Object.keys(changes.order)
+    ])
+    layers.forEach((layer: string) => {
+      const rendered_objects = visual_data[layer] ?? []
+      const keys = rendered_object_keys(rendered_objects)
+      const objects_by_key = new Map<string, any>(keys.map((key, index) => [key, rendered_objects[index]]))
+
+      for (const key of changes.removed[layer] ?? []) {
+        objects_by_key.delete(key)
+      }
+      for (const [key, rendered_object] of Object.entries(changes.changed[layer] ?? {})) {
+        objects_by_key.set(key, rendered_object)
+      }
+      const ordered_keys: string[] = changes.order[layer] ?? keys.filter((key) => objects_by_key.has(key))
+      visual_data[layer] = ordered_keys.map((key) => objects_by_key.get(key))
+    })
   }
+  (window as any).visual_revision = changes.revision
 }
 
 export async function add_activity_to_visual(visual_id: number, unique_id: string, swimlane_seq_num:number) {